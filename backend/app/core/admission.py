@@ -0,0 +1,286 @@
+# app/core/admission.py
+"""
+Admission control for request bursts.
+
+Requests are sorted into route classes: cheap reads, heavy reads (case
+detail, batch gets, delta sync) and writes. Each class may run a limited
+number of requests at once and park a bounded number more in a wait queue.
+A request gets a 503 with Retry-After instead of piling up inside uvicorn
+and the Motor pool when the queue is full, when the class's recent slot hold
+time says the requests ahead of it would keep it waiting longer than
+settings.admission_queue_timeout_seconds (refused right away), or when it
+actually waited that long.
+
+Writes have priority: a freed slot goes to a waiting write first, and
+settings.admission_write_reserve slots of settings.admission_max_concurrency
+can only be used by writes, so a flood of reads cannot starve them.
+
+The limits adapt to Mongo latency. A pymongo CommandListener (registered on
+the client in app/db/mongo.py) records command durations; every
+settings.admission_adjust_seconds the average is compared to a slowly
+moving baseline. While it is more than settings.admission_latency_tolerance
+times the baseline all limits shrink multiplicatively (down to
+settings.admission_min_scale of the configured values); once latency
+recovers they grow back additively. Without samples (idle, or the in-memory
+engine) the limits drift back to their configured values.
+
+Streams (/events SSE), /admin and the API docs are never queued.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from pymongo import monitoring
+from starlette.responses import JSONResponse
+
+from .config import settings
+
+RETRY_AFTER_SECONDS = 1
+
+# Multiplicative decrease / additive increase of the limit scale per adjustment
+_DECREASE = 0.75
+_INCREASE = 0.05
+# How fast the latency baseline follows latency that stays above it
+_BASELINE_DRIFT = 0.01
+# Weight of the newest request in a class's average slot hold time
+_SERVICE_ALPHA = 0.05
+
+_EXEMPT = re.compile(r"^/(admin|events|docs|redoc|openapi\.json)(/|$)|^/cases/[^/]+/events/?$|^/?$")
+_HEAVY_GET = re.compile(r"^/cases/[^/]+/?$|^/sync(/|$)")
+_HEAVY_POST = re.compile(r"/batch-get/?$")
+
+# Commands that do not reflect load: handshakes, and getMore, which blocks on change streams
+_IGNORED_COMMANDS = {
+    "getMore", "hello", "isMaster", "ismaster", "ping", "buildInfo", "endSessions",
+    "killCursors", "saslStart", "saslContinue", "abortTransaction", "commitTransaction",
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class RouteClass:
+    __slots__ = ("name", "limit", "reserve", "waiters", "active", "service_time", "admitted", "queued", "shed",
+                 "timed_out")
+
+    def __init__(self, name: str, limit: int, reserve: int = 0):
+        self.name = name
+        # Configured concurrency, and slots of the total it must leave free
+        self.limit = limit
+        self.reserve = reserve
+        self.waiters: Deque["asyncio.Future[float]"] = deque()
+        self.active = 0
+        # Average seconds a request of this class holds its slot
+        self.service_time = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.enabled = settings.admission_enabled
+        reserve = min(settings.admission_write_reserve, settings.admission_max_concurrency - 1)
+        self.write = RouteClass("write", settings.admission_max_concurrency)
+        self.read = RouteClass("read", settings.admission_read_limit, reserve)
+        self.heavy = RouteClass("heavy", settings.admission_heavy_limit, reserve)
+        # Wake order when a slot frees up
+        self.classes: List[RouteClass] = [self.write, self.read, self.heavy]
+        self.active = 0
+        self.scale = 1.0
+        self.latency_ms: Optional[float] = None
+        self.baseline_ms: Optional[float] = None
+        self._lock = threading.Lock()
+        self._window_total = 0.0
+        self._window_count = 0
+        self._next_adjust = 0.0
+
+    # -------------------------
+    # Classification
+    # -------------------------
+    def classify(self, method: str, path: str) -> Optional[RouteClass]:
+        if _EXEMPT.match(path):
+            return None
+        if method in ("GET", "HEAD"):
+            return self.heavy if _HEAVY_GET.match(path) else self.read
+        if method == "OPTIONS":
+            return None
+        if method == "POST" and _HEAVY_POST.search(path):
+            return self.heavy
+        return self.write
+
+    # -------------------------
+    # Slots
+    # -------------------------
+    def _scaled(self, value: int) -> int:
+        return max(1, int(value * self.scale))
+
+    def _can_run(self, cls: RouteClass) -> bool:
+        total = self._scaled(settings.admission_max_concurrency)
+        if cls.reserve:
+            total = max(1, total - self._scaled(cls.reserve))
+        return cls.active < self._scaled(cls.limit) and self.active < total
+
+    def _start(self, cls: RouteClass) -> float:
+        cls.active += 1
+        cls.admitted += 1
+        self.active += 1
+        return time.monotonic()
+
+    async def acquire(self, cls: RouteClass) -> float:
+        """Wait for a slot and return when it was granted; raises Overloaded when the request should be shed"""
+        now = time.monotonic()
+        if now >= self._next_adjust:
+            self._adjust(now)
+        if not cls.waiters and self._can_run(cls):
+            return self._start(cls)
+        if len(cls.waiters) >= settings.admission_queue_size:
+            cls.shed += 1
+            raise Overloaded(f"Server busy ({cls.name} queue full), retry shortly")
+        # Every running request frees a slot after service_time on average, so
+        # the queue ahead drains at limit / service_time requests per second
+        expected_wait = (len(cls.waiters) + 1) * cls.service_time / self._scaled(cls.limit)
+        if expected_wait > settings.admission_queue_timeout_seconds:
+            cls.shed += 1
+            raise Overloaded(f"Server busy ({cls.name} requests would wait too long), retry shortly")
+
+        waiter: "asyncio.Future[float]" = asyncio.get_running_loop().create_future()
+        cls.waiters.append(waiter)
+        cls.queued += 1
+        try:
+            return await asyncio.wait_for(waiter, settings.admission_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._forget(cls, waiter)
+            cls.timed_out += 1
+            raise Overloaded(f"Server busy ({cls.name} requests waited too long), retry shortly")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the client went away
+                self.release(cls, waiter.result())
+            else:
+                self._forget(cls, waiter)
+            raise
+
+    def _forget(self, cls: RouteClass, waiter: "asyncio.Future[float]") -> None:
+        try:
+            cls.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, cls: RouteClass, granted_at: float) -> None:
+        cls.service_time += (time.monotonic() - granted_at - cls.service_time) * _SERVICE_ALPHA
+        cls.active -= 1
+        self.active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for cls in self.classes:
+            while cls.waiters and self._can_run(cls):
+                waiter = cls.waiters.popleft()
+                if waiter.done():
+                    continue
+                waiter.set_result(self._start(cls))
+
+    # -------------------------
+    # Adaptive limits
+    # -------------------------
+    def observe(self, seconds: float) -> None:
+        """Record one Mongo command duration; safe to call from any thread"""
+        with self._lock:
+            self._window_total += seconds
+            self._window_count += 1
+
+    def _adjust(self, now: float) -> None:
+        self._next_adjust = now + settings.admission_adjust_seconds
+        with self._lock:
+            total, count = self._window_total, self._window_count
+            self._window_total, self._window_count = 0.0, 0
+        if not count:
+            self.scale = min(1.0, self.scale + _INCREASE)
+            self._wake()
+            return
+
+        latency_ms = total / count * 1000
+        self.latency_ms = latency_ms
+        if self.baseline_ms is None or latency_ms < self.baseline_ms:
+            self.baseline_ms = latency_ms
+        else:
+            self.baseline_ms += (latency_ms - self.baseline_ms) * _BASELINE_DRIFT
+        threshold = max(self.baseline_ms * settings.admission_latency_tolerance, settings.admission_latency_floor_ms)
+        if latency_ms > threshold:
+            self.scale = max(settings.admission_min_scale, self.scale * _DECREASE)
+        else:
+            self.scale = min(1.0, self.scale + _INCREASE)
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "scale": round(self.scale, 3),
+            "mongo_latency_ms": round(self.latency_ms, 3) if self.latency_ms is not None else None,
+            "baseline_ms": round(self.baseline_ms, 3) if self.baseline_ms is not None else None,
+            "active": self.active,
+            "classes": {
+                cls.name: {
+                    "limit": self._scaled(cls.limit),
+                    "active": cls.active,
+                    "waiting": len(cls.waiters),
+                    "service_ms": round(cls.service_time * 1000, 3),
+                    "admitted": cls.admitted,
+                    "queued": cls.queued,
+                    "shed": cls.shed,
+                    "timed_out": cls.timed_out,
+                }
+                for cls in self.classes
+            },
+        }
+
+
+admission_controller = AdmissionController()
+
+
+class MongoLatencyListener(monitoring.CommandListener):
+    """Feeds Mongo command durations to the admission controller"""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        if event.command_name not in _IGNORED_COMMANDS:
+            admission_controller.observe(event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        if event.command_name not in _IGNORED_COMMANDS:
+            admission_controller.observe(event.duration_micros / 1e6)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; a request holds its slot until the response is sent"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        controller = admission_controller
+        if scope["type"] != "http" or not controller.enabled:
+            return await self.app(scope, receive, send)
+        cls = controller.classify(scope["method"], scope["path"])
+        if cls is None:
+            return await self.app(scope, receive, send)
+        try:
+            granted_at = await controller.acquire(cls)
+        except Overloaded as e:
+            response = JSONResponse({"detail": e.detail}, status_code=503,
+                                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(cls, granted_at)
@@ -0,0 +1,425 @@
+# app/core/analytics.py
+"""
+Case pendency, disposal and hearing statistics from a columnar snapshot.
+
+Grouped statistics over every case (medians in particular) would be
+aggregations scanning the cases and hearings collections on each request.
+Instead each worker keeps the few fields they need as NumPy columns, one
+row per case and one per hearing, with the grouping fields (court type,
+court, category, subcategory, lawyer) dictionary-encoded as int32 codes.
+A query is then a handful of vectorised passes over those arrays, a few
+milliseconds for hundreds of thousands of cases, and never reaches MongoDB.
+
+The snapshot is built once in the background after startup and then
+refreshed every settings.analytics_refresh_seconds from what changed since
+the last refresh, the same way delta sync does it: records with a newer
+``updated_at`` are upserted into their rows and tombstones mark rows dead
+(a case's tombstone takes its hearings with it). Reads prefer secondaries,
+project only the needed fields and are applied in one step, so a query
+never sees half a refresh. The snapshot is rebuilt from scratch every
+settings.analytics_rebuild_seconds, when dead rows outnumber live ones, or
+when tombstones the refresh still needed were compacted away.
+
+Disposal time runs from ``filing_date`` to ``disposed_at``, stamped by the
+cases router when a case becomes Disposed (``updated_at`` for cases
+disposed before that field existed). A hearing counts as an adjournment
+when its stage or order summary matches settings.analytics_adjournment_pattern.
+
+NumPy is imported on the first build; without it the /analytics routes
+answer 503.
+"""
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReadPreference
+
+from .config import settings
+from .lazy import LazyModule
+from .sync import compaction_horizon, to_millis
+from .tenancy import TenantLocal
+
+np = LazyModule("numpy")
+
+# Case fields the statistics can be grouped by
+GROUP_FIELDS = ("court_type", "court_name_id", "category_id", "subcategory_id", "assigned_lawyer_id")
+
+# Display names resolved from reference data for these group fields
+GROUP_NAMES = {"court_name_id": "court_name", "category_id": "category_name", "subcategory_id": "subcategory_name"}
+
+DISPOSED = "Disposed"
+
+_EPOCH = datetime(1970, 1, 1)
+# Day number of a missing date
+_NO_DAY = -(2 ** 31)
+
+# name -> (dtype, fill value of unused rows)
+_CASE_COLUMNS = {
+    "alive": ("bool", False),
+    "updated": ("int64", -1),
+    "disposed": ("bool", False),
+    "filed": ("int32", _NO_DAY),
+    "disposed_on": ("int32", _NO_DAY),
+    **{field: ("int32", -1) for field in GROUP_FIELDS},
+}
+_HEARING_COLUMNS = {
+    "alive": ("bool", False),
+    "updated": ("int64", -1),
+    "case": ("int32", -1),
+    "adjourned": ("bool", False),
+}
+
+_CASE_PROJECTION = {"_id": 1, "updated_at": 1, "status": 1, "filing_date": 1, "disposed_at": 1,
+                    **{field: 1 for field in GROUP_FIELDS}}
+_HEARING_PROJECTION = {"_id": 1, "updated_at": 1, "case_id": 1, "stage": 1, "order_summary": 1}
+
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+
+def _day(value: Any) -> int:
+    if isinstance(value, datetime):
+        return (value - _EPOCH).days
+    return _NO_DAY
+
+
+def _millis(value: Any) -> int:
+    return to_millis(value) if isinstance(value, datetime) else 0
+
+
+class _Table:
+    """Growable NumPy columns sharing one row numbering, rows found by record id"""
+
+    __slots__ = ("spec", "columns", "rows", "size")
+
+    def __init__(self, spec: Dict[str, Tuple[str, Any]], capacity: int = 1024):
+        self.spec = spec
+        self.columns = {name: np.full(capacity, fill, dtype=dtype) for name, (dtype, fill) in spec.items()}
+        self.rows: Dict[Any, int] = {}
+        self.size = 0
+
+    def rows_for(self, ids: Iterable[Any]) -> Any:
+        """Row of each id, allocating rows for ids not seen before"""
+        rows = []
+        for id in ids:
+            row = self.rows.get(id)
+            if row is None:
+                row = self.rows[id] = self.size
+                self.size += 1
+            rows.append(row)
+        self._reserve(self.size)
+        return np.array(rows, dtype="int64")
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.columns["alive"])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, (dtype, fill) in self.spec.items():
+            column = self.columns[name]
+            grown = np.full(capacity, fill, dtype=dtype)
+            grown[:len(column)] = column
+            self.columns[name] = grown
+
+    def __getitem__(self, name: str) -> Any:
+        """The used part of a column"""
+        return self.columns[name][:self.size]
+
+    def live(self) -> int:
+        return int(np.count_nonzero(self["alive"]))
+
+
+class _Codes:
+    """Dictionary encoding of one group field: value <-> int32 code"""
+
+    __slots__ = ("values", "index")
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        key = str(value)
+        code = self.index.get(key)
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(key)
+        return code
+
+
+class AnalyticsSnapshot:
+    """Case and hearing columns as of ``until`` (milliseconds)"""
+
+    def __init__(self) -> None:
+        self.cases = _Table(_CASE_COLUMNS)
+        self.hearings = _Table(_HEARING_COLUMNS)
+        self.codes = {field: _Codes() for field in GROUP_FIELDS}
+        self.until: Optional[int] = None
+        self.built_at = datetime.utcnow()
+        self.refreshed_at = self.built_at
+
+    # -------------------------
+    # Applying changes
+    # -------------------------
+    def apply(self, cases: List[Dict[str, Any]], hearings: List[Dict[str, Any]],
+              tombstones: List[Dict[str, Any]], adjourned: "re.Pattern[str]") -> None:
+        if cases:
+            self._apply_cases(cases)
+        if hearings:
+            self._apply_hearings(hearings, adjourned)
+        if tombstones:
+            self._apply_tombstones(tombstones)
+
+    def _apply_cases(self, docs: List[Dict[str, Any]]) -> None:
+        table = self.cases
+        rows = table.rows_for(d["_id"] for d in docs)
+        columns = table.columns
+        columns["alive"][rows] = True
+        columns["updated"][rows] = [_millis(d.get("updated_at")) for d in docs]
+        disposed = [d.get("status") == DISPOSED for d in docs]
+        columns["disposed"][rows] = disposed
+        columns["filed"][rows] = [_day(d.get("filing_date")) for d in docs]
+        columns["disposed_on"][rows] = [_day(d.get("disposed_at") or d.get("updated_at")) if is_disposed else _NO_DAY
+                                        for d, is_disposed in zip(docs, disposed)]
+        for field in GROUP_FIELDS:
+            codes = self.codes[field]
+            columns[field][rows] = [codes.code(d.get(field)) for d in docs]
+
+    def _apply_hearings(self, docs: List[Dict[str, Any]], adjourned: "re.Pattern[str]") -> None:
+        docs = [d for d in docs if d.get("case_id") is not None]
+        table = self.hearings
+        rows = table.rows_for(d["_id"] for d in docs)
+        columns = table.columns
+        columns["alive"][rows] = True
+        columns["updated"][rows] = [_millis(d.get("updated_at")) for d in docs]
+        # Hearings of cases not loaded yet get a placeholder case row, filled in when the case arrives
+        columns["case"][rows] = self.cases.rows_for(d["case_id"] for d in docs)
+        columns["adjourned"][rows] = [bool(adjourned.search(f"{d.get('stage') or ''}\n{d.get('order_summary') or ''}"))
+                                      for d in docs]
+
+    def _apply_tombstones(self, docs: List[Dict[str, Any]]) -> None:
+        deleted_cases = None
+        for collection, table in (("cases", self.cases), ("case_hearings", self.hearings)):
+            hits = [(table.rows[d["doc_id"]], _millis(d.get("deleted_at")))
+                    for d in docs if d.get("collection") == collection and d.get("doc_id") in table.rows]
+            if not hits:
+                continue
+            rows = np.array([row for row, _ in hits], dtype="int64")
+            deleted_at = np.array([at for _, at in hits], dtype="int64")
+            # A record restored or rewritten after its tombstone stays
+            gone = table["updated"][rows] <= deleted_at
+            table.columns["alive"][rows[gone]] = False
+            if collection == "cases":
+                deleted_cases = (rows[gone], deleted_at[gone])
+        if deleted_cases is not None and len(deleted_cases[0]) and self.hearings.size:
+            # One tombstone covers the case and its hearings
+            cutoff = np.full(self.cases.size, -1, dtype="int64")
+            cutoff[deleted_cases[0]] = deleted_cases[1]
+            hearings = self.hearings
+            case_rows = hearings["case"]
+            gone = hearings["alive"] & (hearings["updated"] <= cutoff[case_rows])
+            hearings.columns["alive"][:hearings.size][gone] = False
+
+    def dead_rows(self) -> int:
+        return (self.cases.size - self.cases.live()) + (self.hearings.size - self.hearings.live())
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def _groups(self, by: str, mask: Any) -> Tuple[Any, List[Optional[str]]]:
+        """Group number of each selected case (0: no value) and the group keys"""
+        return self.cases[by][mask] + 1, [None] + self.codes[by].values
+
+    def case_mask(self, filed_from: Optional[int] = None, filed_to: Optional[int] = None) -> Any:
+        cases = self.cases
+        mask = cases["alive"].copy()
+        if filed_from is not None:
+            mask &= cases["filed"] >= filed_from
+        if filed_to is not None:
+            mask &= (cases["filed"] <= filed_to) & (cases["filed"] != _NO_DAY)
+        return mask
+
+    def pendency(self, by: str, mask: Any, today: int) -> Tuple[List[Optional[str]], Dict[str, Any]]:
+        cases = self.cases
+        groups, keys = self._groups(by, mask)
+        disposed = cases["disposed"][mask]
+        filed = cases["filed"][mask]
+        pending = ~disposed & (filed != _NO_DAY)
+        stats = _grouped_stats(groups[pending], (today - filed[pending]).astype("float64"), len(keys))
+        stats["pending"] = np.bincount(groups[~disposed], minlength=len(keys))
+        stats["disposed"] = np.bincount(groups[disposed], minlength=len(keys))
+        return keys, stats
+
+    def disposal(self, by: str, mask: Any) -> Tuple[List[Optional[str]], Dict[str, Any]]:
+        cases = self.cases
+        groups, keys = self._groups(by, mask)
+        filed = cases["filed"][mask]
+        disposed_on = cases["disposed_on"][mask]
+        done = cases["disposed"][mask] & (filed != _NO_DAY) & (disposed_on != _NO_DAY)
+        days = np.maximum(disposed_on[done] - filed[done], 0).astype("float64")
+        return keys, _grouped_stats(groups[done], days, len(keys))
+
+    def hearing_counts(self, by: str, mask: Any) -> Tuple[List[Optional[str]], Dict[str, Any]]:
+        hearings = self.hearings
+        alive = hearings["alive"]
+        case_rows = hearings["case"][alive]
+        per_case = np.bincount(case_rows, minlength=self.cases.size)
+        adjourned = np.bincount(case_rows, weights=hearings["adjourned"][alive], minlength=self.cases.size)
+        groups, keys = self._groups(by, mask)
+        counts = per_case[mask]
+        stats = _grouped_stats(groups, counts.astype("float64"), len(keys))
+        stats["hearings"] = np.bincount(groups, weights=counts, minlength=len(keys))
+        stats["adjourned"] = np.bincount(groups, weights=adjourned[mask], minlength=len(keys))
+        return keys, stats
+
+
+def _grouped_stats(groups: Any, values: Any, n_groups: int) -> Dict[str, Any]:
+    """Count, mean, median and 90th percentile of ``values`` per group number"""
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    numbers = np.arange(n_groups)
+    starts = np.searchsorted(sorted_groups, numbers, side="left")
+    counts = np.searchsorted(sorted_groups, numbers, side="right") - starts
+    present = counts > 0
+    median = np.full(n_groups, np.nan)
+    p90 = np.full(n_groups, np.nan)
+    mean = np.full(n_groups, np.nan)
+    if sorted_values.size:
+        # Positions inside each group's sorted run; empty groups are masked out
+        def at(offsets: Any) -> Any:
+            return sorted_values[np.clip(starts + offsets, 0, sorted_values.size - 1)]
+
+        median[present] = ((at((counts - 1) // 2) + at(counts // 2)) / 2)[present]
+        p90[present] = at((9 * (counts - 1)) // 10)[present]
+        sums = np.bincount(groups, weights=values, minlength=n_groups)
+        mean[present] = sums[present] / counts[present]
+    return {"count": counts, "mean": mean, "median": median, "p90": p90}
+
+
+class CaseAnalytics:
+    def __init__(self) -> None:
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+        self._rebuild = False
+        self.builds = 0
+        self.refreshes = 0
+        self.build_ms = 0.0
+        self.refresh_ms = 0.0
+        self.last_changes = 0
+
+    @property
+    def snapshot(self) -> AnalyticsSnapshot:
+        if not np.available:
+            raise AnalyticsUnavailable("Analytics requires numpy")
+        if self._snapshot is None:
+            raise AnalyticsUnavailable("Analytics snapshot is being built")
+        return self._snapshot
+
+    # -------------------------
+    # Building and refreshing
+    # -------------------------
+    async def _changes(self, db: AsyncIOMotorDatabase, since: Optional[datetime]) -> Tuple[List[Any], List[Any], List[Any]]:
+        """Cases, hearings and tombstones changed since ``since`` (everything when None)"""
+        def read(collection: str, field: str, projection: Optional[Dict[str, int]]) -> Any:
+            query = {} if since is None else {field: {"$gte": since}}
+            handle = db[collection].with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+            return handle.find(query, projection).batch_size(settings.analytics_batch_size).to_list(None)
+
+        if since is None:
+            cases, hearings = await asyncio.gather(read("cases", "updated_at", _CASE_PROJECTION),
+                                                   read("case_hearings", "updated_at", _HEARING_PROJECTION))
+            return cases, hearings, []
+        return await asyncio.gather(read("cases", "updated_at", _CASE_PROJECTION),
+                                    read("case_hearings", "updated_at", _HEARING_PROJECTION),
+                                    read("tombstones", "deleted_at", None))
+
+    async def build(self, db: AsyncIOMotorDatabase) -> AnalyticsSnapshot:
+        """Load every case and hearing into a new snapshot and swap it in"""
+        started = time.perf_counter()
+        snapshot = AnalyticsSnapshot()
+        until = datetime.utcnow()
+        cases, hearings, _ = await self._changes(db, None)
+        snapshot.apply(cases, hearings, [], self._adjourned())
+        snapshot.until = to_millis(until)
+        self._snapshot = snapshot
+        self._rebuild = False
+        self.builds += 1
+        self.build_ms = (time.perf_counter() - started) * 1000
+        return snapshot
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> int:
+        """Apply what changed since the last build or refresh; returns the number of changed records"""
+        snapshot = self._snapshot
+        if snapshot is None or self._rebuild or snapshot.until is None:
+            snapshot = await self.build(db)
+            return snapshot.cases.size + snapshot.hearings.size
+        started = time.perf_counter()
+        until = datetime.utcnow()
+        # Overlap like delta sync so writes that committed late with an earlier timestamp are not missed
+        since = _EPOCH + timedelta(milliseconds=snapshot.until) - timedelta(seconds=settings.sync_overlap_seconds)
+        horizon = await compaction_horizon(db)
+        if horizon is not None and horizon > since:
+            await self.build(db)
+            return self._snapshot.cases.size + self._snapshot.hearings.size
+        cases, hearings, tombstones = await self._changes(db, since)
+        if snapshot is not self._snapshot:
+            # Rebuilt meanwhile
+            return 0
+        snapshot.apply(cases, hearings, tombstones, self._adjourned())
+        snapshot.until = to_millis(until)
+        snapshot.refreshed_at = until
+        self._rebuild = snapshot.dead_rows() > max(1024, snapshot.cases.live() + snapshot.hearings.live())
+        self.refreshes += 1
+        self.refresh_ms = (time.perf_counter() - started) * 1000
+        self.last_changes = len(cases) + len(hearings) + len(tombstones)
+        return self.last_changes
+
+    async def run_refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """Background loop started from the app lifespan: build now, then keep up with changes"""
+        while True:
+            try:
+                if self._snapshot is None or (datetime.utcnow() - self._snapshot.built_at).total_seconds() >= settings.analytics_rebuild_seconds:
+                    await self.build(db)
+                else:
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Analytics refresh failed: {e}")
+            await asyncio.sleep(settings.analytics_refresh_seconds)
+
+    def _adjourned(self) -> "re.Pattern[str]":
+        return re.compile(settings.analytics_adjournment_pattern, re.IGNORECASE)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        stats: Dict[str, Any] = {
+            "available": np.available,
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+            "build_ms": round(self.build_ms, 3),
+            "refresh_ms": round(self.refresh_ms, 3),
+            "last_changes": self.last_changes,
+        }
+        if snapshot is not None:
+            columns = list(snapshot.cases.columns.values()) + list(snapshot.hearings.columns.values())
+            stats.update({
+                "built_at": snapshot.built_at,
+                "refreshed_at": snapshot.refreshed_at,
+                "cases": snapshot.cases.live(),
+                "hearings": snapshot.hearings.live(),
+                "dead_rows": snapshot.dead_rows(),
+                "memory_bytes": sum(column.nbytes for column in columns),
+            })
+        return stats
+
+
+# Each tenant has its own cases (app/core/tenancy.py)
+case_analytics: CaseAnalytics = TenantLocal(CaseAnalytics)
@@ -0,0 +1,362 @@
+# app/core/archive.py
+"""
+Cold storage for finished work.
+
+Disposed cases and archived matters that have not changed for
+settings.archive_after_days are moved out of the working collections into
+``archived_cases`` / ``archived_matters``. Each archive document holds the
+record and everything that belongs to it (a case's parties, hearings,
+documents, notes and tasks; a matter's timeline buckets) as one
+zlib-compressed BSON blob, plus a few uncompressed summary fields.
+
+Archiving removes the records from the working set, so list_cases and its
+indexes only carry live work; get_case / get_matter still find them with
+``include_archived=true``. A record is only removed while it still matches
+the copy in the archive (same updated_at, or count for timeline buckets);
+one changed or added meanwhile is read again and the archive rewritten
+first, so concurrent writes are archived rather than lost. This needs no
+transaction, so it also runs on a standalone server. Each archive document
+is inserted, never replaced, and carries the token of the run that wrote
+it; a second archiver of the same record finds the archive taken and skips,
+and a run only ever rewrites or rolls back its own archive. An archive left
+by an interrupted run (the record still in place) is cleared by restoring it. Restoring puts everything back with a fresh
+``updated_at`` so delta sync clients pick the records up again.
+
+Run it from app.tools.archive, POST /admin/archive/run, or periodically by
+setting settings.archive_interval_seconds.
+"""
+import asyncio
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import bson
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from .config import settings
+from .events import change_feed, CASE_COLLECTIONS
+from .sync import record_tombstones
+
+CASE_CHILDREN = CASE_COLLECTIONS[1:]
+WORKING_SET = CASE_COLLECTIONS + ("matters", "matter_timeline_buckets")
+ARCHIVES = ("archived_cases", "archived_matters")
+
+# job_runs entry that lets one worker per interval run the archival pass
+_JOB_ID = "archival"
+
+
+def pack(bundle: Dict[str, Any]) -> Binary:
+    return Binary(zlib.compress(bson.encode(bundle), settings.archive_compression_level))
+
+
+def unpack(data: bytes) -> Dict[str, Any]:
+    return bson.decode(zlib.decompress(data))
+
+
+# -------------------------
+# Sizes
+# -------------------------
+async def collection_stats(db: AsyncIOMotorDatabase, names: tuple = WORKING_SET + ARCHIVES) -> Dict[str, Dict[str, int]]:
+    """Document count, data size and index size per collection (collStats)"""
+    stats: Dict[str, Dict[str, int]] = {}
+    for name in names:
+        try:
+            raw = await db.command("collStats", name)
+        except OperationFailure:
+            # Collection does not exist yet
+            raw = {}
+        stats[name] = {
+            "count": int(raw.get("count", 0)),
+            "size": int(raw.get("size", 0)),
+            "index_size": int(raw.get("totalIndexSize", 0)),
+        }
+    return stats
+
+
+def working_set_totals(stats: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    live = [stats[name] for name in WORKING_SET if name in stats]
+    return {
+        "count": sum(s["count"] for s in live),
+        "size": sum(s["size"] for s in live),
+        "index_size": sum(s["index_size"] for s in live),
+    }
+
+
+async def _take(db: AsyncIOMotorDatabase, bundle: Dict[str, Any], name: str, query: Dict[str, Any],
+                version: str, case_id: Any, rewrite: Callable[[], Awaitable[None]]) -> None:
+    """
+    Delete the records matching ``query``, which ``bundle[name]`` holds
+    copies of. Each is only deleted while its ``version`` field still has
+    the value in the copy; records changed or added since are read again,
+    put in the bundle and archived with ``rewrite`` before they are deleted
+    in turn.
+    """
+    docs = bundle[name]
+    taken: List[Dict[str, Any]] = []
+    while True:
+        if docs:
+            await db[name].delete_many({"$or": [{"_id": doc["_id"], version: doc.get(version)} for doc in docs]})
+        left = {doc["_id"]: doc for doc in await db[name].find(query).to_list(None)}
+        for doc in docs:
+            if doc["_id"] not in left:
+                taken.append(doc)
+                change_feed.record(name, "delete", doc["_id"], case_id)
+        if not left:
+            return
+        docs = list(left.values())
+        bundle[name] = taken + docs
+        await rewrite()
+
+
+# -------------------------
+# Cases
+# -------------------------
+async def archive_case(db: AsyncIOMotorDatabase, case: Dict[str, Any]) -> bool:
+    """
+    Move one case and its related records into archived_cases. Returns
+    False if the case changed since it was read or another run is
+    archiving it (it is left in place).
+    Related records changed while it was being archived are archived as
+    they were when removed.
+    """
+    oid = case["_id"]
+    bundle: Dict[str, Any] = {"case": case}
+    for name in CASE_CHILDREN:
+        bundle[name] = await db[name].find({"case_id": oid}).to_list(None)
+    raw_size = len(bson.encode(bundle))
+    archive = {
+        "_id": oid,
+        "case_number": case.get("case_number"),
+        "case_title": case.get("case_title"),
+        "status": case.get("status"),
+        "client_id": case.get("client_id"),
+        "assigned_lawyer_id": case.get("assigned_lawyer_id"),
+        "filing_date": case.get("filing_date"),
+        "counts": {name: len(bundle[name]) for name in CASE_CHILDREN},
+        "raw_size": raw_size,
+        "archived_at": datetime.utcnow(),
+        "run": ObjectId(),
+        "data": pack(bundle),
+    }
+    mine = {"_id": oid, "run": archive["run"]}
+    # Write the archive first so a crash never loses data, then remove the
+    # case only if nobody touched it meanwhile
+    try:
+        await db.archived_cases.insert_one(archive)
+    except DuplicateKeyError:
+        return False
+    removed = await db.cases.delete_one({"_id": oid, "updated_at": case.get("updated_at")})
+    if removed.deleted_count == 0:
+        await db.archived_cases.delete_one(mine)
+        return False
+    change_feed.record("archived_cases", "insert", oid, oid, archive)
+
+    async def rewrite() -> None:
+        archive.update({
+            "counts": {name: len(bundle[name]) for name in CASE_CHILDREN},
+            "raw_size": len(bson.encode(bundle)),
+            "data": pack(bundle),
+        })
+        await db.archived_cases.update_one(mine, {"$set": {
+            "counts": archive["counts"],
+            "raw_size": archive["raw_size"],
+            "data": archive["data"],
+        }})
+        change_feed.record("archived_cases", "update", oid, oid, archive)
+
+    for name in CASE_CHILDREN:
+        await _take(db, bundle, name, {"case_id": oid}, "updated_at", oid, rewrite)
+
+    await record_tombstones(db, "cases", [oid], oid)
+    change_feed.record("cases", "delete", oid, oid)
+    return True
+
+
+async def load_archived_case(db: AsyncIOMotorDatabase, oid: Any) -> Optional[Dict[str, Any]]:
+    """The archived bundle for a case: {"case": ..., "case_parties": [...], ...}"""
+    archive = await db.archived_cases.find_one({"_id": oid}, {"data": 1})
+    return unpack(archive["data"]) if archive else None
+
+
+async def restore_case(db: AsyncIOMotorDatabase, oid: Any) -> bool:
+    """Put an archived case back into the working collections. Safe to re-run."""
+    bundle = await load_archived_case(db, oid)
+    if bundle is None:
+        return False
+    now = datetime.utcnow()
+    for name in CASE_CHILDREN:
+        docs = bundle.get(name) or []
+        if not docs:
+            continue
+        present = set(await db[name].distinct("_id", {"_id": {"$in": [doc["_id"] for doc in docs]}}))
+        missing = [{**doc, "updated_at": now} for doc in docs if doc["_id"] not in present]
+        if missing:
+            await db[name].insert_many(missing)
+            for doc in missing:
+                change_feed.record(name, "insert", doc["_id"], oid, doc)
+    case = {**bundle["case"], "updated_at": now}
+    try:
+        await db.cases.insert_one(case)
+        change_feed.record("cases", "insert", oid, oid, case)
+    except DuplicateKeyError:
+        if not await db.cases.find_one({"_id": oid}, {"_id": 1}):
+            # Its number was reused while archived; restored without the unique
+            # key, the duplicate finder (app/core/duplicates.py) reports the pair
+            case.pop("case_number_norm", None)
+            await db.cases.insert_one(case)
+            change_feed.record("cases", "insert", oid, oid, case)
+    await db.archived_cases.delete_one({"_id": oid})
+    change_feed.record("archived_cases", "delete", oid, oid)
+    return True
+
+
+# -------------------------
+# Matters
+# -------------------------
+async def archive_matter(db: AsyncIOMotorDatabase, matter: Dict[str, Any]) -> bool:
+    oid = matter["_id"]
+    buckets = await db.matter_timeline_buckets.find({"matter_id": oid}).to_list(None)
+    bundle = {"matter": matter, "matter_timeline_buckets": buckets}
+    archive = {
+        "_id": oid,
+        "title": matter.get("title"),
+        "timeline_count": matter.get("timeline_count", 0),
+        "raw_size": len(bson.encode(bundle)),
+        "archived_at": datetime.utcnow(),
+        "run": ObjectId(),
+        "data": pack(bundle),
+    }
+    mine = {"_id": oid, "run": archive["run"]}
+    try:
+        await db.archived_matters.insert_one(archive)
+    except DuplicateKeyError:
+        return False
+    removed = await db.matters.delete_one({"_id": oid, "updated_at": matter.get("updated_at"), "is_archived": True})
+    if removed.deleted_count == 0:
+        await db.archived_matters.delete_one(mine)
+        return False
+    change_feed.record("archived_matters", "insert", oid, None, archive)
+    change_feed.record("matters", "delete", oid, None)
+
+    async def rewrite() -> None:
+        archive.update({"raw_size": len(bson.encode(bundle)), "data": pack(bundle)})
+        await db.archived_matters.update_one(mine, {"$set": {
+            "raw_size": archive["raw_size"],
+            "data": archive["data"],
+        }})
+        change_feed.record("archived_matters", "update", oid, None, archive)
+
+    # Timeline buckets have no updated_at; an append always bumps count
+    await _take(db, bundle, "matter_timeline_buckets", {"matter_id": oid}, "count", None, rewrite)
+    return True
+
+
+async def load_archived_matter(db: AsyncIOMotorDatabase, oid: Any) -> Optional[Dict[str, Any]]:
+    archive = await db.archived_matters.find_one({"_id": oid}, {"data": 1})
+    return unpack(archive["data"]) if archive else None
+
+
+async def restore_matter(db: AsyncIOMotorDatabase, oid: Any, unarchive: bool = True) -> bool:
+    """Put an archived matter back; ``unarchive`` also clears is_archived so it is not re-archived"""
+    bundle = await load_archived_matter(db, oid)
+    if bundle is None:
+        return False
+    buckets = bundle.get("matter_timeline_buckets") or []
+    if buckets:
+        present = set(await db.matter_timeline_buckets.distinct("_id", {"_id": {"$in": [b["_id"] for b in buckets]}}))
+        missing = [b for b in buckets if b["_id"] not in present]
+        if missing:
+            await db.matter_timeline_buckets.insert_many(missing)
+            for bucket in missing:
+                change_feed.record("matter_timeline_buckets", "insert", bucket["_id"], None, bucket)
+    matter = {**bundle["matter"], "updated_at": datetime.utcnow()}
+    if unarchive:
+        matter["is_archived"] = False
+    try:
+        await db.matters.insert_one(matter)
+        change_feed.record("matters", "insert", oid, None, matter)
+    except DuplicateKeyError:
+        pass
+    await db.archived_matters.delete_one({"_id": oid})
+    change_feed.record("archived_matters", "delete", oid, None)
+    return True
+
+
+# -------------------------
+# Archival pass
+# -------------------------
+async def run_archival(db: AsyncIOMotorDatabase, older_than_days: Optional[int] = None,
+                       limit: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Archive disposed cases and archived matters untouched for
+    ``older_than_days`` (default settings.archive_after_days). Reports
+    working set sizes before and after.
+    """
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    before = await collection_stats(db)
+    report: Dict[str, Any] = {"cutoff": cutoff, "dry_run": dry_run,
+                              "cases": 0, "matters": 0, "skipped": 0}
+
+    case_query = {"updated_at": {"$lt": cutoff}, "status": "Disposed"}
+    matter_query = {"updated_at": {"$lt": cutoff}, "is_archived": True}
+    if dry_run:
+        report["cases"] = await db.cases.count_documents(case_query, **({"limit": limit} if limit else {}))
+        report["matters"] = await db.matters.count_documents(matter_query, **({"limit": limit} if limit else {}))
+    else:
+        cursor = db.cases.find(case_query)
+        if limit:
+            cursor = cursor.limit(limit)
+        async for case in cursor:
+            if await archive_case(db, case):
+                report["cases"] += 1
+            else:
+                report["skipped"] += 1
+        cursor = db.matters.find(matter_query)
+        if limit:
+            cursor = cursor.limit(limit)
+        async for matter in cursor:
+            if await archive_matter(db, matter):
+                report["matters"] += 1
+            else:
+                report["skipped"] += 1
+
+    after = await collection_stats(db) if not dry_run else before
+    report["before"] = {"working_set": working_set_totals(before), "collections": before}
+    report["after"] = {"working_set": working_set_totals(after), "collections": after}
+    return report
+
+
+async def _claim(db: AsyncIOMotorDatabase) -> bool:
+    """Take the next pass unless another worker did within archive_interval_seconds"""
+    now = datetime.utcnow()
+    try:
+        await db.job_runs.update_one(
+            {"_id": _JOB_ID, "next_at": {"$not": {"$gt": now}}},
+            {"$set": {"next_at": now + timedelta(seconds=settings.archive_interval_seconds), "started_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def run_archival_job(db: AsyncIOMotorDatabase) -> None:
+    """
+    Background loop started from the app lifespan when archive_interval_seconds
+    is set. Every worker runs it; one pass per interval is claimed in job_runs.
+    """
+    while True:
+        await asyncio.sleep(settings.archive_interval_seconds)
+        try:
+            if not await _claim(db):
+                continue
+            report = await run_archival(db)
+            if report["cases"] or report["matters"]:
+                print(f"🗄 Archived {report['cases']} cases, {report['matters']} matters")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Archival failed: {e}")
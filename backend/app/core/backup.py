@@ -0,0 +1,590 @@
+# app/core/backup.py
+"""
+Incremental backup from the change feed, with point-in-time restore.
+
+Every change event on the watched collections (cases and their records,
+matters and their timeline buckets, the two archives; see
+app/core/events.py) is appended to a change log: the full document as
+written, or a delete. Events are buffered and written every
+settings.backup_flush_seconds as one frame, a length-prefixed zlib block of
+BSON records, to an append-only segment file. A crash loses at most the
+unflushed events, and a torn last frame is ignored when reading. Segments
+roll at settings.backup_segment_bytes or settings.backup_segment_seconds:
+
+    <backup_dir>/<database>/seg-<first ts>-<writer>.open    being written
+    <backup_dir>/<database>/seg-<first ts>-<last ts>-<writer>.log
+
+Each process writes its own segments (writer is its change feed epoch), so
+workers on the local change feed, which only see their own writes, never
+share a file; restore merges them by time.
+
+A base snapshot copies the collections as they are, batch by batch in the
+same frame format, into base-<started>-<finished>.snap. It is not a point in
+time: writes land while it is read. Restoring to a time T loads the latest
+snapshot finished by T and replays the log from settings.backup_overlap_seconds
+before it started up to T. Events carry whole documents, so only the last
+event per record matters: restore folds the log into a map first and then
+makes one pass over the snapshot, inserting documents in batches, never
+updating. One worker per settings.backup_snapshot_hours takes the snapshot
+(claimed in job_runs) and then drops snapshots beyond
+settings.backup_keep_snapshots and the segments only they needed.
+
+backup_dir must be one directory shared by all workers writing the log.
+Run a dedicated writer with app.tools.backup instead of backup_enabled when
+the API runs many workers on a change stream, where each would log every
+write. Restore with ``python -m app.tools.backup restore --to <time>``.
+
+On a change stream, each flush also saves the resume token of its last
+event to stream.resume, and the dedicated writer continues from there
+after a restart. When the stream cannot be resumed (the token fell off the
+oplog, or the API's stream failed and it fell back to local events), the
+writes in between are lost for good: the writer records the window as
+gap-<last logged ts>-<recovered at>.gap and takes a base snapshot right
+away. Restoring to a time the snapshots and log cannot rebuild exactly then
+fails instead of returning wrong data.
+"""
+import asyncio
+import heapq
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from .config import settings
+from .events import ChangeEvent, WATCHED_COLLECTIONS, change_feed
+from .tenancy import TenantLocal
+from ..models.rawjson import RAW_CODEC_OPTIONS
+
+BACKUP_COLLECTIONS = WATCHED_COLLECTIONS
+
+# Frame header: length of the zlib block that follows
+_FRAME = struct.Struct(">I")
+
+# Flush early once this much is buffered
+_FLUSH_BYTES = 4 * 1024 * 1024
+
+_STAMP = "%Y%m%dT%H%M%S%f"
+
+# Claimed by the worker that takes the next base snapshot
+_JOB_ID = "backup_snapshot"
+
+# Change stream resume token after the last flushed event
+_RESUME_FILE = "stream.resume"
+
+
+# -------------------------
+# Files
+# -------------------------
+def _stamp(ts: datetime) -> str:
+    return ts.strftime(_STAMP)
+
+
+def _parse_stamp(value: str) -> datetime:
+    return datetime.strptime(value, _STAMP)
+
+
+def _bson_time(ts: datetime) -> datetime:
+    """Truncated to the millisecond, as stored"""
+    return ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+
+
+def backup_directory(db: AsyncIOMotorDatabase) -> Path:
+    return Path(settings.backup_dir) / db.name
+
+
+def write_frame(file: Any, records: bytes) -> int:
+    """Append concatenated BSON records as one frame; returns the bytes written"""
+    block = zlib.compress(records, settings.backup_compression_level)
+    file.write(_FRAME.pack(len(block)) + block)
+    return _FRAME.size + len(block)
+
+
+def read_frames(path: Path) -> Iterator[List[Dict[str, Any]]]:
+    """Records of each frame in the file, up to a torn or corrupt tail"""
+    with open(path, "rb") as file:
+        while True:
+            header = file.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return
+            (length,) = _FRAME.unpack(header)
+            block = file.read(length)
+            if len(block) < length:
+                return
+            try:
+                yield bson.decode_all(zlib.decompress(block))
+            except (zlib.error, bson.errors.InvalidBSON):
+                return
+
+
+class Segment(NamedTuple):
+    path: Path
+    first: datetime
+    # None while still being written (or left open by a crash)
+    last: Optional[datetime]
+    writer: str
+
+
+class Snapshot(NamedTuple):
+    path: Path
+    started: datetime
+    finished: datetime
+
+
+class Gap(NamedTuple):
+    """Writes after ``first`` and before ``last`` that never reached the log"""
+    path: Path
+    first: datetime
+    last: datetime
+
+
+def list_segments(directory: Path) -> List[Segment]:
+    segments = []
+    for path in directory.glob("seg-*"):
+        parts = path.name.split(".")[0].split("-")[1:]
+        try:
+            if path.suffix == ".log" and len(parts) == 3:
+                segments.append(Segment(path, _parse_stamp(parts[0]), _parse_stamp(parts[1]), parts[2]))
+            elif path.suffix == ".open" and len(parts) == 2:
+                segments.append(Segment(path, _parse_stamp(parts[0]), None, parts[1]))
+        except ValueError:
+            continue
+    return sorted(segments, key=lambda s: s.first)
+
+
+def list_snapshots(directory: Path) -> List[Snapshot]:
+    """Complete base snapshots, oldest first"""
+    snapshots = []
+    for path in directory.glob("base-*.snap"):
+        parts = path.stem.split("-")[1:]
+        try:
+            snapshots.append(Snapshot(path, _parse_stamp(parts[0]), _parse_stamp(parts[1])))
+        except (ValueError, IndexError):
+            continue
+    return sorted(snapshots, key=lambda s: s.started)
+
+
+def list_gaps(directory: Path) -> List[Gap]:
+    gaps = []
+    for path in directory.glob("gap-*.gap"):
+        parts = path.stem.split("-")[1:]
+        try:
+            gaps.append(Gap(path, _parse_stamp(parts[0]), _parse_stamp(parts[1])))
+        except (ValueError, IndexError):
+            continue
+    return sorted(gaps, key=lambda g: g.first)
+
+
+def read_resume(directory: Path) -> Optional[Dict[str, Any]]:
+    """{"token", "ts"} saved with the last flush on a change stream, if any"""
+    try:
+        return bson.decode((directory / _RESUME_FILE).read_bytes())
+    except (OSError, bson.errors.InvalidBSON):
+        return None
+
+
+def log_end(directory: Path) -> Optional[datetime]:
+    """Time of the last event in the log"""
+    ends = [s.last or _last_ts(s.path) for s in list_segments(directory)]
+    return max((end for end in ends if end is not None), default=None)
+
+
+def _records(segment: Segment) -> Iterator[Dict[str, Any]]:
+    for frame in read_frames(segment.path):
+        yield from frame
+
+
+def replay(directory: Path, since: datetime, until: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+    """Logged events with since < ts <= until, merged across writers in time order"""
+    segments = [s for s in list_segments(directory)
+                if (s.last is None or s.last > since) and (until is None or s.first <= until)]
+    for record in heapq.merge(*(_records(s) for s in segments), key=lambda r: r["ts"]):
+        if record["ts"] <= since:
+            continue
+        if until is not None and record["ts"] > until:
+            # Each segment is in time order, so nothing later can qualify
+            return
+        yield record
+
+
+def _last_ts(path: Path) -> Optional[datetime]:
+    last = None
+    for frame in read_frames(path):
+        if frame:
+            last = frame[-1]["ts"]
+    return last
+
+
+# -------------------------
+# Change log writer
+# -------------------------
+class ChangeLog:
+    def __init__(self) -> None:
+        self.directory: Optional[Path] = None
+        self.writer = ""
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._first: Optional[datetime] = None
+        self._last: Optional[datetime] = None
+        self._file: Any = None
+        self._path: Optional[Path] = None
+        self._segment_first: Optional[datetime] = None
+        self._segment_last: Optional[datetime] = None
+        self._opened = 0.0
+        self._size = 0
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self.events = 0
+        self.unencodable = 0
+        self.frames = 0
+        self.bytes = 0
+        self.segments = 0
+        self.snapshots = 0
+        self.snapshot_ms = 0.0
+        self.flushed_at: Optional[datetime] = None
+        self._resume: Any = None
+        self._logged: Optional[datetime] = None
+        self._recovered = False
+        self.gaps = 0
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if event.collection not in BACKUP_COLLECTIONS:
+            return
+        ts = _bson_time(event.ts)
+        try:
+            record = bson.encode({"ts": ts, "c": event.collection, "op": event.op, "id": event.id,
+                                  "doc": event.document if event.op != "delete" else None})
+        except Exception as e:
+            self.unencodable += 1
+            print(f"⚠️ Backup could not encode a {event.collection} {event.op}: {e}")
+            return
+        self._buffer.append(record)
+        self._buffered += len(record)
+        self._first = self._first or ts
+        self._last = ts
+        if event.resume is not None:
+            self._resume = event.resume
+        self.events += 1
+        if self._buffered >= _FLUSH_BYTES:
+            self._wake.set()
+
+    # -------------------------
+    # Segments
+    # -------------------------
+    def _write(self, records: bytes, first: datetime, last: datetime, resume: Any) -> int:
+        """Runs in a thread: append one frame, opening or rolling the segment as needed"""
+        if self._file is not None and (self._size >= settings.backup_segment_bytes
+                                       or time.monotonic() - self._opened >= settings.backup_segment_seconds):
+            self._seal()
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._path = self.directory / f"seg-{_stamp(first)}-{self.writer}.open"
+            self._file = open(self._path, "ab")
+            self._opened = time.monotonic()
+            self._size = 0
+            self._segment_first = first
+            self.segments += 1
+        written = write_frame(self._file, records)
+        self._file.flush()
+        if settings.backup_fsync:
+            os.fsync(self._file.fileno())
+        self._size += written
+        self._segment_last = last
+        if resume is not None:
+            self._save_resume(resume, last)
+        return written
+
+    def _save_resume(self, token: Any, ts: datetime) -> None:
+        """Only once the frame holding its event is on disk"""
+        path = self.directory / _RESUME_FILE
+        partial = path.with_suffix(".tmp")
+        with open(partial, "wb") as file:
+            file.write(bson.encode({"token": token, "ts": ts, "writer": self.writer}))
+            file.flush()
+            if settings.backup_fsync:
+                os.fsync(file.fileno())
+        os.replace(partial, path)
+
+    def _seal(self) -> None:
+        """Close the open segment under its final name"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        sealed = self._path.with_name(f"seg-{_stamp(self._segment_first)}-{_stamp(self._segment_last)}-{self.writer}.log")
+        os.replace(self._path, sealed)
+        self._path = None
+
+    async def flush(self) -> int:
+        """Write the buffered events as one frame"""
+        async with self._lock:
+            if not self._buffer or self.directory is None:
+                return 0
+            records, first, last, resume = b"".join(self._buffer), self._first, self._last, self._resume
+            count = len(self._buffer)
+            self._buffer, self._buffered, self._first, self._last, self._resume = [], 0, None, None, None
+            self.bytes += await asyncio.to_thread(self._write, records, first, last, resume)
+            self.frames += 1
+            self._logged = last
+            self.flushed_at = datetime.utcnow()
+            return count
+
+    # -------------------------
+    # Base snapshots
+    # -------------------------
+    async def snapshot(self, db: AsyncIOMotorDatabase) -> Snapshot:
+        """Copy the backed up collections into a new base snapshot"""
+        directory = backup_directory(db)
+        directory.mkdir(parents=True, exist_ok=True)
+        started = _bson_time(datetime.utcnow())
+        clock = time.perf_counter()
+        partial = directory / f"base-{_stamp(started)}.tmp"
+        file = open(partial, "wb")
+        try:
+            for name in BACKUP_COLLECTIONS:
+                header = bson.encode({"c": name})
+                batch: List[bytes] = []
+                async for doc in db[name].with_options(codec_options=RAW_CODEC_OPTIONS).find({}):
+                    batch.append(doc.raw)
+                    if len(batch) >= settings.backup_batch_size:
+                        await asyncio.to_thread(write_frame, file, header + b"".join(batch))
+                        batch = []
+                if batch:
+                    await asyncio.to_thread(write_frame, file, header + b"".join(batch))
+            file.flush()
+            os.fsync(file.fileno())
+        finally:
+            file.close()
+        finished = _bson_time(datetime.utcnow())
+        path = directory / f"base-{_stamp(started)}-{_stamp(finished)}.snap"
+        os.replace(partial, path)
+        self.snapshots += 1
+        self.snapshot_ms = (time.perf_counter() - clock) * 1000
+        return Snapshot(path, started, finished)
+
+    async def _claim(self, db: AsyncIOMotorDatabase) -> bool:
+        """Take the next snapshot unless another worker did within backup_snapshot_hours"""
+        now = datetime.utcnow()
+        try:
+            await db.job_runs.update_one(
+                {"_id": _JOB_ID, "next_at": {"$not": {"$gt": now}}},
+                {"$set": {"next_at": now + timedelta(hours=settings.backup_snapshot_hours), "started_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def recover(self, db: AsyncIOMotorDatabase, since: Optional[datetime] = None) -> Snapshot:
+        """
+        The log misses the writes after ``since`` (default: the last logged
+        event) until now: record the gap and take a base snapshot, so restores
+        to later times are exact again. Call once events are being logged again.
+        """
+        await self.flush()
+        directory = backup_directory(db)
+        since = since or self._logged or await asyncio.to_thread(log_end, directory)
+        now = _bson_time(datetime.utcnow())
+        if since is not None and since < now:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"gap-{_stamp(since)}-{_stamp(now)}.gap").touch()
+            self.gaps += 1
+            print(f"⚠️ Backup log misses writes from {since} to {now}; taking a base snapshot")
+        (directory / _RESUME_FILE).unlink(missing_ok=True)
+        snapshot = await self.snapshot(db)
+        await asyncio.to_thread(self.prune, directory)
+        return snapshot
+
+    def prune(self, directory: Path) -> Dict[str, int]:
+        """Seal segments abandoned by crashed writers, drop snapshots, segments and gaps no longer needed"""
+        removed = {"snapshots": 0, "segments": 0, "sealed": 0}
+        stale = time.time() - 2 * settings.backup_segment_seconds
+        for segment in list_segments(directory):
+            if segment.last is None and segment.path != self._path and segment.path.stat().st_mtime < stale:
+                last = _last_ts(segment.path) or segment.first
+                os.replace(segment.path, segment.path.with_name(
+                    f"seg-{_stamp(segment.first)}-{_stamp(last)}-{segment.writer}.log"))
+                removed["sealed"] += 1
+        snapshots = list_snapshots(directory)
+        keep = max(1, settings.backup_keep_snapshots)
+        if len(snapshots) <= keep:
+            return removed
+        for snapshot in snapshots[:-keep]:
+            snapshot.path.unlink(missing_ok=True)
+            removed["snapshots"] += 1
+        needed_from = snapshots[-keep].started - timedelta(seconds=settings.backup_overlap_seconds)
+        for segment in list_segments(directory):
+            if segment.last is not None and segment.last <= needed_from:
+                segment.path.unlink(missing_ok=True)
+                removed["segments"] += 1
+        for gap in list_gaps(directory):
+            if gap.last <= needed_from:
+                gap.path.unlink(missing_ok=True)
+        return removed
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        self.directory = backup_directory(db)
+        self.writer = change_feed.epoch
+        change_feed.add_listener(self._on_change)
+
+    async def run(self, db: AsyncIOMotorDatabase, recover: bool = True) -> None:
+        """
+        Background loop started from the app lifespan: flush, and take
+        snapshots when claimed. With ``recover``, a change stream that was
+        lost (the feed then logs this worker's own writes) is handled with
+        recover(); the dedicated writer restarts its stream first and
+        recovers itself.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.backup_flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                if recover and change_feed.stream_lost and not self._recovered:
+                    self._recovered = True
+                    await self.recover(db)
+                elif settings.backup_snapshot_hours and await self._claim(db):
+                    await self.snapshot(db)
+                    await asyncio.to_thread(self.prune, self.directory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Backup failed: {e}")
+
+    async def stop(self) -> None:
+        change_feed.remove_listener(self._on_change)
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️ Backup flush on shutdown failed: {e}")
+        async with self._lock:
+            if self._file is not None:
+                await asyncio.to_thread(self._seal)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory) if self.directory else None,
+            "writer": self.writer,
+            "segment": self._path.name if self._path else None,
+            "buffered": len(self._buffer),
+            "events": self.events,
+            "unencodable": self.unencodable,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "segments_opened": self.segments,
+            "flushed_at": self.flushed_at,
+            "logged_until": self._logged,
+            "snapshots": self.snapshots,
+            "snapshot_ms": round(self.snapshot_ms, 3),
+            "gaps_recorded": self.gaps,
+        }
+
+
+# -------------------------
+# Restore
+# -------------------------
+async def restore(db: AsyncIOMotorDatabase, directory: Path, until: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Rebuild the backed up collections of ``db`` (dropped first) as they were
+    at ``until`` (default: the end of the log). Indexes are left to
+    ensure_indexes. Raises ValueError when no snapshot finished by then, or
+    when writes between that snapshot and ``until`` were never logged.
+    """
+    clock = time.perf_counter()
+    snapshots = [s for s in list_snapshots(directory) if until is None or s.finished <= until]
+    if not snapshots:
+        raise ValueError(f"No base snapshot in {directory} finished by {until or 'now'}")
+    base = snapshots[-1]
+    since = base.started - timedelta(seconds=settings.backup_overlap_seconds)
+    for gap in list_gaps(directory):
+        if gap.last > base.started and (until is None or gap.first < until):
+            raise ValueError(f"Writes from {gap.first} to {gap.last} were not logged; restore to a time "
+                             f"before {gap.first} or after the first snapshot finished since {gap.last}")
+
+    # Last state of every record changed since the snapshot; None = deleted
+    changes: Dict[Tuple[str, Any], Optional[Dict[str, Any]]] = {}
+    replayed = 0
+    last_ts = None
+    for record in replay(directory, since, until):
+        replayed += 1
+        last_ts = record["ts"]
+        if record["op"] == "delete":
+            changes[(record["c"], record["id"])] = None
+        elif record.get("doc") is not None:
+            changes[(record["c"], record["id"])] = record["doc"]
+    replay_ms = (time.perf_counter() - clock) * 1000
+
+    for name in BACKUP_COLLECTIONS:
+        await db[name].drop()
+    counts = {name: 0 for name in BACKUP_COLLECTIONS}
+    pending: Set[asyncio.Task] = set()
+
+    async def insert(name: str, docs: List[Dict[str, Any]]) -> None:
+        """Keeps up to backup_restore_concurrency insert_many calls in flight"""
+        if len(pending) >= settings.backup_restore_concurrency:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            pending.difference_update(done)
+        pending.add(asyncio.create_task(db[name].insert_many(docs, ordered=False)))
+        counts[name] += len(docs)
+
+    # Frames are decompressed in a thread while the previous inserts run
+    frames = read_frames(base.path)
+    while True:
+        frame = await asyncio.to_thread(next, frames, None)
+        if frame is None:
+            break
+        name = frame[0]["c"]
+        docs = []
+        for doc in frame[1:]:
+            key = (name, doc["_id"])
+            if key in changes:
+                doc = changes.pop(key)
+                if doc is None:
+                    continue
+            docs.append(doc)
+        if docs:
+            await insert(name, docs)
+    # Records created after the snapshot read their collection
+    created: Dict[str, List[Dict[str, Any]]] = {}
+    for (name, _), doc in changes.items():
+        if doc is not None:
+            created.setdefault(name, []).append(doc)
+    for name, docs in created.items():
+        for start in range(0, len(docs), settings.backup_batch_size):
+            await insert(name, docs[start:start + settings.backup_batch_size])
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        for task in done:
+            task.result()
+
+    elapsed = time.perf_counter() - clock
+    total = sum(counts.values())
+    return {
+        "snapshot": base.path.name,
+        "until": until,
+        "last_event": last_ts,
+        "events_replayed": replayed,
+        "documents": counts,
+        "total": total,
+        "replay_ms": round(replay_ms, 1),
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(total / elapsed) if elapsed else None,
+    }
+
+
+# One change log per tenant database (app/core/tenancy.py)
+change_log: ChangeLog = TenantLocal(ChangeLog)
@@ -0,0 +1,343 @@
+# app/core/bookings.py
+"""
+Per-lawyer interval index of hearings, for double-booking checks.
+
+A hearing books its ``assigned_lawyer_id`` from ``start_time`` to
+``end_time`` on ``hearing_date``; without an end time it lasts
+settings.hearing_default_minutes, without a start time the whole day. Two
+bookings of the same lawyer conflict when they overlap in different
+courtrooms (several matters in one courtroom are listed one after the
+other, so they do not).
+
+Each lawyer's bookings are kept in a list sorted by start. No booking is
+longer than a day, so everything overlapping [start, end) starts in
+[start - longest, end): two bisections find that slice, and a check costs
+O(log n) plus the few bookings around that time, however many hearings
+the lawyer has had. The index is loaded at startup and kept current from
+the change feed; add_hearing / update_hearing also put the booking they
+are about to write straight away, so two requests racing on one worker
+cannot both pass the check.
+
+The local change feed only sees this worker's writes. While it is the
+source, run_refresh re-reads hearings by ``updated_at`` (and tombstones)
+every settings.hearing_bookings_refresh_seconds, as analytics does, and
+every write first re-reads its lawyer's hearings for that day
+(sync_days), so a hearing booked through another worker is seen before
+the check. Neither replaces a booking with an older copy, which keeps the
+slots held by requests still in flight here.
+"""
+import asyncio
+import bisect
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .config import settings
+from .events import change_feed, ChangeEvent
+from .sync import compaction_horizon
+from .tenancy import TenantLocal
+
+_EPOCH = datetime(1970, 1, 1)
+_DAY_MINUTES = 24 * 60
+
+_PROJECTION = {"case_id": 1, "assigned_lawyer_id": 1, "hearing_date": 1, "start_time": 1, "end_time": 1,
+               "courtroom": 1, "updated_at": 1}
+
+
+class Booking(NamedTuple):
+    # Minutes since the epoch; sorted and bisected on (start, end, id)
+    start: int
+    end: int
+    id: Any
+    lawyer_id: str
+    case_id: Any
+    courtroom: Optional[str]
+    updated_at: Optional[datetime] = None
+
+    def out(self) -> Dict[str, Any]:
+        start = _EPOCH + timedelta(minutes=self.start)
+        end = _EPOCH + timedelta(minutes=self.end)
+        return {
+            "hearing_id": str(self.id),
+            "case_id": str(self.case_id) if self.case_id is not None else None,
+            "lawyer_id": self.lawyer_id,
+            "courtroom": self.courtroom,
+            "start": start,
+            "end": end,
+        }
+
+
+def _minutes(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(minutes=1)
+
+
+def _clock(value: Any) -> Optional[int]:
+    """Minutes after midnight of a stored "HH:MM" time"""
+    if not value:
+        return None
+    try:
+        hours, minutes = str(value).split(":")[:2]
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return None
+
+
+def _room(courtroom: Optional[str]) -> Optional[str]:
+    return " ".join(courtroom.split()).lower() if courtroom else None
+
+
+def booking(doc: Dict[str, Any]) -> Optional[Booking]:
+    """The booking a hearing document makes, or None when it names no lawyer or date"""
+    lawyer_id = doc.get("assigned_lawyer_id")
+    day = doc.get("hearing_date")
+    if not lawyer_id or not isinstance(day, datetime):
+        return None
+    midnight = _minutes(datetime.combine(day.date(), datetime.min.time()))
+    start = _clock(doc.get("start_time"))
+    end = _clock(doc.get("end_time"))
+    if start is None:
+        start, end = 0, _DAY_MINUTES
+    elif end is None or end <= start:
+        end = min(start + settings.hearing_default_minutes, _DAY_MINUTES)
+    return Booking(midnight + start, midnight + end, doc["_id"], str(lawyer_id), doc.get("case_id"),
+                   doc.get("courtroom"), doc.get("updated_at"))
+
+
+def _day(value: Any) -> Optional[date]:
+    """The date of a stored datetime or of an ISO string from a request payload"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def clashes(a: Booking, b: Booking) -> bool:
+    room_a, room_b = _room(a.courtroom), _room(b.courtroom)
+    return (a.id != b.id and a.start < b.end and b.start < a.end
+            and room_a is not None and room_b is not None and room_a != room_b)
+
+
+class LawyerSchedule:
+    __slots__ = ("bookings", "longest")
+
+    def __init__(self) -> None:
+        self.bookings: List[Booking] = []
+        # Upper bound on booking length; only grows, which keeps the search correct
+        self.longest = 0
+
+    def add(self, entry: Booking) -> None:
+        bisect.insort(self.bookings, entry)
+        self.longest = max(self.longest, entry.end - entry.start)
+
+    def remove(self, entry: Booking) -> None:
+        i = bisect.bisect_left(self.bookings, entry)
+        if i < len(self.bookings) and self.bookings[i] == entry:
+            del self.bookings[i]
+
+    def around(self, start: int, end: int) -> List[Booking]:
+        """Bookings that may overlap [start, end): those starting in [start - longest, end)"""
+        lo = bisect.bisect_left(self.bookings, (start - self.longest,))
+        hi = bisect.bisect_left(self.bookings, (end,))
+        return [b for b in self.bookings[lo:hi] if b.end > start]
+
+
+class BookingIndex:
+    def __init__(self) -> None:
+        self._lawyers: Dict[str, LawyerSchedule] = {}
+        self._by_id: Dict[Any, Booking] = {}
+        self.checks = 0
+        self.clashes_found = 0
+        # Start of the last load or refresh, for the next refresh
+        self._until: Optional[datetime] = None
+        self.refreshes = 0
+        self.synced_days = 0
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def put(self, doc: Dict[str, Any]) -> None:
+        """Index a hearing as written, replacing its previous booking"""
+        self.remove(doc["_id"])
+        entry = booking(doc)
+        if entry is None:
+            return
+        self._lawyers.setdefault(entry.lawyer_id, LawyerSchedule()).add(entry)
+        self._by_id[entry.id] = entry
+
+    def remove(self, id: Any) -> None:
+        entry = self._by_id.pop(id, None)
+        if entry is None:
+            return
+        schedule = self._lawyers[entry.lawyer_id]
+        schedule.remove(entry)
+        if not schedule.bookings:
+            del self._lawyers[entry.lawyer_id]
+
+    def merge(self, doc: Dict[str, Any]) -> None:
+        """put() unless the index already has a newer copy, such as a slot held by a request in flight"""
+        current = self._by_id.get(doc["_id"])
+        updated_at = doc.get("updated_at")
+        if current is not None and current.updated_at and updated_at and current.updated_at > updated_at:
+            return
+        self.put(doc)
+
+    def _remove_case(self, case_id: Any) -> None:
+        for id in [id for id, entry in self._by_id.items() if entry.case_id == case_id]:
+            self.remove(id)
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if event.collection != "case_hearings":
+            return
+        if event.op == "delete":
+            self.remove(event.id)
+        elif event.document is not None:
+            self.put(event.document)
+
+    async def load(self, db: AsyncIOMotorDatabase) -> int:
+        """Rebuild from the case_hearings collection"""
+        self._until = datetime.utcnow()
+        lawyers: Dict[str, LawyerSchedule] = {}
+        by_id: Dict[Any, Booking] = {}
+        async for doc in db.case_hearings.find({"assigned_lawyer_id": {"$ne": None}}, _PROJECTION):
+            entry = booking(doc)
+            if entry is not None:
+                lawyers.setdefault(entry.lawyer_id, LawyerSchedule()).bookings.append(entry)
+                by_id[entry.id] = entry
+        for schedule in lawyers.values():
+            schedule.bookings.sort()
+            schedule.longest = max(b.end - b.start for b in schedule.bookings)
+        self._lawyers, self._by_id = lawyers, by_id
+        return len(by_id)
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> int:
+        """Apply hearings changed since the last load or refresh; returns the number of changes read"""
+        if self._until is None:
+            return await self.load(db)
+        until = datetime.utcnow()
+        # Overlap like delta sync so writes that committed late with an earlier timestamp are not missed
+        since = self._until - timedelta(seconds=settings.sync_overlap_seconds)
+        horizon = await compaction_horizon(db)
+        if horizon is not None and horizon > since:
+            return await self.load(db)
+        hearings, tombstones = await asyncio.gather(
+            db.case_hearings.find({"updated_at": {"$gte": since}}, _PROJECTION).to_list(None),
+            db.tombstones.find({"deleted_at": {"$gte": since},
+                                "collection": {"$in": ["case_hearings", "cases"]}}).to_list(None),
+        )
+        for doc in hearings:
+            self.merge(doc)
+        for tombstone in tombstones:
+            if tombstone["collection"] == "case_hearings":
+                self.remove(tombstone["doc_id"])
+            else:
+                # A case delete leaves no tombstones for its hearings
+                self._remove_case(tombstone["doc_id"])
+        self._until = until
+        self.refreshes += 1
+        return len(hearings) + len(tombstones)
+
+    async def sync_days(self, db: AsyncIOMotorDatabase, days: Iterable[Tuple[Any, Any]]) -> None:
+        """
+        Before a write is checked: re-read the hearings of each (lawyer id,
+        hearing date) pair. Only needed while the change feed is local; a
+        change stream already reports every worker's writes.
+        """
+        if change_feed.source == "change_stream":
+            return
+        ranges = []
+        for lawyer_id, value in set((lawyer_id, _day(value)) for lawyer_id, value in days):
+            if not lawyer_id or value is None:
+                continue
+            midnight = datetime.combine(value, datetime.min.time())
+            ranges.append({"assigned_lawyer_id": lawyer_id,
+                           "hearing_date": {"$gte": midnight, "$lt": midnight + timedelta(days=1)}})
+        if not ranges:
+            return
+        async for doc in db.case_hearings.find({"$or": ranges}, _PROJECTION):
+            self.merge(doc)
+        self.synced_days += len(ranges)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        change_feed.add_listener(self._on_change)
+        await self.load(db)
+
+    async def run_refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """Background loop started from the app lifespan; idle while a change stream keeps the index current"""
+        while True:
+            await asyncio.sleep(settings.hearing_bookings_refresh_seconds)
+            try:
+                if change_feed.source != "change_stream":
+                    await self.refresh(db)
+                else:
+                    self._until = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Hearing bookings refresh failed: {e}")
+
+    async def stop(self) -> None:
+        change_feed.remove_listener(self._on_change)
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def conflicts(self, doc: Dict[str, Any]) -> List[Booking]:
+        """Bookings a hearing document would clash with"""
+        entry = booking(doc)
+        self.checks += 1
+        if entry is None or entry.lawyer_id not in self._lawyers:
+            return []
+        found = [b for b in self._lawyers[entry.lawyer_id].around(entry.start, entry.end) if clashes(entry, b)]
+        self.clashes_found += bool(found)
+        return found
+
+    def conflicts_between(self, start: datetime, end: datetime,
+                          lawyer_id: Optional[str] = None) -> List[Tuple[str, List[Booking]]]:
+        """
+        Groups of overlapping bookings touching [start, end) that contain a
+        clash, per lawyer in time order. A group is a run of bookings each
+        starting before the ones before it have all ended.
+        """
+        lo, hi = _minutes(start), _minutes(end)
+        lawyers: Iterable[str] = [lawyer_id] if lawyer_id is not None else sorted(self._lawyers)
+        found: List[Tuple[str, List[Booking]]] = []
+
+        def flush(lawyer: str, group: List[Booking]) -> None:
+            if any(clashes(a, b) for i, a in enumerate(group) for b in group[i + 1:]):
+                found.append((lawyer, group))
+
+        for lawyer in lawyers:
+            schedule = self._lawyers.get(lawyer)
+            if schedule is None:
+                continue
+            group: List[Booking] = []
+            group_end = 0
+            for entry in schedule.around(lo, hi):
+                if group and entry.start >= group_end:
+                    flush(lawyer, group)
+                    group = []
+                group_end = max(group_end, entry.end) if group else entry.end
+                group.append(entry)
+            flush(lawyer, group)
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lawyers": len(self._lawyers),
+            "bookings": len(self._by_id),
+            "checks": self.checks,
+            "clashes_found": self.clashes_found,
+            "refreshes": self.refreshes,
+            "synced_days": self.synced_days,
+        }
+
+
+# One index per tenant database (app/core/tenancy.py)
+hearing_bookings: BookingIndex = TenantLocal(BookingIndex)
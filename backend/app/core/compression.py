@@ -0,0 +1,438 @@
+# app/core/compression.py
+"""
+Negotiated response compression and a cache of case responses.
+
+CompressionMiddleware picks the best of zstd, br and gzip that the client
+accepts (Accept-Encoding, with q-values). zstd and br need the optional
+``zstandard`` / ``brotli`` packages and are only offered when installed.
+
+- JSON and text responses of at least settings.compression_min_bytes are
+  compressed whole at the request-time levels (settings.compression_*).
+- NDJSON streams are compressed as they are produced, flushing after every
+  chunk so the client can decode each batch as soon as it arrives. Server
+  sent events are left alone.
+
+GET /cases/{case_id} and its child lists are cacheable: the first 200
+response is kept per path, query string and settings.raw_bson_responses
+(ResponseCache) with a weak ETag, and each encoding is compressed once, at a
+higher level, the first time a client asks for it. Later reads are
+answered from the cache without running the handler (no queries, no
+serialization, no compression), and with 304 Not Modified when If-None-Match
+matches. Entries are dropped when the change feed reports a write to the
+case or any of its records, and expire after
+settings.response_cache_ttl_seconds in any case. Writes made by other
+workers are only seen when the change feed is a change stream, so by
+default (settings.response_cache_enabled None) the cache is only used
+then; set it to true to use it on the local feed with a single worker.
+A response that was being built while its case changed is not stored.
+"""
+import gzip
+import hashlib
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .config import settings
+from .events import change_feed, ChangeEvent
+from .lazy import LazyModule
+from .profiling import requested_by_header
+from .tenancy import TenantLocal
+
+brotli = LazyModule("brotli")
+zstandard = LazyModule("zstandard")
+
+# Preferred first when the client weighs several equally
+ENCODINGS = ("zstd", "br", "gzip")
+
+# Levels for cached bodies, compressed once and served many times
+_CACHED_LEVELS = {"zstd": 12, "br": 9, "gzip": 9}
+
+_COMPRESSIBLE = re.compile(r"^(application/(json|x-ndjson|xml|javascript)|text/(?!event-stream))")
+_STREAMED = "application/x-ndjson"
+
+# Cacheable reads: a case and its child lists, keyed to the case they show
+_CACHEABLE = re.compile(r"^/cases/([0-9a-f]{24})(?:/(?:parties|hearings|documents|notes|tasks))?/?$")
+
+# Headers of one response that a cached copy does not repeat
+_PER_RESPONSE = (b"content-length", b"content-encoding", b"etag", b"server-timing")
+
+# Remembered invalidations, for rejecting responses built across one
+_INVALIDATIONS_KEPT = 10_000
+
+
+# -------------------------
+# Codecs
+# -------------------------
+def available() -> Tuple[str, ...]:
+    return tuple(e for e in ENCODINGS
+                 if e == "gzip" or (e == "br" and brotli.available) or (e == "zstd" and zstandard.available))
+
+
+def _level(encoding: str) -> int:
+    return {"zstd": settings.compression_zstd_level, "br": settings.compression_brotli_quality,
+            "gzip": settings.compression_gzip_level}[encoding]
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    level = _level(encoding) if level is None else level
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class StreamCompressor:
+    """Incremental compression; every chunk() output is decodable on its own arrival"""
+
+    def __init__(self, encoding: str):
+        level = _level(encoding)
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.flush(zlib.Z_FINISH)
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts, or None for identity"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+# -------------------------
+# Cached responses
+# -------------------------
+class CachedResponse:
+    __slots__ = ("case_id", "etag", "headers", "bodies", "size", "expires")
+
+    def __init__(self, case_id: str, etag: bytes, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.case_id = case_id
+        self.etag = etag
+        self.headers = headers
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        self.size = len(body)
+        self.expires = time.monotonic() + settings.response_cache_ttl_seconds
+
+    def body(self, encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Body for an encoding, compressed on first use; small bodies stay uncompressed"""
+        identity = self.bodies["identity"]
+        if encoding is None or len(identity) < settings.compression_min_bytes:
+            return "identity", identity
+        body = self.bodies.get(encoding)
+        if body is None:
+            body = self.bodies[encoding] = compress(encoding, identity, _CACHED_LEVELS[encoding])
+            self.size += len(body)
+        return encoding, body
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._by_case: Dict[str, Set[str]] = {}
+        self._invalidated: "OrderedDict[str, float]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.stored = 0
+        self.invalidations = 0
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse, started: float) -> bool:
+        """Store unless the case changed after ``started`` (monotonic)"""
+        if self._invalidated.get(entry.case_id, 0.0) >= started:
+            return False
+        self._drop(key)
+        self._entries[key] = entry
+        self._by_case.setdefault(entry.case_id, set()).add(key)
+        self.bytes += entry.size
+        self.stored += 1
+        self.trim()
+        return True
+
+    def grew(self, entry: CachedResponse, before: int) -> None:
+        """An entry gained an encoded body"""
+        self.bytes += entry.size - before
+        self.trim()
+
+    def trim(self) -> None:
+        while self.bytes > settings.response_cache_max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry.size
+        keys = self._by_case.get(entry.case_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_case[entry.case_id]
+
+    def invalidate(self, case_id: str) -> None:
+        self._invalidated[case_id] = time.monotonic()
+        self._invalidated.move_to_end(case_id)
+        if len(self._invalidated) > _INVALIDATIONS_KEPT:
+            self._invalidated.popitem(last=False)
+        for key in list(self._by_case.get(case_id, ())):
+            self._drop(key)
+            self.invalidations += 1
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if event.case_id is not None:
+            self.invalidate(str(event.case_id))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_case.clear()
+        self.bytes = 0
+
+    async def start(self) -> None:
+        change_feed.add_listener(self._on_change)
+
+    async def stop(self) -> None:
+        change_feed.remove_listener(self._on_change)
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": settings.response_cache_max_bytes,
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "stored": self.stored,
+            "invalidations": self.invalidations,
+            "encodings": list(available()),
+            "enabled": cache_enabled(),
+        }
+
+
+def cache_enabled() -> bool:
+    """settings.response_cache_enabled; None means only while the change feed is a change stream"""
+    enabled = settings.response_cache_enabled
+    if enabled is None:
+        return change_feed.source == "change_stream"
+    return enabled
+
+
+# Cached responses come from the tenant's database (app/core/tenancy.py)
+response_cache: ResponseCache = TenantLocal(ResponseCache)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key == name:
+            return value
+    return None
+
+
+def _etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(b",")]
+    # Weak comparison: W/"x" and "x" match
+    return b"*" in tags or etag.removeprefix(b"W/") in (tag.removeprefix(b"W/") for tag in tags)
+
+
+class _Request(NamedTuple):
+    encoding: Optional[str]
+    if_none_match: Optional[bytes]
+    cache_key: Optional[str]
+    case_id: Optional[str]
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses and serving cached case reads"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    def _request(self, scope: Dict[str, Any]) -> _Request:
+        headers = scope.get("headers", ())
+        accept_encoding = _header(headers, b"accept-encoding")
+        encoding = negotiate(accept_encoding.decode("latin-1")) if accept_encoding and settings.compression_enabled else None
+        cache_key = case_id = None
+        match = _CACHEABLE.match(scope["path"]) if scope["method"] == "GET" and cache_enabled() else None
+        # Profiled requests see the response computed afresh
+        if match and not requested_by_header(headers):
+            accept = _header(headers, b"accept") or b""
+            if _STREAMED.encode() not in accept:
+                case_id = match.group(1)
+                # Keyed on the serialization path too, so switching it never serves the other's bytes
+                cache_key = (f"{'raw' if settings.raw_bson_responses else 'std'}:{scope['path']}"
+                             f"?{scope.get('query_string', b'').decode('latin-1')}")
+        return _Request(encoding, _header(headers, b"if-none-match"), cache_key, case_id)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        request = self._request(scope)
+        if request.cache_key is not None:
+            cache = response_cache.get()
+            entry = cache.lookup(request.cache_key)
+            if entry is not None:
+                return await self._send_cached(cache, entry, request, send)
+            cache.misses += 1
+            return await self._run_and_cache(cache, request, scope, receive, send)
+        if request.encoding is None:
+            return await self.app(scope, receive, send)
+        return await self._run_and_compress(request.encoding, scope, receive, send)
+
+    # -------------------------
+    # Cached reads
+    # -------------------------
+    async def _send_cached(self, cache: ResponseCache, entry: CachedResponse, request: _Request,
+                           send: Callable[..., Any]) -> None:
+        if _etag_matches(request.if_none_match, entry.etag):
+            cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [(b"etag", entry.etag), (b"vary", b"Accept-Encoding")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        cache.hits += 1
+        before = entry.size
+        encoding, body = entry.body(request.encoding)
+        if entry.size != before:
+            cache.grew(entry, before)
+        headers = entry.headers + [(b"content-length", str(len(body)).encode())]
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _run_and_cache(self, cache: ResponseCache, request: _Request, scope: Dict[str, Any],
+                             receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        started = time.monotonic()
+        start: Optional[Dict[str, Any]] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def capture(message: Dict[str, Any]) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                if start["status"] != 200 or len(chunks) > 1:
+                    return
+                # Streamed: not cacheable, send as it comes
+                passthrough = True
+                await send(start)
+                await send({**message, "body": b"".join(chunks)})
+                return
+
+        await self.app(scope, receive, capture)
+        if passthrough or start is None:
+            return
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in start["headers"] if k not in _PER_RESPONSE]
+        if start["status"] != 200:
+            return await self._send_whole(request.encoding, start["status"], headers, body, send)
+        entry = CachedResponse(request.case_id, b'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest().encode() + b'"',
+                               headers + [(b"vary", b"Accept-Encoding")], body)
+        entry.headers.append((b"etag", entry.etag))
+        cache.put(request.cache_key, entry, started)
+        await self._send_cached(cache, entry, request, send)
+
+    # -------------------------
+    # Compression of uncached responses
+    # -------------------------
+    async def _send_whole(self, encoding: Optional[str], status: int, headers: List[Tuple[bytes, bytes]],
+                          body: bytes, send: Callable[..., Any]) -> None:
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+        if _COMPRESSIBLE.match(content_type):
+            headers = headers + [(b"vary", b"Accept-Encoding")]
+            if encoding and len(body) >= settings.compression_min_bytes and status not in (204, 304):
+                body = compress(encoding, body)
+                headers.append((b"content-encoding", encoding.encode()))
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _run_and_compress(self, encoding: str, scope: Dict[str, Any], receive: Callable[..., Any],
+                                send: Callable[..., Any]) -> None:
+        start: Optional[Dict[str, Any]] = None
+        stream: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def compressing(message: Dict[str, Any]) -> None:
+            nonlocal start, stream, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                content_type = (_header(message["headers"], b"content-type") or b"").decode("latin-1")
+                if _header(message["headers"], b"content-encoding") is not None or not _COMPRESSIBLE.match(content_type):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+            if stream is None and not more:
+                # Whole body in one message
+                return await self._send_whole(encoding, start["status"], headers, body, send)
+            if stream is None:
+                if not _header(headers, b"content-type").startswith(_STREAMED.encode()):
+                    # Other streamed bodies go out as they are
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                stream = StreamCompressor(encoding)
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                await send({**start, "headers": headers})
+            data = stream.chunk(body) if body else b""
+            if not more:
+                data += stream.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, compressing)
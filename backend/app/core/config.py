@@ -1,12 +1,158 @@
 # app/core/config.py
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     mongo_uri: str
     mongo_db: str
+    # "mongo" talks to mongo_uri, "memory" uses the in-process engine in app/db/memory.py
+    db_engine: str = "mongo"
+    # Whether the memory engine reports transaction support. Its transactions roll back but do not
+    # isolate; False makes multi-collection writes (POST /cases/{id}/batch) take the standalone path
+    memory_transactions: bool = True
     google_drive_service_account_json: str | None = None
     google_drive_root_folder_id: str | None = None
 
+    # Worker startup (app/main.py): "eager" creates indexes before serving, "fast"
+    # serves as soon as the pool is warm and creates them in the background
+    startup_mode: str = "eager"
+    # Connections opened at startup and kept in the pool
+    mongo_min_pool_size: int = 10
+
+    # Matter timeline storage
+    matter_timeline_bucket_size: int = 200
+    matter_timeline_preview: int = 5
+
+    # Request profiling (app/core/profiling.py)
+    profiling_sample_rate: float = 0.0
+    profiling_header: str = "X-Profile"
+    profiling_slow_ms: float = 500.0
+    profiling_buffer_size: int = 200
+
+    # Change feed (app/core/events.py): "auto", "change_stream" or "local"
+    change_feed_source: str = "auto"
+    change_feed_history: int = 10000
+    change_feed_queue_size: int = 256
+    change_feed_heartbeat_seconds: float = 15.0
+
+    # Delta sync (app/core/sync.py)
+    sync_overlap_seconds: float = 5.0
+    sync_tombstone_retention_days: int = 90
+    sync_compaction_interval_seconds: float = 3600.0
+
+    # Hearing and task reminders (app/core/reminders.py)
+    reminders_enabled: bool = True
+    reminder_lead_hours: float = 24.0
+    reminder_horizon_days: int = 7
+    reminder_resync_seconds: float = 3600.0
+    reminder_lease_seconds: float = 60.0
+
+    # Archival of disposed cases and archived matters (app/core/archive.py)
+    archive_after_days: int = 365
+    archive_compression_level: int = 6
+    # 0 disables the background job; run app.tools.archive from cron instead
+    archive_interval_seconds: float = 0.0
+
+    # List routes under /cases transcode raw BSON straight to JSON (app/models/rawjson.py)
+    raw_bson_responses: bool = False
+
+    # Child list routes: page size without ?limit=, documents per NDJSON batch
+    list_default_limit: int = 100
+    stream_batch_size: int = 500
+
+    # Reference data (app/core/reference.py): validate case ids, poll for other workers' changes
+    reference_validation: bool = True
+    reference_refresh_seconds: float = 30.0
+
+    # Idempotency-Key on create routes (app/core/idempotency.py)
+    idempotency_ttl_hours: float = 24.0
+    idempotency_cache_size: int = 10000
+    idempotency_wait_seconds: float = 10.0
+    idempotency_lock_seconds: float = 60.0
+
+    # Admission control (app/core/admission.py): concurrent requests per route class
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 64
+    admission_read_limit: int = 48
+    admission_heavy_limit: int = 12
+    # Slots of admission_max_concurrency only writes may use
+    admission_write_reserve: int = 8
+    admission_queue_size: int = 100
+    admission_queue_timeout_seconds: float = 1.0
+    # Limits shrink while Mongo latency exceeds tolerance x its baseline (and the floor)
+    admission_latency_tolerance: float = 2.0
+    admission_latency_floor_ms: float = 5.0
+    admission_min_scale: float = 0.1
+    admission_adjust_seconds: float = 0.5
+
+    # Lawyer double-booking checks (app/core/bookings.py): length of a hearing with a start but no end time
+    hearing_default_minutes: int = 60
+    # How often the booking index re-reads changed hearings while the change feed is local
+    hearing_bookings_refresh_seconds: float = 10.0
+
+    # Pendency and disposal statistics (app/core/analytics.py): columnar snapshot per worker
+    analytics_enabled: bool = True
+    analytics_refresh_seconds: float = 60.0
+    analytics_rebuild_seconds: float = 21600.0
+    analytics_batch_size: int = 5000
+    # Hearings whose stage or order summary matches this (case-insensitive) count as adjournments
+    analytics_adjournment_pattern: str = "adjourn"
+
+    # Response compression (app/core/compression.py): zstd and br need the optional packages
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    # Case reads kept with their ETag and compressed bodies, per worker and tenant.
+    # None: only while the change feed is a change stream, the one source that
+    # reports other workers' writes; true forces it on (single worker)
+    response_cache_enabled: bool | None = None
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_ttl_seconds: float = 300.0
+
+    # Duplicate cases (app/core/duplicates.py): court type -> {case type as written: abbreviation}
+    case_number_aliases: Dict[str, Dict[str, str]] = {}
+    # 0 disables the background scan; POST /admin/duplicates/scan runs one
+    duplicate_scan_hours: float = 24.0
+    duplicate_min_score: float = 0.8
+    # Title tokens shared by more cases of a court and year than this propose no pairs
+    duplicate_token_limit: int = 50
+    duplicate_batch_size: int = 1000
+
+    # Change-log backup (app/core/backup.py): segments and base snapshots under backup_dir/<database>
+    backup_enabled: bool = False
+    backup_dir: str = "backups"
+    backup_flush_seconds: float = 1.0
+    backup_fsync: bool = True
+    backup_segment_bytes: int = 64 * 1024 * 1024
+    backup_segment_seconds: float = 3600.0
+    # 0 leaves base snapshots to app.tools.backup
+    backup_snapshot_hours: float = 24.0
+    backup_keep_snapshots: int = 7
+    # Log replayed from this long before a snapshot started, for clock skew between workers
+    backup_overlap_seconds: float = 5.0
+    backup_compression_level: int = 6
+    backup_batch_size: int = 1000
+    backup_restore_concurrency: int = 4
+
+    # Tenants (app/core/tenancy.py): id -> {"db": name, "uri": optional own cluster}
+    tenants: Dict[str, Dict[str, str]] = {}
+    tenant_header: str | None = "X-Tenant-ID"
+    # HS256 secret for bearer tokens carrying the tenant in tenant_claim
+    tenant_jwt_secret: str | None = None
+    tenant_claim: str = "tenant"
+    # Reject requests without a tenant instead of serving them from mongo_db
+    tenant_required: bool = False
+    # Tenants with services running in one worker; the least recently used idle one is stopped beyond this
+    tenant_max_active: int = 32
+    # Clients for tenants on their own clusters share tenant_pool_budget connections
+    tenant_max_clients: int = 8
+    tenant_pool_budget: int = 200
+
+    # When set, /admin endpoints require a matching X-Admin-Token header
+    admin_token: str | None = None
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,397 @@
+# app/core/duplicates.py
+"""
+Case number normalization and the background duplicate case finder.
+
+The same matter is often entered twice with the number written
+differently: "CRL.A. 123/2024", "CRLA 123 of 2024", "Crl. Appeal No. 123
+of 2024". normalize_case_number reduces these to one key, "CRLA/123/2024":
+the case type letters without punctuation (spelled out names mapped to the
+usual abbreviation: COMMON_CASE_TYPE_ALIASES, then per court type
+CASE_TYPE_ALIASES and settings.case_number_aliases), then the numbers without leading zeros,
+with the year last. Cases store it as ``case_number_norm`` under a unique
+index on (court_type, court_name_id, case_number_norm), so create_case and
+update_case reject an exact duplicate through the index with a 409. Cases
+written before the index existed are backfilled at startup; one whose key
+is already taken is left without it and is reported by the finder instead.
+
+The finder looks for duplicates that are not exact: a wrong case type, a
+title spelled differently. Comparing every pair of cases is out of the
+question at millions of cases, so:
+
+1. Blocking: only cases of the same court, court type and year (from the
+   case number, else the filing date) are compared, read one court at a
+   time through the court_name_id index.
+2. Candidates: within a block, an inverted index from title tokens and the
+   case serial number to cases proposes the pairs sharing at least one.
+   Tokens held by more than settings.duplicate_token_limit cases of the
+   block ("State", a city) propose nothing, which bounds the pairs per
+   case whatever the block size.
+3. Scoring: titles and party names are compared fuzzily (difflib, on
+   sorted tokens), together with the case number. Party names are read
+   only for the pairs whose title could still reach the threshold.
+
+Pairs scoring at least settings.duplicate_min_score are kept in the
+case_duplicates collection, listed by GET /cases/duplicates. One worker
+per settings.duplicate_scan_hours runs the scan, claimed in job_runs
+(0 disables the background job; POST /admin/duplicates/scan runs one).
+"""
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .config import settings
+from .tenancy import TenantLocal
+from ..db.indexes import CASE_NUMBER_INDEX, has_index
+
+# Spelled out or variant case types, after punctuation is removed, in every court
+COMMON_CASE_TYPE_ALIASES: Dict[str, str] = {
+    "CRIMINALAPPEAL": "CRLA", "CRLAPPEAL": "CRLA",
+    "CRIMINALREVISION": "CRLREV", "CRLREVISION": "CRLREV",
+    "WPCIVIL": "WPC", "WRITPETITIONCIVIL": "WPC", "CWP": "WPC",
+    "WPCRIMINAL": "WPCRL", "WRITPETITIONCRIMINAL": "WPCRL", "WRITPETITION": "WP",
+    "CIVILSUIT": "CS", "CIVILAPPEAL": "CA", "BAILAPPLN": "BAIL", "BAILAPPLICATION": "BAIL",
+    "MOTORACCIDENTCLAIM": "MAC", "MACT": "MAC", "EXECUTIONPETITION": "EP",
+}
+
+# And those that only mean something in one court type
+CASE_TYPE_ALIASES: Dict[str, Dict[str, str]] = {
+    "SC": {
+        "SLPCIVIL": "SLPC", "SPECIALLEAVEPETITIONCIVIL": "SLPC",
+        "SLPCRIMINAL": "SLPCRL", "SPECIALLEAVEPETITIONCRIMINAL": "SLPCRL",
+        "TRANSFERPETITIONCIVIL": "TPC", "REVIEWPETITIONCIVIL": "RPC",
+    },
+    "HC": {
+        "REGULARFIRSTAPPEAL": "RFA", "REGULARSECONDAPPEAL": "RSA", "FIRSTAPPEAL": "FA",
+        "LETTERSPATENTAPPEAL": "LPA", "CONTEMPTCASE": "CONTCAS",
+    },
+    "District": {
+        "ORIGINALSUIT": "OS", "CRIMINALCASE": "CC", "SESSIONSCASE": "SC",
+        "MISCAPPEAL": "MA", "MISCELLANEOUSAPPEAL": "MA",
+    },
+}
+
+# Words in case numbers that carry no meaning ("No.", "of")
+_NUMBER_FILLER = frozenset({"NO", "NOS", "OF"})
+
+# Title and party words too common to tell cases apart
+_STOPWORDS = frozenset({
+    "VS", "V", "VERSUS", "THE", "AND", "OF", "STATE", "UNION", "INDIA", "ORS", "ANR", "OTHERS",
+    "ANOTHER", "THROUGH", "THR", "LTD", "LIMITED", "PVT", "PRIVATE", "M", "S", "MR", "MRS", "MS",
+    "SMT", "SHRI", "SRI", "KUMARI", "DR", "GOVT", "GOVERNMENT", "NCT",
+})
+
+_WORD = re.compile(r"[A-Z]+|\d+")
+
+# Weights of the title, party and case number similarity in a pair's score
+_WEIGHTS = (0.5, 0.3, 0.2)
+
+_PROJECTION = {"case_number": 1, "court_type": 1, "court_name_id": 1, "case_title": 1, "filing_date": 1}
+
+# Claimed by the worker that runs the next scan
+_JOB_ID = "duplicate_scan"
+
+
+# -------------------------
+# Normalization
+# -------------------------
+def _aliases(court_type: Optional[str]) -> Dict[str, str]:
+    return {**COMMON_CASE_TYPE_ALIASES, **CASE_TYPE_ALIASES.get(court_type or "", {}),
+            **settings.case_number_aliases.get(court_type or "", {})}
+
+
+def _is_year(number: str) -> bool:
+    return len(number) == 4 and number[:2] in ("19", "20")
+
+
+def normalize_case_number(case_number: Optional[str], court_type: Optional[str]) -> Optional[str]:
+    """"CRL.A. No. 0123 of 2024" -> "CRLA/123/2024"; None when there is nothing to key on"""
+    if not case_number:
+        return None
+    letters: List[str] = []
+    numbers: List[str] = []
+    for token in _WORD.findall(case_number.upper()):
+        if token.isdigit():
+            numbers.append(str(int(token)))
+        elif token not in _NUMBER_FILLER:
+            letters.append(token)
+    if not numbers:
+        return None
+    # "2024/123" -> "123/2024"
+    if len(numbers) > 1 and _is_year(numbers[0]) and not _is_year(numbers[-1]):
+        numbers = numbers[1:] + numbers[:1]
+    kind = "".join(letters)
+    kind = _aliases(court_type).get(kind, kind)
+    return "/".join([kind] + numbers if kind else numbers)
+
+
+def _year(norm: Optional[str], filing_date: Any) -> Optional[int]:
+    if norm:
+        last = norm.rsplit("/", 1)[-1]
+        if _is_year(last):
+            return int(last)
+    return filing_date.year if isinstance(filing_date, datetime) else None
+
+
+def _tokens(text: Optional[str]) -> Tuple[str, ...]:
+    """Significant words, sorted"""
+    if not text:
+        return ()
+    return tuple(sorted({w for w in _WORD.findall(text.upper()) if w not in _STOPWORDS and (len(w) > 1 or w.isdigit())}))
+
+
+def _similarity(a: Tuple[str, ...], b: Tuple[str, ...], floor: float = 0.0) -> float:
+    """difflib ratio of the joined tokens; 0.0 as soon as its cheap upper bounds fall below floor"""
+    if not a or not b:
+        return 0.0
+    matcher = SequenceMatcher(None, " ".join(a), " ".join(b), autojunk=False)
+    if floor > 0 and (matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor):
+        return 0.0
+    return matcher.ratio()
+
+
+def _party_similarity(a: List[Tuple[str, ...]], b: List[Tuple[str, ...]]) -> Optional[float]:
+    """Mean best match of the names on the side with fewer parties; None if either has none"""
+    if not a or not b:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(max(_similarity(name, other) for other in b) for name in a) / len(a)
+
+
+def _score(title: float, parties: Optional[float], number: float) -> float:
+    wt, wp, wn = _WEIGHTS
+    if parties is None:
+        return (wt * title + wn * number) / (wt + wn)
+    return wt * title + wp * parties + wn * number
+
+
+class _Entry(NamedTuple):
+    id: Any
+    norm: Optional[str]
+    serial: Optional[str]
+    title: Tuple[str, ...]
+
+
+# -------------------------
+# Finder
+# -------------------------
+class DuplicateFinder:
+    def __init__(self) -> None:
+        self.scans = 0
+        self.scan_ms = 0.0
+        self.scanned_at: Optional[datetime] = None
+        self.cases = 0
+        self.blocks = 0
+        self.candidates = 0
+        self.compared = 0
+        self.found = 0
+        self.backfilled = 0
+        self.unindexed = 0
+
+    # -------------------------
+    # Backfill
+    # -------------------------
+    async def backfill(self, db: AsyncIOMotorDatabase) -> int:
+        """Set case_number_norm where missing; cases whose key is taken keep none"""
+        filled = 0
+        skipped: Set[Any] = set()
+        while True:
+            query: Dict[str, Any] = {"case_number_norm": {"$exists": False}}
+            if skipped:
+                query["_id"] = {"$nin": list(skipped)}
+            docs = await db.cases.find(query, {"case_number": 1, "court_type": 1}).limit(settings.duplicate_batch_size).to_list(None)
+            if not docs:
+                break
+            requests = []
+            for doc in docs:
+                norm = normalize_case_number(doc.get("case_number"), doc.get("court_type"))
+                if norm is None:
+                    skipped.add(doc["_id"])
+                    continue
+                requests.append(UpdateOne({"_id": doc["_id"], "case_number_norm": {"$exists": False}},
+                                          {"$set": {"case_number_norm": norm}}))
+            if not requests:
+                continue
+            try:
+                result = await db.cases.bulk_write(requests, ordered=False)
+                filled += result.modified_count
+            except BulkWriteError as e:
+                filled += e.details.get("nModified", 0)
+                for error in e.details["writeErrors"]:
+                    if error.get("code") != 11000:
+                        raise
+                    skipped.add(requests[error["index"]]._filter["_id"])
+        self.backfilled += filled
+        self.unindexed = len(skipped)
+        return filled
+
+    # -------------------------
+    # Scan
+    # -------------------------
+    async def _claim(self, db: AsyncIOMotorDatabase) -> bool:
+        """Take the next scan unless another worker did within duplicate_scan_hours"""
+        now = datetime.utcnow()
+        try:
+            await db.job_runs.update_one(
+                {"_id": _JOB_ID, "next_at": {"$not": {"$gt": now}}},
+                {"$set": {"next_at": now + timedelta(hours=settings.duplicate_scan_hours), "started_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def _candidates(self, block: List[_Entry]) -> Dict[Tuple[int, int], int]:
+        """Pairs sharing a title token or serial number, with how many they share"""
+        postings: Dict[str, List[int]] = {}
+        for i, entry in enumerate(block):
+            keys = set(entry.title)
+            if entry.serial:
+                keys.add("#" + entry.serial)
+            for key in keys:
+                postings.setdefault(key, []).append(i)
+        pairs: Dict[Tuple[int, int], int] = {}
+        for ids in postings.values():
+            if len(ids) < 2 or len(ids) > settings.duplicate_token_limit:
+                continue
+            for x, a in enumerate(ids):
+                for b in ids[x + 1:]:
+                    pairs[(a, b)] = pairs.get((a, b), 0) + 1
+        return pairs
+
+    async def _parties(self, db: AsyncIOMotorDatabase, case_ids: Iterable[Any]) -> Dict[Any, List[Tuple[str, ...]]]:
+        names: Dict[Any, List[Tuple[str, ...]]] = {}
+        async for doc in db.case_parties.find({"case_id": {"$in": list(case_ids)}}, {"case_id": 1, "name": 1}):
+            tokens = _tokens(doc.get("name"))
+            if tokens:
+                names.setdefault(doc["case_id"], []).append(tokens)
+        return names
+
+    async def _scan_court(self, db: AsyncIOMotorDatabase, court_name_id: Any, found_at: datetime) -> List[UpdateOne]:
+        blocks: Dict[Tuple[Any, Optional[int]], List[_Entry]] = {}
+        async for doc in db.cases.find({"court_name_id": court_name_id}, _PROJECTION):
+            norm = normalize_case_number(doc.get("case_number"), doc.get("court_type"))
+            parts = norm.split("/") if norm else []
+            serial = next((p for p in parts if p.isdigit() and not _is_year(p)), None)
+            key = (doc.get("court_type"), _year(norm, doc.get("filing_date")))
+            blocks.setdefault(key, []).append(_Entry(doc["_id"], norm, serial, _tokens(doc.get("case_title"))))
+            self.cases += 1
+
+        # Title and number first; parties only where they could still lift the pair over the threshold
+        wt, wp, wn = _WEIGHTS
+        scored: List[Tuple[_Entry, _Entry, float, float, Tuple[Any, Optional[int]]]] = []
+        for key, block in blocks.items():
+            self.blocks += 1
+            pairs = self._candidates(block)
+            self.candidates += len(pairs)
+            for a, b in pairs:
+                x, y = block[a], block[b]
+                number = 1.0 if x.serial is not None and x.serial == y.serial else 0.0
+                floor = 0.0 if x.norm == y.norm else (settings.duplicate_min_score - wp - wn * number) / wt
+                title = _similarity(x.title, y.title, floor)
+                if x.norm == y.norm or _score(title, 1.0, number) >= settings.duplicate_min_score:
+                    scored.append((x, y, title, number, key))
+        self.compared += len(scored)
+        parties = await self._parties(db, {e.id for x, y, *_ in scored for e in (x, y)}) if scored else {}
+
+        requests: List[UpdateOne] = []
+        for x, y, title, number, (court_type, year) in scored:
+            party = _party_similarity(parties.get(x.id, []), parties.get(y.id, []))
+            same_number = x.norm is not None and x.norm == y.norm
+            score = 1.0 if same_number else _score(title, party, number)
+            if score < settings.duplicate_min_score:
+                continue
+            first, second = sorted((x.id, y.id), key=str)
+            requests.append(UpdateOne(
+                {"_id": f"{first}:{second}"},
+                {"$set": {
+                    "case_ids": [first, second],
+                    "score": round(score, 4),
+                    "title_score": round(title, 4),
+                    "party_score": round(party, 4) if party is not None else None,
+                    "same_case_number": same_number,
+                    "court_type": court_type,
+                    "court_name_id": court_name_id,
+                    "year": year,
+                    "found_at": found_at,
+                }, "$setOnInsert": {"first_found_at": found_at}},
+                upsert=True,
+            ))
+        return requests
+
+    async def scan(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Find duplicate pairs court by court and replace the stored ones"""
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        # Stored at BSON precision; the stale pair cleanup compares against it
+        found_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        self.cases = self.blocks = self.candidates = self.compared = self.found = 0
+        for court_name_id in await db.cases.distinct("court_name_id"):
+            requests = await self._scan_court(db, court_name_id, found_at)
+            if requests:
+                await db.case_duplicates.bulk_write(requests, ordered=False)
+                self.found += len(requests)
+        if await db.cases.count_documents({"court_name_id": None}, limit=1):
+            requests = await self._scan_court(db, None, found_at)
+            if requests:
+                await db.case_duplicates.bulk_write(requests, ordered=False)
+                self.found += len(requests)
+        # Pairs that no longer match
+        await db.case_duplicates.delete_many({"found_at": {"$lt": found_at}})
+        self.scans += 1
+        self.scan_ms = (time.perf_counter() - started) * 1000
+        self.scanned_at = found_at
+        return self.stats()
+
+    async def run(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Background loop started from the app lifespan: backfill, then scan
+        whenever this worker claims it. The backfill only runs once the
+        unique case number index exists, so no normalized number is written
+        that the index could not reject as a duplicate.
+        """
+        try:
+            if not await has_index(db.cases, CASE_NUMBER_INDEX):
+                print("⚠️ Case number index missing, backfill skipped")
+            else:
+                filled = await self.backfill(db)
+                if filled or self.unindexed:
+                    print(f"🔢 Case numbers normalized: {filled}, {self.unindexed} left as duplicates")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Case number backfill failed: {e}")
+        while True:
+            try:
+                if await self._claim(db):
+                    await self.scan(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Duplicate scan failed: {e}")
+            await asyncio.sleep(settings.duplicate_scan_hours * 3600)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scans": self.scans,
+            "scan_ms": round(self.scan_ms, 3),
+            "scanned_at": self.scanned_at,
+            "cases": self.cases,
+            "blocks": self.blocks,
+            "candidate_pairs": self.candidates,
+            "compared_pairs": self.compared,
+            "found": self.found,
+            "backfilled": self.backfilled,
+            "unindexed": self.unindexed,
+        }
+
+
+# One finder per tenant database (app/core/tenancy.py)
+duplicate_finder: DuplicateFinder = TenantLocal(DuplicateFinder)
@@ -0,0 +1,345 @@
+# app/core/events.py
+"""
+Change feed for cases and their related collections.
+
+Every committed write to a watched collection becomes a ChangeEvent that is
+fanned out to SSE subscribers (firm-wide or per case) and to in-process
+listeners; writes to matters and the archives only reach the listeners.
+Events come from one of two sources:
+
+- "change_stream": a MongoDB change stream on the watched collections,
+  which also sees writes made by other workers. Needs a replica set.
+- "local": the routers report their own writes through record(). Only
+  writes made by this worker are seen.
+
+settings.change_feed_source picks one, "auto" uses change streams when the
+server supports them. Either way updates reach subscribers as the fields
+set and removed rather than the whole record: a change stream reports them
+in updateDescription, the routers pass the $set / $unset of their update to
+record() (update_changes()). The full document still travels with the event
+because the in-process listeners keep copies of records.
+
+An event's id is the change stream resume token, which every worker watching
+the same database assigns to the same change, so a client may reconnect to
+any worker; local events use "<epoch>-<seq>", valid only on the process that
+issued it. A reconnect with an id still in that worker's history buffer
+replays what was missed, otherwise the client gets a reset and should refetch.
+"""
+import asyncio
+import json
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .config import settings
+from .tenancy import TenantLocal
+
+CASE_COLLECTIONS = ("cases", "case_parties", "case_hearings", "case_documents", "case_notes", "case_tasks")
+# Also watched, but only passed to in-process listeners (the change-log backup,
+# app/core/backup.py); SSE subscribers and resume history stay case scoped
+LISTENER_COLLECTIONS = ("matters", "matter_timeline_buckets", "archived_cases", "archived_matters")
+WATCHED_COLLECTIONS = CASE_COLLECTIONS + LISTENER_COLLECTIONS
+
+# Remembers which case a child record belongs to, for deletes seen on a
+# change stream without a pre-image
+_CASE_ID_CACHE_SIZE = 100_000
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def update_changes(update: Dict[str, Any], document: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The {"set", "unset"} an update document makes, in the shape of a change
+    stream's updateDescription. Fields changed by other operators ($push,
+    $max, ...) are reported with their value in ``document``, the record as
+    written.
+    """
+    changes: Dict[str, Any] = {"set": dict(update.get("$set", {})), "unset": list(update.get("$unset", {}))}
+    for op, fields in update.items():
+        if op in ("$set", "$unset", "$setOnInsert") or document is None:
+            continue
+        for path in fields:
+            field = path.split(".")[0]
+            changes["set"][field] = document.get(field)
+    return changes
+
+
+class ChangeEvent:
+    __slots__ = ("seq", "token", "collection", "op", "id", "case_id", "ts", "document", "changes", "resume",
+                 "_payload")
+
+    def __init__(self, epoch: str, seq: int, collection: str, op: str, id: Any, case_id: Any,
+                 document: Optional[Dict[str, Any]], ts: Optional[datetime] = None, resume: Any = None,
+                 changes: Optional[Dict[str, Any]] = None):
+        self.seq = seq
+        # Change stream resume token of the event; None for local events
+        self.resume = resume
+        self.token = resume["_data"] if resume is not None else f"{epoch}-{seq}"
+        self.collection = collection
+        self.op = op
+        self.id = id
+        self.case_id = case_id
+        self.document = document
+        # {"set": {...}, "unset": [...]} for updates
+        self.changes = changes
+        self.ts = ts or datetime.utcnow()
+        self._payload: Optional[str] = None
+
+    @property
+    def payload(self) -> str:
+        """JSON body sent to subscribers, encoded once per event"""
+        if self._payload is None:
+            body = {
+                "collection": self.collection,
+                "op": self.op,
+                "id": str(self.id),
+                "case_id": str(self.case_id) if self.case_id is not None else None,
+                "ts": self.ts.isoformat(),
+            }
+            if self.changes is not None:
+                body["changes"] = self.changes
+            else:
+                body["data"] = self.document
+            self._payload = json.dumps(body, default=_json_default)
+        return self._payload
+
+
+class Subscriber:
+    """One SSE connection. The queue is bounded; on overflow the subscriber is reset."""
+
+    def __init__(self, case_id: Optional[str], maxsize: int):
+        self.case_id = case_id
+        self.queue: "asyncio.Queue[Optional[ChangeEvent]]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event: ChangeEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop what is queued and leave a reset marker (None)
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    def __init__(self, history: int, queue_size: int):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.source = "local"
+        self.queue_size = queue_size
+        self._seq = count(1)
+        self._history: Deque[ChangeEvent] = deque(maxlen=history)
+        self._firm: Set[Subscriber] = set()
+        self._by_case: Dict[str, Set[Subscriber]] = {}
+        self._listeners: List[Callable[[ChangeEvent], None]] = []
+        self._case_ids: "OrderedDict[Any, Any]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._opened = asyncio.Event()
+        # Why the change stream stopped for good (it could not be resumed)
+        self.stream_lost: Optional[str] = None
+
+    # ---------- publishing ----------
+    def publish(self, collection: str, op: str, id: Any, case_id: Any, document: Optional[Dict[str, Any]] = None,
+                ts: Optional[datetime] = None, resume: Any = None,
+                changes: Optional[Dict[str, Any]] = None) -> ChangeEvent:
+        event = ChangeEvent(self.epoch, next(self._seq), collection, op, id, case_id, document, ts, resume, changes)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️ Change listener {listener!r} failed: {e}")
+        if collection in LISTENER_COLLECTIONS:
+            return event
+        self._history.append(event)
+        for subscriber in self._firm:
+            subscriber.offer(event)
+        if case_id is not None:
+            for subscriber in self._by_case.get(str(case_id), ()):
+                subscriber.offer(event)
+        return event
+
+    def record(self, collection: str, op: str, id: Any, case_id: Any,
+               document: Optional[Dict[str, Any]] = None, changes: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Called by the routers after a write, with the record as written and,
+        for updates, what changed (update_changes()). Ignored while a change
+        stream is the source.
+        """
+        if self.source == "local":
+            self.publish(collection, op, id, case_id, document, changes=changes)
+
+    def add_listener(self, listener: Callable[[ChangeEvent], None]) -> None:
+        """In-process consumers; called synchronously for every event, must not block"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[ChangeEvent], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    # ---------- subscribing ----------
+    def subscribe(self, case_id: Optional[str] = None,
+                  last_event_id: Optional[str] = None) -> Tuple[Subscriber, List[ChangeEvent], bool]:
+        """
+        Register a subscriber. Returns it with the events to replay after
+        ``last_event_id`` and whether the client must reset because the token
+        is unknown or too old.
+        """
+        subscriber = Subscriber(case_id, self.queue_size)
+        if case_id is None:
+            self._firm.add(subscriber)
+        else:
+            self._by_case.setdefault(case_id, set()).add(subscriber)
+
+        replay: List[ChangeEvent] = []
+        reset = False
+        if last_event_id:
+            last = self._last_seq(last_event_id)
+            if last is None:
+                reset = True
+            else:
+                replay = [e for e in self._history if e.seq > last
+                          and (case_id is None or str(e.case_id) == case_id)]
+        return subscriber, replay, reset
+
+    def _last_seq(self, token: str) -> Optional[int]:
+        """Local sequence number of the event ``token`` names, None if it is not in the history"""
+        epoch, _, seq = token.partition("-")
+        if epoch == self.epoch and seq.isdigit():
+            last = int(seq)
+            oldest = self._history[0].seq if self._history else last + 1
+            return last if last + 1 >= oldest else None
+        # A resume token, possibly issued by another worker
+        for event in reversed(self._history):
+            if event.token == token:
+                return event.seq
+        return None
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber.case_id is None:
+            self._firm.discard(subscriber)
+            return
+        subscribers = self._by_case.get(subscriber.case_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._by_case[subscriber.case_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "epoch": self.epoch,
+            "firm_subscribers": len(self._firm),
+            "case_subscribers": sum(len(s) for s in self._by_case.values()),
+            "history": len(self._history),
+        }
+
+    # ---------- change stream source ----------
+    def _remember_case(self, id: Any, case_id: Any) -> None:
+        self._case_ids[id] = case_id
+        self._case_ids.move_to_end(id)
+        if len(self._case_ids) > _CASE_ID_CACHE_SIZE:
+            self._case_ids.popitem(last=False)
+
+    def _from_change(self, change: Dict[str, Any]) -> None:
+        collection = change["ns"]["coll"]
+        op = {"insert": "insert", "update": "update", "replace": "update", "delete": "delete"}.get(change["operationType"])
+        if op is None:
+            return
+        id = change["documentKey"]["_id"]
+        document = change.get("fullDocument")
+        before = change.get("fullDocumentBeforeChange")
+        if collection in ("cases", "archived_cases"):
+            case_id = id
+        else:
+            source = document or before or {}
+            case_id = source.get("case_id", self._case_ids.get(id))
+        if op == "delete":
+            self._case_ids.pop(id, None)
+        elif collection != "cases" and case_id is not None:
+            self._remember_case(id, case_id)
+        changes = None
+        description = change.get("updateDescription")
+        if description is not None:
+            changes = {"set": description.get("updatedFields", {}), "unset": description.get("removedFields", [])}
+            if description.get("truncatedArrays"):
+                changes["truncated"] = description["truncatedArrays"]
+        cluster_time = change.get("clusterTime")
+        ts = cluster_time.as_datetime().replace(tzinfo=None) if cluster_time is not None else None
+        self.publish(collection, op, id, case_id, document, ts, change["_id"], changes)
+
+    async def _watch(self, db: Any, resume_after: Any) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup",
+                                    full_document_before_change="whenAvailable",
+                                    resume_after=resume_after) as stream:
+                    self._opened.set()
+                    async for change in stream:
+                        resume_after = change["_id"]
+                        self._from_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Also raised when resume_after has fallen off the oplog: the writes since are gone
+                print(f"⚠️ Change stream stopped ({e}), falling back to local events")
+                self.stream_lost = str(e)
+                self.source = "local"
+                return
+            except PyMongoError as e:
+                print(f"⚠️ Change stream interrupted ({e}), resuming")
+                await asyncio.sleep(1)
+
+    async def start(self, db: Any, resume_after: Any = None) -> None:
+        """Start the source; a change stream continues after ``resume_after`` when given"""
+        self.stream_lost = None
+        self._opened.clear()
+        mode = settings.change_feed_source
+        if mode == "auto":
+            try:
+                hello = await db.command("hello")
+            except PyMongoError:
+                hello = {}
+            mode = "change_stream" if hello.get("setName") or hello.get("msg") == "isdbgrid" else "local"
+        self.source = mode
+        if mode == "change_stream":
+            self._task = asyncio.create_task(self._watch(db, resume_after))
+
+    async def wait_open(self) -> bool:
+        """True once the change stream is open, False if it stopped before"""
+        if self._task is None:
+            return False
+        opened = asyncio.create_task(self._opened.wait())
+        await asyncio.wait({opened, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        opened.cancel()
+        return self._opened.is_set()
+
+    async def wait_lost(self) -> str:
+        """Wait until the change stream stops for good; returns why"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self.stream_lost or "no change stream"
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+# One feed per tenant (app/core/tenancy.py)
+change_feed: ChangeFeed = TenantLocal(lambda: ChangeFeed(settings.change_feed_history, settings.change_feed_queue_size))
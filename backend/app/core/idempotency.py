@@ -0,0 +1,264 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key support for the create routes.
+
+A client that sends ``Idempotency-Key: <unique value>`` with a POST to one
+of IDEMPOTENT_ROUTES gets exactly one write per key: the first request runs
+and its response is stored; retries with the same key get the stored
+response back (with ``Idempotent-Replayed: true``) without reaching the
+handler.
+
+Responses live in the ``idempotency_keys`` collection, removed by a TTL
+index after settings.idempotency_ttl_hours, with an in-memory LRU in front
+so retries hitting the same worker skip the database. Concurrent duplicates
+collapse onto the request in flight: inside one worker they wait for its
+result; across workers the key is claimed with an insert (unique _id) and
+the losers poll until the owner finishes (409 after
+settings.idempotency_wait_seconds). A claim whose owner died is taken over
+after settings.idempotency_lock_seconds.
+
+Keys are scoped to the route path, and the request body is fingerprinted:
+reusing a key with a different body returns 422. Server errors (5xx) are
+not stored and release the key, so the client can retry.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .tenancy import TenantLocal
+from ..db.mongo import get_db
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# POST routes that create records
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/cases/?$"),
+    re.compile(r"^/cases/[^/]+/(parties|hearings|documents|notes|tasks)/?$"),
+    re.compile(r"^/cases/[^/]+/batch/?$"),
+    re.compile(r"^/matters/?$"),
+    re.compile(r"^/matters/[^/]+/timeline/?$"),
+]
+
+# Response headers kept with a stored response
+_STORED_HEADERS = {b"content-type", b"location"}
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+                 expires_at: datetime):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "StoredResponse":
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in doc.get("headers", [])]
+        return cls(doc["fingerprint"], doc["status"], headers, bytes(doc["body"]), doc["expires_at"])
+
+    async def send(self, send: Callable[..., Any]) -> None:
+        headers = self.headers + [(b"content-length", str(len(self.body)).encode()),
+                                  (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class IdempotencyStore:
+    """Front cache and in-flight requests of this worker"""
+
+    def __init__(self) -> None:
+        self._cache: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self.inflight: Dict[str, "asyncio.Future[Optional[StoredResponse]]"] = {}
+        self.hits = {"cache": 0, "db": 0, "collapsed": 0, "executed": 0}
+
+    def cached(self, key: str) -> Optional[StoredResponse]:
+        stored = self._cache.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return stored
+
+    def remember(self, key: str, stored: StoredResponse) -> None:
+        self._cache[key] = stored
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.idempotency_cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached": len(self._cache), "in_flight": len(self.inflight), **self.hits}
+
+
+# Keys are per tenant, like the idempotency_keys collection they mirror
+idempotency_store: IdempotencyStore = TenantLocal(IdempotencyStore)
+
+
+def _fingerprint(method: str, path: str, body: bytes) -> str:
+    return hashlib.sha256(method.encode() + b" " + path.encode() + b"\n" + body).hexdigest()
+
+
+async def _read_body(receive: Callable[..., Any]) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; requests without the header pass straight through"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    def _key(self, scope: Dict[str, Any]) -> Optional[str]:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        for name, value in scope.get("headers", ()):
+            if name == HEADER:
+                if any(route.match(scope["path"]) for route in IDEMPOTENT_ROUTES):
+                    return value.decode("latin-1")
+                return None
+        return None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        key = self._key(scope)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}, status_code=400)
+            return await response(scope, receive, send)
+
+        body = await _read_body(receive)
+        fingerprint = _fingerprint(scope["method"], scope["path"], body)
+        store_key = f"{scope['path'].rstrip('/')}|{key}"
+        store = idempotency_store
+
+        while True:
+            stored = store.cached(store_key)
+            if stored is not None:
+                store.hits["cache"] += 1
+                return await self._replay(stored, fingerprint, scope, receive, send)
+            inflight = store.inflight.get(store_key)
+            if inflight is None:
+                break
+            # Same key already running in this worker: wait for its outcome
+            store.hits["collapsed"] += 1
+            stored = await asyncio.shield(inflight)
+            if stored is not None:
+                return await self._replay(stored, fingerprint, scope, receive, send)
+            # It failed without storing anything; try again ourselves
+
+        future: "asyncio.Future[Optional[StoredResponse]]" = asyncio.get_running_loop().create_future()
+        store.inflight[store_key] = future
+        result: Optional[StoredResponse] = None
+        try:
+            result = await self._claim_and_run(store_key, fingerprint, body, scope, receive, send)
+        finally:
+            future.set_result(result)
+            del store.inflight[store_key]
+
+    async def _replay(self, stored: StoredResponse, fingerprint: str, scope: Dict[str, Any],
+                      receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if stored.fingerprint != fingerprint:
+            response = JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+            return await response(scope, receive, send)
+        await stored.send(send)
+
+    async def _claim_and_run(self, store_key: str, fingerprint: str, body: bytes, scope: Dict[str, Any],
+                             receive: Callable[..., Any], send: Callable[..., Any]) -> Optional[StoredResponse]:
+        db = get_db()
+        store = idempotency_store
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=settings.idempotency_ttl_hours)
+        deadline = time.monotonic() + settings.idempotency_wait_seconds
+        while True:
+            try:
+                await db.idempotency_keys.insert_one({
+                    "_id": store_key, "fingerprint": fingerprint, "state": "pending",
+                    "created_at": now, "lock_until": now + timedelta(seconds=settings.idempotency_lock_seconds),
+                    "expires_at": expires_at,
+                })
+                break
+            except DuplicateKeyError:
+                doc = await db.idempotency_keys.find_one({"_id": store_key})
+            if doc is None:
+                continue
+            if doc["state"] == "completed" and doc["expires_at"] > datetime.utcnow():
+                stored = StoredResponse.from_doc(doc)
+                store.hits["db"] += 1
+                store.remember(store_key, stored)
+                await self._replay(stored, fingerprint, scope, receive, send)
+                return stored
+            if doc["state"] != "completed" and doc["lock_until"] > datetime.utcnow():
+                # Another worker owns the key
+                if time.monotonic() >= deadline:
+                    response = JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"},
+                                            status_code=409, headers={"Retry-After": "1"})
+                    await response(scope, receive, send)
+                    return None
+                await asyncio.sleep(0.05)
+                continue
+            # Expired or abandoned claim: take it over
+            await db.idempotency_keys.delete_one({"_id": store_key, "state": doc["state"], "created_at": doc["created_at"]})
+
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        replayed = False
+
+        async def replay_receive() -> Dict[str, Any]:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message: Dict[str, Any]) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() in _STORED_HEADERS]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        store.hits["executed"] += 1
+        try:
+            await self.app(scope, replay_receive, capture)
+        except BaseException:
+            await db.idempotency_keys.delete_one({"_id": store_key, "state": "pending"})
+            raise
+        if status >= 500:
+            await db.idempotency_keys.delete_one({"_id": store_key, "state": "pending"})
+            return None
+
+        stored = StoredResponse(fingerprint, status, headers, b"".join(chunks), expires_at)
+        await db.idempotency_keys.update_one({"_id": store_key}, {"$set": {
+            "state": "completed",
+            "status": status,
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers],
+            "body": Binary(stored.body),
+            "completed_at": datetime.utcnow(),
+        }})
+        store.remember(store_key, stored)
+        return stored
@@ -0,0 +1,59 @@
+# app/core/lazy.py
+"""
+Modules imported on first use.
+
+Every module reachable from app.main is imported before a worker can serve,
+so optional or rarely used subsystems (the in-memory engine, optional
+codecs, numeric libraries, the Google Drive client stack) are referenced
+through a LazyModule instead: the module is imported the first time one of
+its attributes is read. ``available`` checks whether an optional dependency
+is installed without importing it.
+
+Import times of lazily loaded modules are listed by GET /admin/startup.
+"""
+import importlib
+import importlib.util
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+_load_ms: Dict[str, float] = {}
+
+
+class LazyModule:
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            _load_ms[self._name] = round((time.perf_counter() - started) * 1000, 3)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    @property
+    def available(self) -> bool:
+        if self._module is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except ImportError:
+            return False
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self.load(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazyModule {self._name} ({'loaded' if self._module is not None else 'not loaded'})>"
+
+
+def lazy_loads() -> Dict[str, float]:
+    """Lazily imported modules so far, with their import time in ms"""
+    return dict(_load_ms)
@@ -0,0 +1,359 @@
+# app/core/profiling.py
+"""
+Per-request profiling with a ring buffer of slow request traces.
+
+A request is profiled when it carries the settings.profiling_header header
+(and, with settings.admin_token set, a matching X-Admin-Token) or is picked
+by settings.profiling_sample_rate. Profiled requests record
+time spent per phase:
+
+- db: awaiting Mongo (every collection call made through get_database)
+- conversion: _convert_objectid in the routers
+- validation: response_model validation (routes built with ProfiledRoute)
+- serialization: JSON encoding of the response body
+- other: everything else (routing, dependencies, handler code)
+
+plus the Mongo commands issued. Traces slower than settings.profiling_slow_ms
+(or explicitly requested through the header) land in a ring buffer served by
+GET /admin/profiles. Requests that are not profiled only pay for one
+ContextVar lookup at each hook.
+"""
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import json_util
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from .config import settings
+
+MAX_COMMANDS = 100
+MAX_FILTER_CHARS = 500
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_traces: Deque[Dict[str, Any]] = deque(maxlen=settings.profiling_buffer_size)
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, query: str, trigger: str):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.commands: List[Dict[str, Any]] = []
+        self.dropped_commands = 0
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def command(self, collection: str, op: str, filter: Any) -> Optional[Dict[str, Any]]:
+        """Start a command entry; returns None once MAX_COMMANDS is reached"""
+        if len(self.commands) >= MAX_COMMANDS:
+            self.dropped_commands += 1
+            return None
+        try:
+            rendered = json_util.dumps(filter) if filter is not None else None
+        except Exception:
+            rendered = repr(filter)
+        if rendered and len(rendered) > MAX_FILTER_CHARS:
+            rendered = rendered[:MAX_FILTER_CHARS] + "..."
+        entry = {"collection": collection, "op": op, "filter": rendered, "ms": 0.0, "docs": None}
+        self.commands.append(entry)
+        return entry
+
+    def to_dict(self, status: int, total: float) -> Dict[str, Any]:
+        phases = {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        phases["other"] = round(max(0.0, total - sum(self.phases.values())) * 1000, 3)
+        return {
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": round(total * 1000, 3),
+            "phases": phases,
+            "commands": self.commands,
+            "dropped_commands": self.dropped_commands,
+        }
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items())
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def recent_traces(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Newest first"""
+    traces = list(reversed(_traces))
+    return traces[:limit] if limit else traces
+
+
+def clear_traces() -> None:
+    _traces.clear()
+
+
+def profile_phase(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator that charges a function's run time to ``name`` on profiled requests"""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# -------------------------
+# Database instrumentation
+# -------------------------
+_TIMED_METHODS = {
+    "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "estimated_document_count", "distinct",
+    "find_one_and_update", "find_one_and_delete", "find_one_and_replace", "bulk_write",
+}
+_CURSOR_METHODS = {"find", "aggregate"}
+
+
+class ProfiledCursor:
+    def __init__(self, cursor: Any, profile: RequestProfile, entry: Optional[Dict[str, Any]]):
+        self._cursor = cursor
+        self._profile = profile
+        self._entry = entry
+        self._iter: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._cursor, name)
+        if name in ("sort", "skip", "limit", "batch_size", "hint", "max_time_ms", "allow_disk_use"):
+            @wraps(attr)
+            def chain(*args: Any, **kwargs: Any) -> "ProfiledCursor":
+                attr(*args, **kwargs)
+                return self
+            return chain
+        return attr
+
+    def _charge(self, seconds: float, docs: int) -> None:
+        self._profile.add("db", seconds)
+        if self._entry is not None:
+            self._entry["ms"] = round(self._entry["ms"] + seconds * 1000, 3)
+            self._entry["docs"] = (self._entry["docs"] or 0) + docs
+
+    def __aiter__(self) -> "ProfiledCursor":
+        self._iter = self._cursor.__aiter__()
+        return self
+
+    async def __anext__(self) -> Any:
+        start = time.perf_counter()
+        try:
+            doc = await self._iter.__anext__()
+        except StopAsyncIteration:
+            self._charge(time.perf_counter() - start, 0)
+            raise
+        self._charge(time.perf_counter() - start, 1)
+        return doc
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        start = time.perf_counter()
+        docs = await self._cursor.to_list(length)
+        self._charge(time.perf_counter() - start, len(docs))
+        return docs
+
+
+class ProfiledCollection:
+    def __init__(self, collection: Any, profile: RequestProfile):
+        self._collection = collection
+        self._profile = profile
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._collection, name)
+        profile = self._profile
+        collection = self._collection.name
+
+        if name == "with_options":
+            @wraps(attr)
+            def with_options(*args: Any, **kwargs: Any) -> ProfiledCollection:
+                return ProfiledCollection(attr(*args, **kwargs), profile)
+            return with_options
+
+        if name in _CURSOR_METHODS:
+            @wraps(attr)
+            def cursor(*args: Any, **kwargs: Any) -> ProfiledCursor:
+                query = args[0] if args else kwargs.get("filter", kwargs.get("pipeline"))
+                return ProfiledCursor(attr(*args, **kwargs), profile, profile.command(collection, name, query))
+            return cursor
+
+        if name in _TIMED_METHODS:
+            @wraps(attr)
+            async def timed(*args: Any, **kwargs: Any) -> Any:
+                entry = profile.command(collection, name, args[0] if args else kwargs.get("filter"))
+                start = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    profile.add("db", seconds)
+                    if entry is not None:
+                        entry["ms"] = round(seconds * 1000, 3)
+            return timed
+
+        return attr
+
+
+class ProfiledDatabase:
+    def __init__(self, db: Any, profile: RequestProfile):
+        self._db = db
+        self._profile = profile
+
+    def get_collection(self, name: str, *args: Any, **kwargs: Any) -> ProfiledCollection:
+        return ProfiledCollection(self._db.get_collection(name, *args, **kwargs), self._profile)
+
+    def __getitem__(self, name: str) -> ProfiledCollection:
+        return ProfiledCollection(self._db[name], self._profile)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        # The client also answers any attribute, as a database
+        if name.startswith("_") or name == "client" or not hasattr(attr, "find_one"):
+            return attr
+        return ProfiledCollection(attr, self._profile)
+
+
+def profiled_database(db: Any) -> Any:
+    """Wrap ``db`` for the current request if it is being profiled"""
+    profile = _current.get()
+    return db if profile is None else ProfiledDatabase(db, profile)
+
+
+# -------------------------
+# FastAPI hooks
+# -------------------------
+class ProfiledJSONResponse(JSONResponse):
+    """JSONResponse that charges body encoding to the serialization phase"""
+
+    def render(self, content: Any) -> bytes:
+        profile = _current.get()
+        if profile is None:
+            return super().render(content)
+        with profile.phase("serialization"):
+            return super().render(content)
+
+
+class _ProfiledField:
+    """Response field whose validate/serialize are charged to the validation phase"""
+
+    def __init__(self, field: Any):
+        self._field = field
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._field, name)
+
+    def validate(self, *args: Any, **kwargs: Any) -> Any:
+        profile = _current.get()
+        if profile is None:
+            return self._field.validate(*args, **kwargs)
+        with profile.phase("validation"):
+            return self._field.validate(*args, **kwargs)
+
+    def serialize(self, *args: Any, **kwargs: Any) -> Any:
+        profile = _current.get()
+        if profile is None:
+            return self._field.serialize(*args, **kwargs)
+        with profile.phase("validation"):
+            return self._field.serialize(*args, **kwargs)
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that times its response_model validation; pass as the routers' route_class"""
+
+    def get_route_handler(self) -> Callable[..., Any]:
+        field = self.secure_cloned_response_field
+        if field is not None and not isinstance(field, _ProfiledField):
+            self.secure_cloned_response_field = _ProfiledField(field)
+        return super().get_route_handler()
+
+
+def requested_by_header(headers: Iterable[Tuple[bytes, bytes]]) -> bool:
+    """
+    Whether a request asks to be profiled through settings.profiling_header.
+    With settings.admin_token set it must also carry a matching
+    X-Admin-Token, as for the /admin endpoints.
+    """
+    if not settings.profiling_header:
+        return False
+    header = settings.profiling_header.lower().encode()
+    token = settings.admin_token.encode() if settings.admin_token else None
+    asked = authorized = False
+    for name, value in headers:
+        if name == header:
+            asked = value not in (b"", b"0", b"false")
+        elif name == b"x-admin-token":
+            authorized = value == token
+    return asked and (token is None or authorized)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware, so unprofiled requests skip all wrapping"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    def _trigger(self, scope: Dict[str, Any]) -> Optional[str]:
+        if requested_by_header(scope.get("headers", ())):
+            return "header"
+        if settings.profiling_sample_rate and random.random() < settings.profiling_sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), trigger)
+        token = _current.set(profile)
+        status = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trigger == "header":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", profile.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - profile.started
+            if trigger == "header" or total * 1000 >= settings.profiling_slow_ms:
+                _traces.append(profile.to_dict(status, total))
@@ -0,0 +1,207 @@
+# app/core/reference.py
+"""
+Reference data: courts, case categories and subcategories.
+
+Cases point at these through court_name_id, category_id and
+subcategory_id. The three collections are small and read on every case
+write, so each worker preloads them into an immutable snapshot
+(read-only maps of named tuples). Lookups and validation never touch the
+database; a refresh builds a complete new snapshot and swaps it in with a
+single assignment, so readers see either the old data or the new, never a
+mix.
+
+Writes through /reference bump a version counter in ``reference_state``
+and reload this worker right away. Other workers poll the counter every
+settings.reference_refresh_seconds and reload when it moves.
+
+Validation of a kind is skipped while no entries of that kind exist, so a
+deployment that has not loaded any reference data keeps accepting free-form
+ids. settings.reference_validation turns it off entirely.
+"""
+import asyncio
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .config import settings
+from .tenancy import TenantLocal
+
+REFERENCE_COLLECTIONS = ("courts", "case_categories", "case_subcategories")
+
+_STATE_ID = "version"
+
+
+class InvalidReference(ValueError):
+    pass
+
+
+class Court(NamedTuple):
+    id: str
+    name: str
+    court_type: Optional[str]
+
+
+class Category(NamedTuple):
+    id: str
+    name: str
+
+
+class Subcategory(NamedTuple):
+    id: str
+    name: str
+    category_id: str
+
+
+class ReferenceSnapshot:
+    """One consistent, read-only copy of the reference collections"""
+
+    __slots__ = ("version", "loaded_at", "courts", "categories", "subcategories",
+                 "courts_by_type", "subcategories_by_category")
+
+    def __init__(self, version: int, courts: List[Court], categories: List[Category],
+                 subcategories: List[Subcategory]):
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        self.courts: Mapping[str, Court] = MappingProxyType({c.id: c for c in courts})
+        self.categories: Mapping[str, Category] = MappingProxyType({c.id: c for c in categories})
+        self.subcategories: Mapping[str, Subcategory] = MappingProxyType({s.id: s for s in subcategories})
+        by_type: Dict[Optional[str], set] = {}
+        for court in courts:
+            by_type.setdefault(court.court_type, set()).add(court.id)
+        self.courts_by_type: Mapping[Optional[str], FrozenSet[str]] = MappingProxyType(
+            {k: frozenset(v) for k, v in by_type.items()})
+        by_category: Dict[str, set] = {}
+        for sub in subcategories:
+            by_category.setdefault(sub.category_id, set()).add(sub.id)
+        self.subcategories_by_category: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {k: frozenset(v) for k, v in by_category.items()})
+
+
+class ReferenceData:
+    def __init__(self) -> None:
+        self._snapshot = ReferenceSnapshot(0, [], [], [])
+        self.load_ms = 0.0
+
+    @property
+    def snapshot(self) -> ReferenceSnapshot:
+        return self._snapshot
+
+    # -------------------------
+    # Loading
+    # -------------------------
+    async def load(self, db: AsyncIOMotorDatabase) -> ReferenceSnapshot:
+        """Read all reference collections and swap in the new snapshot"""
+        started = time.perf_counter()
+        # Version first: writers change the data before bumping it, so the
+        # data read below is at least as new as the version
+        version = await self.stored_version(db)
+        courts = [Court(str(d["_id"]), d.get("name", ""), d.get("court_type"))
+                  async for d in db.courts.find({})]
+        categories = [Category(str(d["_id"]), d.get("name", ""))
+                      async for d in db.case_categories.find({})]
+        subcategories = [Subcategory(str(d["_id"]), d.get("name", ""), str(d.get("category_id")))
+                         async for d in db.case_subcategories.find({})]
+        snapshot = ReferenceSnapshot(version, courts, categories, subcategories)
+        self._snapshot = snapshot
+        self.load_ms = (time.perf_counter() - started) * 1000
+        return snapshot
+
+    async def stored_version(self, db: AsyncIOMotorDatabase) -> int:
+        state = await db.reference_state.find_one({"_id": _STATE_ID})
+        return int(state["n"]) if state else 0
+
+    async def changed(self, db: AsyncIOMotorDatabase) -> None:
+        """Called after a write to a reference collection"""
+        await db.reference_state.update_one({"_id": _STATE_ID}, {"$inc": {"n": 1}}, upsert=True)
+        await self.load(db)
+
+    async def run_refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """Background loop reloading when another worker changed the data"""
+        while True:
+            await asyncio.sleep(settings.reference_refresh_seconds)
+            try:
+                if await self.stored_version(db) != self._snapshot.version:
+                    await self.load(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Reference data refresh failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "version": snap.version,
+            "loaded_at": snap.loaded_at,
+            "load_ms": round(self.load_ms, 3),
+            "courts": len(snap.courts),
+            "categories": len(snap.categories),
+            "subcategories": len(snap.subcategories),
+        }
+
+    # -------------------------
+    # Case validation
+    # -------------------------
+    def check_case(self, values: Dict[str, Any], partial: bool = False) -> Dict[str, Any]:
+        """
+        Validate the reference ids in a case create (or, with ``partial``,
+        update) payload. Raises InvalidReference. For partial updates,
+        returns conditions the stored case must meet for the result to be
+        consistent (e.g. a new subcategory needs the stored category), to
+        be added to the update filter.
+        """
+        conditions: Dict[str, Any] = {}
+        if not settings.reference_validation:
+            return conditions
+        snap = self._snapshot
+
+        if snap.courts:
+            court_type = values.get("court_type")
+            court_id = values.get("court_name_id")
+            if court_id is not None:
+                court = snap.courts.get(court_id)
+                if court is None:
+                    raise InvalidReference(f"Unknown court_name_id: {court_id}")
+                if court_type is not None and court.court_type and court.court_type != court_type:
+                    raise InvalidReference(f"Court {court_id} is not a {court_type} court")
+                if court_type is None and partial and court.court_type:
+                    conditions["court_type"] = court.court_type
+            elif court_type is not None and partial:
+                conditions["court_name_id"] = {"$in": sorted(
+                    snap.courts_by_type.get(court_type, frozenset()) | snap.courts_by_type.get(None, frozenset()))}
+
+        if snap.categories:
+            category_id = values.get("category_id")
+            if category_id is not None and category_id not in snap.categories:
+                raise InvalidReference(f"Unknown category_id: {category_id}")
+            subcategory_id = values.get("subcategory_id")
+            if subcategory_id is not None:
+                sub = snap.subcategories.get(subcategory_id)
+                if sub is None:
+                    raise InvalidReference(f"Unknown subcategory_id: {subcategory_id}")
+                if category_id is not None and sub.category_id != category_id:
+                    raise InvalidReference(f"Subcategory {subcategory_id} does not belong to category {category_id}")
+                if category_id is None and partial:
+                    conditions["category_id"] = sub.category_id
+            elif category_id is not None and partial and "subcategory_id" not in values:
+                allowed = sorted(snap.subcategories_by_category.get(category_id, frozenset()))
+                conditions["subcategory_id"] = {"$in": [None] + allowed}
+        return conditions
+
+    def names(self, case: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """Display names for a case's reference ids"""
+        snap = self._snapshot
+        court = snap.courts.get(case.get("court_name_id"))
+        category = snap.categories.get(case.get("category_id"))
+        subcategory = snap.subcategories.get(case.get("subcategory_id"))
+        return {
+            "court_name": court.name if court else None,
+            "category_name": category.name if category else None,
+            "subcategory_name": subcategory.name if subcategory else None,
+        }
+
+
+# Each tenant has its own reference collections (app/core/tenancy.py)
+reference_data: ReferenceData = TenantLocal(ReferenceData)
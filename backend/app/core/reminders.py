@@ -0,0 +1,227 @@
+# app/core/reminders.py
+"""
+Reminder scheduler for upcoming hearings and task due dates.
+
+Hearings with a ``next_hearing_date`` and open tasks with a ``due_date``
+inside settings.reminder_horizon_days are kept in a min-heap ordered by
+when their reminder is due (settings.reminder_lead_hours before the date).
+The scheduler sleeps until the head of the heap is due, or until the
+change feed reports a write that moves an item to the front; it never
+polls the collections. A full reload every settings.reminder_resync_seconds
+picks up items entering the horizon and anything the feed missed.
+
+Every worker runs its own scheduler. A reminder is claimed with a lease on
+the record before it is written to the ``reminders`` outbox, and the
+outbox has a unique key per record and date, so each reminder is written
+exactly once even when workers race or one dies mid-way. The record's
+``reminder_sent_for`` remembers the date that was reminded; moving the
+date schedules a new reminder.
+"""
+import asyncio
+import heapq
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .config import settings
+from .events import change_feed, ChangeEvent
+from .tenancy import TenantLocal
+
+# collection -> (reminder kind, date field)
+REMINDER_SOURCES = {
+    "case_hearings": ("hearing", "next_hearing_date"),
+    "case_tasks": ("task", "due_date"),
+}
+
+# fire_at, tie breaker, collection, record id, due date
+Entry = Tuple[datetime, int, str, Any, datetime]
+
+
+class ReminderScheduler:
+    def __init__(self) -> None:
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._heap: List[Entry] = []
+        self._entries: Dict[Tuple[str, Any], Entry] = {}
+        self._seq = count()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.skipped = 0
+        self.errors = 0
+
+    # ---------- scheduling ----------
+    def _due(self, collection: str, doc: Dict[str, Any]) -> Optional[datetime]:
+        """Date to remind about, or None if the record needs no reminder"""
+        _, field = REMINDER_SOURCES[collection]
+        due = doc.get(field)
+        if not isinstance(due, datetime) or doc.get("reminder_sent_for") == due:
+            return None
+        if collection == "case_tasks" and doc.get("status") == "completed":
+            return None
+        now = datetime.utcnow()
+        if due <= now or due > now + timedelta(days=settings.reminder_horizon_days):
+            return None
+        return due
+
+    def _schedule(self, collection: str, doc: Dict[str, Any]) -> None:
+        key = (collection, doc["_id"])
+        due = self._due(collection, doc)
+        if due is None:
+            # Stale heap entries are skipped when they reach the top
+            self._entries.pop(key, None)
+            return
+        current = self._entries.get(key)
+        if current is not None and current[4] == due:
+            return
+        entry: Entry = (due - timedelta(hours=settings.reminder_lead_hours), next(self._seq), collection, doc["_id"], due)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry and self._wake is not None:
+            self._wake.set()
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if event.collection not in REMINDER_SOURCES:
+            return
+        if event.op == "delete":
+            self._entries.pop((event.collection, event.id), None)
+        elif event.document is not None:
+            self._schedule(event.collection, event.document)
+
+    async def resync(self, db: AsyncIOMotorDatabase) -> None:
+        """Rebuild the heap from the collections"""
+        now = datetime.utcnow()
+        horizon = now + timedelta(days=settings.reminder_horizon_days)
+        self._heap = []
+        self._entries = {}
+        for collection, (_, field) in REMINDER_SOURCES.items():
+            query: Dict[str, Any] = {field: {"$gt": now, "$lte": horizon}}
+            if collection == "case_tasks":
+                query["status"] = {"$ne": "completed"}
+            projection = {field: 1, "status": 1, "reminder_sent_for": 1}
+            async for doc in db[collection].find(query, projection):
+                self._schedule(collection, doc)
+
+    def _pop_stale(self) -> None:
+        while self._heap:
+            head = self._heap[0]
+            if self._entries.get((head[2], head[3])) is head:
+                return
+            heapq.heappop(self._heap)
+
+    # ---------- firing ----------
+    async def _fire(self, db: AsyncIOMotorDatabase, entry: Entry) -> None:
+        fire_at, _, collection, id, due = entry
+        kind, field = REMINDER_SOURCES[collection]
+        now = datetime.utcnow()
+        # Lease: only one worker gets past this for a given record and date
+        claimed = await db[collection].find_one_and_update(
+            {
+                "_id": id,
+                field: due,
+                "reminder_sent_for": {"$ne": due},
+                "reminder_lease_until": {"$not": {"$gt": now}},
+            },
+            {"$set": {
+                "reminder_lease_until": now + timedelta(seconds=settings.reminder_lease_seconds),
+                "reminder_lease_owner": self.worker_id,
+            }},
+        )
+        if claimed is None:
+            self.skipped += 1
+            return
+        try:
+            await db.reminders.insert_one({
+                "kind": kind,
+                "collection": collection,
+                "doc_id": id,
+                "case_id": claimed.get("case_id"),
+                "due": due,
+                "fire_at": fire_at,
+                "assigned_to": claimed.get("assigned_lawyer_id") or claimed.get("assigned_to"),
+                "created_at": now,
+                "delivered": False,
+            })
+            self.fired += 1
+        except DuplicateKeyError:
+            # An earlier owner wrote the outbox entry but died before marking the record
+            self.skipped += 1
+        await db[collection].update_one(
+            {"_id": id, "reminder_lease_owner": self.worker_id},
+            {"$set": {"reminder_sent_for": due}, "$unset": {"reminder_lease_until": "", "reminder_lease_owner": ""}},
+        )
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        next_resync = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_resync:
+                    await self.resync(db)
+                    next_resync = time.monotonic() + settings.reminder_resync_seconds
+                self._pop_stale()
+                now = datetime.utcnow()
+                if self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    self._entries.pop((entry[2], entry[3]), None)
+                    try:
+                        await self._fire(db, entry)
+                    except PyMongoError:
+                        raise
+                    except Exception as e:
+                        # Skip just this record; the next resync schedules it again
+                        self.errors += 1
+                        print(f"⚠️ Reminder for {entry[2]} {entry[3]} failed ({e!r}), skipped")
+                    continue
+                timeout = next_resync - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), max(timeout, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Anything else (a malformed record, a listener bug) must not end the loop either
+                if not isinstance(e, PyMongoError):
+                    self.errors += 1
+                print(f"⚠️ Reminder scheduler error ({e!r}), resyncing")
+                next_resync = time.monotonic() + 5
+                self._heap, self._entries = [], {}
+                await asyncio.sleep(5)
+
+    # ---------- lifecycle ----------
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        self._wake = asyncio.Event()
+        change_feed.add_listener(self._on_change)
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        change_feed.remove_listener(self._on_change)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        self._pop_stale()
+        return {
+            "worker_id": self.worker_id,
+            "scheduled": len(self._entries),
+            "next_at": self._heap[0][0].isoformat() if self._heap else None,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+
+# One scheduler per tenant database (app/core/tenancy.py)
+reminder_scheduler: ReminderScheduler = TenantLocal(ReminderScheduler)
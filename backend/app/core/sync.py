@@ -0,0 +1,148 @@
+# app/core/sync.py
+"""
+Delta sync support: tombstones for deleted records and sync tokens.
+
+Every case and child record carries ``updated_at``, stamped on insert and
+on every update. Deletes leave a tombstone in the ``tombstones``
+collection, so /sync can tell offline clients what to drop. Deleting a
+case leaves a single tombstone for the case; clients remove its related
+records with it.
+
+A sync token pins the window being paged through (changes after ``since``
+up to ``until``) and the keyset position inside it, so a sync that takes
+several requests neither skips nor repeats records that change meanwhile.
+Changes made after ``until`` are picked up by the next sync.
+
+Tombstones older than settings.sync_tombstone_retention_days are removed
+by compact_tombstones(); tokens from before the compaction horizon are
+rejected and the client has to resync from scratch.
+"""
+import asyncio
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .config import settings
+from .events import CASE_COLLECTIONS
+
+# Paged in this order, tombstones last
+SYNC_COLLECTIONS = CASE_COLLECTIONS + ("tombstones",)
+
+_EPOCH = datetime(1970, 1, 1)
+_STATE_ID = "tombstones"
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def to_millis(value: datetime) -> int:
+    # Mongo keeps datetimes at millisecond precision
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+
+def from_millis(value: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=value)
+
+
+class SyncToken:
+    """Position of a sync: the window (since, until] and where paging stopped inside it"""
+
+    __slots__ = ("since", "until", "collection", "last")
+
+    def __init__(self, since: Optional[int], until: int, collection: int = 0,
+                 last: Optional[List[Any]] = None):
+        self.since = since
+        self.until = until
+        self.collection = collection
+        self.last = last
+
+    def encode(self) -> str:
+        raw = json.dumps({"s": self.since, "u": self.until, "c": self.collection, "k": self.last},
+                         separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "SyncToken":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            since, until, collection, last = data["s"], data["u"], data["c"], data["k"]
+            if since is not None and not isinstance(since, int):
+                raise ValueError("since")
+            if not isinstance(until, int) or not isinstance(collection, int):
+                raise ValueError("until")
+            if not 0 <= collection < len(SYNC_COLLECTIONS):
+                raise ValueError("collection")
+            if last is not None:
+                last = [int(last[0]), ObjectId(last[1])]
+        except (binascii.Error, ValueError, KeyError, TypeError, IndexError) as e:
+            raise InvalidSyncToken(str(e)) from e
+        return cls(since, until, collection, last)
+
+
+def start_token(since: Optional[int] = None) -> SyncToken:
+    """Token for a new sync window ending now"""
+    return SyncToken(since, to_millis(datetime.utcnow()))
+
+
+def next_token(token: SyncToken) -> SyncToken:
+    """
+    Token for the sync after ``token`` finished. The next window overlaps the
+    last one by settings.sync_overlap_seconds so writes that committed late
+    with an earlier timestamp are not missed; clients apply records by id.
+    """
+    overlap = int(settings.sync_overlap_seconds * 1000)
+    return SyncToken(max(token.until - overlap, token.since or 0), token.until)
+
+
+# -------------------------
+# Tombstones
+# -------------------------
+def tombstone(collection: str, id: Any, case_id: Any, deleted_at: datetime) -> Dict[str, Any]:
+    return {"collection": collection, "doc_id": id, "case_id": case_id, "deleted_at": deleted_at}
+
+
+async def record_tombstones(db: AsyncIOMotorDatabase, collection: str, ids: Iterable[Any],
+                            case_id: Any) -> None:
+    """Remember deleted records for delta sync"""
+    now = datetime.utcnow()
+    docs = [tombstone(collection, id, case_id, now) for id in ids]
+    if docs:
+        await db.tombstones.insert_many(docs)
+
+
+async def compaction_horizon(db: AsyncIOMotorDatabase) -> Optional[datetime]:
+    """Tombstones deleted before this may be gone; older tokens cannot be served"""
+    state = await db.sync_state.find_one({"_id": _STATE_ID})
+    return state.get("compacted_before") if state else None
+
+
+async def compact_tombstones(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """Remove tombstones past the retention period and move the horizon forward"""
+    horizon = datetime.utcnow() - timedelta(days=settings.sync_tombstone_retention_days)
+    # Move the horizon first so no token is accepted for a window being emptied
+    await db.sync_state.update_one(
+        {"_id": _STATE_ID}, {"$max": {"compacted_before": horizon}}, upsert=True
+    )
+    result = await db.tombstones.delete_many({"deleted_at": {"$lt": horizon}})
+    return {"removed": result.deleted_count, "compacted_before": horizon}
+
+
+async def run_compaction(db: AsyncIOMotorDatabase) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        try:
+            stats = await compact_tombstones(db)
+            if stats["removed"]:
+                print(f"🧹 Compacted {stats['removed']} tombstones")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Tombstone compaction failed: {e}")
+        await asyncio.sleep(settings.sync_compaction_interval_seconds)
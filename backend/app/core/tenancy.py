@@ -0,0 +1,305 @@
+# app/core/tenancy.py
+"""
+Per-firm (tenant) data partitioning.
+
+Each tenant in settings.tenants has its own database, optionally on its own
+cluster:
+
+    TENANTS='{"acme": {"db": "law_acme"}, "globex": {"uri": "mongodb://db2:27017", "db": "law_globex"}}'
+
+TenantMiddleware resolves the tenant of every request from the
+settings.tenant_header header or the settings.tenant_claim claim of an HS256
+bearer token (verified with settings.tenant_jwt_secret) and stores it in the
+``current_tenant`` context variable. get_db() (app/db/mongo.py) routes on it,
+so handlers, dependencies and middlewares reach the tenant's database
+without passing it around. Requests without a tenant use settings.mongo_db,
+unless settings.tenant_required is set.
+
+Process-wide services that hold per-database state (change feed, reference
+data, reminders, idempotency cache) are TenantLocal: one instance per
+tenant, picked by the context variable on attribute access, so the existing
+``change_feed.record(...)`` style call sites stay as they are. Background
+tasks started while a tenant is current keep it, as asyncio tasks copy the
+context they are created in.
+
+A tenant is activated in a worker on its first request (or at startup):
+its indexes are created and its services started. TenantRegistry keeps at
+most settings.tenant_max_active tenants active; beyond that the least
+recently used tenant without requests in flight is stopped. Per-tenant
+request metrics are served by GET /admin/tenants.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Generic, List, NamedTuple, Optional, TypeVar
+
+from starlette.responses import JSONResponse
+
+from .config import settings
+
+T = TypeVar("T")
+
+# Paths served without a tenant even when settings.tenant_required is set
+_TENANTLESS_PATHS = ("/docs", "/redoc", "/openapi.json", "/admin")
+
+
+class Tenant(NamedTuple):
+    id: str
+    mongo_db: str
+    # None: the cluster at settings.mongo_uri
+    mongo_uri: Optional[str] = None
+
+
+class TenantError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+current_tenant: ContextVar[Optional[Tenant]] = ContextVar("current_tenant", default=None)
+
+
+def current_tenant_id() -> Optional[str]:
+    tenant = current_tenant.get()
+    return tenant.id if tenant else None
+
+
+class TenantLocal(Generic[T]):
+    """One ``factory()`` instance per tenant; attribute access goes to the current tenant's"""
+
+    __slots__ = ("_factory", "_instances")
+    _all: List["TenantLocal[Any]"] = []
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instances: Dict[Optional[str], T] = {}
+        TenantLocal._all.append(self)
+
+    def get(self) -> T:
+        key = current_tenant_id()
+        instance = self._instances.get(key)
+        if instance is None:
+            instance = self._instances[key] = self._factory()
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    @classmethod
+    def discard(cls, tenant_id: str) -> None:
+        """Drop a stopped tenant's instances"""
+        for local in cls._all:
+            local._instances.pop(tenant_id, None)
+
+
+# -------------------------
+# Resolution
+# -------------------------
+def configured_tenants() -> Dict[str, Tenant]:
+    return {id: Tenant(id, spec["db"], spec.get("uri")) for id, spec in settings.tenants.items()}
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def jwt_claims(token: str, secret: str) -> Dict[str, Any]:
+    """Claims of an HS256 JWT; raises TenantError(401) unless valid and unexpired"""
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            raise ValueError("unsupported alg")
+        expected = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            raise ValueError("bad signature")
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, binascii.Error, AttributeError):
+        raise TenantError(401, "Invalid bearer token")
+    if "exp" in claims and claims["exp"] < time.time():
+        raise TenantError(401, "Bearer token expired")
+    return claims
+
+
+def resolve_tenant(scope: Dict[str, Any], tenants: Dict[str, Tenant]) -> Optional[Tenant]:
+    """Tenant of a request from its header or token claim; raises TenantError"""
+    header_name = settings.tenant_header.lower().encode() if settings.tenant_header else None
+    from_header = from_claim = None
+    for name, value in scope.get("headers", ()):
+        if name == header_name:
+            from_header = value.decode("latin-1").strip() or None
+        elif name == b"authorization" and settings.tenant_jwt_secret:
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token.count(".") == 2:
+                claim = jwt_claims(token.strip(), settings.tenant_jwt_secret).get(settings.tenant_claim)
+                from_claim = str(claim) if claim is not None else None
+    if settings.tenant_jwt_secret and from_header:
+        # With a secret only the verified claim picks the tenant; the header may repeat it
+        if from_claim is None:
+            raise TenantError(401, "Bearer token with a tenant claim required")
+        if from_header != from_claim:
+            raise TenantError(403, "Tenant header does not match the token")
+    tenant_id = from_claim or from_header
+    if tenant_id is None:
+        if settings.tenant_required and not scope["path"].startswith(_TENANTLESS_PATHS) and scope["path"] != "/":
+            raise TenantError(400, "Tenant required")
+        return None
+    tenant = tenants.get(tenant_id)
+    if tenant is None:
+        raise TenantError(404, f"Unknown tenant: {tenant_id}")
+    return tenant
+
+
+# -------------------------
+# Activation and metrics
+# -------------------------
+class TenantState:
+    __slots__ = ("tenant", "services", "in_flight", "requests", "errors", "total_ms", "activated_at", "last_request")
+
+    def __init__(self, tenant: Tenant):
+        self.tenant = tenant
+        self.services: Any = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.activated_at = time.time()
+        self.last_request = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "db": self.tenant.mongo_db,
+            "active": True,
+            "dedicated_cluster": self.tenant.mongo_uri is not None,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.requests, 3) if self.requests else None,
+            "activated_at": self.activated_at,
+            "last_request": self.last_request or None,
+        }
+
+
+class TenantRegistry:
+    """Active tenants of this worker, least recently used first"""
+
+    def __init__(self) -> None:
+        self.tenants: Dict[str, Tenant] = configured_tenants()
+        self._active: "OrderedDict[str, TenantState]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._start: Optional[Callable[[Tenant], Awaitable[Any]]] = None
+        self._stop: Optional[Callable[[Tenant, Any], Awaitable[None]]] = None
+        self.evicted = 0
+
+    def configure(self, start: Callable[[Tenant], Awaitable[Any]], stop: Callable[[Tenant, Any], Awaitable[None]]) -> None:
+        """Set the callbacks that start and stop a tenant's services (run with the tenant current)"""
+        self._start = start
+        self._stop = stop
+
+    async def activate(self, tenant: Tenant) -> TenantState:
+        state = self._active.get(tenant.id)
+        if state is not None:
+            self._active.move_to_end(tenant.id)
+            return state
+        lock = self._locks.setdefault(tenant.id, asyncio.Lock())
+        async with lock:
+            state = self._active.get(tenant.id)
+            if state is not None:
+                return state
+            await self._evict(settings.tenant_max_active - 1)
+            state = TenantState(tenant)
+            token = current_tenant.set(tenant)
+            try:
+                if self._start is not None:
+                    state.services = await self._start(tenant)
+            finally:
+                current_tenant.reset(token)
+            self._active[tenant.id] = state
+            return state
+
+    async def deactivate(self, tenant_id: str) -> None:
+        state = self._active.pop(tenant_id, None)
+        if state is None:
+            return
+        token = current_tenant.set(state.tenant)
+        try:
+            if self._stop is not None:
+                await self._stop(state.tenant, state.services)
+        finally:
+            current_tenant.reset(token)
+        TenantLocal.discard(tenant_id)
+
+    async def _evict(self, keep: int) -> None:
+        for tenant_id in [id for id, s in self._active.items() if s.in_flight == 0]:
+            if len(self._active) <= keep:
+                return
+            await self.deactivate(tenant_id)
+            self.evicted += 1
+
+    async def stop_all(self) -> None:
+        for tenant_id in list(self._active):
+            await self.deactivate(tenant_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": len(self.tenants),
+            "active": len(self._active),
+            "max_active": settings.tenant_max_active,
+            "evicted": self.evicted,
+            "tenants": {id: (self._active[id].stats() if id in self._active else {"db": t.mongo_db, "active": False})
+                        for id, t in self.tenants.items()},
+        }
+
+
+tenant_registry = TenantRegistry()
+
+
+class TenantMiddleware:
+    """Pure ASGI middleware setting current_tenant for the rest of the request"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http" or (not tenant_registry.tenants and not settings.tenant_required):
+            return await self.app(scope, receive, send)
+        try:
+            tenant = resolve_tenant(scope, tenant_registry.tenants)
+        except TenantError as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code)
+            return await response(scope, receive, send)
+        if tenant is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            state = await tenant_registry.activate(tenant)
+        except Exception as e:
+            print(f"⚠️ Tenant {tenant.id} failed to start: {e}")
+            response = JSONResponse({"detail": f"Tenant unavailable: {tenant.id}"}, status_code=503)
+            return await response(scope, receive, send)
+        status = 500
+
+        async def send_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = current_tenant.set(tenant)
+        state.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            current_tenant.reset(token)
+            state.in_flight -= 1
+            state.requests += 1
+            state.errors += status >= 500
+            state.total_ms += (time.perf_counter() - started) * 1000
+            state.last_request = time.time()
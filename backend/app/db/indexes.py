@@ -0,0 +1,77 @@
+# app/db/indexes.py
+import asyncio
+from typing import Any
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..core.events import CASE_COLLECTIONS
+
+# One case per normalized number and court (app/core/duplicates.py)
+CASE_NUMBER_INDEX = "court_type_1_court_name_id_1_case_number_norm_1"
+
+async def ensure_constraint_indexes(db: AsyncIOMotorDatabase) -> None:
+    """
+    Create the unique indexes that writes rely on to reject duplicates.
+    Awaited before serving even with startup_mode "fast": until they exist
+    a create or update that should get a 409 would be stored instead. They
+    are cheap once built, and the partial ones only cover documents written
+    since the field was introduced.
+    """
+    await asyncio.gather(
+        db.cases.create_index(
+            [("court_type", 1), ("court_name_id", 1), ("case_number_norm", 1)], name=CASE_NUMBER_INDEX,
+            unique=True, partialFilterExpression={"case_number_norm": {"$exists": True}},
+        ),
+        # The reminder outbox holds one entry per record and date
+        db.reminders.create_index([("doc_id", 1), ("due", 1)], unique=True),
+        # One timeline bucket per matter and position (app/routers/matters.py)
+        db.matter_timeline_buckets.create_index(
+            [("matter_id", 1), ("start", 1)], unique=True, partialFilterExpression={"start": {"$exists": True}},
+        ),
+    )
+
+async def has_index(collection: Any, name: str) -> bool:
+    return name in await collection.index_information()
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """
+    Create the indexes the routers rely on. Safe to call on every startup,
+    create_index is a no-op when the index already exists. The commands are
+    independent and sent concurrently, so startup waits for the slowest one
+    rather than for one round trip per index.
+    """
+    await asyncio.gather(
+        ensure_constraint_indexes(db),
+
+        # Timeline buckets are read newest first per matter
+        db.matter_timeline_buckets.create_index([("matter_id", 1), ("start", -1), ("_id", -1)]),
+
+        # Listing and the related sections loaded by get_case. Child lists page
+        # by (sort field, _id), so _id is part of each key
+        db.cases.create_index([("filing_date", -1)]),
+        db.case_parties.create_index([("case_id", 1), ("_id", 1)]),
+        db.case_hearings.create_index([("case_id", 1), ("hearing_date", -1), ("_id", -1)]),
+        db.case_documents.create_index([("case_id", 1), ("uploaded_at", -1), ("_id", -1)]),
+        db.case_notes.create_index([("case_id", 1), ("created_at", -1), ("_id", -1)]),
+        db.case_tasks.create_index([("case_id", 1), ("due_date", 1), ("_id", 1)]),
+        db.matters.create_index([("created_at", -1)]),
+
+        # The duplicate finder reads cases court by court and lists pairs by score
+        db.cases.create_index([("court_name_id", 1)]),
+        db.case_duplicates.create_index([("score", -1), ("_id", 1)]),
+
+        # Delta sync pages through each collection by change time
+        *(db[name].create_index([("updated_at", 1), ("_id", 1)]) for name in CASE_COLLECTIONS),
+        db.tombstones.create_index([("deleted_at", 1), ("_id", 1)]),
+
+        # Reminder scheduler loads upcoming dates and delivers due entries
+        db.case_hearings.create_index([("next_hearing_date", 1)]),
+        db.case_tasks.create_index([("due_date", 1)]),
+        db.reminders.create_index([("delivered", 1), ("fire_at", 1)]),
+
+        # Archive lookups beyond _id
+        db.archived_cases.create_index([("client_id", 1)]),
+        db.archived_cases.create_index([("archived_at", -1)]),
+        db.archived_matters.create_index([("archived_at", -1)]),
+
+        # Stored responses for Idempotency-Key, dropped once expired
+        db.idempotency_keys.create_index([("expires_at", 1)], expireAfterSeconds=0),
+    )
@@ -0,0 +1,1181 @@
+# app/db/memory.py
+"""
+In-memory stand-in for the parts of Motor the routers use.
+
+MemoryClient / MemoryDatabase / MemoryCollection mirror the Motor call
+signatures (find/sort/skip/limit, find_one, insert_*, update_*, delete_*,
+count_documents, create_index, ...) so handlers run unchanged against
+either engine. Documents are stored as plain dicts and round-tripped
+through BSON on every write and read, so values that Mongo cannot store
+fail the same way and callers never share state with the store.
+
+Equality and $in filters on indexed fields (see app/db/indexes.py) are
+answered from hash indexes on the index's leading field; everything else
+is a scan. aggregate() runs the $match, $sort, $skip, $limit, $group
+($push, $first, $firstN, $last, $sum, $min, $max on "$field" or "$$ROOT")
+and $project stages. Every operation runs without awaiting, so it is atomic with
+respect to other coroutines, like a single-document write in Mongo.
+
+bulk_write takes the pymongo request classes (InsertOne, UpdateOne, ...).
+Sessions support transactions: a collection is snapshotted the first time
+a transaction writes to it and put back on abort. There is no isolation,
+other requests see the writes before the commit; callers only get the
+all-or-nothing outcome. Set settings.memory_transactions to False to have
+supports_transactions() (app/db/mongo.py) report none, so hermetic runs
+also cover the path taken on a standalone server.
+
+The engine replaces Motor below the handlers. Whole case and matter
+aggregates are read through app/db/repositories.py, whose in-memory
+implementations use find_grouped() here instead of per-collection queries;
+a router that starts using a collection call missing here has to add it.
+"""
+import re
+from datetime import datetime
+from functools import cmp_to_key
+from itertools import count
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, InvalidOperation, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+
+# -------------------------
+# Value helpers
+# -------------------------
+def _clone(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep copy through BSON, which also rejects values Mongo cannot store"""
+    return bson.decode(bson.encode(doc))
+
+
+def _type_rank(value: Any) -> int:
+    """BSON comparison order between types"""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 12
+
+
+def _compare(a: Any, b: Any) -> int:
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 1:
+        return 0
+    if rank_a in (4, 5):
+        a, b = repr(a), repr(b)
+    if a == b:
+        return 0
+    return -1 if a < b else 1
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if a is _MISSING:
+        a = None
+    if b is _MISSING:
+        b = None
+    return _type_rank(a) == _type_rank(b) and a == b
+
+
+def _hkey(value: Any) -> Any:
+    """Hashable key for index buckets"""
+    if isinstance(value, dict):
+        return ("__d", tuple((k, _hkey(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("__l", tuple(_hkey(v) for v in value))
+    if isinstance(value, bool):
+        return ("__b", value)
+    if value is _MISSING:
+        return None
+    return value
+
+
+def _split(path: str) -> List[str]:
+    return path.split(".")
+
+
+def _lookup(value: Any, parts: List[str]) -> List[Any]:
+    """All values reachable at ``parts``, expanding arrays along the way"""
+    if not parts:
+        return [value]
+    if isinstance(value, dict):
+        if parts[0] not in value:
+            return [_MISSING]
+        return _lookup(value[parts[0]], parts[1:])
+    if isinstance(value, list):
+        if parts[0].isdigit():
+            index = int(parts[0])
+            return _lookup(value[index], parts[1:]) if index < len(value) else [_MISSING]
+        found: List[Any] = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                found.extend(v for v in _lookup(item, parts) if v is not _MISSING)
+        return found or [_MISSING]
+    return [_MISSING]
+
+
+def _expand(values: List[Any]) -> List[Any]:
+    """Array fields match on the array itself and on each element"""
+    expanded: List[Any] = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    current: Any = doc
+    for part in _split(path):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        else:
+            return _MISSING
+    return current
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = _split(path)
+    current: Any = doc
+    for part in parts[:-1]:
+        if isinstance(current, list) and part.isdigit():
+            current = current[int(part)]
+            continue
+        if not isinstance(current.get(part), (dict, list)):
+            current[part] = {}
+        current = current[part]
+    if isinstance(current, list) and parts[-1].isdigit():
+        current[int(parts[-1])] = value
+    else:
+        current[parts[-1]] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = _split(path)
+    parent = _get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+
+
+# -------------------------
+# Query matching
+# -------------------------
+def _is_operator_dict(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(k.startswith("$") for k in value)
+
+
+def _regex(pattern: Any, options: str = "") -> "re.Pattern[str]":
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    if "i" in options:
+        flags |= re.IGNORECASE
+    if "m" in options:
+        flags |= re.MULTILINE
+    if "s" in options:
+        flags |= re.DOTALL
+    return re.compile(getattr(pattern, "pattern", pattern), flags)
+
+
+# $in value list -> hashed keys, for the list most recently matched against.
+# A query is matched against every candidate document with the same list.
+_in_cache: List[Any] = [None, (), frozenset()]
+
+
+def _in_set(arg: Any) -> Optional[FrozenSet[Any]]:
+    """Hashed keys of an $in list, or None if it holds regexes"""
+    cached, snapshot, keys = _in_cache
+    if cached is arg and len(snapshot) == len(arg) and all(a is b for a, b in zip(arg, snapshot)):
+        return keys
+    if any(isinstance(a, re.Pattern) for a in arg):
+        return None
+    keys = frozenset(map(_hkey, arg))
+    _in_cache[:] = [arg, tuple(arg), keys]
+    return keys
+
+
+def _apply_operator(op: str, arg: Any, values: List[Any], cond: Dict[str, Any]) -> bool:
+    candidates = _expand(values)
+    if op == "$eq":
+        return any(_equal(v, arg) for v in candidates)
+    if op == "$ne":
+        return not any(_equal(v, arg) for v in candidates)
+    if op == "$in":
+        wanted = _in_set(arg)
+        if wanted is not None:
+            return any(_hkey(v) in wanted for v in candidates)
+        return any(_equal(v, a) for v in candidates for a in arg)
+    if op == "$nin":
+        wanted = _in_set(arg)
+        if wanted is not None:
+            return not any(_hkey(v) in wanted for v in candidates)
+        return not any(_equal(v, a) for v in candidates for a in arg)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        for v in candidates:
+            if v is _MISSING or _type_rank(v) != _type_rank(arg):
+                continue
+            c = _compare(v, arg)
+            if (op == "$gt" and c > 0) or (op == "$gte" and c >= 0) \
+                    or (op == "$lt" and c < 0) or (op == "$lte" and c <= 0):
+                return True
+        return False
+    if op == "$exists":
+        return any(v is not _MISSING for v in values) == bool(arg)
+    if op == "$size":
+        return any(isinstance(v, list) and len(v) == arg for v in values)
+    if op == "$regex":
+        pattern = _regex(arg, cond.get("$options", ""))
+        return any(isinstance(v, str) and pattern.search(v) for v in candidates)
+    if op == "$options":
+        return True
+    if op == "$not":
+        if _is_operator_dict(arg):
+            return not all(_apply_operator(o, a, values, arg) for o, a in arg.items())
+        return not _apply_operator("$regex", arg, values, {})
+    if op == "$all":
+        return all(any(_equal(v, a) for v in candidates) for a in arg)
+    if op == "$elemMatch":
+        for v in values:
+            if not isinstance(v, list):
+                continue
+            for item in v:
+                if _is_operator_dict(arg):
+                    if all(_apply_operator(o, a, [item], arg) for o, a in arg.items()):
+                        return True
+                elif isinstance(item, dict) and match(item, arg):
+                    return True
+        return False
+    raise OperationFailure(f"unknown operator: {op}")
+
+
+def match(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """True if ``doc`` satisfies the Mongo filter ``query``"""
+    if not query:
+        return True
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(match(doc, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(match(doc, sub) for sub in cond):
+                return False
+        elif key == "$nor":
+            if any(match(doc, sub) for sub in cond):
+                return False
+        else:
+            values = _lookup(doc, _split(key))
+            if _is_operator_dict(cond):
+                if not all(_apply_operator(op, arg, values, cond) for op, arg in cond.items()):
+                    return False
+            elif isinstance(cond, re.Pattern):
+                if not _apply_operator("$regex", cond, values, {}):
+                    return False
+            elif not any(_equal(v, cond) for v in _expand(values)):
+                return False
+    return True
+
+
+# -------------------------
+# Updates
+# -------------------------
+def _push(doc: Dict[str, Any], path: str, spec: Any) -> None:
+    current = _get_path(doc, path)
+    items = list(current) if isinstance(current, list) else []
+    if isinstance(spec, dict) and "$each" in spec:
+        each = list(spec["$each"])
+        position = spec.get("$position")
+        if position is None:
+            items.extend(each)
+        else:
+            items[position:position] = each
+        if "$sort" in spec:
+            order = spec["$sort"]
+            if isinstance(order, dict):
+                for field, direction in reversed(list(order.items())):
+                    items.sort(key=cmp_to_key(lambda a, b, f=field: _compare(_get_path(a, f), _get_path(b, f))),
+                               reverse=direction < 0)
+            else:
+                items.sort(key=cmp_to_key(_compare), reverse=order < 0)
+        if "$slice" in spec:
+            limit = spec["$slice"]
+            items = items[limit:] if limit < 0 else items[:limit]
+    else:
+        items.append(spec)
+    _set_path(doc, path, items)
+
+
+def _pull(doc: Dict[str, Any], path: str, cond: Any) -> None:
+    current = _get_path(doc, path)
+    if not isinstance(current, list):
+        return
+
+    def removed(item: Any) -> bool:
+        if _is_operator_dict(cond):
+            return all(_apply_operator(op, arg, [item], cond) for op, arg in cond.items())
+        if isinstance(cond, dict) and isinstance(item, dict):
+            return match(item, cond)
+        return _equal(item, cond)
+
+    _set_path(doc, path, [item for item in current if not removed(item)])
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    if not _is_operator_dict(update):
+        raise OperationFailure("update document must contain only update operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                _set_path(doc, path, value)
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, path, value)
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$mul":
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) * value)
+            elif op in ("$min", "$max"):
+                current = _get_path(doc, path)
+                if current is _MISSING or current is None:
+                    _set_path(doc, path, value)
+                elif (_compare(value, current) < 0) == (op == "$min") and _compare(value, current) != 0:
+                    _set_path(doc, path, value)
+            elif op == "$push":
+                _push(doc, path, value)
+            elif op == "$addToSet":
+                current = _get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                each = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in each:
+                    if not any(_equal(item, existing) for existing in items):
+                        items.append(item)
+                _set_path(doc, path, items)
+            elif op == "$pull":
+                _pull(doc, path, value)
+            elif op == "$rename":
+                current = _get_path(doc, path)
+                if current is not _MISSING:
+                    _unset_path(doc, path)
+                    _set_path(doc, value, current)
+            elif op == "$currentDate":
+                _set_path(doc, path, datetime.utcnow())
+            else:
+                raise OperationFailure(f"unknown update operator: {op}")
+
+
+def _upsert_seed(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields an upsert copies from its filter (plain equality conditions)"""
+    seed: Dict[str, Any] = {}
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            for sub in cond:
+                seed.update(_upsert_seed(sub))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(cond):
+            if "$eq" in cond:
+                _set_path(seed, key, cond["$eq"])
+        else:
+            _set_path(seed, key, cond)
+    return seed
+
+
+# -------------------------
+# Projection and sorting
+# -------------------------
+def _project(doc: Dict[str, Any], projection: Optional[Union[Dict[str, Any], List[str]]]) -> Dict[str, Any]:
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {name: 1 for name in projection}
+    include_id = bool(projection.get("_id", 1))
+    spec = {k: v for k, v in projection.items() if k != "_id"}
+    inclusive = any(not isinstance(v, dict) and v for v in spec.values())
+    if inclusive:
+        result: Dict[str, Any] = {}
+        for path, value in spec.items():
+            if isinstance(value, dict) or not value:
+                continue
+            found = _get_path(doc, path)
+            if found is not _MISSING:
+                _set_path(result, path, found)
+    else:
+        result = dict(doc)
+        for path, value in spec.items():
+            if not isinstance(value, dict) and not value:
+                _unset_path(result, path)
+    # $slice keeps every other field in inclusive and exclusive mode alike
+    for path, value in spec.items():
+        if isinstance(value, dict) and "$slice" in value:
+            found = _get_path(doc, path)
+            if isinstance(found, list):
+                limit = value["$slice"]
+                if isinstance(limit, list):
+                    start, size = limit
+                    found = found[start:][:size] if start >= 0 else found[start:][:size]
+                else:
+                    found = found[limit:] if limit < 0 else found[:limit]
+            if found is not _MISSING:
+                _set_path(result, path, found)
+    if include_id and "_id" in doc:
+        result = {"_id": doc["_id"], **{k: v for k, v in result.items() if k != "_id"}}
+    else:
+        result.pop("_id", None)
+    return result
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, int(order)) for key, order in key_or_list]
+
+
+def _sort_value(doc: Dict[str, Any], path: str, direction: int) -> Any:
+    values = [v for v in _expand(_lookup(doc, _split(path))) if not isinstance(v, list)]
+    if not values:
+        return None
+    chosen = values[0]
+    for v in values[1:]:
+        c = _compare(v, chosen)
+        if (direction > 0 and c < 0) or (direction < 0 and c > 0):
+            chosen = v
+    return None if chosen is _MISSING else chosen
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5, 12):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def sort_documents(docs: List[Dict[str, Any]], spec: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    for path, direction in reversed(spec):
+        docs.sort(key=lambda d, p=path, o=direction: _sort_key(_sort_value(d, p, o)), reverse=direction < 0)
+    return docs
+
+
+# -------------------------
+# Aggregation
+# -------------------------
+def _expression(doc: Dict[str, Any], expr: Any) -> Any:
+    """Evaluate a "$field.path" or "$$ROOT" expression; anything else is a literal"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc if expr == "$$ROOT" else _get_path(doc, expr[1:])
+    return expr
+
+
+def _accumulate(op: str, current: Any, value: Any, first: bool, n: int = 0) -> Any:
+    if value is _MISSING:
+        value = None
+    if op in ("$push", "$firstN"):
+        current = [] if first else current
+        if op == "$push" or len(current) < n:
+            current.append(value)
+        return current
+    if op == "$first":
+        return value if first else current
+    if op == "$last":
+        return value
+    if op == "$sum":
+        return (0 if first else current) + (value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0)
+    if op in ("$min", "$max"):
+        if first or current is None:
+            return value
+        if value is None:
+            return current
+        c = _compare(value, current)
+        return value if (c < 0 if op == "$min" else c > 0) else current
+    raise OperationFailure(f"unknown group operator '{op}'", 15952)
+
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        key = _expression(doc, spec["_id"])
+        key = None if key is _MISSING else key
+        group = groups.get(_hkey(key))
+        first = group is None
+        if first:
+            group = groups[_hkey(key)] = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, arg = next(iter(accumulator.items()))
+            if op == "$firstN":
+                group[field] = _accumulate(op, group.get(field), _expression(doc, arg["input"]), first, arg["n"])
+            else:
+                group[field] = _accumulate(op, group.get(field), _expression(doc, arg), first)
+    return list(groups.values())
+
+
+def run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The $match, $sort, $skip, $limit, $group and $project stages of an aggregation"""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if match(d, spec)]
+        elif name == "$sort":
+            docs = sort_documents(list(docs), _normalize_sort(spec))
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$project":
+            docs = [_project(d, spec) for d in docs]
+        else:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", 40324)
+    return docs
+
+
+# -------------------------
+# Storage
+# -------------------------
+class _Index:
+    def __init__(self, name: str, keys: List[Tuple[str, int]], unique: bool = False,
+                 sparse: bool = False, partial: Optional[Dict[str, Any]] = None,
+                 expire_after: Optional[int] = None):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.sparse = sparse
+        self.partial = partial
+        self.expire_after = expire_after
+        self.lead: Dict[Any, Set[Any]] = {}
+        self.entries: Dict[Any, Any] = {}
+
+    @property
+    def field(self) -> str:
+        return self.keys[0][0]
+
+    def covers(self, doc: Dict[str, Any]) -> bool:
+        if self.partial is not None and not match(doc, self.partial):
+            return False
+        if self.sparse and all(_get_path(doc, f) is _MISSING for f, _ in self.keys):
+            return False
+        return True
+
+    def lead_keys(self, doc: Dict[str, Any]) -> Set[Any]:
+        return {_hkey(v) for v in _expand(_lookup(doc, _split(self.field)))}
+
+    def entry_key(self, doc: Dict[str, Any]) -> Any:
+        return tuple(_hkey(_get_path(doc, f)) for f, _ in self.keys)
+
+    def add(self, key: Any, doc: Dict[str, Any]) -> None:
+        for lead in self.lead_keys(doc):
+            self.lead.setdefault(lead, set()).add(key)
+        if self.unique and self.covers(doc):
+            self.entries[self.entry_key(doc)] = key
+
+    def remove(self, key: Any, doc: Dict[str, Any]) -> None:
+        for lead in self.lead_keys(doc):
+            bucket = self.lead.get(lead)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.lead[lead]
+        if self.unique and self.entries.get(self.entry_key(doc)) == key:
+            del self.entries[self.entry_key(doc)]
+
+    def conflicts(self, key: Any, doc: Dict[str, Any]) -> bool:
+        if not self.unique or not self.covers(doc):
+            return False
+        owner = self.entries.get(self.entry_key(doc), key)
+        return owner != key
+
+
+class _Store:
+    """Documents and indexes of one collection, shared by all its handles"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: Dict[Any, Dict[str, Any]] = {}
+        self.order: Dict[Any, int] = {}
+        self.seq = count()
+        self.indexes: Dict[str, _Index] = {"_id_": _Index("_id_", [("_id", 1)], unique=True)}
+
+    def candidates(self, query: Optional[Dict[str, Any]]) -> Iterable[Any]:
+        """Keys that may match ``query``, narrowed through an index when possible"""
+        if not query:
+            return list(self.docs)
+        best: Optional[Set[Any]] = None
+        for index in self.indexes.values():
+            cond = query.get(index.field, _MISSING)
+            if cond is _MISSING:
+                continue
+            if _is_operator_dict(cond):
+                if set(cond) - {"$in", "$eq"}:
+                    continue
+                wanted = list(cond.get("$in", [])) + ([cond["$eq"]] if "$eq" in cond else [])
+            elif isinstance(cond, (dict, list, re.Pattern)):
+                continue
+            else:
+                wanted = [cond]
+            found: Set[Any] = set()
+            for value in wanted:
+                if isinstance(value, (dict, list, re.Pattern)):
+                    break
+                found |= index.lead.get(_hkey(value), set())
+                if value is None:
+                    found |= {k for k, d in self.docs.items() if _get_path(d, index.field) is _MISSING}
+            else:
+                if best is None or len(found) < len(best):
+                    best = found
+        if best is None:
+            return list(self.docs)
+        return sorted(best, key=self.order.__getitem__)
+
+    def find(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.docs[k] for k in self.candidates(query) if match(self.docs[k], query)]
+
+    def check_unique(self, key: Any, doc: Dict[str, Any]) -> None:
+        for index in self.indexes.values():
+            if index.conflicts(key, doc):
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name}",
+                    11000,
+                )
+
+    def put(self, doc: Dict[str, Any]) -> None:
+        key = _hkey(doc["_id"])
+        old = self.docs.get(key)
+        self.check_unique(key, doc)
+        if old is not None:
+            for index in self.indexes.values():
+                index.remove(key, old)
+        else:
+            self.order[key] = next(self.seq)
+        self.docs[key] = doc
+        for index in self.indexes.values():
+            index.add(key, doc)
+
+    def remove(self, doc: Dict[str, Any]) -> None:
+        key = _hkey(doc["_id"])
+        for index in self.indexes.values():
+            index.remove(key, doc)
+        del self.docs[key]
+        del self.order[key]
+
+    def restore(self, docs: Dict[Any, Dict[str, Any]], order: Dict[Any, int]) -> None:
+        """Go back to a snapshot of ``docs`` and ``order``, rebuilding the indexes"""
+        self.docs, self.order = docs, order
+        for index in self.indexes.values():
+            index.lead, index.entries = {}, {}
+            for key, doc in docs.items():
+                index.add(key, doc)
+
+    def stats(self) -> Dict[str, Any]:
+        """collStats-shaped sizes. Index sizes are estimated from the encoded keys."""
+        size = sum(len(bson.encode(doc)) for doc in self.docs.values())
+        index_sizes = {}
+        for name, index in self.indexes.items():
+            index_sizes[name] = sum(
+                len(bson.encode({"k": [_get_path(doc, f) if _get_path(doc, f) is not _MISSING else None
+                                       for f, _ in index.keys]})) + 8
+                for doc in self.docs.values() if index.covers(doc)
+            )
+        return {
+            "ns": self.name,
+            "count": len(self.docs),
+            "size": size,
+            "avgObjSize": size // len(self.docs) if self.docs else 0,
+            "storageSize": size,
+            "nindexes": len(self.indexes),
+            "indexSizes": index_sizes,
+            "totalIndexSize": sum(index_sizes.values()),
+            "ok": 1.0,
+        }
+
+
+# -------------------------
+# Motor-compatible API
+# -------------------------
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: Optional[Dict[str, Any]],
+                 projection: Any = None, sort: Any = None, skip: int = 0, limit: int = 0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = _normalize_sort(sort) if sort else []
+        self._skip = skip
+        self._limit = limit
+        self._results: Optional[List[Any]] = None
+        self._position = 0
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _evaluate(self) -> List[Any]:
+        if self._results is None:
+            docs = self._collection._store.find(self._query)
+            if self._sort:
+                docs = sort_documents(list(docs), self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._results = [self._collection._output(d, self._projection) for d in docs]
+        return self._results
+
+    def __aiter__(self) -> "MemoryCursor":
+        self._evaluate()
+        return self
+
+    async def __anext__(self) -> Any:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        results = self._evaluate()
+        end = self._position + length if length else len(results)
+        taken = results[self._position:end]
+        self._position += len(taken)
+        return taken
+
+
+class MemoryCommandCursor(MemoryCursor):
+    """What aggregate() returns: iterated or listed like a find() cursor"""
+
+    def __init__(self, collection: "MemoryCollection", pipeline: List[Dict[str, Any]]):
+        super().__init__(collection, None)
+        self._pipeline = pipeline
+
+    def _evaluate(self) -> List[Any]:
+        if self._results is None:
+            pipeline = list(self._pipeline)
+            # A leading $match is answered from the indexes like find()
+            query = pipeline.pop(0)["$match"] if pipeline and "$match" in pipeline[0] else None
+            docs = run_pipeline(self._collection._store.find(query), pipeline)
+            self._results = [self._collection._output(d) for d in docs]
+        return self._results
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", store: _Store, codec_options: Optional[CodecOptions] = None):
+        self.database = database
+        self._store = store
+        self.codec_options = codec_options
+
+    @property
+    def name(self) -> str:
+        return self._store.name
+
+    def _output(self, doc: Dict[str, Any], projection: Any = None) -> Any:
+        projected = _project(doc, projection)
+        if self.codec_options is not None and self.codec_options.document_class is RawBSONDocument:
+            return RawBSONDocument(bson.encode(projected), self.codec_options)
+        return _clone(projected)
+
+    def with_options(self, codec_options: Optional[CodecOptions] = None, **kwargs: Any) -> "MemoryCollection":
+        return MemoryCollection(self.database, self._store, codec_options or self.codec_options)
+
+    # ---------- reads ----------
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Any = None, *,
+             sort: Any = None, skip: int = 0, limit: int = 0, **kwargs: Any) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection, sort, skip, limit)
+
+    async def find_one(self, filter: Any = None, projection: Any = None, *, sort: Any = None, **kwargs: Any) -> Any:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        results = await MemoryCursor(self, filter, projection, sort, 0, 1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: Dict[str, Any], **kwargs: Any) -> int:
+        docs = self._store.find(filter)
+        skip, limit = kwargs.get("skip", 0), kwargs.get("limit", 0)
+        docs = docs[skip:]
+        return len(docs[:limit] if limit else docs)
+
+    async def estimated_document_count(self, **kwargs: Any) -> int:
+        return len(self._store.docs)
+
+    async def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Any]:
+        seen: List[Any] = []
+        for doc in self._store.find(filter):
+            for value in _expand(_lookup(doc, _split(key))):
+                if value is _MISSING or isinstance(value, list):
+                    continue
+                if not any(_equal(value, s) for s in seen):
+                    seen.append(value)
+        return [_clone({"v": v})["v"] for v in seen]
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> MemoryCommandCursor:
+        return MemoryCommandCursor(self, pipeline)
+
+    # ---------- aggregate reads (app/db/repositories.py) ----------
+    async def find_grouped(self, field: str, values: List[Any], sort: List[Tuple[str, int]], limit: int = 0,
+                           as_stored: bool = False) -> Dict[Any, List[Any]]:
+        """
+        Documents whose ``field`` is one of ``values``, grouped by it, each
+        group sorted and cut to ``limit``. Only the documents returned are
+        copied; ``as_stored`` skips even that, for callers that copy the
+        part they keep with copies() and never modify what they read.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in self._store.find({field: {"$in": values}}):
+            groups.setdefault(_hkey(doc.get(field)), []).append(doc)
+        found: Dict[Any, List[Any]] = {}
+        for value in values:
+            docs = sort_documents(groups.get(_hkey(value), []), sort)
+            docs = docs[:limit] if limit else docs
+            found[value] = docs if as_stored else self.copies(docs)
+        return found
+
+    def copies(self, docs: List[Dict[str, Any]]) -> List[Any]:
+        """Copies of stored documents (or parts of them), as the reads return them"""
+        return [self._output(doc) for doc in docs]
+
+    # ---------- writes ----------
+    def _writing(self, session: Optional["MemorySession"]) -> None:
+        if session is not None:
+            session._touch(self._store)
+
+    def _prepare(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        return _clone(document)
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> InsertOneResult:
+        self._writing(kwargs.get("session"))
+        doc = self._prepare(document)
+        if _hkey(doc["_id"]) in self._store.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+        self._store.put(doc)
+        return InsertOneResult(doc["_id"], True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True,
+                          **kwargs: Any) -> InsertManyResult:
+        ids = []
+        for document in documents:
+            result = await self.insert_one(document, session=kwargs.get("session"))
+            ids.append(result.inserted_id)
+        return InsertManyResult(ids, True)
+
+    def _update(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool,
+                replacement: bool = False, sort: Any = None) -> Tuple[UpdateResult, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        matched = self._store.find(filter)
+        if sort:
+            matched = sort_documents(list(matched), _normalize_sort(sort))
+        if not many:
+            matched = matched[:1]
+        if not matched:
+            if not upsert:
+                return UpdateResult({"n": 0, "nModified": 0}, True), None, None
+            doc = _upsert_seed(filter)
+            if replacement:
+                doc = {**({"_id": doc["_id"]} if "_id" in doc else {}), **update}
+            else:
+                _apply_update(doc, update, inserting=True)
+            doc = self._prepare(doc)
+            if _hkey(doc["_id"]) in self._store.docs:
+                # The filter missed a document with the same _id, as MongoDB reports it
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+            self._store.put(doc)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": doc["_id"]}, True), None, doc
+        modified = 0
+        before = after = None
+        for old in matched:
+            if replacement:
+                new = {"_id": old["_id"], **{k: v for k, v in update.items() if k != "_id"}}
+            else:
+                new = _clone(old)
+                _apply_update(new, update)
+                new["_id"] = old["_id"]
+            new = _clone(new)
+            if new != old:
+                self._store.put(new)
+                modified += 1
+            before, after = old, new
+        return UpdateResult({"n": len(matched), "nModified": modified}, True), before, after
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False,
+                         **kwargs: Any) -> UpdateResult:
+        self._writing(kwargs.get("session"))
+        return self._update(filter, update, upsert, many=False)[0]
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False,
+                          **kwargs: Any) -> UpdateResult:
+        self._writing(kwargs.get("session"))
+        return self._update(filter, update, upsert, many=True)[0]
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False,
+                          **kwargs: Any) -> UpdateResult:
+        self._writing(kwargs.get("session"))
+        return self._update(filter, replacement, upsert, many=False, replacement=True)[0]
+
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], projection: Any = None,
+                                  sort: Any = None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs: Any) -> Any:
+        self._writing(kwargs.get("session"))
+        _, before, after = self._update(filter, update, upsert, many=False, sort=sort)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return self._output(doc, projection) if doc is not None else None
+
+    async def find_one_and_delete(self, filter: Dict[str, Any], projection: Any = None, sort: Any = None,
+                                  **kwargs: Any) -> Any:
+        self._writing(kwargs.get("session"))
+        matched = self._store.find(filter)
+        if sort:
+            matched = sort_documents(list(matched), _normalize_sort(sort))
+        if not matched:
+            return None
+        self._store.remove(matched[0])
+        return self._output(matched[0], projection)
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        self._writing(kwargs.get("session"))
+        matched = self._store.find(filter)[:1]
+        for doc in matched:
+            self._store.remove(doc)
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        self._writing(kwargs.get("session"))
+        matched = self._store.find(filter)
+        for doc in matched:
+            self._store.remove(doc)
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        session = kwargs.get("session")
+        self._writing(session)
+        counts: Dict[str, Any] = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                                  "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+        for i, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    await self.insert_one(request._doc, session=session)
+                    counts["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    result = self._update(request._filter, request._doc, request._upsert,
+                                          many=isinstance(request, UpdateMany),
+                                          replacement=isinstance(request, ReplaceOne))[0]
+                    if result.upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": i, "_id": result.upserted_id})
+                    else:
+                        counts["nMatched"] += result.matched_count
+                        counts["nModified"] += result.modified_count
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    matched = self._store.find(request._filter)
+                    if isinstance(request, DeleteOne):
+                        matched = matched[:1]
+                    for doc in matched:
+                        self._store.remove(doc)
+                    counts["nRemoved"] += len(matched)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as e:
+                counts["writeErrors"].append({"index": i, "code": e.code, "errmsg": str(e)})
+                if ordered:
+                    break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+        return BulkWriteResult(counts, True)
+
+    # ---------- indexes ----------
+    async def create_index(self, keys: Any, unique: bool = False, name: Optional[str] = None,
+                           sparse: bool = False, partialFilterExpression: Optional[Dict[str, Any]] = None,
+                           expireAfterSeconds: Optional[int] = None, **kwargs: Any) -> str:
+        spec = _normalize_sort(keys, 1)
+        name = name or "_".join(f"{field}_{order}" for field, order in spec)
+        if name in self._store.indexes:
+            return name
+        index = _Index(name, spec, unique, sparse, partialFilterExpression, expireAfterSeconds)
+        for key, doc in self._store.docs.items():
+            if index.conflicts(key, doc):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}", 11000)
+            index.add(key, doc)
+        self._store.indexes[name] = index
+        return name
+
+    async def index_information(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {}
+        for name, index in self._store.indexes.items():
+            info[name] = {"key": index.keys, **({"unique": True} if index.unique and name != "_id_" else {})}
+        return info
+
+    async def drop_index(self, name: str, **kwargs: Any) -> None:
+        self._store.indexes.pop(name, None)
+
+    async def drop(self, **kwargs: Any) -> None:
+        await self.database.drop_collection(self.name)
+
+    def watch(self, *args: Any, **kwargs: Any) -> Any:
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._stores: Dict[str, _Store] = {}
+
+    def get_collection(self, name: str, codec_options: Optional[CodecOptions] = None, **kwargs: Any) -> MemoryCollection:
+        store = self._stores.get(name)
+        if store is None:
+            store = self._stores[name] = _Store(name)
+        return MemoryCollection(self, store, codec_options)
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self, **kwargs: Any) -> List[str]:
+        return [name for name, store in self._stores.items() if store.docs or len(store.indexes) > 1]
+
+    async def drop_collection(self, name: str, **kwargs: Any) -> None:
+        self._stores.pop(getattr(name, "name", name), None)
+
+    async def command(self, command: Any, value: Any = 1, **kwargs: Any) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name in ("ping", "hello", "isMaster", "ismaster"):
+            return {"ok": 1.0}
+        if name == "collStats":
+            target = command[name] if isinstance(command, dict) else value
+            store = self._stores.get(target)
+            return store.stats() if store is not None else _Store(target).stats()
+        raise OperationFailure(f"no such command: '{name}'", 59)
+
+    def watch(self, *args: Any, **kwargs: Any) -> Any:
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+
+
+class _MemoryTransaction:
+    """``async with session.start_transaction()``: commits on success, aborts on error"""
+
+    def __init__(self, session: "MemorySession"):
+        self._session = session
+
+    async def __aenter__(self) -> "_MemoryTransaction":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._session.in_transaction:
+            if exc_type is None:
+                await self._session.commit_transaction()
+            else:
+                await self._session.abort_transaction()
+
+
+class MemorySession:
+    def __init__(self, client: "MemoryClient"):
+        self.client = client
+        self.in_transaction = False
+        self.has_ended = False
+        self._saved: Dict[int, Tuple[_Store, Dict[Any, Dict[str, Any]], Dict[Any, int]]] = {}
+
+    def start_transaction(self, **kwargs: Any) -> _MemoryTransaction:
+        if self.in_transaction:
+            raise InvalidOperation("Transaction already in progress")
+        self.in_transaction = True
+        self._saved = {}
+        return _MemoryTransaction(self)
+
+    def _touch(self, store: _Store) -> None:
+        """Snapshot a store before the transaction first writes to it"""
+        if self.in_transaction and id(store) not in self._saved:
+            self._saved[id(store)] = (store, dict(store.docs), dict(store.order))
+
+    async def commit_transaction(self) -> None:
+        if not self.in_transaction:
+            raise InvalidOperation("No transaction started")
+        self.in_transaction = False
+        self._saved = {}
+
+    async def abort_transaction(self) -> None:
+        if not self.in_transaction:
+            raise InvalidOperation("No transaction started")
+        for store, docs, order in self._saved.values():
+            store.restore(docs, order)
+        self.in_transaction = False
+        self._saved = {}
+
+    async def end_session(self) -> None:
+        if self.in_transaction:
+            await self.abort_transaction()
+        self.has_ended = True
+
+    async def __aenter__(self) -> "MemorySession":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        await self.end_session()
+
+
+class MemoryClient:
+    def __init__(self) -> None:
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    async def start_session(self, **kwargs: Any) -> MemorySession:
+        return MemorySession(self)
+
+    def get_database(self, name: str, **kwargs: Any) -> MemoryDatabase:
+        db = self._databases.get(name)
+        if db is None:
+            db = self._databases[name] = MemoryDatabase(self, name)
+        return db
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_database(name)
+
+    async def drop_database(self, name: str) -> None:
+        self._databases.pop(getattr(name, "name", name), None)
+
+    def close(self) -> None:
+        pass
@@ -1,28 +1,179 @@
-# app/db/mongo.py
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+from pymongo.errors import BulkWriteError
 from ..core.config import settings
+from ..core.profiling import profiled_database
+from ..core.admission import MongoLatencyListener
+from ..core.lazy import LazyModule
+from ..core.tenancy import Tenant, current_tenant
+
+# Only imported when settings.db_engine is "memory"
+memory = LazyModule("app.db.memory")
 
 _client: Optional[AsyncIOMotorClient] = None
 
 def get_client() -> AsyncIOMotorClient:
     """
     Return a global Motor client (created lazily).
-    Uses settings.mongo_uri from app/core/config.py
+    Uses settings.mongo_uri from app/core/config.py, or the in-memory
+    engine when settings.db_engine is "memory".
     """
     global _client
     if _client is None:
-        _client = AsyncIOMotorClient(settings.mongo_uri)
+        if settings.db_engine == "memory":
+            _client = memory.MemoryClient()
+        else:
+            # Command latency drives the adaptive admission limits
+            _client = AsyncIOMotorClient(settings.mongo_uri, minPoolSize=settings.mongo_min_pool_size,
+                                         event_listeners=[MongoLatencyListener()])
     return _client
 
+class TenantClients:
+    """
+    Motor clients for tenants on their own clusters, least recently used
+    first. Tenants on settings.mongo_uri share the main client. The pool
+    budget is split evenly, so the total stays within
+    settings.tenant_pool_budget whatever the number of clusters; an idle
+    client beyond settings.tenant_max_clients is closed.
+    """
+
+    def __init__(self) -> None:
+        self._clients: "OrderedDict[str, AsyncIOMotorClient]" = OrderedDict()
+        self._users: Dict[str, int] = {}
+        self.opened = 0
+        self.closed = 0
+
+    def _shared(self, uri: Optional[str]) -> bool:
+        return uri is None or uri == settings.mongo_uri or settings.db_engine == "memory"
+
+    def client(self, uri: Optional[str]) -> AsyncIOMotorClient:
+        if self._shared(uri):
+            return get_client()
+        client = self._clients.get(uri)
+        if client is None:
+            pool_size = max(1, settings.tenant_pool_budget // max(1, settings.tenant_max_clients))
+            client = self._clients[uri] = AsyncIOMotorClient(uri, maxPoolSize=pool_size,
+                                                             event_listeners=[MongoLatencyListener()])
+            self.opened += 1
+        self._clients.move_to_end(uri)
+        return client
+
+    def acquire(self, uri: Optional[str]) -> AsyncIOMotorClient:
+        """Client for an active tenant; not closed until released"""
+        client = self.client(uri)
+        if not self._shared(uri):
+            self._users[uri] = self._users.get(uri, 0) + 1
+            self._evict()
+        return client
+
+    def release(self, uri: Optional[str]) -> None:
+        if self._shared(uri):
+            return
+        self._users[uri] = self._users.get(uri, 1) - 1
+        self._evict()
+
+    def _evict(self) -> None:
+        for uri in [u for u in self._clients if not self._users.get(u)]:
+            if len(self._clients) <= settings.tenant_max_clients:
+                return
+            self._clients.pop(uri).close()
+            self._users.pop(uri, None)
+            self.closed += 1
+
+    def close_all(self) -> None:
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+        self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "max_clients": settings.tenant_max_clients,
+            "pool_size_each": max(1, settings.tenant_pool_budget // max(1, settings.tenant_max_clients)),
+            "opened": self.opened,
+            "closed": self.closed,
+        }
+
+tenant_clients = TenantClients()
+
+def tenant_db(tenant: Tenant) -> AsyncIOMotorDatabase:
+    return tenant_clients.client(tenant.mongo_uri)[tenant.mongo_db]
+
 def get_db() -> AsyncIOMotorDatabase:
     """
-    Return the configured database object.
+    Return the database of the current tenant (app/core/tenancy.py), or the
+    configured database outside of a tenant.
     """
-    return get_client()[settings.mongo_db]
+    tenant = current_tenant.get()
+    if tenant is None:
+        return get_client()[settings.mongo_db]
+    return tenant_db(tenant)
 
 async def get_database() -> AsyncIOMotorDatabase:
     """
     Dependency for FastAPI to inject database into route handlers.
+    Profiled requests get a wrapper that records the Mongo calls they make.
+    """
+    return profiled_database(get_db())
+
+async def warm_pool(client: AsyncIOMotorClient) -> int:
+    """
+    Open settings.mongo_min_pool_size connections before serving instead of
+    on the first requests. The pings run concurrently, so each one checks
+    out its own connection; the driver keeps the pool at minPoolSize after.
+    """
+    if settings.db_engine == "memory" or settings.mongo_min_pool_size <= 0:
+        return 0
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(settings.mongo_min_pool_size)))
+    return settings.mongo_min_pool_size
+
+# Whether each client's deployment runs multi-document transactions
+_transactions: Dict[int, bool] = {}
+
+async def supports_transactions(db: AsyncIOMotorDatabase) -> bool:
+    """
+    Replica sets and sharded clusters do, a standalone server does not. The
+    in-memory engine does unless settings.memory_transactions is off.
+    """
+    key = id(db.client)
+    if key not in _transactions:
+        if settings.db_engine == "memory":
+            supported = settings.memory_transactions
+        else:
+            try:
+                hello = await db.command("hello")
+            except Exception:
+                hello = {}
+            supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        _transactions[key] = supported
+    return _transactions[key]
+
+async def bulk_write_collections(db: AsyncIOMotorDatabase, writes: Dict[str, List[Any]],
+                                 check: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[bool, Dict[str, Any]]:
+    """
+    One ordered bulk_write per collection, in the order of ``writes``.
+    Where transactions are supported they all run in one: the first
+    BulkWriteError aborts it and is raised, and ``check`` sees the results
+    before the commit and may raise to abort. Otherwise each collection is
+    written on its own and a BulkWriteError is returned as its result.
+    Returns whether a transaction was used and the result per collection.
     """
-    return get_db()
+    writes = {name: requests for name, requests in writes.items() if requests}
+    results: Dict[str, Any] = {}
+    if await supports_transactions(db):
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                for name, requests in writes.items():
+                    results[name] = await db[name].bulk_write(requests, ordered=True, session=session)
+                if check is not None:
+                    check(results)
+        return True, results
+    for name, requests in writes.items():
+        try:
+            results[name] = await db[name].bulk_write(requests, ordered=True)
+        except BulkWriteError as e:
+            results[name] = e
+    return False, results
@@ -0,0 +1,275 @@
+# app/db/repositories.py
+"""
+Data access per aggregate.
+
+A case aggregate is a case with its parties, hearings, documents, notes and
+tasks; a matter aggregate is a matter with its timeline buckets. The
+handlers in app/routers/cases.py and app/routers/matters.py read, update
+and delete whole aggregates through these classes rather than calling the
+collections inline, so each engine answers those reads its own way:
+
+- CaseRepository / MatterRepository run Motor queries: one query (or
+  aggregation) per collection for any number of cases, bucket counts
+  first so only the timeline buckets a page needs are loaded.
+- MemoryCaseRepository / MemoryMatterRepository read the in-memory
+  engine's stores (app/db/memory.py) grouped by case or matter straight
+  from the case_id / matter_id index, copying only what they return.
+
+get_case_repository / get_matter_repository pick the implementation for
+settings.db_engine and take the database from get_database, so
+``app.dependency_overrides[get_database]`` reaches them too. Writes to a
+single related record (a party, a note, ...) still use the collection API,
+which both engines provide.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..core.config import settings
+from ..core.events import CASE_COLLECTIONS
+from ..models.paging import sort_spec
+from .mongo import get_database
+
+# Related sections embedded in a case, with their collection and sort order
+CASE_SECTIONS = {
+    "parties": ("case_parties", None),
+    "hearings": ("case_hearings", "hearing_date"),
+    "documents": ("case_documents", "uploaded_at"),
+    "notes": ("case_notes", "created_at"),
+    "tasks": ("case_tasks", "created_at"),
+}
+
+# Matters with this version keep their timeline in matter_timeline_buckets and
+# only embed the latest few events. Older documents still carry the full
+# timeline array until app.tools.migrate_timeline has been run.
+TIMELINE_VERSION = 2
+
+# Newest bucket first. Buckets from before "start" was recorded sort last
+# (missing sorts lowest) and are ordered among themselves by _id
+BUCKET_ORDER = [("start", -1), ("_id", -1)]
+
+
+def section_order(sort_field: Optional[str]) -> List[Tuple[str, int]]:
+    """Most recent first; parties, which have no date, in the order they were added"""
+    return sort_spec(sort_field or "_id", -1 if sort_field else 1)
+
+
+# -------------------------
+# Cases
+# -------------------------
+class CaseRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def get(self, oid: Any, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return await self.db.cases.find_one({"_id": oid}, projection)
+
+    async def get_many(self, oids: List[Any], projection: Optional[Dict[str, Any]] = None) -> Dict[Any, Dict[str, Any]]:
+        """Cases by id; missing ones are left out"""
+        return {case["_id"]: case async for case in self.db.cases.find({"_id": {"$in": oids}}, projection)}
+
+    async def sections(self, case_ids: List[Any], names: Iterable[str],
+                       limit: Optional[int] = None) -> Dict[Any, Dict[str, List[Dict[str, Any]]]]:
+        """The related records of each case for the sections ``names``, at most ``limit`` per section"""
+        found: Dict[Any, Dict[str, List[Dict[str, Any]]]] = {oid: {} for oid in case_ids}
+        for name in names:
+            collection, sort_field = CASE_SECTIONS[name]
+            order = section_order(sort_field)
+            for sections in found.values():
+                sections[name] = []
+            if not case_ids:
+                continue
+            if len(case_ids) == 1:
+                cursor = self.db[collection].find({"case_id": case_ids[0]}).sort(order)
+                found[case_ids[0]][name] = await (cursor.limit(limit) if limit else cursor).to_list(None)
+            elif limit:
+                # Keeps the first `limit` items of each case ($firstN, MongoDB 5.2+)
+                pipeline = [
+                    {"$match": {"case_id": {"$in": case_ids}}},
+                    {"$sort": dict([("case_id", 1)] + order)},
+                    {"$group": {"_id": "$case_id", "items": {"$firstN": {"input": "$$ROOT", "n": limit}}}},
+                ]
+                async for group in self.db[collection].aggregate(pipeline, allowDiskUse=True):
+                    found[group["_id"]][name] = group["items"]
+            else:
+                # Each case's items arrive together and already sorted from the (case_id, sort field) index
+                async for item in self.db[collection].find({"case_id": {"$in": case_ids}}).sort([("case_id", 1)] + order):
+                    found[item["case_id"]][name].append(item)
+        return found
+
+    async def delete(self, oid: Any) -> Tuple[bool, Dict[str, List[Any]]]:
+        """
+        Delete a case and its related records. Returns whether the case was
+        there and the ids of the related records removed, per collection.
+        """
+        result = await self.db.cases.delete_one({"_id": oid})
+        removed: Dict[str, List[Any]] = {}
+        for collection in CASE_COLLECTIONS[1:]:
+            child_ids = await self.db[collection].distinct("_id", {"case_id": oid})
+            if child_ids:
+                await self.db[collection].delete_many({"case_id": oid})
+                removed[collection] = child_ids
+        return bool(result.deleted_count), removed
+
+
+class MemoryCaseRepository(CaseRepository):
+    async def sections(self, case_ids: List[Any], names: Iterable[str],
+                       limit: Optional[int] = None) -> Dict[Any, Dict[str, List[Dict[str, Any]]]]:
+        found: Dict[Any, Dict[str, List[Dict[str, Any]]]] = {oid: {} for oid in case_ids}
+        for name in names:
+            collection, sort_field = CASE_SECTIONS[name]
+            groups = await self.db[collection].find_grouped("case_id", case_ids, section_order(sort_field), limit)
+            for oid, sections in found.items():
+                sections[name] = groups.get(oid, [])
+        return found
+
+
+# -------------------------
+# Matters
+# -------------------------
+class MatterRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def create(self, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a matter; the matter as stored"""
+        res = await self.db.matters.insert_one(doc)
+        return await self.db.matters.find_one({"_id": res.inserted_id})
+
+    async def list(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]],
+                   skip: int, limit: int) -> List[Dict[str, Any]]:
+        """Newest first"""
+        return await self.db.matters.find(query, projection).sort("created_at", -1).skip(skip).limit(limit).to_list(None)
+
+    async def get(self, oid: Any, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return await self.db.matters.find_one({"_id": oid}, projection)
+
+    async def update(self, oid: Any, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply an update document; the matter as written, None if it does not exist"""
+        return await self.db.matters.find_one_and_update({"_id": oid}, update, return_document=ReturnDocument.AFTER)
+
+    async def delete(self, oid: Any) -> Optional[List[Any]]:
+        """Delete a matter and its timeline; the ids of the buckets removed, None if there was no matter"""
+        res = await self.db.matters.delete_one({"_id": oid})
+        if res.deleted_count == 0:
+            return None
+        bucket_ids = await self.db.matter_timeline_buckets.distinct("_id", {"matter_id": oid})
+        if bucket_ids:
+            await self.db.matter_timeline_buckets.delete_many({"matter_id": oid})
+        return bucket_ids
+
+    async def _events_before(self, oid: Any, bucket_id: Any) -> int:
+        """Events in the buckets before a bucket written without "start" (all such buckets are older)"""
+        older = self.db.matter_timeline_buckets.find(
+            {"matter_id": oid, "start": {"$exists": False}, "_id": {"$lt": bucket_id}}, {"count": 1})
+        return sum([b.get("count", 0) async for b in older])
+
+    async def append_event(self, oid: Any, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add an event to the matter's newest bucket, opening the next one once it
+        is full. The buckets are the record of the timeline: each stores how many
+        events precede it ("start"), and the unique (matter_id, start) index lets
+        only one concurrent request open a given bucket, the others retry and
+        append to it.
+        """
+        buckets = self.db.matter_timeline_buckets
+        size = settings.matter_timeline_bucket_size
+        while True:
+            last = await buckets.find_one({"matter_id": oid}, {"count": 1, "start": 1}, sort=BUCKET_ORDER)
+            start = 0
+            if last is not None:
+                start = last.get("start")
+                if start is None:
+                    start = await self._events_before(oid, last["_id"])
+                bucket = await buckets.find_one_and_update(
+                    {"_id": last["_id"], "count": {"$lt": size}},
+                    {
+                        "$push": {"events": item},
+                        "$inc": {"count": 1},
+                        "$min": {"first_at": item["created_at"]},
+                        "$max": {"last_at": item["created_at"]},
+                        "$set": {"start": start},
+                    },
+                    return_document=ReturnDocument.AFTER
+                )
+                if bucket is not None:
+                    return bucket
+                # Full: it holds exactly `size` events unless the setting was lowered since
+                start += max(last.get("count", 0), size)
+            bucket = {"matter_id": oid, "start": start, "count": 1, "events": [item],
+                      "first_at": item["created_at"], "last_at": item["created_at"]}
+            try:
+                await buckets.insert_one(bucket)
+                return bucket
+            except DuplicateKeyError:
+                continue
+
+    async def timeline(self, oid: Any, skip: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """A page of the matter's timeline, newest first; None if there is no matter"""
+        matter = await self.db.matters.find_one({"_id": oid}, {"timeline_version": 1})
+        if not matter:
+            return None
+        if matter.get("timeline_version") != TIMELINE_VERSION:
+            legacy = await self.db.matters.find_one({"_id": oid}, {"timeline": 1})
+            events = list(reversed(legacy.get("timeline") or []))
+            return events[skip:skip + limit]
+        return await self._bucket_events(oid, skip, limit)
+
+    async def _bucket_events(self, oid: Any, skip: int, limit: int) -> List[Dict[str, Any]]:
+        # Use the bucket counts to skip whole buckets without loading their events
+        wanted: List[Any] = []
+        offset = skip
+        to_take = limit + skip
+        async for bucket in self.db.matter_timeline_buckets.find({"matter_id": oid}, {"count": 1}).sort(BUCKET_ORDER):
+            count = bucket.get("count", 0)
+            if not wanted and offset >= count:
+                offset -= count
+                to_take -= count
+                continue
+            wanted.append(bucket["_id"])
+            to_take -= count
+            if to_take <= 0:
+                break
+
+        if not wanted:
+            return []
+
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        async for bucket in self.db.matter_timeline_buckets.find({"_id": {"$in": wanted}}, {"events": 1}):
+            buckets[bucket["_id"]] = bucket.get("events") or []
+
+        events: List[Dict[str, Any]] = []
+        for bucket_id in wanted:
+            events.extend(reversed(buckets.get(bucket_id, [])))
+        return events[offset:offset + limit]
+
+
+class MemoryMatterRepository(MatterRepository):
+    async def _bucket_events(self, oid: Any, skip: int, limit: int) -> List[Dict[str, Any]]:
+        # Bucket counts are free to read here; only the events of the page are copied
+        collection = self.db.matter_timeline_buckets
+        buckets = (await collection.find_grouped("matter_id", [oid], BUCKET_ORDER, as_stored=True))[oid]
+        events: List[Dict[str, Any]] = []
+        for bucket in buckets:
+            count = bucket.get("count", 0)
+            if not events and skip >= count:
+                skip -= count
+                continue
+            events.extend(reversed(bucket.get("events") or []))
+            if len(events) >= skip + limit:
+                break
+        return collection.copies(events[skip:skip + limit])
+
+
+# -------------------------
+# Dependencies
+# -------------------------
+async def get_case_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> CaseRepository:
+    return MemoryCaseRepository(db) if settings.db_engine == "memory" else CaseRepository(db)
+
+
+async def get_matter_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> MatterRepository:
+    return MemoryMatterRepository(db) if settings.db_engine == "memory" else MatterRepository(db)
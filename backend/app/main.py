@@ -1,39 +1,203 @@
 # app/main.py
+import asyncio
+import time
+from typing import Dict, Iterator, List, Optional
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
-from app.db.mongo import get_client, get_db
+from contextlib import asynccontextmanager, contextmanager
+from app.db.mongo import get_client, get_db, tenant_clients, warm_pool
+from app.db.indexes import ensure_constraint_indexes, ensure_indexes
+from app.core import profiling
+from app.core.events import change_feed
+from app.core.sync import run_compaction
+from app.core.reminders import reminder_scheduler
+from app.core.archive import run_archival_job
+from app.core.reference import reference_data
+from app.core.bookings import hearing_bookings
+from app.core.analytics import case_analytics, np
+from app.core.compression import CompressionMiddleware, response_cache
+from app.core.duplicates import duplicate_finder
+from app.core.backup import change_log
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.tenancy import Tenant, TenantMiddleware, tenant_registry
+from app.core.config import settings
 from app.routers.matters import router as matters_router
 from app.routers.cases import router as cases_router
+from app.routers.events import router as events_router
+from app.routers.sync import router as sync_router
+from app.routers.admin import router as admin_router
+from app.routers.reference import router as reference_router
+from app.routers.analytics import router as analytics_router
 
 # Store database reference for dependency injection
 db = None
 
+@contextmanager
+def _phase(timings: Dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+
+async def _ensure_indexes_in_background(db) -> None:
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        print(f"⚠️ Index bootstrap failed: {e}")
+
+async def start_services(db, timings: Optional[Dict[str, float]] = None) -> List[asyncio.Task]:
+    """
+    Start the per-database work: index bootstrap, reference data, change
+    feed, reminders and the background jobs. Runs for the default database
+    and for each tenant when it is activated, with that tenant current so
+    its own services are the ones started. Returns the background tasks.
+    """
+    timings = {} if timings is None else timings
+    tasks: List[asyncio.Task] = []
+    try:
+        if settings.startup_mode == "fast":
+            # Unique indexes first, the rest are only needed for speed
+            with _phase(timings, "indexes"):
+                await ensure_constraint_indexes(db)
+            tasks.append(asyncio.create_task(_ensure_indexes_in_background(db)))
+        else:
+            with _phase(timings, "indexes"):
+                await ensure_indexes(db)
+        with _phase(timings, "reference"):
+            await reference_data.load(db)
+        tasks.append(asyncio.create_task(reference_data.run_refresh(db)))
+        await change_feed.start(db)
+        if settings.backup_enabled:
+            await change_log.start(db)
+            tasks.append(asyncio.create_task(change_log.run(db)))
+        with _phase(timings, "bookings"):
+            await hearing_bookings.start(db)
+        tasks.append(asyncio.create_task(hearing_bookings.run_refresh(db)))
+        await response_cache.start()
+        tasks.append(asyncio.create_task(run_compaction(db)))
+        if settings.reminders_enabled:
+            await reminder_scheduler.start(db)
+        if settings.archive_interval_seconds:
+            tasks.append(asyncio.create_task(run_archival_job(db)))
+        if settings.analytics_enabled and np.available:
+            tasks.append(asyncio.create_task(case_analytics.run_refresh(db)))
+        if settings.duplicate_scan_hours:
+            tasks.append(asyncio.create_task(duplicate_finder.run(db)))
+    except Exception:
+        await stop_services(tasks)
+        raise
+    return tasks
+
+async def stop_services(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await reminder_scheduler.stop()
+    await response_cache.stop()
+    await hearing_bookings.stop()
+    if settings.backup_enabled:
+        await change_log.stop()
+    await change_feed.stop()
+
+async def _start_tenant(tenant: Tenant) -> List[asyncio.Task]:
+    started = time.perf_counter()
+    tenant_clients.acquire(tenant.mongo_uri)
+    try:
+        tasks = await start_services(get_db())
+    except Exception:
+        tenant_clients.release(tenant.mongo_uri)
+        raise
+    print(f"🏢 Tenant {tenant.id} started on {tenant.mongo_db} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    return tasks
+
+async def _stop_tenant(tenant: Tenant, tasks: List[asyncio.Task]) -> None:
+    await stop_services(tasks)
+    tenant_clients.release(tenant.mongo_uri)
+
+tenant_registry.configure(start=_start_tenant, stop=_stop_tenant)
+
+async def _activate_tenants() -> None:
+    """Start the configured tenants up to settings.tenant_max_active; the rest start on first request"""
+    tenants = list(tenant_registry.tenants.values())[:settings.tenant_max_active]
+    results = await asyncio.gather(*(tenant_registry.activate(t) for t in tenants), return_exceptions=True)
+    for tenant, result in zip(tenants, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Tenant {tenant.id} failed to start: {result}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Connect to MongoDB
     global db
+    timings: Dict[str, float] = {}
+    app.state.startup = {"mode": settings.startup_mode, "phases_ms": timings}
+    started = time.perf_counter()
     try:
         client = get_client()
         db = get_db()
         # Test connection
-        await client.admin.command('ping')
+        with _phase(timings, "connect"):
+            await client.admin.command('ping')
         print("✅ Connected to MongoDB successfully!")
+        # Open pooled connections now rather than on the first requests
+        with _phase(timings, "pool"):
+            await warm_pool(client)
+        services = await start_services(db, timings)
+        snapshot = reference_data.snapshot
+        print(f"📚 Reference data: {len(snapshot.courts)} courts, {len(snapshot.categories)} categories, "
+              f"{len(snapshot.subcategories)} subcategories ({reference_data.load_ms:.1f} ms)")
+        print(f"📡 Change feed source: {change_feed.source}")
+        bookings = hearing_bookings.stats()
+        print(f"📅 Hearing bookings: {bookings['bookings']} across {bookings['lawyers']} lawyers")
+        if tenant_registry.tenants:
+            with _phase(timings, "tenants"):
+                await _activate_tenants()
+        # Build the OpenAPI schema (every response model's JSON schema) before
+        # the first /docs request; validators and serializers are already
+        # compiled when the models and routes are defined
+        with _phase(timings, "prebuild"):
+            app.openapi()
     except Exception as e:
         print(f"❌ Failed to connect to MongoDB: {e}")
         raise
+    app.state.startup["ready_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    print(f"🚀 Ready in {app.state.startup['ready_ms']:.0f} ms ({settings.startup_mode} startup)")
     
     yield
     
-    # Shutdown: Close MongoDB connection
+    # Shutdown: Stop background work, then close MongoDB connection
+    await tenant_registry.stop_all()
+    await stop_services(services)
+    tenant_clients.close_all()
     if client:
         client.close()
         print("🔌 MongoDB connection closed")
 
-app = FastAPI(title="Law Matters API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(
+    title="Law Matters API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=profiling.ProfiledJSONResponse,
+)
+
+# Per-request profiling (off unless sampled or asked for via header)
+app.add_middleware(profiling.ProfilingMiddleware)
+# Retried creates with the same Idempotency-Key get the stored response
+app.add_middleware(IdempotencyMiddleware)
+# Negotiated gzip/br/zstd; case reads answered from cached, pre-compressed bodies
+app.add_middleware(CompressionMiddleware)
+# Routes the rest of the request to the tenant's database (X-Tenant-ID or token claim)
+app.add_middleware(TenantMiddleware)
+# Outermost: bursts beyond the per-class limits queue briefly or get a 503
+app.add_middleware(AdmissionMiddleware)
 
 # Include routers
 app.include_router(matters_router)
 app.include_router(cases_router)
+app.include_router(events_router)
+app.include_router(sync_router)
+app.include_router(admin_router)
+app.include_router(reference_router)
+app.include_router(analytics_router)
 
 @app.get("/")
 def home():
@@ -0,0 +1,107 @@
+# app/models/paging.py
+"""
+Keyset pagination and NDJSON streaming for list endpoints.
+
+A page is sorted by (field, _id) and its cursor holds the field value and
+_id of the last document returned, so the next page starts right after it
+with an index range scan instead of skipping. Null values (e.g. tasks
+without a due date) are handled the way Mongo sorts them: before every
+other value ascending, after them descending.
+
+Streaming reads the cursor one batch at a time and writes one JSON document
+per line, so memory stays bounded by the batch size whatever the result size.
+"""
+import base64
+import binascii
+import json
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, Optional, Tuple, Type
+
+import bson
+from bson import json_util
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from .projection import projected_model
+from .rawjson import Fallback, field_plan, transcode_lines
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CURSOR_DESCRIPTION = "Value of X-Next-Cursor from the previous page"
+
+
+def encode_cursor(doc: Any, field: str) -> str:
+    """Cursor pointing just after ``doc``"""
+    value = doc.get(field) if field != "_id" else None
+    raw = json_util.dumps({"f": field, "v": value, "i": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str) -> Tuple[Any, Any]:
+    """(field value, _id) of the last document of the previous page"""
+    try:
+        data = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if data["f"] != field:
+            raise ValueError("cursor belongs to another listing")
+        return data["v"], data["i"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    if field == "_id":
+        return [("_id", direction)]
+    return [(field, direction), ("_id", direction)]
+
+
+def keyset_query(query: Dict[str, Any], field: str, direction: int, after: Tuple[Any, Any]) -> Dict[str, Any]:
+    """``query`` restricted to documents sorting after ``after``"""
+    value, last_id = after
+    past = "$gt" if direction > 0 else "$lt"
+    if field == "_id":
+        return {"$and": [query, {"_id": {past: last_id}}]}
+    if value is None:
+        branches = [{field: None, "_id": {past: last_id}}]
+        if direction > 0:
+            # Ascending, nulls come first: every non-null value is still ahead
+            branches.append({field: {"$ne": None}})
+    else:
+        branches = [{field: {past: value}}, {field: value, "_id": {past: last_id}}]
+        if direction < 0:
+            # Descending, nulls come last
+            branches.append({field: None})
+    return {"$and": [query, {"$or": branches}]}
+
+
+def _line(item: Any, response_model: Type[BaseModel]) -> str:
+    return json.dumps(jsonable_encoder(response_model(**item), by_alias=True),
+                      ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def encode_lines(docs: List[Any], model: Type[BaseModel], selected: Optional[FrozenSet[str]],
+                 convert: Callable[[Any], Any], raw: bool) -> bytes:
+    """NDJSON for one batch; raw documents go through the transcoder when possible"""
+    if not docs:
+        return b""
+    if raw:
+        plan = field_plan(model, selected)
+        if plan is not None:
+            try:
+                return transcode_lines(docs, plan)
+            except Fallback:
+                pass
+        docs = [bson.decode(doc.raw) for doc in docs]
+    response_model = projected_model(model, selected) if selected else model
+    return "".join(_line(convert(doc), response_model) + "\n" for doc in docs).encode("utf-8")
+
+
+async def ndjson_stream(cursor: Any, model: Type[BaseModel], selected: Optional[FrozenSet[str]],
+                        convert: Callable[[Any], Any], batch_size: int, raw: bool = False) -> AsyncIterator[bytes]:
+    """Stream ``cursor`` as NDJSON, holding one batch at a time"""
+    cursor = cursor.batch_size(batch_size)
+    while True:
+        docs = await cursor.to_list(batch_size)
+        if not docs:
+            return
+        yield encode_lines(docs, model, selected, convert, raw)
+        if len(docs) < batch_size:
+            return
@@ -0,0 +1,79 @@
+# app/models/projection.py
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Type
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+
+from ..core.profiling import ProfiledJSONResponse, profile_phase
+
+# pydantic 1 and 2 expose field definitions differently
+_PYDANTIC_V2 = hasattr(BaseModel, "model_fields")
+
+
+def _model_fields(model: Type[BaseModel]) -> Dict[str, Any]:
+    return model.model_fields if _PYDANTIC_V2 else model.__fields__
+
+
+def _field_definition(field: Any) -> Any:
+    if _PYDANTIC_V2:
+        return (field.annotation, field)
+    annotation = field.outer_type_
+    if field.allow_none:
+        annotation = Optional[annotation]
+    return (annotation, field.field_info)
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[FrozenSet[str]]:
+    """
+    Turn a comma separated ``fields=`` query value into the set of model
+    fields to return. ``id`` is always included. Returns None when no
+    projection was requested.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(_model_fields(model))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return frozenset(requested | {"id"})
+
+
+def mongo_projection(selected: FrozenSet[str], exclude: FrozenSet[str] = frozenset()) -> Dict[str, Any]:
+    """
+    Build a Mongo inclusion projection for the selected fields. Fields listed
+    in ``exclude`` are not stored on the document itself (e.g. related
+    sections that come from other collections).
+    """
+    projection: Dict[str, Any] = {name: 1 for name in selected if name != "id" and name not in exclude}
+    # An empty inclusion projection would return the whole document
+    return projection or {"_id": 1}
+
+
+@lru_cache(maxsize=256)
+def projected_model(model: Type[BaseModel], selected: FrozenSet[str]) -> Type[BaseModel]:
+    """Response model restricted to ``selected``, built once per field set."""
+    fields = _model_fields(model)
+    definitions = {name: _field_definition(fields[name]) for name in fields if name in selected}
+    config = model.model_config if _PYDANTIC_V2 else model.__config__
+    name = f"{model.__name__}_{'_'.join(sorted(selected))}"
+    return create_model(name, __config__=config, **definitions)
+
+
+@profile_phase("validation")
+def projected_content(model: Type[BaseModel], selected: FrozenSet[str], data: Any) -> Any:
+    projected = projected_model(model, selected)
+    if isinstance(data, list):
+        return jsonable_encoder([projected(**item) for item in data], by_alias=True)
+    return jsonable_encoder(projected(**data), by_alias=True)
+
+
+def projected_response(model: Type[BaseModel], selected: FrozenSet[str], data: Any) -> JSONResponse:
+    """
+    Validate ``data`` (a document or a list of documents) against the
+    projected model and encode it the same way FastAPI encodes response_model
+    output.
+    """
+    return ProfiledJSONResponse(content=projected_content(model, selected, data))
@@ -0,0 +1,243 @@
+# app/models/rawjson.py
+"""
+Transcode raw BSON documents straight to JSON response bytes.
+
+The regular read path decodes BSON into dicts, converts ObjectIds, builds
+pydantic models, turns them back into dicts and finally encodes JSON. For
+flat response models (strings, enums, dates, datetimes and "HH:MM" clock
+times - every Case*Out model) this module instead walks the raw bytes of
+each document (RawBSONDocument) and writes the JSON for the fields of the
+response model directly, in model order.
+
+The output is byte-for-byte what FastAPI produces for the same model:
+``_id`` alias, ObjectId as hex string, date fields as ``YYYY-MM-DD``,
+datetimes as isoformat, clock times as ``HH:MM:SS``, compact separators and
+ensure_ascii=False. Anything the model would treat differently (a missing
+required field, an unknown enum value, a date with a time part, an
+unexpected BSON type) makes the whole response fall back to the regular
+path, so errors surface the same way. Enabled with settings.raw_bson_responses.
+"""
+import struct
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from functools import lru_cache
+from json import dumps
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from ..core.profiling import current_profile, ProfiledJSONResponse
+from .projection import _PYDANTIC_V2, _model_fields, projected_model
+
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+_INT32 = struct.Struct("<i").unpack_from
+_INT64 = struct.Struct("<q").unpack_from
+_EPOCH = datetime(1970, 1, 1)
+_DAY_MS = 86_400_000
+
+# Size of fixed-width BSON values by type byte
+_FIXED = {0x01: 8, 0x06: 0, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8,
+          0x12: 8, 0x13: 16, 0x7F: 0, 0xFF: 0}
+
+
+class Fallback(Exception):
+    """The document needs the regular (validating) path"""
+
+
+# -------------------------
+# Field plans
+# -------------------------
+# (key, kind, required, json for a missing value, null allowed, allowed enum values, '"key":')
+# kind is "str", "enum", "date", "datetime" or "time"; the key is the alias, as stored and as sent
+PlanField = Tuple[str, str, bool, str, bool, Optional[FrozenSet[str]], str]
+
+
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _kind(annotation: Any) -> Tuple[Optional[str], Optional[FrozenSet[str]]]:
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum) and issubclass(annotation, str):
+            return "enum", frozenset(member.value for member in annotation)
+        if annotation is str:
+            return "str", None
+        if issubclass(annotation, datetime):
+            return "datetime", None
+        if issubclass(annotation, date):
+            return "date", None
+        if issubclass(annotation, time):
+            return "time", None
+    return None, None
+
+
+@lru_cache(maxsize=256)
+def field_plan(model: Type[BaseModel], selected: Optional[FrozenSet[str]] = None) -> Optional[Tuple[PlanField, ...]]:
+    """How to write each response field, or None if the model is not flat enough"""
+    plan = []
+    for name, field in _model_fields(model).items():
+        if selected is not None and name not in selected:
+            continue
+        if _PYDANTIC_V2:
+            annotation, nullable = _unwrap_optional(field.annotation)
+            required = field.is_required()
+            alias = field.alias or name
+        else:
+            annotation, nullable = field.outer_type_, field.allow_none
+            required = field.required
+            alias = field.alias
+        kind, allowed = _kind(annotation)
+        if kind is None:
+            return None
+        if _PYDANTIC_V2 and field.default_factory is not None:
+            return None
+        missing = "null"
+        if not required and field.default is not None:
+            missing = dumps(jsonable_encoder(field.default), ensure_ascii=False, separators=(",", ":"))
+        plan.append((alias, kind, required, missing, nullable, allowed, encode_basestring(alias) + ":"))
+    return tuple(plan)
+
+
+# -------------------------
+# Transcoding
+# -------------------------
+def _skip(raw: bytes, kind: int, pos: int) -> int:
+    """Offset just past the value of type ``kind`` starting at ``pos``"""
+    size = _FIXED.get(kind)
+    if size is not None:
+        return pos + size
+    if kind in (0x02, 0x0D, 0x0E):
+        return pos + 4 + _INT32(raw, pos)[0]
+    if kind in (0x03, 0x04, 0x0F):
+        return pos + _INT32(raw, pos)[0]
+    if kind == 0x05:
+        return pos + 5 + _INT32(raw, pos)[0]
+    if kind == 0x0B:
+        pos = raw.index(b"\x00", pos) + 1
+        return raw.index(b"\x00", pos) + 1
+    if kind == 0x0C:
+        return pos + 4 + _INT32(raw, pos)[0] + 12
+    raise Fallback(f"unknown BSON type {kind}")
+
+
+@lru_cache(maxsize=4096)
+def _date_json(millis: int) -> str:
+    # Hearing, filing and due dates repeat a lot across a response
+    return '"' + (_EPOCH + timedelta(milliseconds=millis)).date().isoformat() + '"'
+
+
+def _datetime_json(millis: int) -> str:
+    return '"' + (_EPOCH + timedelta(milliseconds=millis)).isoformat() + '"'
+
+
+@lru_cache(maxsize=4096)
+def _time_json(value: str) -> Optional[str]:
+    # Hearing times are stored as "HH:MM" strings
+    try:
+        return '"' + time.fromisoformat(value).isoformat() + '"'
+    except ValueError:
+        return None
+
+
+def _render(raw: bytes, kind: int, pos: int, spec: PlanField) -> str:
+    field_kind = spec[1]
+    if kind == 0x0A:
+        if not spec[4]:
+            raise Fallback(f"{spec[0]} is null")
+        return "null"
+    if field_kind == "str" or field_kind == "enum":
+        if kind == 0x02:
+            length = _INT32(raw, pos)[0]
+            value = raw[pos + 4:pos + 3 + length].decode("utf-8")
+            if spec[5] is not None and value not in spec[5]:
+                raise Fallback(f"{spec[0]}: unknown value {value!r}")
+            return encode_basestring(value)
+        if kind == 0x07 and field_kind == "str":
+            return '"' + raw[pos:pos + 12].hex() + '"'
+    elif field_kind == "time":
+        if kind == 0x02:
+            length = _INT32(raw, pos)[0]
+            rendered = _time_json(raw[pos + 4:pos + 3 + length].decode("utf-8"))
+            if rendered is not None:
+                return rendered
+    elif kind == 0x09:
+        millis = _INT64(raw, pos)[0]
+        if field_kind == "datetime":
+            return _datetime_json(millis)
+        if millis % _DAY_MS == 0:
+            return _date_json(millis)
+    raise Fallback(f"{spec[0]}: BSON type {kind} for a {field_kind} field")
+
+
+def transcode(raw: bytes, plan: Tuple[PlanField, ...], index: Dict[str, PlanField]) -> str:
+    """JSON object for one BSON document"""
+    found: Dict[str, str] = {}
+    end = len(raw) - 1
+    pos = 4
+    while pos < end:
+        kind = raw[pos]
+        key_end = raw.index(b"\x00", pos + 1)
+        key = raw[pos + 1:key_end].decode("utf-8")
+        pos = key_end + 1
+        spec = index.get(key)
+        if spec is not None:
+            found[key] = _render(raw, kind, pos, spec)
+        pos = _skip(raw, kind, pos)
+    parts = []
+    for spec in plan:
+        value = found.get(spec[0])
+        if value is None:
+            if spec[2]:
+                raise Fallback(f"{spec[0]} is missing")
+            value = spec[3]
+        parts.append(spec[6] + value)
+    return "{" + ",".join(parts) + "}"
+
+
+def transcode_many(docs: List[RawBSONDocument], plan: Tuple[PlanField, ...]) -> bytes:
+    index = {spec[0]: spec for spec in plan}
+    return ("[" + ",".join(transcode(doc.raw, plan, index) for doc in docs) + "]").encode("utf-8")
+
+
+def transcode_lines(docs: List[RawBSONDocument], plan: Tuple[PlanField, ...]) -> bytes:
+    """One JSON object per line (NDJSON)"""
+    index = {spec[0]: spec for spec in plan}
+    return "".join(transcode(doc.raw, plan, index) + "\n" for doc in docs).encode("utf-8")
+
+
+def _encode(docs: List[RawBSONDocument], model: Type[BaseModel], selected: Optional[FrozenSet[str]],
+            convert: Callable[[Any], Any]) -> Response:
+    plan = field_plan(model, selected)
+    if plan is not None:
+        try:
+            return Response(content=transcode_many(docs, plan), media_type="application/json")
+        except Fallback:
+            pass
+    # Same result as the regular path, errors included
+    response_model = projected_model(model, selected) if selected else model
+    items = [response_model(**convert(bson.decode(doc.raw))) for doc in docs]
+    return ProfiledJSONResponse(content=jsonable_encoder(items, by_alias=True))
+
+
+def raw_json_response(docs: List[RawBSONDocument], model: Type[BaseModel],
+                      selected: Optional[FrozenSet[str]], convert: Callable[[Any], Any]) -> Response:
+    """
+    Response for a list of raw documents read through RAW_CODEC_OPTIONS.
+    ``convert`` is the router's ObjectId conversion, used on fallback.
+    """
+    profile = current_profile()
+    if profile is None:
+        return _encode(docs, model, selected, convert)
+    with profile.phase("serialization"):
+        return _encode(docs, model, selected, convert)
@@ -1,7 +1,7 @@
 # app/models/schemas.py
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any, Dict
-from datetime import datetime, date
+from datetime import datetime, date, time
 from enum import Enum
 
 # -------------------------
@@ -66,6 +66,7 @@ class MatterOut(BaseModel):
     client: Optional[Dict[str, Any]] = None
     assigned_to: Optional[Dict[str, Any]] = None
     timeline: Optional[List[TimelineItem]] = []
+    timeline_count: int = 0
     tags: Optional[List[str]] = []
     is_archived: bool = False
     created_at: Optional[datetime] = None
@@ -120,6 +121,7 @@ class CaseOut(BaseModel):
     client_id: str
     assigned_lawyer_id: str
     status: CaseStatus
+    disposed_at: Optional[datetime] = None
     created_by: str
     created_at: datetime
     updated_at: datetime
@@ -149,6 +151,7 @@ class CasePartyOut(BaseModel):
     name: str
     phone: Optional[str] = None
     address: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -159,6 +162,8 @@ class CasePartyOut(BaseModel):
 class CaseHearingCreate(BaseModel):
     case_id: str
     hearing_date: date
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
     stage: Optional[str] = None
     courtroom: Optional[str] = None
     order_summary: Optional[str] = None
@@ -169,6 +174,8 @@ class CaseHearingCreate(BaseModel):
 
 class CaseHearingUpdate(BaseModel):
     hearing_date: Optional[date] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
     stage: Optional[str] = None
     courtroom: Optional[str] = None
     order_summary: Optional[str] = None
@@ -181,6 +188,8 @@ class CaseHearingOut(BaseModel):
     id: str = Field(..., alias="_id")
     case_id: str
     hearing_date: date
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
     stage: Optional[str] = None
     courtroom: Optional[str] = None
     order_summary: Optional[str] = None
@@ -188,6 +197,7 @@ class CaseHearingOut(BaseModel):
     purpose_next: Optional[str] = None
     order_file: Optional[str] = None
     assigned_lawyer_id: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -218,6 +228,7 @@ class CaseDocumentOut(BaseModel):
     notes: Optional[str] = None
     uploaded_by: str
     uploaded_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -288,4 +299,113 @@ class CaseDetailOut(CaseOut):
     hearings: Optional[List[CaseHearingOut]] = []
     documents: Optional[List[CaseDocumentOut]] = []
     notes: Optional[List[CaseNoteOut]] = []
-    tasks: Optional[List[CaseTaskOut]] = []
\ No newline at end of file
+    tasks: Optional[List[CaseTaskOut]] = []
+# -------------------------
+# Reference data
+# -------------------------
+class CourtCreate(BaseModel):
+    name: str
+    court_type: Optional[CourtType] = None
+
+class CourtUpdate(BaseModel):
+    name: Optional[str] = None
+    court_type: Optional[CourtType] = None
+
+class CourtOut(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: str
+    court_type: Optional[CourtType] = None
+
+    class Config:
+        allow_population_by_field_name = True
+
+class CategoryCreate(BaseModel):
+    name: str
+
+class CategoryUpdate(BaseModel):
+    name: Optional[str] = None
+
+class CategoryOut(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: str
+
+    class Config:
+        allow_population_by_field_name = True
+
+class SubcategoryCreate(BaseModel):
+    name: str
+    category_id: str
+
+class SubcategoryUpdate(BaseModel):
+    name: Optional[str] = None
+    category_id: Optional[str] = None
+
+class SubcategoryOut(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: str
+    category_id: str
+
+    class Config:
+        allow_population_by_field_name = True
+
+# -------------------------
+# Batch reads
+# -------------------------
+class BatchGetRequest(BaseModel):
+    ids: List[str]
+
+class CaseBatchOut(BaseModel):
+    """Found records in request order, plus the ids that were not found"""
+    items: List[CaseDetailOut] = []
+    missing: List[str] = []
+
+class CaseHearingBatchOut(BaseModel):
+    items: List[CaseHearingOut] = []
+    missing: List[str] = []
+
+class CaseTaskBatchOut(BaseModel):
+    items: List[CaseTaskOut] = []
+    missing: List[str] = []
+
+# -------------------------
+# Batch writes
+# -------------------------
+class CaseBatchOp(str, Enum):
+    UPDATE_CASE = "update_case"
+    ADD_PARTY = "add_party"
+    UPDATE_PARTY = "update_party"
+    DELETE_PARTY = "delete_party"
+    ADD_HEARING = "add_hearing"
+    UPDATE_HEARING = "update_hearing"
+    DELETE_HEARING = "delete_hearing"
+    ADD_DOCUMENT = "add_document"
+    UPDATE_DOCUMENT = "update_document"
+    DELETE_DOCUMENT = "delete_document"
+    ADD_NOTE = "add_note"
+    UPDATE_NOTE = "update_note"
+    DELETE_NOTE = "delete_note"
+    ADD_TASK = "add_task"
+    UPDATE_TASK = "update_task"
+    DELETE_TASK = "delete_task"
+
+class CaseBatchOperation(BaseModel):
+    """One write: ``data`` is the body the single-operation endpoint takes, ``id`` the record to update or delete"""
+    op: CaseBatchOp
+    id: Optional[str] = None
+    data: Dict[str, Any] = {}
+
+class CaseBatchRequest(BaseModel):
+    operations: List[CaseBatchOperation]
+
+class CaseBatchResult(BaseModel):
+    index: int
+    op: CaseBatchOp
+    status: int
+    id: Optional[str] = None
+    item: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class CaseBatchWriteOut(BaseModel):
+    """Per-operation results in request order"""
+    transaction: bool
+    results: List[CaseBatchResult] = []
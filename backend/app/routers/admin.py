@@ -0,0 +1,208 @@
+# app/routers/admin.py
+from fastapi import APIRouter, HTTPException, Query, Depends, Header, Request
+from typing import List, Optional, Any, Dict
+from bson import ObjectId
+from pydantic import BaseModel
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..core.config import settings
+from ..core.profiling import recent_traces, clear_traces, ProfiledRoute
+from ..core.events import change_feed
+from ..core.sync import compact_tombstones
+from ..core.reminders import reminder_scheduler
+from ..core.archive import run_archival, restore_case, restore_matter, collection_stats, working_set_totals
+from ..core.reference import reference_data
+from ..core.idempotency import idempotency_store
+from ..core.admission import admission_controller
+from ..core.lazy import lazy_loads
+from ..core.analytics import case_analytics
+from ..core.bookings import hearing_bookings
+from ..core.compression import response_cache
+from ..core.duplicates import duplicate_finder
+from ..core.backup import change_log, backup_directory, list_gaps, list_segments, list_snapshots
+from ..core.tenancy import tenant_registry
+from ..db.mongo import get_database, tenant_clients
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Guard for operational endpoints when settings.admin_token is configured"""
+    if settings.admin_token and x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)], route_class=ProfiledRoute)
+
+# ==========================================
+# REQUEST PROFILES
+# ==========================================
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=1000)) -> List[Dict[str, Any]]:
+    """Slow and explicitly profiled request traces, newest first"""
+    return recent_traces(limit)
+
+@router.delete("/profiles", status_code=204)
+async def delete_profiles():
+    """Empty the trace buffer"""
+    clear_traces()
+    return
+
+# ==========================================
+# CHANGE FEED
+# ==========================================
+
+@router.get("/events")
+async def change_feed_stats() -> Dict[str, Any]:
+    """Change feed source and subscriber counts"""
+    return change_feed.stats()
+
+# ==========================================
+# DELTA SYNC
+# ==========================================
+
+@router.post("/sync/compact")
+async def compact_sync_tombstones(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Drop tombstones past the retention period now instead of waiting for the job"""
+    return await compact_tombstones(db)
+
+# ==========================================
+# REMINDERS
+# ==========================================
+
+@router.get("/reminders")
+async def reminder_stats() -> Dict[str, Any]:
+    """Reminder scheduler state for this worker"""
+    return reminder_scheduler.stats()
+
+# ==========================================
+# ARCHIVE
+# ==========================================
+
+class RestoreRequest(BaseModel):
+    case_ids: List[str] = []
+    matter_ids: List[str] = []
+
+@router.get("/archive/stats")
+async def archive_stats(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Working set and archive sizes per collection"""
+    stats = await collection_stats(db)
+    return {"working_set": working_set_totals(stats), "collections": stats}
+
+@router.post("/archive/run")
+async def run_archive(
+    older_than_days: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    dry_run: bool = Query(False),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> Dict[str, Any]:
+    """Archive disposed cases and archived matters now, with sizes before and after"""
+    return await run_archival(db, older_than_days, limit, dry_run)
+
+@router.post("/archive/restore")
+async def restore_archived(payload: RestoreRequest, db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Bring archived cases and matters back into the working set"""
+    try:
+        case_oids = [ObjectId(id) for id in payload.case_ids]
+        matter_oids = [ObjectId(id) for id in payload.matter_ids]
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    restored: Dict[str, List[str]] = {"cases": [], "matters": []}
+    not_found: Dict[str, List[str]] = {"cases": [], "matters": []}
+    for oid in case_oids:
+        (restored if await restore_case(db, oid) else not_found)["cases"].append(str(oid))
+    for oid in matter_oids:
+        (restored if await restore_matter(db, oid) else not_found)["matters"].append(str(oid))
+    return {"restored": restored, "not_found": not_found}
+
+# ==========================================
+# REFERENCE DATA
+# ==========================================
+
+@router.get("/reference")
+async def reference_stats() -> Dict[str, Any]:
+    """Loaded reference data version, sizes and last load time"""
+    return reference_data.stats()
+
+@router.post("/reference/reload")
+async def reload_reference(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Reload reference data now, e.g. after editing the collections directly"""
+    await reference_data.changed(db)
+    return reference_data.stats()
+
+@router.get("/bookings")
+async def booking_stats() -> Dict[str, Any]:
+    """Size of the hearing booking index and how many checks found a clash on this worker"""
+    return hearing_bookings.stats()
+
+@router.get("/analytics")
+async def analytics_stats() -> Dict[str, Any]:
+    """Size, age and refresh timings of this worker's analytics snapshot"""
+    return case_analytics.stats()
+
+@router.post("/analytics/rebuild")
+async def rebuild_analytics(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Rebuild the analytics snapshot from scratch now"""
+    if not settings.analytics_enabled:
+        raise HTTPException(status_code=400, detail="Analytics is disabled")
+    await case_analytics.build(db)
+    return case_analytics.stats()
+
+@router.get("/compression")
+async def compression_stats() -> Dict[str, Any]:
+    """Cached case responses on this worker: size, hits, 304s and invalidations"""
+    return response_cache.stats()
+
+@router.get("/duplicates")
+async def duplicate_stats() -> Dict[str, Any]:
+    """Last duplicate case scan on this worker and the case number backfill"""
+    return duplicate_finder.stats()
+
+@router.post("/duplicates/scan")
+async def scan_duplicates(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Backfill missing normalized case numbers and scan for duplicate cases now"""
+    await duplicate_finder.backfill(db)
+    return await duplicate_finder.scan(db)
+
+@router.get("/backup")
+async def backup_stats(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """This worker's change log writer, and the snapshots, segments and gaps on disk"""
+    directory = backup_directory(db)
+    segments = list_segments(directory) if directory.exists() else []
+    snapshots = list_snapshots(directory) if directory.exists() else []
+    return {
+        "enabled": settings.backup_enabled,
+        "writer": change_log.stats(),
+        "snapshots": [{"name": s.path.name, "started": s.started, "finished": s.finished,
+                       "bytes": s.path.stat().st_size} for s in snapshots],
+        "segments": len(segments),
+        "segment_bytes": sum(s.path.stat().st_size for s in segments),
+        "log_from": segments[0].first if segments else None,
+        "gaps": [{"from": g.first, "to": g.last} for g in list_gaps(directory)] if directory.exists() else [],
+    }
+
+@router.post("/backup/snapshot")
+async def backup_snapshot(db: AsyncIOMotorDatabase = Depends(get_database)) -> Dict[str, Any]:
+    """Take a base snapshot now"""
+    if not settings.backup_enabled:
+        raise HTTPException(status_code=400, detail="Backup is disabled")
+    await change_log.flush()
+    snapshot = await change_log.snapshot(db)
+    return {"name": snapshot.path.name, "started": snapshot.started, "finished": snapshot.finished,
+            "bytes": snapshot.path.stat().st_size}
+
+@router.get("/idempotency")
+async def idempotency_stats() -> Dict[str, Any]:
+    """Idempotency-Key front cache size and how retries were answered on this worker"""
+    return idempotency_store.stats()
+
+@router.get("/admission")
+async def admission_stats() -> Dict[str, Any]:
+    """Current admission limits, queue depths and shed counts per route class on this worker"""
+    return admission_controller.stats()
+
+@router.get("/startup")
+async def startup_stats(request: Request) -> Dict[str, Any]:
+    """How long this worker took to start, per phase, and the modules it imported lazily since"""
+    return {**getattr(request.app.state, "startup", {}), "lazy_imports_ms": lazy_loads()}
+
+@router.get("/tenants")
+async def tenant_stats() -> Dict[str, Any]:
+    """Tenants active on this worker with their request metrics, and the per-cluster clients"""
+    return {**tenant_registry.stats(), "clients": tenant_clients.stats()}
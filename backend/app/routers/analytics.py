@@ -0,0 +1,126 @@
+# app/routers/analytics.py
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional, Any, Dict, Callable
+from datetime import date, datetime
+import math
+import time
+from ..core.analytics import case_analytics, AnalyticsSnapshot, AnalyticsUnavailable, GROUP_FIELDS, GROUP_NAMES
+from ..core.reference import reference_data
+from ..core.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=ProfiledRoute)
+
+# Statistics come from the in-memory columnar snapshot (app/core/analytics.py),
+# refreshed in the background; MongoDB is not queried per request
+
+BY_DESCRIPTION = f"Group by one of: {', '.join(GROUP_FIELDS)}"
+
+_EPOCH = date(1970, 1, 1)
+
+def _days(value: Optional[date]) -> Optional[int]:
+    return (value - _EPOCH).days if value else None
+
+def _number(value: Any, digits: int = 1) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+def _report(by: str, filed_from: Optional[date], filed_to: Optional[date],
+            compute: Callable[[AnalyticsSnapshot, Any], Any],
+            row: Callable[[Dict[str, Any], int], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run one grouped statistic over the snapshot; groups are listed largest first"""
+    if by not in GROUP_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown group field: {by}")
+    try:
+        snapshot = case_analytics.snapshot
+    except AnalyticsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    started = time.perf_counter()
+    mask = snapshot.case_mask(_days(filed_from), _days(filed_to))
+    keys, stats = compute(snapshot, mask)
+    groups = []
+    for i, key in enumerate(keys):
+        values = row(stats, i)
+        if not values["cases"]:
+            continue
+        group: Dict[str, Any] = {by: key}
+        if by in GROUP_NAMES and key is not None:
+            group[GROUP_NAMES[by]] = reference_data.names({by: key})[GROUP_NAMES[by]]
+        groups.append({**group, **values})
+    groups.sort(key=lambda g: -g["cases"])
+    return {
+        "by": by,
+        "groups": groups,
+        "as_of": snapshot.refreshed_at,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+# ==========================================
+# PENDENCY
+# ==========================================
+
+@router.get("/pendency")
+async def pendency(
+    by: str = Query("court_type", description=BY_DESCRIPTION),
+    filed_from: Optional[date] = Query(None),
+    filed_to: Optional[date] = Query(None),
+) -> Dict[str, Any]:
+    """Pending and disposed cases per group, with the age of pending cases in days"""
+    today = (datetime.utcnow().date() - _EPOCH).days
+
+    def row(stats: Dict[str, Any], i: int) -> Dict[str, Any]:
+        return {
+            "cases": int(stats["pending"][i] + stats["disposed"][i]),
+            "pending": int(stats["pending"][i]),
+            "disposed": int(stats["disposed"][i]),
+            "median_pending_days": _number(stats["median"][i]),
+            "mean_pending_days": _number(stats["mean"][i]),
+            "p90_pending_days": _number(stats["p90"][i]),
+        }
+
+    return _report(by, filed_from, filed_to, lambda s, mask: s.pendency(by, mask, today), row)
+
+# ==========================================
+# DISPOSAL
+# ==========================================
+
+@router.get("/disposal")
+async def disposal(
+    by: str = Query("court_type", description=BY_DESCRIPTION),
+    filed_from: Optional[date] = Query(None),
+    filed_to: Optional[date] = Query(None),
+) -> Dict[str, Any]:
+    """Days from filing to disposal of disposed cases per group"""
+    def row(stats: Dict[str, Any], i: int) -> Dict[str, Any]:
+        return {
+            "cases": int(stats["count"][i]),
+            "median_days": _number(stats["median"][i]),
+            "mean_days": _number(stats["mean"][i]),
+            "p90_days": _number(stats["p90"][i]),
+        }
+
+    return _report(by, filed_from, filed_to, lambda s, mask: s.disposal(by, mask), row)
+
+# ==========================================
+# HEARINGS
+# ==========================================
+
+@router.get("/hearings")
+async def hearings(
+    by: str = Query("court_type", description=BY_DESCRIPTION),
+    filed_from: Optional[date] = Query(None),
+    filed_to: Optional[date] = Query(None),
+) -> Dict[str, Any]:
+    """Hearings per case and the share of hearings that were adjournments, per group"""
+    def row(stats: Dict[str, Any], i: int) -> Dict[str, Any]:
+        hearings = int(stats["hearings"][i])
+        adjourned = int(stats["adjourned"][i])
+        return {
+            "cases": int(stats["count"][i]),
+            "hearings": hearings,
+            "mean_hearings_per_case": _number(stats["mean"][i], 2),
+            "median_hearings_per_case": _number(stats["median"][i]),
+            "adjourned": adjourned,
+            "adjournment_rate": round(adjourned / hearings, 4) if hearings else None,
+        }
+
+    return _report(by, filed_from, filed_to, lambda s, mask: s.hearing_counts(by, mask), row)
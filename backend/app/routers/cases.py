@@ -1,31 +1,73 @@
 # app/routers/cases.py
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional, Any, Dict
-from datetime import datetime, date
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Any, Dict, FrozenSet, NamedTuple, Set, Tuple
+from datetime import datetime, date, time, timedelta
 from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..db.mongo import get_database
+from ..core.archive import load_archived_case
+from ..core.bookings import hearing_bookings
+from ..core.config import settings
+from ..core.duplicates import normalize_case_number
+from ..core.events import change_feed, update_changes
+from ..core.profiling import profile_phase, ProfiledJSONResponse, ProfiledRoute
+from ..core.reference import reference_data, InvalidReference
+from ..core.sync import record_tombstones, tombstone
+from ..db.mongo import bulk_write_collections, get_database
+from ..db.repositories import CASE_SECTIONS, CaseRepository, get_case_repository
+from ..models.paging import (
+    CURSOR_DESCRIPTION, NDJSON_MEDIA_TYPE,
+    decode_cursor, encode_cursor, keyset_query, ndjson_stream, sort_spec
+)
+from ..models.projection import parse_fields, mongo_projection, projected_content, projected_response
+from ..models.rawjson import RAW_CODEC_OPTIONS, raw_json_response
 from ..models.schemas import (
-    CaseCreate, CaseUpdate, CaseOut, CaseDetailOut,
+    CaseStatus, CaseCreate, CaseUpdate, CaseOut, CaseDetailOut,
     CasePartyCreate, CasePartyUpdate, CasePartyOut,
     CaseHearingCreate, CaseHearingUpdate, CaseHearingOut,
     CaseDocumentCreate, CaseDocumentUpdate, CaseDocumentOut,
     CaseNoteCreate, CaseNoteUpdate, CaseNoteOut,
-    CaseTaskCreate, CaseTaskUpdate, CaseTaskOut
+    CaseTaskCreate, CaseTaskUpdate, CaseTaskOut,
+    BatchGetRequest, CaseBatchOut, CaseHearingBatchOut, CaseTaskBatchOut,
+    CaseBatchOp, CaseBatchRequest, CaseBatchWriteOut
 )
 
-router = APIRouter(prefix="/cases", tags=["cases"])
+router = APIRouter(prefix="/cases", tags=["cases"], route_class=ProfiledRoute)
+
+FIELDS_DESCRIPTION = "Comma separated list of fields to return (id is always included)"
+LIMIT_DESCRIPTION = "Page size (default settings.list_default_limit); with NDJSON, caps the stream"
+SECTION_LIMIT_DESCRIPTION = "Most recent items to embed per section"
+EXPAND_NAMES_DESCRIPTION = "Add court_name, category_name and subcategory_name"
+ALLOW_CONFLICT_DESCRIPTION = "Save even if the lawyer is booked in another courtroom at that time"
+
+# Case fields resolved by reference data
+REFERENCE_FIELDS = ("court_name_id", "category_id", "subcategory_id")
+
+# Most ids accepted by one batch-get request
+BATCH_GET_MAX = 200
 
 # Helper to convert ObjectId instances to strings recursively
-def _convert_objectid(obj: Any) -> Any:
+def _convert(obj: Any) -> Any:
     if isinstance(obj, ObjectId):
         return str(obj)
     if isinstance(obj, dict):
-        return {k: _convert_objectid(v) for k, v in obj.items()}
+        return {k: _convert(v) for k, v in obj.items()}
     if isinstance(obj, list):
-        return [_convert_objectid(v) for v in obj]
+        return [_convert(v) for v in obj]
     return obj
 
+@profile_phase("conversion")
+def _convert_objectid(obj: Any) -> Any:
+    return _convert(obj)
+
+# Read handle returning RawBSONDocument, for the raw_bson_responses fast path
+def _raw(collection: Any) -> Any:
+    return collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+
 # Helper to serialize document for MongoDB (convert dates, enums, etc.)
 def _serialize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Convert Pydantic model dict to MongoDB-compatible format"""
@@ -36,6 +78,9 @@ def _serialize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
         elif isinstance(value, date) and not isinstance(value, datetime):
             # Convert date to datetime at midnight UTC
             serialized[key] = datetime.combine(value, datetime.min.time())
+        elif isinstance(value, time):
+            # Times of day are kept as "HH:MM"
+            serialized[key] = value.strftime("%H:%M")
         elif hasattr(value, "value"):
             # Convert Enum to its value
             serialized[key] = value.value
@@ -43,6 +88,171 @@ def _serialize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
             serialized[key] = value
     return serialized
 
+def _check_references(values: Dict[str, Any], partial: bool = False) -> Dict[str, Any]:
+    """Validate court/category ids against the reference data snapshot (no DB round trip)"""
+    try:
+        return reference_data.check_case(values, partial)
+    except InvalidReference as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _case_projection(selected: Optional[FrozenSet[str]], expand_names: bool,
+                     exclude: FrozenSet[str] = frozenset()) -> Optional[Dict[str, Any]]:
+    if not selected:
+        return None
+    projection = mongo_projection(selected, exclude=exclude)
+    if expand_names:
+        projection.update({name: 1 for name in REFERENCE_FIELDS})
+    return projection
+
+def _encode_cases(model: Any, selected: Optional[FrozenSet[str]], data: Any, expand_names: bool) -> Any:
+    """Encoded case(s), with reference display names added when asked for"""
+    many = isinstance(data, list)
+    if selected:
+        content = projected_content(model, selected, data)
+    else:
+        content = jsonable_encoder([model(**item) for item in data] if many else model(**data), by_alias=True)
+    if expand_names:
+        for out, case in (zip(content, data) if many else [(content, data)]):
+            out.update(reference_data.names(case))
+    return content
+
+def _archived_case_detail(bundle: Dict[str, Any], selected: Optional[FrozenSet[str]],
+                          section_limit: Optional[int] = None, expand_names: bool = False) -> Any:
+    """get_case response built from an archived case bundle"""
+    case_detail = _convert_objectid(bundle["case"])
+    for section, (collection, sort_field) in CASE_SECTIONS.items():
+        if selected and section not in selected:
+            continue
+        items = bundle.get(collection) or []
+        if sort_field:
+            items = sorted(items, key=lambda item: (item.get(sort_field) is not None, item.get(sort_field) or 0), reverse=True)
+        case_detail[section] = [_convert_objectid(item) for item in items[:section_limit]]
+    if selected or expand_names:
+        return ProfiledJSONResponse(content=_encode_cases(CaseDetailOut, selected, case_detail, expand_names))
+    return case_detail
+
+async def _child_list(
+    request: Request,
+    response: Response,
+    collection: Any,
+    query: Dict[str, Any],
+    model: Any,
+    selected: Optional[FrozenSet[str]],
+    sort_field: str,
+    direction: int,
+    limit: Optional[int],
+    cursor: Optional[str],
+) -> Any:
+    """
+    One keyset page of a child list, sorted by (sort_field, _id). The cursor
+    for the next page goes in X-Next-Cursor. Callers accepting
+    application/x-ndjson get every matching document (up to ``limit``)
+    streamed in batches instead.
+    """
+    if cursor:
+        query = keyset_query(query, sort_field, direction, decode_cursor(cursor, sort_field))
+    projection = mongo_projection(selected) if selected else None
+    if projection is not None and sort_field != "_id":
+        # Needed to build the next cursor
+        projection[sort_field] = 1
+    source = _raw(collection) if settings.raw_bson_responses else collection
+    order = sort_spec(sort_field, direction)
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        find = source.find(query, projection).sort(order)
+        if limit:
+            find = find.limit(limit)
+        stream = ndjson_stream(find, model, selected, _convert_objectid,
+                               settings.stream_batch_size, settings.raw_bson_responses)
+        return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
+
+    size = limit or settings.list_default_limit
+    docs = await source.find(query, projection).sort(order).limit(size + 1).to_list(None)
+    next_cursor = None
+    if len(docs) > size:
+        docs = docs[:size]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    if settings.raw_bson_responses:
+        result = raw_json_response(docs, model, selected, _convert_objectid)
+    else:
+        items = [_convert_objectid(doc) for doc in docs]
+        result = projected_response(model, selected, items) if selected else items
+    if next_cursor:
+        (result if isinstance(result, Response) else response).headers["X-Next-Cursor"] = next_cursor
+    return result
+
+def _batch_ids(ids: List[str]) -> List[ObjectId]:
+    """Request ids as ObjectIds, duplicates dropped, order kept"""
+    if len(ids) > BATCH_GET_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX} ids per request")
+    oids: List[ObjectId] = []
+    for id in ids:
+        try:
+            oid = ObjectId(id)
+        except:
+            raise HTTPException(status_code=400, detail=f"Invalid id format: {id}")
+        if oid not in oids:
+            oids.append(oid)
+    return oids
+
+def _batch_result(oids: List[ObjectId], found: Dict[ObjectId, Any], model: Any,
+                  selected: Optional[FrozenSet[str]], expand_names: bool = False) -> Any:
+    """Found documents in request order plus the missing ids"""
+    items = [found[oid] for oid in oids if oid in found]
+    missing = [str(oid) for oid in oids if oid not in found]
+    if selected or expand_names:
+        return ProfiledJSONResponse(content={"items": _encode_cases(model, selected, items, expand_names), "missing": missing})
+    return {"items": items, "missing": missing}
+
+async def _batch_get_records(collection: Any, ids: List[str], model: Any, fields: Optional[str]) -> Any:
+    selected = parse_fields(fields, model)
+    oids = _batch_ids(ids)
+    projection = mongo_projection(selected) if selected else None
+    found = {}
+    async for doc in collection.find({"_id": {"$in": oids}}, projection):
+        found[doc["_id"]] = _convert_objectid(doc)
+    return _batch_result(oids, found, model, selected)
+
+# Hearing fields that decide a lawyer's booking (app/core/bookings.py)
+BOOKING_FIELDS = ("assigned_lawyer_id", "hearing_date", "start_time", "end_time", "courtroom")
+
+def _check_booking(hearing: Dict[str, Any], allow_conflict: bool) -> None:
+    """409 when the hearing books its lawyer into another courtroom at the same time"""
+    start, end = hearing.get("start_time"), hearing.get("end_time")
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if allow_conflict:
+        return
+    conflicts = hearing_bookings.conflicts(hearing)
+    if conflicts:
+        raise HTTPException(status_code=409, detail={
+            "message": "Lawyer is booked in another courtroom at that time",
+            "conflicts": jsonable_encoder([b.out() for b in conflicts]),
+        })
+
+# Case fields that decide the unique case number key (app/core/duplicates.py)
+CASE_NUMBER_FIELDS = ("case_number", "court_type", "court_name_id")
+
+def _case_number_update(update_data: Dict[str, Any], case: Dict[str, Any]) -> Dict[str, Any]:
+    """Update document that also sets case_number_norm for the case as updated (or drops it)"""
+    norm = normalize_case_number(case.get("case_number"), case.get("court_type"))
+    if norm is None:
+        return {"$set": update_data, "$unset": {"case_number_norm": ""}}
+    return {"$set": {**update_data, "case_number_norm": norm}}
+
+async def _duplicate_case_number(db: AsyncIOMotorDatabase, case: Dict[str, Any]) -> HTTPException:
+    """409 naming the case already filed in the court under the same normalized number"""
+    existing = await db.cases.find_one({
+        "court_type": case.get("court_type"),
+        "court_name_id": case.get("court_name_id"),
+        "case_number_norm": normalize_case_number(case.get("case_number"), case.get("court_type")),
+    }, {"_id": 1})
+    return HTTPException(status_code=409, detail={
+        "message": "A case with this number already exists in this court",
+        "case_id": str(existing["_id"]) if existing else None,
+    })
+
 # ==========================================
 # CASES CRUD
 # ==========================================
@@ -54,19 +264,29 @@ async def create_case(payload: CaseCreate, db: AsyncIOMotorDatabase = Depends(ge
     
     case_data = payload.dict()
     case_data = _serialize_document(case_data)
+    _check_references(case_data)
     
     case_doc = {
         **case_data,
         "created_at": now,
         "updated_at": now
     }
+    if case_doc.get("status") == CaseStatus.DISPOSED.value:
+        case_doc["disposed_at"] = now
+    norm = normalize_case_number(case_doc.get("case_number"), case_doc.get("court_type"))
+    if norm is not None:
+        case_doc["case_number_norm"] = norm
     
-    result = await db.cases.insert_one(case_doc)
+    try:
+        result = await db.cases.insert_one(case_doc)
+    except DuplicateKeyError:
+        raise await _duplicate_case_number(db, case_doc)
     created = await db.cases.find_one({"_id": result.inserted_id})
     
     if not created:
         raise HTTPException(status_code=500, detail="Failed to create case")
     
+    change_feed.record("cases", "insert", created["_id"], created["_id"], created)
     return _convert_objectid(created)
 
 @router.get("/", response_model=List[CaseOut])
@@ -77,9 +297,12 @@ async def list_cases(
     client_id: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand_names: bool = Query(False, description=EXPAND_NAMES_DESCRIPTION),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """List all cases with optional filtering"""
+    selected = parse_fields(fields, CaseOut)
     query: Dict[str, Any] = {}
     
     if status:
@@ -97,53 +320,144 @@ async def list_cases(
         except:
             raise HTTPException(status_code=400, detail="Invalid client_id format")
     
-    cursor = db.cases.find(query).sort("filing_date", -1).skip(skip).limit(limit)
+    projection = _case_projection(selected, expand_names)
+    if settings.raw_bson_responses and not expand_names:
+        cursor = _raw(db.cases).find(query, projection).sort("filing_date", -1).skip(skip).limit(limit)
+        return raw_json_response(await cursor.to_list(None), CaseOut, selected, _convert_objectid)
+    cursor = db.cases.find(query, projection).sort("filing_date", -1).skip(skip).limit(limit)
     items = []
     async for doc in cursor:
         items.append(_convert_objectid(doc))
     
+    if selected or expand_names:
+        return ProfiledJSONResponse(content=_encode_cases(CaseOut, selected, items, expand_names))
     return items
 
+# ==========================================
+# BATCH READS
+# ==========================================
+
+@router.post("/batch-get", response_model=CaseBatchOut)
+async def batch_get_cases(
+    payload: BatchGetRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    section_limit: Optional[int] = Query(None, ge=1, description=SECTION_LIMIT_DESCRIPTION),
+    expand_names: bool = Query(False, description=EXPAND_NAMES_DESCRIPTION),
+    cases: CaseRepository = Depends(get_case_repository)
+):
+    """Get several cases with their related data, in request order"""
+    selected = parse_fields(fields, CaseDetailOut)
+    oids = _batch_ids(payload.ids)
+
+    projection = _case_projection(selected, expand_names, exclude=frozenset(CASE_SECTIONS))
+    found: Dict[ObjectId, Any] = {oid: _convert_objectid(case) for oid, case in (await cases.get_many(oids, projection)).items()}
+    case_oids = [oid for oid in oids if oid in found]
+
+    # One query per section for all cases, not one per case
+    names = [section for section in CASE_SECTIONS if not selected or section in selected]
+    for oid, sections in (await cases.sections(case_oids, names, section_limit)).items():
+        found[oid].update(_convert_objectid(sections))
+
+    return _batch_result(oids, found, CaseDetailOut, selected, expand_names)
+
+@router.post("/hearings/batch-get", response_model=CaseHearingBatchOut)
+async def batch_get_hearings(
+    payload: BatchGetRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get hearings by id, in request order"""
+    return await _batch_get_records(db.case_hearings, payload.ids, CaseHearingOut, fields)
+
+@router.post("/tasks/batch-get", response_model=CaseTaskBatchOut)
+async def batch_get_tasks(
+    payload: BatchGetRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get tasks by id, in request order"""
+    return await _batch_get_records(db.case_tasks, payload.ids, CaseTaskOut, fields)
+
+@router.get("/hearings/conflicts")
+async def list_hearing_conflicts(
+    date_from: Optional[date] = Query(None, description="First day to check (default today)"),
+    date_to: Optional[date] = Query(None, description="Last day to check (default date_from + 30 days)"),
+    lawyer_id: Optional[str] = Query(None),
+) -> Dict[str, Any]:
+    """Lawyers booked into different courtrooms at overlapping times, from the in-memory booking index"""
+    start = date_from or datetime.utcnow().date()
+    end = date_to or start + timedelta(days=30)
+    if end < start:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    groups = hearing_bookings.conflicts_between(datetime.combine(start, time.min),
+                                                datetime.combine(end + timedelta(days=1), time.min), lawyer_id)
+    return {
+        "date_from": start,
+        "date_to": end,
+        "conflicts": [{"lawyer_id": lawyer, "hearings": [b.out() for b in bookings]} for lawyer, bookings in groups],
+    }
+
+@router.get("/duplicates")
+async def list_duplicate_cases(
+    min_score: float = Query(0.0, ge=0.0, le=1.0, description="Lowest score to list (the scan keeps pairs from settings.duplicate_min_score)"),
+    court_name_id: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> Dict[str, Any]:
+    """Likely duplicate cases found by the last background scan (app/core/duplicates.py), best match first"""
+    query: Dict[str, Any] = {"score": {"$gte": min_score}}
+    if court_name_id:
+        query["court_name_id"] = court_name_id
+    pairs = await db.case_duplicates.find(query).sort([("score", -1), ("_id", 1)]).limit(limit).to_list(None)
+    case_ids = list({id for pair in pairs for id in pair["case_ids"]})
+    cases = {}
+    async for doc in db.cases.find({"_id": {"$in": case_ids}}, {"case_number": 1, "case_title": 1, "status": 1, "filing_date": 1}):
+        cases[doc["_id"]] = doc
+    items = []
+    for pair in pairs:
+        # Cases deleted or archived since the scan drop out
+        if not all(id in cases for id in pair["case_ids"]):
+            continue
+        items.append({
+            **{k: v for k, v in pair.items() if k not in ("_id", "case_ids")},
+            "cases": [_convert_objectid(cases[id]) for id in pair["case_ids"]],
+        })
+    return {"items": _convert_objectid(items)}
+
 @router.get("/{case_id}", response_model=CaseDetailOut)
-async def get_case(case_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+async def get_case(
+    case_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description="Also look in the case archive"),
+    section_limit: Optional[int] = Query(None, ge=1, description=SECTION_LIMIT_DESCRIPTION),
+    expand_names: bool = Query(False, description=EXPAND_NAMES_DESCRIPTION),
+    cases: CaseRepository = Depends(get_case_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
     """Get case details with all related data"""
+    selected = parse_fields(fields, CaseDetailOut)
     try:
         oid = ObjectId(case_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid case_id format")
     
-    case = await db.cases.find_one({"_id": oid})
+    projection = _case_projection(selected, expand_names, exclude=frozenset(CASE_SECTIONS))
+    case = await cases.get(oid, projection)
+    if not case and include_archived:
+        bundle = await load_archived_case(db, oid)
+        if bundle:
+            return _archived_case_detail(bundle, selected, section_limit, expand_names)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
-    # Fetch related data
-    parties = []
-    async for party in db.case_parties.find({"case_id": oid}):
-        parties.append(_convert_objectid(party))
-    
-    hearings = []
-    async for hearing in db.case_hearings.find({"case_id": oid}).sort("hearing_date", -1):
-        hearings.append(_convert_objectid(hearing))
-    
-    documents = []
-    async for doc in db.case_documents.find({"case_id": oid}).sort("uploaded_at", -1):
-        documents.append(_convert_objectid(doc))
-    
-    notes = []
-    async for note in db.case_notes.find({"case_id": oid}).sort("created_at", -1):
-        notes.append(_convert_objectid(note))
-    
-    tasks = []
-    async for task in db.case_tasks.find({"case_id": oid}).sort("created_at", -1):
-        tasks.append(_convert_objectid(task))
-    
     case_detail = _convert_objectid(case)
-    case_detail["parties"] = parties
-    case_detail["hearings"] = hearings
-    case_detail["documents"] = documents
-    case_detail["notes"] = notes
-    case_detail["tasks"] = tasks
     
+    # Fetch related data, skipping sections that were not requested
+    names = [section for section in CASE_SECTIONS if not selected or section in selected]
+    case_detail.update(_convert_objectid((await cases.sections([oid], names, section_limit))[oid]))
+    
+    if selected or expand_names:
+        return ProfiledJSONResponse(content=_encode_cases(CaseDetailOut, selected, case_detail, expand_names))
     return case_detail
 
 @router.patch("/{case_id}", response_model=CaseOut)
@@ -160,18 +474,43 @@ async def update_case(
     
     update_data = {k: v for k, v in payload.dict(exclude_unset=True).items()}
     update_data = _serialize_document(update_data)
+    # Ids the payload leaves out must still fit the ones it changes
+    conditions = _check_references(update_data, partial=True)
     update_data["updated_at"] = datetime.utcnow()
+    if update_data.get("status") == CaseStatus.ACTIVE.value:
+        update_data["disposed_at"] = None
+    update: Dict[str, Any] = {"$set": update_data}
+    if "case_number" in update_data or "court_type" in update_data:
+        # The normalized number needs both fields
+        current = await db.cases.find_one({"_id": oid}, {name: 1 for name in CASE_NUMBER_FIELDS})
+        if not current:
+            raise HTTPException(status_code=404, detail="Case not found")
+        update = _case_number_update(update_data, {**current, **update_data})
     
-    result = await db.cases.update_one({"_id": oid}, {"$set": update_data})
+    try:
+        result = await db.cases.update_one({"_id": oid, **conditions}, update)
+    except DuplicateKeyError:
+        current = await db.cases.find_one({"_id": oid}, {name: 1 for name in CASE_NUMBER_FIELDS})
+        raise await _duplicate_case_number(db, {**(current or {}), **update_data})
     
     if result.matched_count == 0:
+        if conditions and await db.cases.find_one({"_id": oid}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail=f"Update does not fit the case's {', '.join(sorted(conditions))}")
         raise HTTPException(status_code=404, detail="Case not found")
+    changes = update_changes(update)
+    if update_data.get("status") == CaseStatus.DISPOSED.value:
+        # Disposal time for analytics; kept when an already disposed case is patched again
+        disposed = await db.cases.update_one({"_id": oid, "disposed_at": None}, {"$set": {"disposed_at": update_data["updated_at"]}})
+        if disposed.modified_count:
+            changes["set"]["disposed_at"] = update_data["updated_at"]
     
     case = await db.cases.find_one({"_id": oid})
+    change_feed.record("cases", "update", oid, oid, case, changes)
     return _convert_objectid(case)
 
 @router.delete("/{case_id}", status_code=204)
-async def delete_case(case_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+async def delete_case(case_id: str, cases: CaseRepository = Depends(get_case_repository),
+                      db: AsyncIOMotorDatabase = Depends(get_database)):
     """Delete a case and all related data"""
     try:
         oid = ObjectId(case_id)
@@ -179,12 +518,14 @@ async def delete_case(case_id: str, db: AsyncIOMotorDatabase = Depends(get_datab
         raise HTTPException(status_code=400, detail="Invalid case_id format")
     
     # Delete case and all related documents
-    await db.cases.delete_one({"_id": oid})
-    await db.case_parties.delete_many({"case_id": oid})
-    await db.case_hearings.delete_many({"case_id": oid})
-    await db.case_documents.delete_many({"case_id": oid})
-    await db.case_notes.delete_many({"case_id": oid})
-    await db.case_tasks.delete_many({"case_id": oid})
+    deleted, removed = await cases.delete(oid)
+    for collection, child_ids in removed.items():
+        for child_id in child_ids:
+            change_feed.record(collection, "delete", child_id, oid)
+    if deleted:
+        # One tombstone covers the case and its related records
+        await record_tombstones(db, "cases", [oid], oid)
+        change_feed.record("cases", "delete", oid, oid)
     
     return
 
@@ -212,30 +553,39 @@ async def add_party(
     party_data = payload.dict()
     party_data = _serialize_document(party_data)
     
+    now = datetime.utcnow()
     party_doc = {
         **party_data,
         "case_id": oid,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
     
     result = await db.case_parties.insert_one(party_doc)
     created = await db.case_parties.find_one({"_id": result.inserted_id})
+    change_feed.record("case_parties", "insert", created["_id"], oid, created)
     
     return _convert_objectid(created)
 
 @router.get("/{case_id}/parties", response_model=List[CasePartyOut])
-async def list_parties(case_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
-    """List all parties for a case"""
+async def list_parties(
+    case_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """List the parties of a case, oldest first"""
+    selected = parse_fields(fields, CasePartyOut)
     try:
         oid = ObjectId(case_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid case_id format")
     
-    parties = []
-    async for party in db.case_parties.find({"case_id": oid}):
-        parties.append(_convert_objectid(party))
-    
-    return parties
+    return await _child_list(request, response, db.case_parties, {"case_id": oid},
+                             CasePartyOut, selected, "_id", 1, limit, cursor)
 
 @router.patch("/{case_id}/parties/{party_id}", response_model=CasePartyOut)
 async def update_party(
@@ -253,6 +603,7 @@ async def update_party(
     
     update_data = {k: v for k, v in payload.dict(exclude_unset=True).items()}
     update_data = _serialize_document(update_data)
+    update_data["updated_at"] = datetime.utcnow()
     
     result = await db.case_parties.update_one(
         {"_id": party_oid, "case_id": case_oid},
@@ -263,6 +614,7 @@ async def update_party(
         raise HTTPException(status_code=404, detail="Party not found")
     
     party = await db.case_parties.find_one({"_id": party_oid})
+    change_feed.record("case_parties", "update", party_oid, case_oid, party, update_changes({"$set": update_data}))
     return _convert_objectid(party)
 
 @router.delete("/{case_id}/parties/{party_id}", status_code=204)
@@ -283,6 +635,8 @@ async def delete_party(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Party not found")
     
+    await record_tombstones(db, "case_parties", [party_oid], case_oid)
+    change_feed.record("case_parties", "delete", party_oid, case_oid)
     return
 
 # ==========================================
@@ -293,9 +647,10 @@ async def delete_party(
 async def add_hearing(
     case_id: str,
     payload: CaseHearingCreate,
+    allow_conflict: bool = Query(False, description=ALLOW_CONFLICT_DESCRIPTION),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Add a hearing to a case"""
+    """Add a hearing to a case; 409 if its lawyer is booked in another courtroom at that time"""
     try:
         oid = ObjectId(case_id)
     except:
@@ -309,13 +664,24 @@ async def add_hearing(
     hearing_data = payload.dict()
     hearing_data = _serialize_document(hearing_data)
     
+    now = datetime.utcnow()
     hearing_doc = {
+        "_id": ObjectId(),
         **hearing_data,
         "case_id": oid,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
+    await hearing_bookings.sync_days(db, [(hearing_doc.get("assigned_lawyer_id"), hearing_doc.get("hearing_date"))])
+    _check_booking(hearing_doc, allow_conflict)
+    # Hold the slot before the insert so a concurrent request sees it
+    hearing_bookings.put(hearing_doc)
     
-    result = await db.case_hearings.insert_one(hearing_doc)
+    try:
+        result = await db.case_hearings.insert_one(hearing_doc)
+    except Exception:
+        hearing_bookings.remove(hearing_doc["_id"])
+        raise
     
     # Update case with next hearing date
     if payload.next_hearing_date:
@@ -325,30 +691,38 @@ async def add_hearing(
         )
     
     created = await db.case_hearings.find_one({"_id": result.inserted_id})
+    change_feed.record("case_hearings", "insert", created["_id"], oid, created)
     return _convert_objectid(created)
 
 @router.get("/{case_id}/hearings", response_model=List[CaseHearingOut])
-async def list_hearings(case_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
-    """List all hearings for a case"""
+async def list_hearings(
+    case_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """List the hearings of a case, latest first"""
+    selected = parse_fields(fields, CaseHearingOut)
     try:
         oid = ObjectId(case_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid case_id format")
     
-    hearings = []
-    async for hearing in db.case_hearings.find({"case_id": oid}).sort("hearing_date", -1):
-        hearings.append(_convert_objectid(hearing))
-    
-    return hearings
+    return await _child_list(request, response, db.case_hearings, {"case_id": oid},
+                             CaseHearingOut, selected, "hearing_date", -1, limit, cursor)
 
 @router.patch("/{case_id}/hearings/{hearing_id}", response_model=CaseHearingOut)
 async def update_hearing(
     case_id: str,
     hearing_id: str,
     payload: CaseHearingUpdate,
+    allow_conflict: bool = Query(False, description=ALLOW_CONFLICT_DESCRIPTION),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Update a hearing"""
+    """Update a hearing; 409 if the new time books its lawyer in another courtroom"""
     try:
         case_oid = ObjectId(case_id)
         hearing_oid = ObjectId(hearing_id)
@@ -357,16 +731,34 @@ async def update_hearing(
     
     update_data = {k: v for k, v in payload.dict(exclude_unset=True).items()}
     update_data = _serialize_document(update_data)
+    update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.case_hearings.update_one(
-        {"_id": hearing_oid, "case_id": case_oid},
-        {"$set": update_data}
-    )
+    current = None
+    if any(field in update_data for field in BOOKING_FIELDS):
+        current = await db.case_hearings.find_one({"_id": hearing_oid, "case_id": case_oid})
+        if not current:
+            raise HTTPException(status_code=404, detail="Hearing not found")
+        hearing = {**current, **update_data}
+        await hearing_bookings.sync_days(db, [(hearing.get("assigned_lawyer_id"), hearing.get("hearing_date"))])
+        _check_booking(hearing, allow_conflict)
+        hearing_bookings.put(hearing)
+    
+    try:
+        result = await db.case_hearings.update_one(
+            {"_id": hearing_oid, "case_id": case_oid},
+            {"$set": update_data}
+        )
+    except Exception:
+        if current:
+            hearing_bookings.put(current)
+        raise
     
     if result.matched_count == 0:
+        hearing_bookings.remove(hearing_oid)
         raise HTTPException(status_code=404, detail="Hearing not found")
     
     hearing = await db.case_hearings.find_one({"_id": hearing_oid})
+    change_feed.record("case_hearings", "update", hearing_oid, case_oid, hearing, update_changes({"$set": update_data}))
     return _convert_objectid(hearing)
 
 @router.delete("/{case_id}/hearings/{hearing_id}", status_code=204)
@@ -387,6 +779,8 @@ async def delete_hearing(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Hearing not found")
     
+    await record_tombstones(db, "case_hearings", [hearing_oid], case_oid)
+    change_feed.record("case_hearings", "delete", hearing_oid, case_oid)
     return
 
 # ==========================================
@@ -413,24 +807,33 @@ async def add_document(
     document_data = payload.dict()
     document_data = _serialize_document(document_data)
     
+    now = datetime.utcnow()
     document_doc = {
         **document_data,
         "case_id": oid,
-        "uploaded_at": datetime.utcnow()
+        "uploaded_at": now,
+        "updated_at": now
     }
     
     result = await db.case_documents.insert_one(document_doc)
     created = await db.case_documents.find_one({"_id": result.inserted_id})
+    change_feed.record("case_documents", "insert", created["_id"], oid, created)
     
     return _convert_objectid(created)
 
 @router.get("/{case_id}/documents", response_model=List[CaseDocumentOut])
 async def list_documents(
     case_id: str,
+    request: Request,
+    response: Response,
     category: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """List all documents for a case, optionally filtered by category"""
+    """List the documents of a case, newest first, optionally filtered by category"""
+    selected = parse_fields(fields, CaseDocumentOut)
     try:
         oid = ObjectId(case_id)
     except:
@@ -440,11 +843,8 @@ async def list_documents(
     if category:
         query["category"] = category
     
-    documents = []
-    async for doc in db.case_documents.find(query).sort("uploaded_at", -1):
-        documents.append(_convert_objectid(doc))
-    
-    return documents
+    return await _child_list(request, response, db.case_documents, query,
+                             CaseDocumentOut, selected, "uploaded_at", -1, limit, cursor)
 
 @router.patch("/{case_id}/documents/{document_id}", response_model=CaseDocumentOut)
 async def update_document(
@@ -462,6 +862,7 @@ async def update_document(
     
     update_data = {k: v for k, v in payload.dict(exclude_unset=True).items()}
     update_data = _serialize_document(update_data)
+    update_data["updated_at"] = datetime.utcnow()
     
     result = await db.case_documents.update_one(
         {"_id": document_oid, "case_id": case_oid},
@@ -472,6 +873,7 @@ async def update_document(
         raise HTTPException(status_code=404, detail="Document not found")
     
     document = await db.case_documents.find_one({"_id": document_oid})
+    change_feed.record("case_documents", "update", document_oid, case_oid, document, update_changes({"$set": update_data}))
     return _convert_objectid(document)
 
 @router.delete("/{case_id}/documents/{document_id}", status_code=204)
@@ -492,6 +894,8 @@ async def delete_document(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    await record_tombstones(db, "case_documents", [document_oid], case_oid)
+    change_feed.record("case_documents", "delete", document_oid, case_oid)
     return
 
 # ==========================================
@@ -515,30 +919,39 @@ async def add_note(
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    now = datetime.utcnow()
     note_doc = {
         **payload.dict(),
         "case_id": oid,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
     
     result = await db.case_notes.insert_one(note_doc)
     created = await db.case_notes.find_one({"_id": result.inserted_id})
+    change_feed.record("case_notes", "insert", created["_id"], oid, created)
     
     return _convert_objectid(created)
 
 @router.get("/{case_id}/notes", response_model=List[CaseNoteOut])
-async def list_notes(case_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
-    """List all notes for a case"""
+async def list_notes(
+    case_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """List the notes of a case, newest first"""
+    selected = parse_fields(fields, CaseNoteOut)
     try:
         oid = ObjectId(case_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid case_id format")
     
-    notes = []
-    async for note in db.case_notes.find({"case_id": oid}).sort("created_at", -1):
-        notes.append(_convert_objectid(note))
-    
-    return notes
+    return await _child_list(request, response, db.case_notes, {"case_id": oid},
+                             CaseNoteOut, selected, "created_at", -1, limit, cursor)
 
 @router.patch("/{case_id}/notes/{note_id}", response_model=CaseNoteOut)
 async def update_note(
@@ -566,6 +979,7 @@ async def update_note(
         raise HTTPException(status_code=404, detail="Note not found")
     
     note = await db.case_notes.find_one({"_id": note_oid})
+    change_feed.record("case_notes", "update", note_oid, case_oid, note, update_changes({"$set": update_data}))
     return _convert_objectid(note)
 
 @router.delete("/{case_id}/notes/{note_id}", status_code=204)
@@ -586,6 +1000,8 @@ async def delete_note(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Note not found")
     
+    await record_tombstones(db, "case_notes", [note_oid], case_oid)
+    change_feed.record("case_notes", "delete", note_oid, case_oid)
     return
 
 # ==========================================
@@ -612,25 +1028,34 @@ async def add_task(
     task_data = payload.dict()
     task_data = _serialize_document(task_data)
     
+    now = datetime.utcnow()
     task_doc = {
         **task_data,
         "case_id": oid,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
     
     result = await db.case_tasks.insert_one(task_doc)
     created = await db.case_tasks.find_one({"_id": result.inserted_id})
+    change_feed.record("case_tasks", "insert", created["_id"], oid, created)
     
     return _convert_objectid(created)
 
 @router.get("/{case_id}/tasks", response_model=List[CaseTaskOut])
 async def list_tasks(
     case_id: str,
+    request: Request,
+    response: Response,
     status: Optional[str] = Query(None),
     assigned_to: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """List all tasks for a case, optionally filtered"""
+    """List the tasks of a case by due date (undated first), optionally filtered"""
+    selected = parse_fields(fields, CaseTaskOut)
     try:
         oid = ObjectId(case_id)
     except:
@@ -642,11 +1067,8 @@ async def list_tasks(
     if assigned_to:
         query["assigned_to"] = assigned_to
     
-    tasks = []
-    async for task in db.case_tasks.find(query).sort("due_date", 1):
-        tasks.append(_convert_objectid(task))
-    
-    return tasks
+    return await _child_list(request, response, db.case_tasks, query,
+                             CaseTaskOut, selected, "due_date", 1, limit, cursor)
 
 @router.patch("/{case_id}/tasks/{task_id}", response_model=CaseTaskOut)
 async def update_task(
@@ -675,6 +1097,7 @@ async def update_task(
         raise HTTPException(status_code=404, detail="Task not found")
     
     task = await db.case_tasks.find_one({"_id": task_oid})
+    change_feed.record("case_tasks", "update", task_oid, case_oid, task, update_changes({"$set": update_data}))
     return _convert_objectid(task)
 
 @router.delete("/{case_id}/tasks/{task_id}", status_code=204)
@@ -695,4 +1118,289 @@ async def delete_task(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    await record_tombstones(db, "case_tasks", [task_oid], case_oid)
+    change_feed.record("case_tasks", "delete", task_oid, case_oid)
     return
+
+# ==========================================
+# CASE BATCH WRITES
+# ==========================================
+
+# Most operations accepted by one batch request
+BATCH_WRITE_MAX = 100
+
+# Records written by batch operations add_/update_/delete_<name>: collection, schemas, creation time field
+BATCH_RECORDS = {
+    "party": ("case_parties", CasePartyCreate, CasePartyUpdate, CasePartyOut, "created_at"),
+    "hearing": ("case_hearings", CaseHearingCreate, CaseHearingUpdate, CaseHearingOut, "created_at"),
+    "document": ("case_documents", CaseDocumentCreate, CaseDocumentUpdate, CaseDocumentOut, "uploaded_at"),
+    "note": ("case_notes", CaseNoteCreate, CaseNoteUpdate, CaseNoteOut, "created_at"),
+    "task": ("case_tasks", CaseTaskCreate, CaseTaskUpdate, CaseTaskOut, "created_at"),
+}
+
+BATCH_STATUS = {"insert": 201, "update": 200, "delete": 204}
+
+class _BatchWrite(NamedTuple):
+    index: int
+    collection: str
+    kind: str
+    id: ObjectId
+    model: Any
+    # Position in the collection's bulk_write
+    position: int
+    # What an update sets and unsets, for the change feed
+    changes: Optional[Dict[str, Any]] = None
+
+def _batch_payload(model: Any, data: Dict[str, Any], partial: bool) -> Dict[str, Any]:
+    try:
+        payload = model(**data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors()))
+    return _serialize_document(payload.dict(exclude_unset=partial))
+
+class _CaseBatch:
+    """
+    The writes of one batch request. Operations are checked and turned
+    into bulk_write requests one by one, against the records as the
+    earlier operations leave them; the hearing booking index is updated
+    as they go, and put back by release() if the batch fails.
+    """
+
+    def __init__(self, oid: ObjectId, case: Dict[str, Any], records: Dict[Tuple[str, ObjectId], Dict[str, Any]],
+                 allow_conflict: bool):
+        self.oid = oid
+        self.case = case
+        self.records = records
+        self.allow_conflict = allow_conflict
+        now = datetime.utcnow()
+        # As stored (milliseconds), to tell which updates were applied
+        self.now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        self.writes: Dict[str, List[Any]] = {"cases": []}
+        self.planned: List[_BatchWrite] = []
+        # Expected matched / removed counts per collection
+        self.expected: Dict[str, List[int]] = {}
+        self.held: List[Tuple[int, ObjectId, Optional[Dict[str, Any]]]] = []
+
+    def _add(self, index: int, collection: str, kind: str, id: ObjectId, model: Any, request: Any,
+             changes: Optional[Dict[str, Any]] = None) -> None:
+        requests = self.writes.setdefault(collection, [])
+        self.planned.append(_BatchWrite(index, collection, kind, id, model, len(requests), changes))
+        requests.append(request)
+        if kind != "insert":
+            self.expected.setdefault(collection, [0, 0])[kind == "delete"] += 1
+
+    def _hold(self, index: int, hearing_id: ObjectId, hearing: Optional[Dict[str, Any]],
+              previous: Optional[Dict[str, Any]]) -> None:
+        """Book (or free) the slot now, so later operations and concurrent requests see it"""
+        if hearing is not None:
+            _check_booking(hearing, self.allow_conflict)
+            hearing_bookings.put(hearing)
+        else:
+            hearing_bookings.remove(hearing_id)
+        self.held.append((index, hearing_id, previous))
+
+    def release(self, failed: Optional[Set[int]] = None) -> None:
+        """Undo the booking changes of the failed operations (all by default)"""
+        for index, hearing_id, previous in reversed(self.held):
+            if failed is not None and index not in failed:
+                continue
+            if previous is None:
+                hearing_bookings.remove(hearing_id)
+            else:
+                hearing_bookings.put(previous)
+
+    def plan(self, index: int, op: CaseBatchOp, record_id: Optional[ObjectId], data: Dict[str, Any]) -> None:
+        action, _, name = op.value.partition("_")
+        if name == "case":
+            update_data = _batch_payload(CaseUpdate, data, partial=True)
+            conditions = _check_references(update_data, partial=True)
+            update_data["updated_at"] = self.now
+            if update_data.get("status") == CaseStatus.ACTIVE.value:
+                update_data["disposed_at"] = None
+            elif update_data.get("status") == CaseStatus.DISPOSED.value and self.case.get("disposed_at") is None:
+                update_data["disposed_at"] = self.now
+            self.case.update(update_data)
+            update = {"$set": update_data}
+            if "case_number" in update_data or "court_type" in update_data:
+                update = _case_number_update(update_data, self.case)
+            self._add(index, "cases", "update", self.oid, CaseOut, UpdateOne({"_id": self.oid, **conditions}, update),
+                      update_changes(update))
+            return
+
+        collection, create_model, update_model, out_model, created_field = BATCH_RECORDS[name]
+        if action == "add":
+            record = {
+                "_id": ObjectId(),
+                **_batch_payload(create_model, {"case_id": str(self.oid), **data}, partial=False),
+                "case_id": self.oid,
+                created_field: self.now,
+                "updated_at": self.now
+            }
+            if collection == "case_hearings":
+                self._hold(index, record["_id"], record, None)
+                if record.get("next_hearing_date"):
+                    self._add(index, "cases", "update", self.oid, None, UpdateOne({"_id": self.oid}, {"$set": {"updated_at": self.now}}))
+            self.records[(collection, record["_id"])] = record
+            self._add(index, collection, "insert", record["_id"], out_model, InsertOne(record))
+            return
+
+        current = self.records.get((collection, record_id))
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"{name.capitalize()} not found")
+        if action == "update":
+            update_data = _batch_payload(update_model, data, partial=True)
+            update_data["updated_at"] = self.now
+            if collection == "case_hearings" and any(field in update_data for field in BOOKING_FIELDS):
+                self._hold(index, record_id, {**current, **update_data}, current)
+            self.records[(collection, record_id)] = {**current, **update_data}
+            self._add(index, collection, "update", record_id, out_model,
+                      UpdateOne({"_id": record_id, "case_id": self.oid}, {"$set": update_data}),
+                      update_changes({"$set": update_data}))
+        else:
+            if collection == "case_hearings":
+                self._hold(index, record_id, None, current)
+            del self.records[(collection, record_id)]
+            self._add(index, collection, "delete", record_id, None, DeleteOne({"_id": record_id, "case_id": self.oid}))
+            self.writes.setdefault("tombstones", []).append(InsertOne(tombstone(collection, record_id, self.oid, self.now)))
+
+    def unmatched(self, results: Dict[str, Any]) -> Set[str]:
+        """Collections where an update or delete did not find its record"""
+        short: Set[str] = set()
+        for collection, (matched, removed) in self.expected.items():
+            result = results.get(collection)
+            if not isinstance(result, BulkWriteError) and (result.matched_count, result.deleted_count) != (matched, removed):
+                short.add(collection)
+        return short
+
+    def check(self, results: Dict[str, Any]) -> None:
+        """Inside the transaction: abort unless every update and delete found its record"""
+        if self.unmatched(results):
+            raise HTTPException(status_code=409, detail="Records changed while the batch ran; nothing was written")
+
+    def failures(self, results: Dict[str, Any]) -> Dict[int, Tuple[int, str]]:
+        """Without a transaction: status and error of the operations a BulkWriteError stopped"""
+        failed: Dict[int, Tuple[int, str]] = {}
+        for write in self.planned:
+            error = results.get(write.collection)
+            if not isinstance(error, BulkWriteError):
+                continue
+            first = error.details["writeErrors"][0]
+            if write.position == first["index"]:
+                failed[write.index] = (409 if first.get("code") == 11000 else 500, first.get("errmsg", ""))
+            elif write.position > first["index"]:
+                failed.setdefault(write.index, (424, f"Not run after an earlier {write.collection} write failed"))
+        return failed
+
+@router.post("/{case_id}/batch", response_model=CaseBatchWriteOut)
+async def batch_case(
+    case_id: str,
+    payload: CaseBatchRequest,
+    allow_conflict: bool = Query(False, description=ALLOW_CONFLICT_DESCRIPTION),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Run several writes to a case and its records in one request, in order.
+    The whole batch is checked first (payloads, ids, references, double
+    bookings); the first failing operation is returned with its index and
+    nothing is written. The writes then go out as one bulk_write per
+    collection, in a transaction where the deployment supports them.
+    """
+    try:
+        oid = ObjectId(case_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid case_id format")
+    operations = payload.operations
+    if len(operations) > BATCH_WRITE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_WRITE_MAX} operations per request")
+    
+    def failed_op(index: int, e: HTTPException) -> HTTPException:
+        return HTTPException(status_code=e.status_code,
+                             detail={"index": index, "op": operations[index].op.value, "detail": e.detail})
+    
+    # Verify case exists, once for the whole batch
+    case = await db.cases.find_one({"_id": oid})
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    
+    # Records to update or delete, one read per collection
+    record_ids: List[Optional[ObjectId]] = []
+    wanted: Dict[str, Set[ObjectId]] = {}
+    for i, operation in enumerate(operations):
+        action, _, name = operation.op.value.partition("_")
+        record_id = None
+        if name != "case" and action != "add":
+            try:
+                record_id = ObjectId(operation.id) if operation.id else None
+            except:
+                pass
+            if record_id is None:
+                raise failed_op(i, HTTPException(status_code=400, detail="Invalid ID format"))
+            wanted.setdefault(BATCH_RECORDS[name][0], set()).add(record_id)
+        record_ids.append(record_id)
+    records = {}
+    for collection, ids in wanted.items():
+        async for doc in db[collection].find({"_id": {"$in": list(ids)}, "case_id": oid}):
+            records[(collection, doc["_id"])] = doc
+    
+    # Hearings other workers booked on the days this batch books
+    days = []
+    for i, operation in enumerate(operations):
+        action, _, name = operation.op.value.partition("_")
+        if name == "hearing" and action != "delete":
+            hearing = {**records.get(("case_hearings", record_ids[i]), {}), **(operation.data or {})}
+            days.append((hearing.get("assigned_lawyer_id"), hearing.get("hearing_date")))
+    await hearing_bookings.sync_days(db, days)
+    
+    batch = _CaseBatch(oid, case, records, allow_conflict)
+    try:
+        for i, operation in enumerate(operations):
+            try:
+                batch.plan(i, operation.op, record_ids[i], operation.data)
+            except HTTPException as e:
+                raise failed_op(i, e)
+        try:
+            transaction, results = await bulk_write_collections(db, batch.writes, batch.check)
+        except BulkWriteError as e:
+            first = e.details["writeErrors"][0]
+            raise HTTPException(status_code=409 if first.get("code") == 11000 else 500, detail=first.get("errmsg"))
+    except Exception:
+        batch.release()
+        raise
+    failed = {} if transaction else batch.failures(results)
+    short = set() if transaction else batch.unmatched(results)
+    
+    # Records as written, one read per collection
+    written: Dict[ObjectId, Dict[str, Any]] = {}
+    by_collection: Dict[str, List[ObjectId]] = {}
+    for write in batch.planned:
+        if write.kind != "delete" and write.model is not None and write.index not in failed:
+            by_collection.setdefault(write.collection, []).append(write.id)
+    for collection, ids in by_collection.items():
+        async for doc in db[collection].find({"_id": {"$in": ids}}):
+            written[doc["_id"]] = doc
+    
+    results_out: List[Dict[str, Any]] = []
+    for write in batch.planned:
+        if write.model is None and write.kind != "delete":
+            # Case timestamp touched by a hearing with a next date
+            continue
+        result: Dict[str, Any] = {"index": write.index, "op": operations[write.index].op, "id": str(write.id)}
+        if write.index in failed:
+            result["status"], result["error"] = failed[write.index]
+        elif write.kind != "delete" and write.id not in written:
+            # Deleted by a concurrent request
+            failed[write.index] = (404, "Not found")
+            result["status"], result["error"] = failed[write.index]
+        elif write.kind == "update" and write.collection in short and written[write.id].get("updated_at") != batch.now:
+            # Changed by a concurrent request so that the update no longer fits
+            failed[write.index] = (409, "Not applied: the record changed meanwhile")
+            result["status"], result["error"] = failed[write.index]
+        else:
+            result["status"] = BATCH_STATUS[write.kind]
+            doc = written.get(write.id) if write.kind != "delete" else None
+            change_feed.record(write.collection, write.kind, write.id, oid, doc, write.changes)
+            if doc is not None:
+                result["item"] = jsonable_encoder(write.model(**_convert_objectid(doc)), by_alias=True)
+        results_out.append(result)
+    batch.release(set(failed))
+    return {"transaction": transaction, "results": results_out}
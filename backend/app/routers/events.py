@@ -0,0 +1,64 @@
+# app/routers/events.py
+import asyncio
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from ..core.config import settings
+from ..core.events import change_feed, ChangeEvent, Subscriber
+from ..core.profiling import ProfiledRoute
+
+router = APIRouter(tags=["events"], route_class=ProfiledRoute)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # keep nginx from buffering the stream
+}
+
+def _format(event: ChangeEvent) -> str:
+    return f"id: {event.token}\nevent: change\ndata: {event.payload}\n\n"
+
+def _reset() -> str:
+    return 'event: reset\ndata: {"reason": "refetch"}\n\n'
+
+async def _stream(subscriber: Subscriber, replay: List[ChangeEvent], reset: bool) -> AsyncIterator[str]:
+    """Server-Sent Events for one subscriber; unsubscribes when the client goes away"""
+    try:
+        yield "retry: 3000\n\n"
+        if reset:
+            yield _reset()
+        for event in replay:
+            yield _format(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), settings.change_feed_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                subscriber.overflowed = False
+                yield _reset()
+            else:
+                yield _format(event)
+    finally:
+        change_feed.unsubscribe(subscriber)
+
+# ==========================================
+# CHANGE FEEDS
+# ==========================================
+
+@router.get("/events")
+async def firm_events(last_event_id: Optional[str] = Header(None)):
+    """Stream changes to all cases and their related records"""
+    subscriber, replay, reset = change_feed.subscribe(None, last_event_id)
+    return StreamingResponse(_stream(subscriber, replay, reset), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/cases/{case_id}/events")
+async def case_events(case_id: str, last_event_id: Optional[str] = Header(None)):
+    """Stream changes to one case and its related records"""
+    try:
+        ObjectId(case_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid case_id format")
+    subscriber, replay, reset = change_feed.subscribe(case_id, last_event_id)
+    return StreamingResponse(_stream(subscriber, replay, reset), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,27 +1,51 @@
 # app/routers/matters.py
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional, Any, Dict
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional, Any, Dict, FrozenSet
 from datetime import datetime
 from bson import ObjectId
-from ..db.mongo import get_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..core.archive import load_archived_matter
+from ..core.config import settings
+from ..core.events import change_feed, update_changes
+from ..core.profiling import profile_phase, ProfiledRoute
+from ..db.mongo import get_database
+from ..db.repositories import TIMELINE_VERSION, MatterRepository, get_matter_repository
+from ..models.projection import parse_fields, mongo_projection, projected_response
 from ..models.schemas import MatterCreate, MatterOut, TimelineItem, MatterUpdate
 
-router = APIRouter(prefix="/matters", tags=["matters"])
+router = APIRouter(prefix="/matters", tags=["matters"], route_class=ProfiledRoute)
 
 # helper to convert ObjectId instances to strings recursively
-def _convert_objectid(obj: Any) -> Any:
+def _convert(obj: Any) -> Any:
     if isinstance(obj, ObjectId):
         return str(obj)
     if isinstance(obj, dict):
-        return {k: _convert_objectid(v) for k, v in obj.items()}
+        return {k: _convert(v) for k, v in obj.items()}
     if isinstance(obj, list):
-        return [_convert_objectid(v) for v in obj]
+        return [_convert(v) for v in obj]
     return obj
 
+@profile_phase("conversion")
+def _convert_objectid(obj: Any) -> Any:
+    return _convert(obj)
+
+def _matter_projection(selected: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+    """Projection that trims the embedded timeline to the latest events"""
+    timeline = {"$slice": -settings.matter_timeline_preview}
+    if not selected:
+        return {"timeline": timeline}
+    projection = mongo_projection(selected)
+    if "timeline" in projection:
+        projection["timeline"] = timeline
+    return projection
+
+def _trimmed(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A full matter document shaped like _matter_projection() reads it"""
+    return {**doc, "timeline": (doc.get("timeline") or [])[-settings.matter_timeline_preview:]}
+
 # ---------- Create a matter ----------
 @router.post("/", response_model=MatterOut)
-async def create_matter(payload: MatterCreate):
-    db = get_db()
+async def create_matter(payload: MatterCreate, matters: MatterRepository = Depends(get_matter_repository)):
     now = datetime.utcnow()
     doc: Dict[str, Any] = payload.dict()
     # store references embedded lightly (client/assigned_to will be populated by frontend or other endpoints)
@@ -39,49 +63,66 @@ async def create_matter(payload: MatterCreate):
 
     doc.update({
         "timeline": [],
+        "timeline_count": 0,
+        "timeline_version": TIMELINE_VERSION,
         "is_archived": False,
         "created_at": now,
         "updated_at": now
     })
 
-    res = await db.matters.insert_one(doc)
-    created = await db.matters.find_one({"_id": res.inserted_id})
+    created = await matters.create(doc)
     if not created:
         raise HTTPException(status_code=500, detail="Failed to create matter")
+    change_feed.record("matters", "insert", created["_id"], None, created)
     created = _convert_objectid(created)
     # ensure response shape matches MatterOut (Pydantic will validate/rename _id -> id)
     return created
 
 # ---------- List matters with optional filtering ----------
 @router.get("/", response_model=List[MatterOut])
-async def list_matters(status: Optional[str] = Query(None), skip: int = 0, limit: int = 20):
-    db = get_db()
+async def list_matters(
+    status: Optional[str] = Query(None),
+    skip: int = 0,
+    limit: int = 20,
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    matters: MatterRepository = Depends(get_matter_repository),
+):
+    selected = parse_fields(fields, MatterOut)
     query: Dict[str, Any] = {}
     if status:
         query["status"] = status
-    cursor = db.matters.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    items = []
-    async for doc in cursor:
-        items.append(_convert_objectid(doc))
+    items = [_convert_objectid(doc) for doc in await matters.list(query, _matter_projection(selected), skip, limit)]
+    if selected:
+        return projected_response(MatterOut, selected, items)
     return items
 
 # ---------- Get single matter ----------
 @router.get("/{id}", response_model=MatterOut)
-async def get_matter(id: str):
-    db = get_db()
+async def get_matter(
+    id: str,
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    include_archived: bool = Query(False, description="Also look in the matter archive"),
+    matters: MatterRepository = Depends(get_matter_repository),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+):
+    selected = parse_fields(fields, MatterOut)
     try:
         oid = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid id")
-    doc = await db.matters.find_one({"_id": oid})
+    doc = await matters.get(oid, _matter_projection(selected))
+    if not doc and include_archived:
+        bundle = await load_archived_matter(db, oid)
+        doc = bundle["matter"] if bundle else None
     if not doc:
         raise HTTPException(status_code=404, detail="Matter not found")
+    if selected:
+        return projected_response(MatterOut, selected, _convert_objectid(doc))
     return _convert_objectid(doc)
 
 # ---------- Update matter (partial) ----------
 @router.patch("/{id}", response_model=MatterOut)
-async def update_matter(id: str, payload: MatterUpdate):
-    db = get_db()
+async def update_matter(id: str, payload: MatterUpdate, matters: MatterRepository = Depends(get_matter_repository)):
     try:
         oid = ObjectId(id)
     except Exception:
@@ -96,30 +137,30 @@ async def update_matter(id: str, payload: MatterUpdate):
 
     update_data["updated_at"] = datetime.utcnow()
 
-    res = await db.matters.update_one({"_id": oid}, {"$set": update_data})
-    if res.matched_count == 0:
+    doc = await matters.update(oid, {"$set": update_data})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Matter not found")
-
-    doc = await db.matters.find_one({"_id": oid})
-    return _convert_objectid(doc)
+    change_feed.record("matters", "update", oid, None, doc, update_changes({"$set": update_data}))
+    return _convert_objectid(_trimmed(doc))
 
 # ---------- Delete matter ----------
 @router.delete("/{id}", status_code=204)
-async def delete_matter(id: str):
-    db = get_db()
+async def delete_matter(id: str, matters: MatterRepository = Depends(get_matter_repository)):
     try:
         oid = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid id")
-    res = await db.matters.delete_one({"_id": oid})
-    if res.deleted_count == 0:
+    bucket_ids = await matters.delete(oid)
+    if bucket_ids is None:
         raise HTTPException(status_code=404, detail="Matter not found")
+    change_feed.record("matters", "delete", oid, None)
+    for bucket_id in bucket_ids:
+        change_feed.record("matter_timeline_buckets", "delete", bucket_id, None)
     return
 
 # ---------- Add timeline item ----------
 @router.post("/{id}/timeline", response_model=TimelineItem)
-async def add_timeline_item(id: str, item: TimelineItem):
-    db = get_db()
+async def add_timeline_item(id: str, item: TimelineItem, matters: MatterRepository = Depends(get_matter_repository)):
     try:
         oid = ObjectId(id)
     except Exception:
@@ -127,26 +168,66 @@ async def add_timeline_item(id: str, item: TimelineItem):
 
     item_dict = item.dict()
     item_dict["created_at"] = item_dict.get("created_at") or datetime.utcnow()
-    res = await db.matters.update_one(
-        {"_id": oid},
-        {"$push": {"timeline": item_dict}, "$set": {"updated_at": datetime.utcnow()}}
-    )
-    if res.matched_count == 0:
+    now = datetime.utcnow()
+
+    found = await matters.get(oid, {"timeline_version": 1})
+    if found is None:
+        raise HTTPException(status_code=404, detail="Matter not found")
+    if found.get("timeline_version") != TIMELINE_VERSION:
+        # Not migrated yet: keep appending to the embedded array
+        update = {"$push": {"timeline": item_dict}, "$set": {"updated_at": now}}
+        matter = await matters.update(oid, update)
+        if matter is None:
+            raise HTTPException(status_code=404, detail="Matter not found")
+        change_feed.record("matters", "update", oid, None, matter, update_changes(update, matter))
+        return item_dict
+
+    # The bucket write is what stores the event; the matter then takes its
+    # count from the buckets ($max, so an earlier request finishing later
+    # cannot lower it) and embeds the latest events for list views
+    bucket = await matters.append_event(oid, item_dict)
+    change_feed.record("matter_timeline_buckets", "update", bucket["_id"], None, bucket)
+    update = {
+        "$push": {"timeline": {"$each": [item_dict], "$slice": -settings.matter_timeline_preview}},
+        "$max": {"timeline_count": bucket["start"] + bucket["count"]},
+        "$set": {"updated_at": now},
+    }
+    matter = await matters.update(oid, update)
+    if matter is None:
         raise HTTPException(status_code=404, detail="Matter not found")
+    change_feed.record("matters", "update", oid, None, matter, update_changes(update, matter))
     # return the stored timeline item (with created_at set)
     return item_dict
 
+# ---------- Paginated timeline (newest first) ----------
+@router.get("/{id}/timeline", response_model=List[TimelineItem])
+async def list_timeline(
+    id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    matters: MatterRepository = Depends(get_matter_repository),
+):
+    try:
+        oid = ObjectId(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid id")
+
+    events = await matters.timeline(oid, skip, limit)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Matter not found")
+    return _convert_objectid(events)
+
 # ---------- Toggle archive (convenience) ----------
 @router.post("/{id}/archive", response_model=MatterOut)
-async def archive_matter(id: str, archive: bool = True):
-    db = get_db()
+async def archive_matter(id: str, archive: bool = True, matters: MatterRepository = Depends(get_matter_repository)):
     try:
         oid = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid id")
 
-    res = await db.matters.update_one({"_id": oid}, {"$set": {"is_archived": archive, "updated_at": datetime.utcnow()}})
-    if res.matched_count == 0:
+    update = {"$set": {"is_archived": archive, "updated_at": datetime.utcnow()}}
+    doc = await matters.update(oid, update)
+    if doc is None:
         raise HTTPException(status_code=404, detail="Matter not found")
-    doc = await db.matters.find_one({"_id": oid})
-    return _convert_objectid(doc)
+    change_feed.record("matters", "update", oid, None, doc, update_changes(update))
+    return _convert_objectid(_trimmed(doc))
@@ -0,0 +1,143 @@
+# app/routers/reference.py
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional, Any, Dict
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..core.reference import reference_data
+from ..core.profiling import ProfiledRoute
+from ..db.mongo import get_database
+from ..models.schemas import (
+    CourtType,
+    CourtCreate, CourtUpdate, CourtOut,
+    CategoryCreate, CategoryUpdate, CategoryOut,
+    SubcategoryCreate, SubcategoryUpdate, SubcategoryOut
+)
+from .admin import require_admin
+
+router = APIRouter(prefix="/reference", tags=["reference"], route_class=ProfiledRoute)
+
+# Reads are served from the in-memory snapshot (app/core/reference.py);
+# writes go to MongoDB and reload it
+
+def _oid(id: str) -> ObjectId:
+    try:
+        return ObjectId(id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+def _serialize(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (v.value if hasattr(v, "value") else v) for k, v in doc.items()}
+
+async def _insert(db: AsyncIOMotorDatabase, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    result = await db[collection].insert_one(_serialize(doc))
+    await reference_data.changed(db)
+    return {"_id": str(result.inserted_id), **_serialize(doc)}
+
+async def _update(db: AsyncIOMotorDatabase, collection: str, id: str, changes: Dict[str, Any], label: str) -> Dict[str, Any]:
+    oid = _oid(id)
+    if changes:
+        result = await db[collection].update_one({"_id": oid}, {"$set": _serialize(changes)})
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+        await reference_data.changed(db)
+    doc = await db[collection].find_one({"_id": oid})
+    if not doc:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return {**doc, "_id": str(doc["_id"])}
+
+async def _delete(db: AsyncIOMotorDatabase, collection: str, id: str, label: str) -> None:
+    result = await db[collection].delete_one({"_id": _oid(id)})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    await reference_data.changed(db)
+
+def _check_category(category_id: str) -> None:
+    if category_id not in reference_data.snapshot.categories:
+        raise HTTPException(status_code=400, detail=f"Unknown category_id: {category_id}")
+
+# ==========================================
+# COURTS
+# ==========================================
+
+@router.get("/courts", response_model=List[CourtOut])
+async def list_courts(court_type: Optional[CourtType] = Query(None)):
+    """List courts, optionally of one court type"""
+    courts = reference_data.snapshot.courts.values()
+    if court_type:
+        courts = [c for c in courts if c.court_type == court_type.value]
+    return [{"_id": c.id, "name": c.name, "court_type": c.court_type} for c in courts]
+
+@router.post("/courts", response_model=CourtOut, status_code=201, dependencies=[Depends(require_admin)])
+async def create_court(payload: CourtCreate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Add a court"""
+    return await _insert(db, "courts", payload.dict())
+
+@router.patch("/courts/{court_id}", response_model=CourtOut, dependencies=[Depends(require_admin)])
+async def update_court(court_id: str, payload: CourtUpdate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Rename a court or change its court type"""
+    return await _update(db, "courts", court_id, payload.dict(exclude_unset=True), "Court")
+
+@router.delete("/courts/{court_id}", status_code=204, dependencies=[Depends(require_admin)])
+async def delete_court(court_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Delete a court"""
+    await _delete(db, "courts", court_id, "Court")
+    return
+
+# ==========================================
+# CATEGORIES
+# ==========================================
+
+@router.get("/categories", response_model=List[CategoryOut])
+async def list_categories():
+    """List case categories"""
+    return [{"_id": c.id, "name": c.name} for c in reference_data.snapshot.categories.values()]
+
+@router.post("/categories", response_model=CategoryOut, status_code=201, dependencies=[Depends(require_admin)])
+async def create_category(payload: CategoryCreate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Add a case category"""
+    return await _insert(db, "case_categories", payload.dict())
+
+@router.patch("/categories/{category_id}", response_model=CategoryOut, dependencies=[Depends(require_admin)])
+async def update_category(category_id: str, payload: CategoryUpdate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Rename a case category"""
+    return await _update(db, "case_categories", category_id, payload.dict(exclude_unset=True), "Category")
+
+@router.delete("/categories/{category_id}", status_code=204, dependencies=[Depends(require_admin)])
+async def delete_category(category_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Delete a case category that has no subcategories"""
+    if reference_data.snapshot.subcategories_by_category.get(category_id):
+        raise HTTPException(status_code=409, detail="Category still has subcategories")
+    await _delete(db, "case_categories", category_id, "Category")
+    return
+
+# ==========================================
+# SUBCATEGORIES
+# ==========================================
+
+@router.get("/subcategories", response_model=List[SubcategoryOut])
+async def list_subcategories(category_id: Optional[str] = Query(None)):
+    """List case subcategories, optionally of one category"""
+    subcategories = reference_data.snapshot.subcategories.values()
+    if category_id:
+        subcategories = [s for s in subcategories if s.category_id == category_id]
+    return [{"_id": s.id, "name": s.name, "category_id": s.category_id} for s in subcategories]
+
+@router.post("/subcategories", response_model=SubcategoryOut, status_code=201, dependencies=[Depends(require_admin)])
+async def create_subcategory(payload: SubcategoryCreate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Add a subcategory to a case category"""
+    _check_category(payload.category_id)
+    return await _insert(db, "case_subcategories", payload.dict())
+
+@router.patch("/subcategories/{subcategory_id}", response_model=SubcategoryOut, dependencies=[Depends(require_admin)])
+async def update_subcategory(subcategory_id: str, payload: SubcategoryUpdate, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Rename a subcategory or move it to another category"""
+    changes = payload.dict(exclude_unset=True)
+    if changes.get("category_id") is not None:
+        _check_category(changes["category_id"])
+    return await _update(db, "case_subcategories", subcategory_id, changes, "Subcategory")
+
+@router.delete("/subcategories/{subcategory_id}", status_code=204, dependencies=[Depends(require_admin)])
+async def delete_subcategory(subcategory_id: str, db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Delete a case subcategory"""
+    await _delete(db, "case_subcategories", subcategory_id, "Subcategory")
+    return
@@ -0,0 +1,107 @@
+# app/routers/sync.py
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional, Any, Dict
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..core.profiling import ProfiledRoute
+from ..core.sync import (
+    SYNC_COLLECTIONS, SyncToken, InvalidSyncToken,
+    start_token, next_token, compaction_horizon, to_millis, from_millis,
+)
+from ..db.mongo import get_database
+from ..models.schemas import CaseOut, CasePartyOut, CaseHearingOut, CaseDocumentOut, CaseNoteOut, CaseTaskOut
+from .cases import _convert_objectid
+
+router = APIRouter(prefix="/sync", tags=["sync"], route_class=ProfiledRoute)
+
+SYNC_MODELS = {
+    "cases": CaseOut,
+    "case_parties": CasePartyOut,
+    "case_hearings": CaseHearingOut,
+    "case_documents": CaseDocumentOut,
+    "case_notes": CaseNoteOut,
+    "case_tasks": CaseTaskOut,
+}
+
+def _window(field: str, token: SyncToken) -> Dict[str, Any]:
+    """Records changed inside the token's window, after its keyset position"""
+    bounds: Dict[str, Any] = {"$lte": from_millis(token.until)}
+    if token.since is not None:
+        bounds["$gt"] = from_millis(token.since)
+    query: Dict[str, Any] = {field: bounds}
+    if token.last is not None:
+        last_ts, last_id = from_millis(token.last[0]), token.last[1]
+        query = {"$and": [query, {"$or": [
+            {field: {"$gt": last_ts}},
+            {field: last_ts, "_id": {"$gt": last_id}},
+        ]}]}
+    return query
+
+def _tombstone_out(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "collection": doc["collection"],
+        "id": str(doc["doc_id"]),
+        "case_id": str(doc["case_id"]) if doc.get("case_id") is not None else None,
+        "deleted_at": doc["deleted_at"],
+    }
+
+# ==========================================
+# DELTA SYNC
+# ==========================================
+
+@router.get("")
+async def sync(
+    since: Optional[str] = Query(None, description="Token from a previous response; omit for a full download"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Cases and related records changed since a sync token, plus deletions"""
+    if since:
+        try:
+            token = SyncToken.decode(since)
+        except InvalidSyncToken:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+        horizon = await compaction_horizon(db)
+        if token.since is not None and horizon is not None and token.since < to_millis(horizon):
+            raise HTTPException(status_code=410, detail="Sync token expired, start a full sync")
+        if token.collection == 0 and token.last is None and token.since is not None:
+            # A finished sync: open a new window ending now
+            token = start_token(token.since)
+    else:
+        token = start_token()
+
+    changes: Dict[str, List[Dict[str, Any]]] = {}
+    deleted: List[Dict[str, Any]] = []
+    remaining = limit
+
+    while remaining and token.collection < len(SYNC_COLLECTIONS):
+        collection = SYNC_COLLECTIONS[token.collection]
+        # A full download has nothing to delete on the client
+        if collection == "tombstones" and token.since is None:
+            token.collection += 1
+            continue
+        field = "deleted_at" if collection == "tombstones" else "updated_at"
+        cursor = db[collection].find(_window(field, token)).sort([(field, 1), ("_id", 1)]).limit(remaining)
+        docs = await cursor.to_list(remaining)
+        for doc in docs:
+            if collection == "tombstones":
+                deleted.append(_tombstone_out(doc))
+            else:
+                changes.setdefault(collection, []).append(
+                    jsonable_encoder(SYNC_MODELS[collection](**_convert_objectid(doc)), by_alias=True)
+                )
+        remaining -= len(docs)
+        if remaining:
+            # Collection exhausted within this window
+            token.collection += 1
+            token.last = None
+        elif docs:
+            token.last = [to_millis(docs[-1][field]), str(docs[-1]["_id"])]
+
+    has_more = token.collection < len(SYNC_COLLECTIONS)
+    return {
+        "changes": changes,
+        "deleted": jsonable_encoder(deleted),
+        "next": token.encode() if has_more else next_token(token).encode(),
+        "has_more": has_more,
+    }
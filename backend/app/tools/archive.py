@@ -0,0 +1,62 @@
+# app/tools/archive.py
+"""
+Move disposed cases and archived matters into the compressed archive.
+
+Usage:
+    python -m app.tools.archive [--older-than-days N] [--limit N] [--dry-run]
+    python -m app.tools.archive --restore-case ID [ID ...] [--restore-matter ID ...]
+
+Cases with status Disposed and matters with is_archived set that have not
+changed for settings.archive_after_days (or --older-than-days) are archived
+together with their related records. Prints the working set size (documents,
+data and index bytes per collection) before and after.
+"""
+import argparse
+import asyncio
+from typing import Any, Dict
+
+from bson import ObjectId
+
+from ..db.mongo import get_client, get_db
+from ..core.archive import run_archival, restore_case, restore_matter
+
+
+def _print_sizes(title: str, sizes: Dict[str, Any]) -> None:
+    print(title)
+    for name, row in sizes["collections"].items():
+        print(f"  {name:<26}{row['count']:>10} docs{row['size'] / 1024:>12.1f} KiB data{row['index_size'] / 1024:>12.1f} KiB index")
+    total = sizes["working_set"]
+    print(f"  {'working set':<26}{total['count']:>10} docs{total['size'] / 1024:>12.1f} KiB data{total['index_size'] / 1024:>12.1f} KiB index")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, help="Override settings.archive_after_days")
+    parser.add_argument("--limit", type=int, help="Archive at most this many cases and matters")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+    parser.add_argument("--restore-case", nargs="+", default=[], metavar="ID")
+    parser.add_argument("--restore-matter", nargs="+", default=[], metavar="ID")
+    args = parser.parse_args()
+
+    async def run() -> None:
+        db = get_db()
+        if args.restore_case or args.restore_matter:
+            for id in args.restore_case:
+                print(f"case {id}: {'restored' if await restore_case(db, ObjectId(id)) else 'not in archive'}")
+            for id in args.restore_matter:
+                print(f"matter {id}: {'restored' if await restore_matter(db, ObjectId(id)) else 'not in archive'}")
+        else:
+            report = await run_archival(db, args.older_than_days, args.limit, args.dry_run)
+            _print_sizes("Before:", report["before"])
+            if not args.dry_run:
+                _print_sizes("After:", report["after"])
+            verb = "Would archive" if args.dry_run else "Archived"
+            print(f"{verb} {report['cases']} cases and {report['matters']} matters "
+                  f"({report['skipped']} changed meanwhile, left in place)")
+        get_client().close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# app/tools/backfill_updated_at.py
+"""
+Give every case and related record an ``updated_at`` so /sync can see it.
+
+Usage:
+    python -m app.tools.backfill_updated_at [--dry-run]
+
+Records written before delta sync only have their creation time
+(``created_at``, or ``uploaded_at`` for documents); that value is copied
+into ``updated_at``. Records without either get the time of the backfill.
+Safe to re-run: records that already have ``updated_at`` are not touched.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..core.events import CASE_COLLECTIONS
+from ..db.mongo import get_client, get_db
+
+CREATED_FIELDS = {"case_documents": "uploaded_at"}
+
+
+async def backfill(db: AsyncIOMotorDatabase, dry_run: bool = False) -> Dict[str, int]:
+    stats: Dict[str, int] = {}
+    now = datetime.utcnow()
+    for name in CASE_COLLECTIONS:
+        created_field = CREATED_FIELDS.get(name, "created_at")
+        missing = {"updated_at": {"$exists": False}}
+        stats[name] = await db[name].count_documents(missing)
+        if dry_run or not stats[name]:
+            continue
+        async for doc in db[name].find(missing, {created_field: 1}):
+            # Condition on the field still missing so concurrent writes win
+            await db[name].update_one(
+                {"_id": doc["_id"], "updated_at": {"$exists": False}},
+                {"$set": {"updated_at": doc.get(created_field) or now}}
+            )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be backfilled")
+    args = parser.parse_args()
+
+    async def run() -> None:
+        stats = await backfill(get_db(), dry_run=args.dry_run)
+        for name, missing in stats.items():
+            print(f"{name}: {missing} records {'missing' if args.dry_run else 'backfilled'}")
+        get_client().close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# app/tools/backup.py
+"""
+Change-log backup and point-in-time restore (app/core/backup.py).
+
+Usage:
+    python -m app.tools.backup run                  # dedicated log writer on a change stream
+    python -m app.tools.backup snapshot             # take a base snapshot now
+    python -m app.tools.backup list
+    python -m app.tools.backup restore --to 2024-11-29T10:00:00 [--target-db NAME] [--force]
+
+``run`` tails a MongoDB change stream (replica set or sharded cluster) and
+writes segments and, every settings.backup_snapshot_hours, base snapshots
+under settings.backup_dir, like the API does with backup_enabled. Use one
+such process instead of backup_enabled when several API workers share a
+change stream. After a restart it continues from the resume token saved
+with its last flush. When the stream cannot be resumed it starts a new one,
+records the writes it missed as a gap and takes a base snapshot; it exits
+with status 1 when no change stream can be opened at all.
+
+``restore`` rebuilds the backed up collections as they were at ``--to``
+(UTC, default: the end of the log) into ``--target-db`` (default
+<mongo_db>_restore), then creates the indexes. Restoring over
+settings.mongo_db itself needs --force. Check the restored database, then
+point mongo_db at it or copy it back with mongodump/mongorestore.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..core.backup import change_log, backup_directory, list_gaps, list_segments, list_snapshots, log_end, read_resume, restore
+from ..core.config import settings
+from ..core.events import change_feed
+from ..db.indexes import ensure_indexes
+from ..db.mongo import get_client, get_db
+
+
+async def _open_stream(db: Any, resume: Optional[Dict[str, Any]]) -> bool:
+    await change_feed.stop()
+    await change_feed.start(db, resume_after=resume["token"] if resume else None)
+    if change_feed.source != "change_stream":
+        raise SystemExit("No change stream on this deployment; enable backup_enabled on the API instead")
+    return await change_feed.wait_open()
+
+
+async def _run() -> None:
+    db = get_db()
+    directory = backup_directory(db)
+    await change_log.start(db)
+    writer = asyncio.create_task(change_log.run(db, recover=False))
+    try:
+        resume = read_resume(directory)
+        # Without a token, anything after the end of an existing log was missed
+        missed_since = None if resume else await asyncio.to_thread(log_end, directory)
+        while True:
+            if resume and not await _open_stream(db, resume):
+                print(f"⚠️ Cannot resume the change stream ({change_feed.stream_lost}), starting a new one")
+                missed_since, resume = resume["ts"], None
+            if not resume and not await _open_stream(db, None):
+                raise SystemExit(f"Cannot open a change stream: {change_feed.stream_lost}")
+            if missed_since is not None:
+                await change_log.recover(db, missed_since)
+                missed_since = None
+            print(f"📼 Writing change log to {change_log.directory}")
+            reason = await change_feed.wait_lost()
+            print(f"⚠️ Change stream lost ({reason})")
+            # Resuming from the last flushed token fails the same way; say what was logged last
+            await change_log.flush()
+            missed_since, resume = change_log.stats()["logged_until"], None
+    finally:
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        await change_log.stop()
+        await change_feed.stop()
+
+
+def _list() -> None:
+    directory = backup_directory(get_db())
+    print(f"{directory}")
+    for gap in list_gaps(directory):
+        print(f"  gap       {gap.first:%Y-%m-%d %H:%M:%S} .. {gap.last:%Y-%m-%d %H:%M:%S}  writes not logged")
+    for snapshot in list_snapshots(directory):
+        print(f"  snapshot  {snapshot.started:%Y-%m-%d %H:%M:%S} .. {snapshot.finished:%H:%M:%S}"
+              f"{snapshot.path.stat().st_size / 1024 / 1024:>10.1f} MiB  {snapshot.path.name}")
+    for segment in list_segments(directory):
+        last = f"{segment.last:%Y-%m-%d %H:%M:%S}" if segment.last else "(open)"
+        print(f"  segment   {segment.first:%Y-%m-%d %H:%M:%S} .. {last}"
+              f"{segment.path.stat().st_size / 1024 / 1024:>10.1f} MiB  {segment.path.name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Tail a change stream into the change log")
+    commands.add_parser("snapshot", help="Take a base snapshot now")
+    commands.add_parser("list", help="Show snapshots and segments")
+    restore_parser = commands.add_parser("restore", help="Rebuild the database as of a point in time")
+    restore_parser.add_argument("--to", type=datetime.fromisoformat, help="UTC time to restore to (default: end of the log)")
+    restore_parser.add_argument("--target-db", help="Database to restore into (default: <mongo_db>_restore)")
+    restore_parser.add_argument("--force", action="store_true", help="Allow restoring over settings.mongo_db")
+    args = parser.parse_args()
+
+    async def run() -> None:
+        if args.command == "run":
+            await _run()
+        elif args.command == "snapshot":
+            snapshot = await change_log.snapshot(get_db())
+            print(f"Snapshot {snapshot.path} ({snapshot.path.stat().st_size / 1024 / 1024:.1f} MiB) "
+                  f"in {change_log.snapshot_ms / 1000:.1f} s")
+        elif args.command == "list":
+            _list()
+        else:
+            target = args.target_db or f"{settings.mongo_db}_restore"
+            if target == settings.mongo_db and not args.force:
+                raise SystemExit(f"Refusing to restore over {target} without --force")
+            db = get_client()[target]
+            report = await restore(db, backup_directory(get_db()), args.to)
+            await ensure_indexes(db)
+            print(f"Restored {target} from {report['snapshot']} and {report['events_replayed']} logged changes "
+                  f"(last at {report['last_event']})")
+            for name, count in report["documents"].items():
+                print(f"  {name:<26}{count:>10} docs")
+            print(f"{report['total']} documents in {report['seconds']:.1f} s ({report['docs_per_second']} docs/s)")
+        get_client().close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# app/tools/migrate_timeline.py
+"""
+Move embedded matter timelines into matter_timeline_buckets.
+
+Usage:
+    python -m app.tools.migrate_timeline [--dry-run]
+
+Each legacy matter gets its events split into buckets of
+settings.matter_timeline_bucket_size, keeps only the latest
+settings.matter_timeline_preview events embedded and is marked with the
+current TIMELINE_VERSION. Safe to re-run: already migrated matters are skipped.
+"""
+import argparse
+import asyncio
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..core.config import settings
+from ..db.mongo import get_client, get_db
+from ..routers.matters import TIMELINE_VERSION
+
+
+def _chunks(events: List[Dict[str, Any]], size: int) -> List[List[Dict[str, Any]]]:
+    return [events[i:i + size] for i in range(0, len(events), size)]
+
+
+async def migrate_matter(db: AsyncIOMotorDatabase, matter: Dict[str, Any]) -> bool:
+    """Bucket one matter's timeline. Returns False if it changed underneath us."""
+    oid = matter["_id"]
+    events = matter.get("timeline") or []
+
+    # Clear buckets left behind by an interrupted earlier run
+    await db.matter_timeline_buckets.delete_many({"matter_id": oid})
+    size = settings.matter_timeline_bucket_size
+    buckets = [
+        {
+            "matter_id": oid,
+            "start": i * size,
+            "count": len(chunk),
+            "events": chunk,
+            "first_at": chunk[0].get("created_at"),
+            "last_at": chunk[-1].get("created_at"),
+        }
+        for i, chunk in enumerate(_chunks(events, size))
+    ]
+    if buckets:
+        await db.matter_timeline_buckets.insert_many(buckets)
+
+    # Only flip the matter if nobody appended to the legacy array meanwhile
+    res = await db.matters.update_one(
+        {"_id": oid, "timeline_version": {"$ne": TIMELINE_VERSION}, "timeline": {"$size": len(events)}},
+        {"$set": {
+            "timeline": events[-settings.matter_timeline_preview:] if settings.matter_timeline_preview else [],
+            "timeline_count": len(events),
+            "timeline_version": TIMELINE_VERSION,
+        }}
+    )
+    return res.matched_count == 1
+
+
+async def migrate(db: AsyncIOMotorDatabase, dry_run: bool = False) -> Dict[str, int]:
+    stats = {"matters": 0, "events": 0, "retried": 0}
+    query = {"timeline_version": {"$ne": TIMELINE_VERSION}}
+    async for matter in db.matters.find(query, {"timeline": 1}):
+        stats["matters"] += 1
+        stats["events"] += len(matter.get("timeline") or [])
+        if dry_run:
+            continue
+        while not await migrate_matter(db, matter):
+            stats["retried"] += 1
+            matter = await db.matters.find_one({"_id": matter["_id"], **query}, {"timeline": 1})
+            if matter is None:
+                break
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be migrated")
+    args = parser.parse_args()
+
+    async def run() -> None:
+        stats = await migrate(get_db(), dry_run=args.dry_run)
+        print(f"Migrated {stats['matters']} matters, {stats['events']} events ({stats['retried']} retries)")
+        get_client().close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
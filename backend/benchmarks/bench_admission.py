@@ -0,0 +1,270 @@
+# benchmarks/bench_admission.py
+"""
+Tail latency under overload, with and without admission control
+(app/core/admission.py).
+
+1. Calibrate: ``--concurrency`` closed-loop clients measure what the API can
+   sustain (req/s) and its unloaded latency.
+2. Overload: requests arrive open-loop (Poisson) at ``--overload`` times that
+   rate for ``--seconds``, once with admission control off and once with it
+   on. Shed requests (503) are not retried.
+
+Reported per route class: requests sent, served, shed, p50/p99 of served
+requests and p99 of the 503s. Without admission control every request is
+eventually served but latency grows with the backlog; with it, served
+requests keep close to unloaded latency and the excess is refused quickly.
+
+Mongo is simulated on top of the in-memory engine: a server that works on
+``--db-slots`` operations at a time, each taking ``--db-ms``, so an
+operation arriving behind a backlog takes proportionally longer. That
+server-side duration is fed to the controller the way the CommandListener
+does for a real client, so the adaptive limits react as they would to a
+saturated mongod.
+
+Run from backend/:
+
+    python -m benchmarks.bench_admission [--overload 5] [--seconds 3] [--db-ms 20] [--db-slots 4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Any, List, Tuple
+
+_TIMED_METHODS = {
+    "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "distinct", "find_one_and_update",
+    "find_one_and_delete", "bulk_write",
+}
+_CURSOR_METHODS = {"find", "aggregate"}
+
+
+class SimulatedServer:
+    """A mongod that can work on ``slots`` operations at a time, each taking ``delay`` seconds"""
+
+    def __init__(self, slots: int, delay: float):
+        self.slots = slots
+        self.delay = delay
+        self.in_flight = 0
+
+    async def call(self) -> None:
+        from app.core.admission import admission_controller
+
+        # Queueing model rather than a semaphore: durations measured on the
+        # event loop would include its own lag, which the real listener
+        # (running in the driver's threads) does not see
+        duration = self.delay * (1 + self.in_flight // self.slots)
+        admission_controller.observe(duration)
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self.in_flight -= 1
+
+
+class SimulatedCursor:
+    def __init__(self, cursor: Any, server: SimulatedServer):
+        self._cursor = cursor
+        self._server = server
+        self._waited = False
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._cursor, name)
+        if name in ("sort", "skip", "limit", "batch_size", "hint"):
+            def chain(*args: Any, **kwargs: Any) -> "SimulatedCursor":
+                attr(*args, **kwargs)
+                return self
+            return chain
+        return attr
+
+    async def _wait(self) -> None:
+        if not self._waited:
+            self._waited = True
+            await self._server.call()
+
+    def __aiter__(self) -> "SimulatedCursor":
+        self._iter = self._cursor.__aiter__()
+        return self
+
+    async def __anext__(self) -> Any:
+        await self._wait()
+        return await self._iter.__anext__()
+
+    async def to_list(self, length: Any = None) -> List[Any]:
+        await self._wait()
+        return await self._cursor.to_list(length)
+
+
+class SimulatedCollection:
+    def __init__(self, collection: Any, server: SimulatedServer):
+        self._collection = collection
+        self._server = server
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._collection, name)
+        server = self._server
+        if name == "with_options":
+            return lambda *args, **kwargs: SimulatedCollection(attr(*args, **kwargs), server)
+        if name in _CURSOR_METHODS:
+            return lambda *args, **kwargs: SimulatedCursor(attr(*args, **kwargs), server)
+        if name in _TIMED_METHODS:
+            async def timed(*args: Any, **kwargs: Any) -> Any:
+                await server.call()
+                return await attr(*args, **kwargs)
+            return timed
+        return attr
+
+
+class SimulatedDatabase:
+    def __init__(self, db: Any, server: SimulatedServer):
+        self._db = db
+        self._server = server
+
+    def get_collection(self, name: str, *args: Any, **kwargs: Any) -> SimulatedCollection:
+        return SimulatedCollection(self._db.get_collection(name, *args, **kwargs), self._server)
+
+    def __getitem__(self, name: str) -> SimulatedCollection:
+        return SimulatedCollection(self._db[name], self._server)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        if name.startswith("_") or not hasattr(attr, "find_one"):
+            return attr
+        return SimulatedCollection(attr, self._server)
+
+
+def build_requests(client: Any, case_ids: List[str], rng: random.Random) -> List[Tuple[str, int, Any]]:
+    """(route class, weight, call) of the request mix"""
+    def case_id() -> str:
+        return rng.choice(case_ids)
+
+    async def list_cases():
+        return await client.get("/cases/", params={"skip": rng.randint(0, 100), "limit": 20})
+
+    async def list_hearings():
+        return await client.get(f"/cases/{case_id()}/hearings", params={"limit": 20})
+
+    async def list_tasks():
+        return await client.get(f"/cases/{case_id()}/tasks", params={"limit": 20})
+
+    async def get_case():
+        return await client.get(f"/cases/{case_id()}", params={"section_limit": 20})
+
+    async def add_note():
+        cid = case_id()
+        return await client.post(f"/cases/{cid}/notes", json={"case_id": cid, "content": "Bench note", "created_by": "bench"})
+
+    async def add_hearing():
+        cid = case_id()
+        return await client.post(f"/cases/{cid}/hearings", json={
+            "case_id": cid, "hearing_date": "2025-01-10", "stage": "Arguments", "courtroom": "Court No. 3"})
+
+    return [
+        ("read", 25, list_cases), ("read", 20, list_hearings), ("read", 15, list_tasks),
+        ("heavy", 25, get_case),
+        ("write", 8, add_note), ("write", 7, add_hearing),
+    ]
+
+
+def report(title: str, results: List[Tuple[str, int, float]], elapsed: float) -> None:
+    from benchmarks.load import percentile
+
+    print(f"\n{title}")
+    print(f"{'class':<8}{'sent':>8}{'served':>8}{'shed':>8}{'p50 ms':>10}{'p99 ms':>10}{'503 p99':>10}{'served/s':>10}")
+    for name in ("read", "heavy", "write", "all"):
+        rows = [r for r in results if name in (r[0], "all")]
+        served = [r[2] for r in rows if r[1] < 500]
+        shed = [r[2] for r in rows if r[1] == 503]
+        print(f"{name:<8}{len(rows):>8}{len(served):>8}{len(shed):>8}"
+              f"{percentile(served, 50) * 1000:>10.1f}{percentile(served, 99) * 1000:>10.1f}"
+              f"{percentile(shed, 99) * 1000:>10.1f}{len(served) / elapsed:>10.1f}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+    from app.core.admission import admission_controller
+    from app.db.mongo import get_client, get_db, get_database
+    from app.main import app
+    from benchmarks.seed import seed
+
+    async with app.router.lifespan_context(app):
+        seeded = await seed(get_db(), args.cases, args.matters, args.seed)
+        case_ids = [str(oid) for oid in seeded["case_ids"]]
+        server = SimulatedServer(args.db_slots, args.db_ms / 1000)
+        app.dependency_overrides[get_database] = lambda: SimulatedDatabase(get_db(), server)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            rng = random.Random(args.seed)
+            mix = build_requests(client, case_ids, rng)
+            weights = [m[1] for m in mix]
+
+            async def one(results: List[Tuple[str, int, float]]) -> None:
+                name, _, call = rng.choices(mix, weights=weights)[0]
+                start = time.perf_counter()
+                response = await call()
+                results.append((name, response.status_code, time.perf_counter() - start))
+
+            # Calibration, closed loop; this load is not shed, and it gives the
+            # controller its latency baseline
+            calibration: List[Tuple[str, int, float]] = []
+            deadline = time.perf_counter() + args.seconds
+
+            async def client_loop() -> None:
+                while time.perf_counter() < deadline:
+                    await one(calibration)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            capacity = len(calibration) / elapsed
+            report(f"calibration: {args.concurrency} clients, {capacity:.0f} req/s sustained", calibration, elapsed)
+
+            rate = capacity * args.overload
+            for enabled in (True, False):
+                admission_controller.enabled = enabled
+                results: List[Tuple[str, int, float]] = []
+                tasks = []
+                started = time.perf_counter()
+                next_arrival = started
+                while next_arrival < started + args.seconds:
+                    delay = next_arrival - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(asyncio.create_task(one(results)))
+                    next_arrival += rng.expovariate(rate)
+                stats = admission_controller.stats()
+                await asyncio.gather(*tasks)
+                elapsed = time.perf_counter() - started
+                state = "on" if enabled else "off"
+                report(f"{args.overload:g}x overload ({rate:.0f} req/s offered), admission control {state}, "
+                       f"drained in {elapsed:.1f}s", results, elapsed)
+                if enabled:
+                    print(f"at the end of the burst: limit scale {stats['scale']}, mongo latency "
+                          f"{stats['mongo_latency_ms']} ms (baseline {stats['baseline_ms']} ms), limits "
+                          + ", ".join(f"{name} {c['limit']}" for name, c in stats["classes"].items()))
+        app.dependency_overrides.clear()
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--matters", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop clients for calibration")
+    parser.add_argument("--overload", type=float, default=5.0, help="Offered load as a multiple of the calibrated rate")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--db-ms", type=float, default=20.0, help="Simulated time per Mongo operation")
+    parser.add_argument("--db-slots", type=int, default=4, help="Simulated Mongo operations in parallel")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_analytics.py
+"""
+Measure the analytics snapshot (app/core/analytics.py).
+
+1. Build: time to load N seeded cases and their hearings into the columnar
+   snapshot, and the memory the columns take.
+2. Queries: pendency, disposal time and hearings per case grouped by each
+   group field, answered from the snapshot, against computing the same
+   pendency figures from a find() over the cases collection.
+3. Refresh: time to apply --changes updated cases and new hearings
+   incrementally, against rebuilding. The in-memory engine has no range
+   indexes, so there the refresh still scans each collection once; MongoDB
+   reads only the changed records through the updated_at indexes.
+
+Uses the in-memory engine by default; pass --mongo to run against
+settings.mongo_uri (the collections in settings.mongo_db are replaced).
+
+Run from backend/:
+
+    python -m benchmarks.bench_analytics [--cases 20000] [--queries 50] [--changes 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Median milliseconds of ``repeat`` calls"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(cases: int, queries: int, changes: int) -> None:
+    from app.core.analytics import CaseAnalytics, GROUP_FIELDS
+    from app.db.indexes import ensure_indexes
+    from app.db.mongo import get_client, get_db
+    from .seed import make_case, make_children
+
+    db = get_db()
+    rng = random.Random(7)
+    for name in ("cases", "case_hearings", "tombstones", "sync_state"):
+        await db[name].delete_many({})
+    await ensure_indexes(db)
+    lawyers = [f"lawyer{i}" for i in range(max(5, cases // 50))]
+    courts = [f"court{i}" for i in range(25)]
+    categories = [f"category{i}" for i in range(12)]
+    case_docs: List[Dict[str, Any]] = []
+    hearing_docs: List[Dict[str, Any]] = []
+    seeded_at = datetime.utcnow()
+    for i in range(cases):
+        case = make_case(rng, i, lawyers, lawyers, courts, categories)
+        case_docs.append(case)
+        for hearing in make_children(rng, case, lawyers)["case_hearings"]:
+            # Seeded hearing dates run into the future; changes must not
+            hearing["updated_at"] = min(hearing["created_at"], seeded_at)
+            hearing_docs.append(hearing)
+    for start in range(0, len(case_docs), 5000):
+        await db.cases.insert_many(case_docs[start:start + 5000])
+    for start in range(0, len(hearing_docs), 5000):
+        await db.case_hearings.insert_many(hearing_docs[start:start + 5000])
+
+    analytics = CaseAnalytics()
+    snapshot = await analytics.build(db)
+    stats = analytics.stats()
+    # Includes reading every case and hearing, which dominates with the in-memory engine
+    print(f"build: {stats['cases']} cases, {stats['hearings']} hearings in {analytics.build_ms:.0f} ms, "
+          f"columns {stats['memory_bytes'] / 1024 / 1024:.1f} MiB")
+
+    today = (datetime.utcnow() - datetime(1970, 1, 1)).days
+    mask = snapshot.case_mask()
+    print(f"\n{'query (median ms)':<24}" + "".join(f"{field:>20}" for field in GROUP_FIELDS))
+    for label, query in (("pendency", lambda by: snapshot.pendency(by, snapshot.case_mask(), today)),
+                         ("disposal", lambda by: snapshot.disposal(by, snapshot.case_mask())),
+                         ("hearings per case", lambda by: snapshot.hearing_counts(by, snapshot.case_mask()))):
+        print(f"{label:<24}" + "".join(f"{timed(lambda: query(by), queries):>20.2f}" for by in GROUP_FIELDS))
+
+    # Pendency by court type the way an ad-hoc report would: read the cases, group in Python
+    async def scan() -> Dict[str, float]:
+        ages: Dict[str, List[int]] = {}
+        async for doc in db.cases.find({"status": {"$ne": "Disposed"}}, {"court_type": 1, "filing_date": 1}):
+            ages.setdefault(doc["court_type"], []).append((datetime.utcnow() - doc["filing_date"]).days)
+        return {k: statistics.median(v) for k, v in ages.items()}
+
+    started = time.perf_counter()
+    for _ in range(3):
+        await scan()
+    scan_ms = (time.perf_counter() - started) * 1000 / 3
+    snapshot_ms = timed(lambda: snapshot.pendency("court_type", mask, today), queries)
+    print(f"\npendency by court_type: snapshot {snapshot_ms:.2f} ms, collection scan {scan_ms:.0f} ms "
+          f"({scan_ms / snapshot_ms:.0f}x)")
+
+    now = datetime.utcnow()
+    for doc in rng.sample(case_docs, min(changes, len(case_docs))):
+        await db.cases.update_one({"_id": doc["_id"]}, {"$set": {"status": "Disposed", "disposed_at": now,
+                                                                  "updated_at": now}})
+        await db.case_hearings.insert_one({"case_id": doc["_id"], "hearing_date": now, "stage": "Orders",
+                                           "order_summary": "Adjourned", "updated_at": now})
+    applied = await analytics.refresh(db)
+    refresh_ms = analytics.refresh_ms
+    await analytics.build(db)
+    print(f"refresh: {applied} changed records in {refresh_ms:.1f} ms, rebuild {analytics.build_ms:.0f} ms")
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50, help="Repetitions per query")
+    parser.add_argument("--changes", type=int, default=500, help="Cases updated before the incremental refresh")
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run(args.cases, args.queries, args.changes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# benchmarks/bench_backup.py
+"""
+Measure the change-log backup and point-in-time restore (app/core/backup.py).
+
+1. Seed N cases with their related records and take a base snapshot:
+   time, size on disk and compression ratio against the BSON size.
+2. Log --changes writes (updates, new hearings and notes, deletes) through
+   the change feed in two halves, remembering the database state between
+   them. Reports log bytes per event.
+3. Restore to the time between the halves and to the end of the log into a
+   second database: documents per second overall, time spent folding the
+   log, and whether the result matches the remembered state exactly.
+
+Uses the in-memory engine by default; pass --mongo to run against
+settings.mongo_uri (settings.mongo_db and <mongo_db>_restore are replaced).
+Segments and snapshots go to a temporary directory.
+
+Run from backend/:
+
+    python -m benchmarks.bench_backup [--cases 20000] [--changes 20000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List
+
+
+async def state(db: Any, collections: tuple) -> Dict[str, Dict[Any, Any]]:
+    return {name: {doc["_id"]: doc async for doc in db[name].find({})} for name in collections}
+
+
+async def run(cases: int, changes: int) -> None:
+    import bson
+    from bson import ObjectId
+    from pymongo import ReturnDocument
+    from app.core.backup import BACKUP_COLLECTIONS, ChangeLog, list_segments, restore
+    from app.core.config import settings
+    from app.core.events import change_feed
+    from app.db.mongo import get_client, get_db
+    from .seed import make_case, make_children
+
+    settings.backup_dir = tempfile.mkdtemp(prefix="law_matters_backup_")
+    settings.backup_fsync = False
+    db = get_db()
+    target = get_client()[f"{settings.mongo_db}_restore"]
+    rng = random.Random(3)
+    for name in BACKUP_COLLECTIONS:
+        await db[name].delete_many({})
+    lawyers = [ObjectId() for _ in range(max(5, cases // 50))]
+    courts = [f"court{i}" for i in range(25)]
+    categories = [f"category{i}" for i in range(12)]
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    case_docs = []
+    for i in range(cases):
+        case = make_case(rng, i, lawyers, lawyers, courts, categories)
+        case_docs.append(case)
+        for name, docs in make_children(rng, case, lawyers).items():
+            children.setdefault(name, []).extend(docs)
+    for name, docs in (("cases", case_docs), *children.items()):
+        for start in range(0, len(docs), 5000):
+            await db[name].insert_many(docs[start:start + 5000])
+    total = len(case_docs) + sum(len(docs) for docs in children.values())
+    raw_bytes = sum(len(bson.encode(doc)) for doc in case_docs) + sum(len(bson.encode(d)) for docs in children.values() for d in docs)
+
+    log = ChangeLog()
+    await log.start(db)
+    snapshot = await log.snapshot(db)
+    size = snapshot.path.stat().st_size
+    print(f"snapshot: {total} documents ({raw_bytes / 1024 / 1024:.1f} MiB BSON) in {log.snapshot_ms / 1000:.2f} s, "
+          f"{size / 1024 / 1024:.1f} MiB on disk ({raw_bytes / size:.1f}x)")
+
+    # Changes go through the (local) change feed, the way the routers report them
+    notes = children.get("case_notes", [])
+
+    async def write_changes(count: int) -> None:
+        for i in range(count):
+            case = rng.choice(case_docs)
+            roll = rng.random()
+            now = datetime.utcnow()
+            if roll < 0.4:
+                doc = await db.cases.find_one_and_update(
+                    {"_id": case["_id"]}, {"$set": {"judge_name": f"Hon. Justice {rng.randint(1, 999)}", "updated_at": now}},
+                    return_document=ReturnDocument.AFTER)
+                if doc is not None:
+                    change_feed.record("cases", "update", case["_id"], case["_id"], doc)
+            elif roll < 0.7:
+                hearing = {"_id": ObjectId(), "case_id": case["_id"], "hearing_date": now, "stage": "Arguments",
+                           "courtroom": "Court No. 1", "created_at": now, "updated_at": now}
+                await db.case_hearings.insert_one(hearing)
+                change_feed.record("case_hearings", "insert", hearing["_id"], case["_id"], hearing)
+            elif roll < 0.95:
+                note = {"_id": ObjectId(), "case_id": case["_id"], "content": "x" * rng.randint(20, 400),
+                        "created_by": "bench", "created_at": now, "updated_at": now}
+                await db.case_notes.insert_one(note)
+                notes.append(note)
+                change_feed.record("case_notes", "insert", note["_id"], case["_id"], note)
+            elif notes:
+                note = notes.pop(rng.randrange(len(notes)))
+                await db.case_notes.delete_one({"_id": note["_id"]})
+                change_feed.record("case_notes", "delete", note["_id"], note["case_id"])
+            if i % 1000 == 999:
+                await log.flush()
+        await log.flush()
+
+    await asyncio.sleep(0.01)
+    await write_changes(changes // 2)
+    await asyncio.sleep(0.01)
+    middle = datetime.utcnow()
+    expected = await state(db, BACKUP_COLLECTIONS)
+    await asyncio.sleep(0.01)
+    await write_changes(changes - changes // 2)
+    final = await state(db, BACKUP_COLLECTIONS)
+    await log.stop()
+    directory = log.directory
+    log_bytes = sum(s.path.stat().st_size for s in list_segments(directory))
+    print(f"log: {log.events} events in {log.frames} frames, {log_bytes / 1024 / 1024:.2f} MiB "
+          f"({log_bytes / max(log.events, 1):.0f} bytes per event)")
+
+    print(f"\n{'restore to':<14}{'documents':>10}{'events':>9}{'fold ms':>10}{'seconds':>9}{'docs/s':>10}  match")
+    for label, until, wanted in (("middle", middle, expected), ("end of log", None, final)):
+        report = await restore(target, directory, until)
+        restored = await state(target, BACKUP_COLLECTIONS)
+        match = restored == wanted
+        print(f"{label:<14}{report['total']:>10}{report['events_replayed']:>9}{report['replay_ms']:>10.0f}"
+              f"{report['seconds']:>9.2f}{report['docs_per_second']:>10}  {'yes' if match else 'NO'}")
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=20000, help="Writes logged after the snapshot")
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run(args.cases, args.changes))
+
+
+if __name__ == "__main__":
+    main()
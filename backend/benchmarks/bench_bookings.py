@@ -0,0 +1,95 @@
+# benchmarks/bench_bookings.py
+"""
+Measure the hearing booking index (app/core/bookings.py).
+
+One lawyer gets N hearings spread over the years, in several courtrooms.
+Reported per N: the cost of a double-booking check through the index,
+against reading all of the lawyer's hearings and comparing them (what a
+check without the index does), plus the cost of keeping the index current
+on a write.
+
+Uses the in-memory engine by default; pass --mongo to run against
+settings.mongo_uri (case_hearings in settings.mongo_db is replaced).
+
+Run from backend/:
+
+    python -m benchmarks.bench_bookings [--sizes 100,1000,10000] [--checks 2000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+
+def make_hearing(rng: random.Random, lawyer: str) -> Dict[str, Any]:
+    from bson import ObjectId
+    hour = rng.randint(9, 16)
+    return {
+        "_id": ObjectId(),
+        "case_id": ObjectId(),
+        "assigned_lawyer_id": lawyer,
+        "hearing_date": datetime(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+        "start_time": f"{hour:02d}:{rng.choice(['00', '30'])}",
+        "end_time": f"{hour + 1:02d}:00",
+        "courtroom": f"Court No. {rng.randint(1, 12)}",
+    }
+
+
+async def run(sizes: List[int], checks: int) -> None:
+    from app.core.bookings import BookingIndex, booking, clashes
+    from app.db.mongo import get_client, get_db
+
+    db = get_db()
+    rng = random.Random(11)
+    print(f"{'hearings':>10}{'index check µs':>18}{'scan check µs':>18}{'speedup':>10}{'index put µs':>16}")
+    for size in sizes:
+        await db.case_hearings.delete_many({})
+        hearings = [make_hearing(rng, "L") for _ in range(size)]
+        await db.case_hearings.insert_many(hearings)
+        index = BookingIndex()
+        await index.load(db)
+        probes = [make_hearing(rng, "L") for _ in range(checks)]
+
+        started = time.perf_counter()
+        for probe in probes:
+            index.conflicts(probe)
+        index_us = (time.perf_counter() - started) / checks * 1e6
+
+        # Without the index: read the lawyer's hearings and compare each
+        sample = probes[:max(1, checks // 50)]
+        started = time.perf_counter()
+        for probe in sample:
+            entry = booking(probe)
+            async for doc in db.case_hearings.find({"assigned_lawyer_id": "L"}):
+                other = booking(doc)
+                if other is not None:
+                    clashes(entry, other)
+        scan_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+        started = time.perf_counter()
+        for probe in probes:
+            index.put(probe)
+        put_us = (time.perf_counter() - started) / checks * 1e6
+        print(f"{size:>10}{index_us:>18.2f}{scan_us:>18.0f}{scan_us / index_us:>9.0f}x{put_us:>16.2f}")
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma separated hearing counts for the lawyer")
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run([int(s) for s in args.sizes.split(",")], args.checks))
+
+
+if __name__ == "__main__":
+    main()
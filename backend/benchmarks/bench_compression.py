@@ -0,0 +1,113 @@
+# benchmarks/bench_compression.py
+"""
+Measure response compression and the case response cache (app/core/compression.py).
+
+One case is seeded with --docs hearings and notes. For each encoding the
+client may ask for (identity, gzip, br, zstd; br and zstd only when the
+packages are installed), reported per request:
+
+- bytes on the wire and the ratio to the uncompressed body;
+- process CPU time, with the response cache off (every request runs the
+  handler, serializes and compresses) and on (answered from the cached,
+  pre-compressed body);
+- for the NDJSON stream of the notes, which is compressed per batch as it
+  is produced and never cached.
+
+Uses the in-memory engine; the CPU figures include the ASGI stack and the
+in-process client (which also decodes compressed bodies), so compare the
+rows rather than read them as absolutes.
+
+Run from backend/:
+
+    python -m benchmarks.bench_compression [--docs 400] [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Tuple
+
+
+async def measure(client: Any, url: str, headers: Dict[str, str], requests: int) -> Tuple[int, float]:
+    """Wire bytes of one response and CPU µs per request"""
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    wire = response.num_bytes_downloaded
+    started = time.process_time()
+    for _ in range(requests):
+        await client.get(url, headers=headers)
+    return wire, (time.process_time() - started) / requests * 1e6
+
+
+async def run(docs: int, requests: int) -> None:
+    import httpx
+    from bson import ObjectId
+    from app.core.compression import available
+    from app.core.config import settings
+    from app.db.mongo import get_db
+    from app.main import app
+    from .seed import make_case, make_children
+
+    rng = random.Random(5)
+    lawyers = [ObjectId() for _ in range(5)]
+    async with app.router.lifespan_context(app):
+        db = get_db()
+        case = make_case(rng, 0, lawyers, lawyers, ["court0"], ["category0"])
+        await db.cases.insert_one(case)
+        hearings, notes = [], []
+        while len(hearings) < docs or len(notes) < docs:
+            children = make_children(rng, case, lawyers)
+            hearings.extend(children["case_hearings"])
+            notes.extend(children["case_notes"])
+        await db.case_hearings.insert_many(hearings[:docs])
+        await db.case_notes.insert_many(notes[:docs])
+
+        cid = str(case["_id"])
+        routes = (
+            (f"hearings page ({docs})", f"/cases/{cid}/hearings?limit={docs}", {}, True),
+            ("case detail", f"/cases/{cid}", {}, True),
+            (f"notes NDJSON ({docs})", f"/cases/{cid}/notes", {"accept": "application/x-ndjson"}, False),
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'response':<24}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'uncached µs':>14}{'cached µs':>12}")
+            for label, url, extra, cacheable in routes:
+                identity = None
+                for encoding in ("identity",) + available():
+                    headers = {**extra, "accept-encoding": encoding}
+                    settings.response_cache_enabled = False
+                    wire, uncached_us = await measure(client, url, headers, requests)
+                    identity = identity or wire
+                    cached = ""
+                    if cacheable:
+                        settings.response_cache_enabled = True
+                        _, cached_us = await measure(client, url, headers, requests)
+                        cached = f"{cached_us:.0f}"
+                    print(f"{label:<24}{encoding:<10}{wire:>10}{wire / identity:>8.2f}{uncached_us:>14.0f}{cached:>12}")
+                    label = ""
+            # Revalidation: the client already has the body
+            settings.response_cache_enabled = True
+            etag = (await client.get(routes[0][1])).headers["etag"]
+            started = time.process_time()
+            for _ in range(requests):
+                response = await client.get(routes[0][1], headers={"if-none-match": etag})
+            print(f"\nIf-None-Match on the hearings page: {response.status_code}, "
+                  f"{(time.process_time() - started) / requests * 1e6:.0f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=400, help="Hearings and notes seeded for the case")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per measurement")
+    args = parser.parse_args()
+
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    os.environ.setdefault("ANALYTICS_ENABLED", "false")
+    asyncio.run(run(args.docs, args.requests))
+
+
+if __name__ == "__main__":
+    main()
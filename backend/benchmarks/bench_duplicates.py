@@ -0,0 +1,165 @@
+# benchmarks/bench_duplicates.py
+"""
+Measure the duplicate case finder (app/core/duplicates.py).
+
+N cases are seeded with person-name titles and parties, plus --duplicates
+(a fraction of N) copies of random cases entered again differently:
+
+- reformatted: the same number written another way ("CRL.A. 12/2020" as
+  "CRLA 12 of 2020"), which the unique index catches;
+- retyped: another case type, a typo in the title and a party name;
+- renumbered: the serial number mistyped, the title sides swapped.
+
+Seeded rows skip the routers, so none carries case_number_norm yet. Reported:
+the backfill (and how many reformatted copies it left without the key), the
+scan time, the pairs proposed and scored against the N²/2 a full comparison
+would need, and the recall of the injected pairs per kind.
+
+Uses the in-memory engine by default; pass --mongo to run against
+settings.mongo_uri (the collections in settings.mongo_db are replaced).
+
+Run from backend/:
+
+    python -m benchmarks.bench_duplicates [--cases 20000] [--duplicates 0.02] [--courts 25]
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Ananya", "Diya", "Saanvi", "Aadhya", "Kavya", "Priya", "Meera", "Lakshmi", "Pooja", "Neha",
+    "Rahul", "Rohit", "Suresh", "Ramesh", "Mahesh", "Vijay", "Sanjay", "Anil", "Sunil", "Manoj",
+    "Deepak", "Amit", "Rajesh", "Harish", "Gopal", "Mohan", "Kiran", "Asha", "Geeta", "Sunita",
+]
+SURNAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Iyer", "Menon",
+    "Rao", "Das", "Bose", "Ghosh", "Mukherjee", "Chatterjee", "Banerjee", "Joshi", "Kulkarni", "Deshpande",
+    "Pillai", "Naidu", "Chauhan", "Yadav", "Mishra", "Pandey", "Tiwari", "Dubey", "Saxena", "Agarwal",
+    "Malhotra", "Kapoor", "Khanna", "Mehta", "Shah", "Desai", "Jain", "Bhat", "Hegde", "Shetty",
+]
+# Other ways to write the case types make_case uses, with a different type for "retyped"
+REFORMATS = {"CRL.A.": ("Crl. Appeal No.", "CRL.REV."), "W.P.(C)": ("WP(Civil) No.", "W.P.(CRL)"),
+             "CS": ("Civil Suit No.", "O.S."), "MAC": ("MACT No.", "EP")}
+
+
+def person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+
+
+def typo(rng: random.Random, text: str) -> str:
+    """Drop one letter of a longer word"""
+    words = text.split(" ")
+    long = [i for i, w in enumerate(words) if len(w) > 4]
+    if not long:
+        return text
+    i = rng.choice(long)
+    j = rng.randrange(1, len(words[i]))
+    words[i] = words[i][:j] + words[i][j + 1:]
+    return " ".join(words)
+
+
+def variant(rng: random.Random, kind: str, case: Dict[str, Any], parties: List[Dict[str, Any]],
+            case_id: Any) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    prefix, serial, year = re.match(r"(.+) (\d+)/(\d+)$", case["case_number"]).groups()
+    spelled, other = REFORMATS[prefix]
+    copy = {**case, "_id": case_id}
+    names = [p["name"] for p in parties]
+    if kind == "reformatted":
+        copy["case_number"] = f"{spelled} {serial} of {year}"
+    elif kind == "retyped":
+        copy["case_number"] = f"{other} {serial}/{year}"
+        copy["case_title"] = typo(rng, case["case_title"])
+        names[0] = typo(rng, names[0])
+    else:
+        copy["case_number"] = f"{prefix} {serial[::-1] if serial[::-1] != serial else int(serial) + 10}/{year}"
+        petitioner, respondent = case["case_title"].split(" vs ")
+        copy["case_title"] = f"{respondent} vs {petitioner}"
+    return copy, [{**p, "case_id": case_id, "name": name} for p, name in zip(parties, names)]
+
+
+async def run(cases: int, duplicates: float, courts: int) -> None:
+    from bson import ObjectId
+    from app.core.config import settings
+    from app.core.duplicates import DuplicateFinder
+    from app.db.indexes import ensure_indexes
+    from app.db.mongo import get_client, get_db
+    from .seed import make_case
+
+    db = get_db()
+    rng = random.Random(11)
+    for name in ("cases", "case_parties", "case_duplicates", "job_runs"):
+        await db[name].delete_many({})
+    await ensure_indexes(db)
+    lawyers = [f"lawyer{i}" for i in range(max(5, cases // 50))]
+    court_ids = [f"court{i}" for i in range(courts)]
+    categories = [f"category{i}" for i in range(12)]
+
+    case_docs: List[Dict[str, Any]] = []
+    party_docs: Dict[Any, List[Dict[str, Any]]] = {}
+    for i in range(cases):
+        case = make_case(rng, i, lawyers, lawyers, court_ids, categories)
+        petitioner, respondent = person(rng), person(rng)
+        case["case_title"] = f"{petitioner} vs {respondent}"
+        case_docs.append(case)
+        party_docs[case["_id"]] = [
+            {"case_id": case["_id"], "party_type": "Petitioner", "name": petitioner, "created_at": case["filing_date"]},
+            {"case_id": case["_id"], "party_type": "Respondent", "name": respondent, "created_at": case["filing_date"]},
+        ]
+    injected: Dict[str, Set[Tuple[str, str]]] = {"reformatted": set(), "retyped": set(), "renumbered": set()}
+    for base in rng.sample(case_docs, int(cases * duplicates)):
+        kind = rng.choice(list(injected))
+        copy, parties = variant(rng, kind, base, party_docs[base["_id"]], ObjectId())
+        case_docs.append(copy)
+        party_docs[copy["_id"]] = parties
+        injected[kind].add(tuple(sorted((str(base["_id"]), str(copy["_id"])))))
+    rng.shuffle(case_docs)
+    for start in range(0, len(case_docs), 5000):
+        await db.cases.insert_many(case_docs[start:start + 5000])
+    all_parties = [p for ps in party_docs.values() for p in ps]
+    for start in range(0, len(all_parties), 5000):
+        await db.case_parties.insert_many(all_parties[start:start + 5000])
+
+    finder = DuplicateFinder()
+    await finder.backfill(db)
+    print(f"backfill: {finder.backfilled} normalized, {finder.unindexed} left without the key "
+          f"({len(injected['reformatted'])} reformatted copies)")
+
+    stats = await finder.scan(db)
+    total = len(case_docs)
+    print(f"scan: {total} cases in {stats['blocks']} blocks, {stats['scan_ms']:.0f} ms "
+          f"({stats['scan_ms'] * 1000 / total:.1f} µs per case)")
+    print(f"pairs: {stats['candidate_pairs']} proposed, {stats['compared_pairs']} scored with parties, "
+          f"{total * (total - 1) // 2} for a full comparison "
+          f"({total * (total - 1) / 2 / max(stats['candidate_pairs'], 1):.0f}x fewer)")
+
+    found = {tuple(sorted(map(str, pair["case_ids"]))) async for pair in db.case_duplicates.find({}, {"case_ids": 1})}
+    expected = set().union(*injected.values())
+    print(f"\n{'kind':<14}{'injected':>10}{'found':>8}{'recall':>9}")
+    for kind, pairs in injected.items():
+        hits = len(pairs & found)
+        print(f"{kind:<14}{len(pairs):>10}{hits:>8}{hits / max(len(pairs), 1):>9.2f}")
+    print(f"\n{len(found)} pairs at score >= {settings.duplicate_min_score}, {len(found - expected)} not injected")
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.02, help="Injected duplicates, as a fraction of --cases")
+    parser.add_argument("--courts", type=int, default=25)
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run(args.cases, args.duplicates, args.courts))
+
+
+if __name__ == "__main__":
+    main()
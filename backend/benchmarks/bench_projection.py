@@ -0,0 +1,76 @@
+# benchmarks/bench_projection.py
+"""
+Compare response building for list_cases?limit=100 with and without
+fields=case_title,case_number.
+
+Measures the part that runs in the API worker (validation + JSON encoding)
+and the response size. Run from backend/:
+
+    python -m benchmarks.bench_projection [--rounds 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.projection import parse_fields, projected_response
+from app.models.schemas import CaseOut
+
+
+def _case(i: int) -> dict:
+    now = datetime(2024, 1, 1) + timedelta(hours=i)
+    return {
+        "_id": str(ObjectId()),
+        "case_title": f"State of Maharashtra vs Petitioner {i}",
+        "case_number": f"CRL.A. {i}/2024",
+        "court_type": "HC",
+        "court_name_id": str(ObjectId()),
+        "judge_name": "Hon. Justice Rao",
+        "filing_date": datetime(now.year, now.month, now.day),
+        "category_id": str(ObjectId()),
+        "subcategory_id": str(ObjectId()),
+        "client_id": str(ObjectId()),
+        "assigned_lawyer_id": str(ObjectId()),
+        "status": "Active",
+        "created_by": str(ObjectId()),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _full(docs):
+    return JSONResponse(content=jsonable_encoder([CaseOut(**d) for d in docs], by_alias=True))
+
+
+def _run(label, build, docs, rounds):
+    body = build(docs).body
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build(docs)
+    per_call = (time.perf_counter() - start) / rounds * 1000
+    print(f"{label:<32} {per_call:8.3f} ms/response {len(body):8d} bytes")
+    return per_call, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    docs = [_case(i) for i in range(args.limit)]
+    selected = parse_fields("case_title,case_number", CaseOut)
+    # Trim documents the way the Mongo projection would
+    projected_docs = [{k: d[k] for k in ("_id", "case_title", "case_number")} for d in docs]
+
+    full_ms, full_bytes = _run("full documents", _full, docs, args.rounds)
+    proj_ms, proj_bytes = _run("fields=case_title,case_number",
+                               lambda d: projected_response(CaseOut, selected, d), projected_docs, args.rounds)
+    print(f"speedup {full_ms / proj_ms:.1f}x, payload {proj_bytes / full_bytes:.0%} of full")
+
+
+if __name__ == "__main__":
+    main()
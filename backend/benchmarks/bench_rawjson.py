@@ -0,0 +1,108 @@
+# benchmarks/bench_rawjson.py
+"""
+Check and measure the RawBSON -> JSON fast path (settings.raw_bson_responses).
+
+1. Equivalence: runs benchmarks.check_rawjson, which compares every list
+   route under /cases with the fast path off and on, uncached, byte for
+   byte. Exits 1 on any difference.
+2. Throughput and memory: builds the JSON for N documents of each model the
+   regular way (BSON decode, ObjectId conversion, pydantic, jsonable_encoder,
+   json.dumps) and with the transcoder, reporting time and peak allocation.
+
+Run from backend/:
+
+    python -m benchmarks.bench_rawjson [--cases 60] [--docs 200] [--rounds 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from .check_rawjson import check_equivalence
+
+
+def _measure(build: Callable[[], bytes], rounds: int) -> Tuple[float, int, int]:
+    body = build()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build()
+    per_call = (time.perf_counter() - start) / rounds * 1000
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak, len(body)
+
+
+def bench_encoding(docs_per_model: int, rounds: int) -> None:
+    import random
+
+    import bson
+    from bson import ObjectId
+    from bson.raw_bson import RawBSONDocument
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from app.models.rawjson import RAW_CODEC_OPTIONS, field_plan, transcode_many
+    from app.models.schemas import CaseOut, CaseHearingOut, CaseNoteOut, CaseTaskOut
+    from app.routers.cases import _convert
+    from benchmarks.seed import make_case, make_children
+
+    rng = random.Random(7)
+    lawyers = [ObjectId() for _ in range(5)]
+    samples: Dict[str, List[Dict[str, Any]]] = {"cases": [], "case_hearings": [], "case_notes": [], "case_tasks": []}
+    while any(len(v) < docs_per_model for v in samples.values()):
+        case = make_case(rng, len(samples["cases"]), lawyers, [str(o) for o in lawyers], ["c"], ["k"])
+        samples["cases"].append(case)
+        children = make_children(rng, case, lawyers)
+        for name in ("case_hearings", "case_notes", "case_tasks"):
+            for child in children[name]:
+                child["_id"] = ObjectId()
+            samples[name].extend(children[name])
+    models = {"cases": CaseOut, "case_hearings": CaseHearingOut, "case_notes": CaseNoteOut, "case_tasks": CaseTaskOut}
+
+    print(f"{'model':<16}{'path':<10}{'ms/resp':>10}{'peak KiB':>10}{'bytes':>9}")
+    for name, model in models.items():
+        raw = [RawBSONDocument(bson.encode(doc), RAW_CODEC_OPTIONS) for doc in samples[name][:docs_per_model]]
+        plan = field_plan(model)
+
+        def regular() -> bytes:
+            items = [_convert(bson.decode(doc.raw)) for doc in raw]
+            return JSONResponse(content=jsonable_encoder([model(**item) for item in items], by_alias=True)).body
+
+        def fast() -> bytes:
+            return transcode_many(raw, plan)
+
+        slow_ms, slow_peak, slow_bytes = _measure(regular, rounds)
+        fast_ms, fast_peak, fast_bytes = _measure(fast, rounds)
+        print(f"{model.__name__:<16}{'regular':<10}{slow_ms:>10.3f}{slow_peak / 1024:>10.1f}{slow_bytes:>9}")
+        print(f"{'':<16}{'raw':<10}{fast_ms:>10.3f}{fast_peak / 1024:>10.1f}{fast_bytes:>9}"
+              f"   {slow_ms / fast_ms:.1f}x faster, {fast_peak / slow_peak:.0%} of peak memory")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=60, help="Seeded cases for the equivalence check")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per response in the benchmark")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+
+    compared, problems = asyncio.run(check_equivalence(args.cases))
+    if problems:
+        print(f"{len(problems)} of {compared} responses differ:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"equivalence: {compared} responses identical, all served by the fast path")
+    bench_encoding(args.docs, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
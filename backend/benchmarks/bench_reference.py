@@ -0,0 +1,107 @@
+# benchmarks/bench_reference.py
+"""
+Measure the reference data cache (app/core/reference.py).
+
+1. Startup: time to load N courts, categories and subcategories into a
+   snapshot, and the memory it takes.
+2. Lookups: cost of validating a case's court/category/subcategory ids and
+   of resolving their names from the snapshot, against doing the same
+   lookups with find_one queries.
+
+Uses the in-memory engine by default; pass --mongo to run against
+settings.mongo_uri (the collections in settings.mongo_db are replaced).
+
+Run from backend/:
+
+    python -m benchmarks.bench_reference [--courts 5000] [--categories 200] [--subcategories 20] [--lookups 20000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+
+async def run(courts: int, categories: int, per_category: int, lookups: int) -> None:
+    from bson import ObjectId
+    from app.core.reference import ReferenceData
+    from app.db.mongo import get_client, get_db
+
+    db = get_db()
+    rng = random.Random(3)
+    for name in ("courts", "case_categories", "case_subcategories", "reference_state"):
+        await db[name].delete_many({})
+    court_docs = [{"_id": ObjectId(), "name": f"Court {i}", "court_type": rng.choice(["SC", "HC", "District"])}
+                  for i in range(courts)]
+    category_docs = [{"_id": ObjectId(), "name": f"Category {i}"} for i in range(categories)]
+    sub_docs = [{"_id": ObjectId(), "name": f"Subcategory {c}.{i}", "category_id": str(cat["_id"])}
+                for c, cat in enumerate(category_docs) for i in range(per_category)]
+    await db.courts.insert_many(court_docs)
+    await db.case_categories.insert_many(category_docs)
+    await db.case_subcategories.insert_many(sub_docs)
+
+    cache = ReferenceData()
+    started = time.perf_counter()
+    snapshot = await cache.load(db)
+    load_ms = (time.perf_counter() - started) * 1000
+    # Memory measured on a second load; tracing slows the load down
+    tracemalloc.start()
+    await ReferenceData().load(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"startup load: {len(snapshot.courts)} courts, {len(snapshot.categories)} categories, "
+          f"{len(snapshot.subcategories)} subcategories in {load_ms:.1f} ms, peak {peak / 1024:.0f} KiB")
+
+    cases: List[Dict[str, Any]] = []
+    for _ in range(lookups):
+        court = rng.choice(court_docs)
+        sub = rng.choice(sub_docs)
+        cases.append({"court_type": court["court_type"], "court_name_id": str(court["_id"]),
+                      "category_id": sub["category_id"], "subcategory_id": str(sub["_id"])})
+
+    started = time.perf_counter()
+    for case in cases:
+        cache.check_case(case)
+    check_us = (time.perf_counter() - started) / lookups * 1e6
+    started = time.perf_counter()
+    for case in cases:
+        cache.names(case)
+    names_us = (time.perf_counter() - started) / lookups * 1e6
+
+    # The same validation done with queries, as a handler without the cache would
+    sample = cases[:max(1, lookups // 20)]
+    started = time.perf_counter()
+    for case in sample:
+        court = await db.courts.find_one({"_id": ObjectId(case["court_name_id"])})
+        sub = await db.case_subcategories.find_one({"_id": ObjectId(case["subcategory_id"])})
+        category = await db.case_categories.find_one({"_id": ObjectId(case["category_id"])})
+        assert court and sub and category and court["court_type"] == case["court_type"]
+    query_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+    print(f"{'per case':<28}{'µs':>10}")
+    print(f"{'validate (snapshot)':<28}{check_us:>10.2f}")
+    print(f"{'names (snapshot)':<28}{names_us:>10.2f}")
+    print(f"{'validate (3 find_one)':<28}{query_us:>10.2f}   {query_us / check_us:.0f}x slower")
+    get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courts", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--subcategories", type=int, default=20, help="Subcategories per category")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    asyncio.run(run(args.courts, args.categories, args.subcategories, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_startup.py
+"""
+Worker cold start: import time and time to the first successful request.
+
+Each trial starts a fresh interpreter that imports app.main, runs the
+lifespan startup and sends GET /cases/?limit=1 until it returns 200. Reported
+per startup mode (settings.startup_mode), as the median of ``--trials``:
+
+- process: interpreter start to first 200, as seen by this script
+- import: ``import app.main``
+- startup: the lifespan up to ready, with its phases (connect, pool warm-up,
+  indexes, reference data, OpenAPI pre-build)
+- first request: ready to first 200
+
+followed by the packages that dominate the import time
+(``python -X importtime``).
+
+Uses the in-memory engine by default; pass --mongo to start against
+settings.mongo_uri, where pool warm-up and index creation cost round trips.
+
+Run from backend/:
+
+    python -m benchmarks.bench_startup [--trials 5] [--mongo]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULT_PREFIX = "RESULT "
+
+
+def child() -> None:
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+    import httpx
+
+    async def run() -> Dict[str, Any]:
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                while (await client.get("/cases/", params={"limit": 1})).status_code != 200:
+                    await asyncio.sleep(0.01)
+            first = time.perf_counter()
+            return {
+                "import_ms": (imported - started) * 1000,
+                "startup_ms": (ready - imported) * 1000,
+                "first_request_ms": (first - ready) * 1000,
+                "phases_ms": app.state.startup["phases_ms"],
+            }
+
+    result = asyncio.run(run())
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def trial(env: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-W", "ignore", "-m", "benchmarks.bench_startup", "--child"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    process_ms = (time.perf_counter() - started) * 1000
+    line = next(l for l in output.splitlines() if l.startswith(RESULT_PREFIX))
+    return {"process_ms": process_ms, **json.loads(line[len(RESULT_PREFIX):])}
+
+
+def import_breakdown(env: Dict[str, str], top: int) -> List[Any]:
+    """
+    Import time of app.main split by package: each package is charged the
+    cumulative time of its imports that were not made by the same package
+    (so dependencies it pulls in count towards it). The app itself is
+    charged only its own modules' self time.
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((depth, name.strip().split(".")[0], int(parts[0].split(":")[1]), int(parts[1])))
+
+    totals: Dict[str, int] = {}
+    # importtime lists a module after its imports; walking backwards gives parents first
+    stack: List[Any] = []
+    for depth, root, self_us, cumulative in reversed(entries):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        if root == "app":
+            totals[root] = totals.get(root, 0) + self_us
+        elif parent != root and (parent == "app" or parent is None):
+            totals[root] = totals.get(root, 0) + cumulative
+        stack.append((depth, root))
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--modes", default="eager,fast", help="Comma separated startup modes")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed in the import breakdown")
+    parser.add_argument("--mongo", action="store_true", help="Use settings.mongo_uri instead of the in-memory engine")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not args.mongo:
+        os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+    if args.child:
+        return child()
+
+    print(f"{'mode':<8}{'process':>10}{'import':>10}{'startup':>10}{'first req':>11}   startup phases (ms)")
+    for mode in args.modes.split(","):
+        env = {**os.environ, "STARTUP_MODE": mode}
+        runs = [trial(env) for _ in range(args.trials)]
+
+        def median(key: str) -> float:
+            return statistics.median(r[key] for r in runs)
+
+        phases = {name: statistics.median(r["phases_ms"].get(name, 0.0) for r in runs)
+                  for name in runs[0]["phases_ms"]}
+        print(f"{mode:<8}{median('process_ms'):>10.1f}{median('import_ms'):>10.1f}{median('startup_ms'):>10.1f}"
+              f"{median('first_request_ms'):>11.1f}   "
+              + ", ".join(f"{name} {ms:.1f}" for name, ms in phases.items()))
+
+    print("\nimport time by package (ms, including the dependencies it imports)")
+    for name, micros in import_breakdown(dict(os.environ), args.top):
+        print(f"  {name:<28}{micros / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/check_archive.py
+"""
+Check that archivers racing on the same record never lose it.
+
+Runs on the in-memory engine. For a seeded case with its related records
+and for a matter with timeline events, archives the record twice: once one
+run after the other, the second holding a stale copy read before the first
+finished, and once with both runs interleaved. Afterwards the record must be archived
+exactly once with everything that belonged to it, GET with
+include_archived=true must find it, and restoring must bring it all back.
+Exits 1 on any failure.
+
+Run from backend/:
+
+    python -m benchmarks.check_archive
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+EVENTS = 5
+
+
+async def check_races() -> List[str]:
+    import httpx
+    from bson import ObjectId
+    from app.core.archive import CASE_CHILDREN, archive_case, archive_matter, restore_case, restore_matter
+    from app.db.mongo import get_db
+    from app.main import app
+    from benchmarks.seed import seed
+
+    problems: List[str] = []
+    old = datetime.utcnow() - timedelta(days=400)
+
+    async def children(db: Any, oid: Any) -> Dict[str, int]:
+        return {name: await db[name].count_documents({"case_id": oid}) for name in CASE_CHILDREN}
+
+    async def seed_matter(db: Any, client: Any) -> Any:
+        matter = (await client.post("/matters/", json={"title": "Archived"})).json()
+        for i in range(EVENTS):
+            await client.post(f"/matters/{matter['_id']}/timeline", json={"event_type": "note", "text": f"event {i}"})
+        oid = ObjectId(matter["_id"])
+        await db.matters.update_one({"_id": oid}, {"$set": {"is_archived": True, "updated_at": old}})
+        return oid
+
+    async def both(first: Awaitable[bool], second: Callable[[], Awaitable[bool]], interleaved: bool) -> List[bool]:
+        if interleaved:
+            return list(await asyncio.gather(first, second()))
+        return [await first, await second()]
+
+    async with app.router.lifespan_context(app):
+        db = get_db()
+        case_ids = (await seed(db, 2, 0))["case_ids"]
+        await db.cases.update_many({}, {"$set": {"status": "Disposed", "updated_at": old}})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            for oid, interleaved in zip(case_ids, (False, True)):
+                label = "interleaved" if interleaved else "stale copy"
+
+                expected = await children(db, oid)
+                copy_a = await db.cases.find_one({"_id": oid})
+                copy_b = await db.cases.find_one({"_id": oid})
+                results = await both(archive_case(db, copy_a), lambda: archive_case(db, copy_b), interleaved)
+                if sorted(results) != [False, True]:
+                    problems.append(f"case, {label}: archivers returned {results}")
+                response = await client.get(f"/cases/{oid}", params={"include_archived": "true"})
+                if response.status_code != 200:
+                    problems.append(f"case, {label}: GET include_archived returned {response.status_code}")
+                await restore_case(db, oid)
+                restored = await children(db, oid)
+                if not await db.cases.find_one({"_id": oid}) or restored != expected:
+                    problems.append(f"case, {label}: restored {restored}, archived {expected}")
+
+                oid = await seed_matter(db, client)
+                copy_a = await db.matters.find_one({"_id": oid})
+                copy_b = await db.matters.find_one({"_id": oid})
+                results = await both(archive_matter(db, copy_a), lambda: archive_matter(db, copy_b), interleaved)
+                if sorted(results) != [False, True]:
+                    problems.append(f"matter, {label}: archivers returned {results}")
+                response = await client.get(f"/matters/{oid}", params={"include_archived": "true"})
+                if response.status_code != 200:
+                    problems.append(f"matter, {label}: GET include_archived returned {response.status_code}")
+                await restore_matter(db, oid)
+                events = (await client.get(f"/matters/{oid}/timeline", params={"limit": 100})).json()
+                if len(events) != EVENTS:
+                    problems.append(f"matter, {label}: restored {len(events)} of {EVENTS} events")
+    return problems
+
+
+def main() -> None:
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+
+    problems = asyncio.run(check_races())
+    if problems:
+        print(f"{len(problems)} problems:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("archive races: every record archived once and restored intact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/check_bookings.py
+"""
+Check that the double-booking index sees hearings written by other workers.
+
+Runs on the in-memory engine with the local change feed, which only reports
+this worker's writes. Hearings written straight to the database stand in
+for ones booked through another worker. A clashing hearing added, updated
+or batched through the API must still get 409; the periodic refresh must
+pick up another worker's hearings, moves and deletes for the conflicts
+listing; and a slot held by a request in flight must not be replaced by
+the older copy a refresh reads. Exits 1 on any failure.
+
+Run from backend/:
+
+    python -m benchmarks.check_bookings
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+LAWYER = "lawyer-1"
+
+
+async def check_bookings() -> List[str]:
+    import httpx
+    from bson import ObjectId
+    from app.core.bookings import hearing_bookings
+    from app.core.events import change_feed
+    from app.db.mongo import get_db
+    from app.main import app
+    from benchmarks.seed import seed
+
+    problems: List[str] = []
+    day = (datetime.utcnow() + timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def elsewhere(db: Any, case_id: Any, courtroom: str, start: str, end: str) -> Any:
+        """A hearing booked through another worker: in the database, never on this worker's feed"""
+        now = datetime.utcnow()
+        doc = {"_id": ObjectId(), "case_id": case_id, "hearing_date": day, "start_time": start, "end_time": end,
+               "courtroom": courtroom, "assigned_lawyer_id": LAWYER, "created_at": now, "updated_at": now}
+        await db.case_hearings.insert_one(doc)
+        return doc["_id"]
+
+    def hearing(case_id: Any, courtroom: str, start: str, end: str) -> Dict[str, Any]:
+        return {"case_id": str(case_id), "hearing_date": day.date().isoformat(), "start_time": start,
+                "end_time": end, "courtroom": courtroom, "assigned_lawyer_id": LAWYER}
+
+    async def listed(client: Any) -> int:
+        response = await client.get("/cases/hearings/conflicts", params={"date_from": day.date().isoformat(),
+                                                                         "lawyer_id": LAWYER})
+        return len(response.json()["conflicts"])
+
+    async with app.router.lifespan_context(app):
+        if change_feed.source != "local":
+            return [f"expected the local change feed, got {change_feed.source}"]
+        db = get_db()
+        case_a, case_b = (await seed(db, 2, 0))["case_ids"]
+        await db.case_hearings.delete_many({"assigned_lawyer_id": LAWYER})
+        await hearing_bookings.load(db)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            # Writes re-read the lawyer's day before the check
+            await elsewhere(db, case_a, "Court 1", "10:00", "11:00")
+            response = await client.post(f"/cases/{case_b}/hearings", json=hearing(case_b, "Court 2", "10:30", "11:30"))
+            if response.status_code != 409:
+                problems.append(f"add: hearing booked elsewhere not seen, got {response.status_code}")
+
+            created = await client.post(f"/cases/{case_b}/hearings", json=hearing(case_b, "Court 2", "14:00", "15:00"))
+            if created.status_code != 201:
+                return problems + [f"add: free slot refused with {created.status_code}: {created.text}"]
+            await elsewhere(db, case_a, "Court 1", "16:00", "17:00")
+            response = await client.patch(f"/cases/{case_b}/hearings/{created.json()['_id']}",
+                                          json={"start_time": "16:30", "end_time": "17:30"})
+            if response.status_code != 409:
+                problems.append(f"update: hearing booked elsewhere not seen, got {response.status_code}")
+
+            await elsewhere(db, case_a, "Court 1", "12:00", "13:00")
+            data = hearing(case_b, "Court 2", "12:15", "12:45")
+            response = await client.post(f"/cases/{case_b}/batch", json={"operations": [{"op": "add_hearing",
+                                                                                          "data": data}]})
+            if response.status_code != 409:
+                problems.append(f"batch: hearing booked elsewhere not seen, got {response.status_code}")
+
+            # The refresh picks up other workers' writes for the listing
+            await hearing_bookings.load(db)
+            if await listed(client):
+                problems.append("conflicts listed before any clash was written")
+            clash = await elsewhere(db, case_b, "Court 3", "10:15", "10:45")
+            await hearing_bookings.refresh(db)
+            if await listed(client) != 1:
+                problems.append("refresh: clash booked elsewhere not listed")
+            await db.case_hearings.update_one({"_id": clash}, {"$set": {"start_time": "18:00", "end_time": "19:00",
+                                                                        "updated_at": datetime.utcnow()}})
+            await hearing_bookings.refresh(db)
+            if await listed(client):
+                problems.append("refresh: clash moved elsewhere still listed")
+            await db.case_hearings.update_one({"_id": clash}, {"$set": {"start_time": "10:15", "end_time": "10:45",
+                                                                        "updated_at": datetime.utcnow()}})
+            await hearing_bookings.refresh(db)
+            await db.case_hearings.delete_one({"_id": clash})
+            await db.tombstones.insert_one({"collection": "case_hearings", "doc_id": clash, "case_id": case_b,
+                                            "deleted_at": datetime.utcnow()})
+            await hearing_bookings.refresh(db)
+            if await listed(client):
+                problems.append("refresh: clash deleted elsewhere still listed")
+
+            # A held slot is newer than the stored copy and survives a refresh
+            held = await db.case_hearings.find_one({"_id": ObjectId(created.json()["_id"])})
+            hearing_bookings.put({**held, "start_time": "10:20", "end_time": "10:40", "courtroom": "Court 4",
+                                  "updated_at": datetime.utcnow() + timedelta(seconds=1)})
+            await hearing_bookings.refresh(db)
+            await hearing_bookings.sync_days(db, [(LAWYER, day)])
+            if await listed(client) != 1:
+                problems.append("a slot held by a request in flight was replaced by the stored copy")
+    return problems
+
+
+def main() -> None:
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ["CHANGE_FEED_SOURCE"] = "local"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+
+    problems = asyncio.run(check_bookings())
+    if problems:
+        print(f"{len(problems)} problems:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("hearing bookings: writes and refreshes see hearings booked through other workers")
+
+
+if __name__ == "__main__":
+    main()
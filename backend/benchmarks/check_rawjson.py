@@ -0,0 +1,117 @@
+# benchmarks/check_rawjson.py
+"""
+Check that the RawBSON -> JSON fast path (settings.raw_bson_responses)
+returns exactly what the regular path does.
+
+Seeds the in-memory engine, adds records that exercise escaping, null
+optionals and clock times, then requests every list route under /cases (with and without
+fields=, as JSON and as NDJSON) once with the fast path off and once with
+it on, and compares status and body byte for byte. The response cache is
+turned off so every request runs its handler, and a fast request that
+returned documents without going through the transcoder counts as a
+failure too. Exits 1 on any difference.
+
+Run from backend/:
+
+    python -m benchmarks.check_rawjson [--cases 60]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+ROUTES = [
+    ("/cases/", None),
+    ("/cases/", "case_title,filing_date,status"),
+    ("/cases/{id}/parties", None),
+    ("/cases/{id}/hearings", None),
+    ("/cases/{id}/hearings", "hearing_date,next_hearing_date"),
+    ("/cases/{id}/documents", None),
+    ("/cases/{id}/notes", None),
+    ("/cases/{id}/tasks", None),
+    ("/cases/{id}/tasks", "title,due_date,status"),
+]
+NDJSON = {"accept": "application/x-ndjson"}
+
+
+async def check_equivalence(cases: int) -> Tuple[int, List[str]]:
+    import httpx
+    from app.core.config import settings
+    from app.db.mongo import get_db
+    from app.main import app
+    from app.models import rawjson
+    from benchmarks.seed import seed
+
+    # Count documents the fast path renders, to tell it ran
+    transcoded = 0
+    transcode = rawjson.transcode
+
+    def counting(*args: Any) -> str:
+        nonlocal transcoded
+        transcoded += 1
+        return transcode(*args)
+
+    rawjson.transcode = counting
+    settings.response_cache_enabled = False
+    problems: List[str] = []
+    compared = 0
+    try:
+        async with app.router.lifespan_context(app):
+            seeded = await seed(get_db(), cases, 0)
+            case_ids = [str(oid) for oid in seeded["case_ids"]]
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+                # Escaping: non-ASCII, quotes, control characters, a null optional
+                cid = case_ids[0]
+                await client.post(f"/cases/{cid}/notes", json={
+                    "case_id": cid, "content": "बहस — “quoted” \"x\"\n\tback\\slash \U0001F680  ",
+                    "created_by": "check"})
+                await client.post(f"/cases/{cid}/tasks", json={"case_id": cid, "title": "No due date"})
+                await client.post(f"/cases/{cid}/hearings", json={
+                    "case_id": cid, "hearing_date": "2031-02-03", "start_time": "10:30", "end_time": "11:15"})
+
+                for case_id in case_ids:
+                    for path, fields in ROUTES:
+                        url = path.format(id=case_id)
+                        params: Dict[str, Any] = {"limit": 100} if path == "/cases/" else {}
+                        if fields:
+                            params["fields"] = fields
+                        for headers in ({}, NDJSON) if path != "/cases/" else ({},):
+                            settings.raw_bson_responses = False
+                            regular = await client.get(url, params=params, headers=headers)
+                            settings.raw_bson_responses = True
+                            before = transcoded
+                            fast = await client.get(url, params=params, headers=headers)
+                            settings.raw_bson_responses = False
+                            compared += 1
+                            label = f"{url} {params}{' ndjson' if headers else ''}"
+                            if regular.status_code != fast.status_code or regular.content != fast.content:
+                                problems.append(f"{label}: {regular.content[:200]!r} != {fast.content[:200]!r}")
+                            elif fast.content not in (b"[]", b"") and transcoded == before:
+                                problems.append(f"{label}: not served by the fast path")
+    finally:
+        rawjson.transcode = transcode
+    return compared, problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=60, help="Seeded cases")
+    args = parser.parse_args()
+
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+
+    compared, problems = asyncio.run(check_equivalence(args.cases))
+    if problems:
+        print(f"{len(problems)} of {compared} responses differ:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"equivalence: {compared} responses identical, all served by the fast path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/check_repositories.py
+"""
+Check that the two implementations of each aggregate repository agree.
+
+Runs on the in-memory engine, where both work: the Motor implementations
+(CaseRepository, MatterRepository) through the engine's collection API, the
+in-memory ones (MemoryCaseRepository, MemoryMatterRepository) through its
+grouped reads. For seeded cases, every section with and without a limit,
+and for a matter with a few timeline buckets, every timeline page, must
+come back the same from both. The case batch endpoint is then run once
+with the engine's transactions on and once with them off, and must write
+the same. Exits 1 on any failure.
+
+Run from backend/:
+
+    python -m benchmarks.check_repositories
+"""
+import asyncio
+import os
+import sys
+from typing import Any, List
+
+CASES = 20
+EVENTS = 23
+BUCKET_SIZE = 5
+
+
+async def check_repositories() -> List[str]:
+    import httpx
+    from bson import ObjectId
+    from app.core.config import settings
+    from app.db import mongo
+    from app.db.mongo import get_db
+    from app.db.repositories import (
+        CASE_SECTIONS, CaseRepository, MatterRepository, MemoryCaseRepository, MemoryMatterRepository
+    )
+    from app.main import app
+    from benchmarks.seed import seed
+
+    problems: List[str] = []
+    settings.matter_timeline_bucket_size = BUCKET_SIZE
+
+    async with app.router.lifespan_context(app):
+        db = get_db()
+        case_ids = (await seed(db, CASES, 0))["case_ids"]
+        motor, memory = CaseRepository(db), MemoryCaseRepository(db)
+        for ids in (case_ids, case_ids[:1], []):
+            for limit in (None, 1, 3):
+                expected = await motor.sections(ids, CASE_SECTIONS, limit)
+                found = await memory.sections(ids, CASE_SECTIONS, limit)
+                if found != expected:
+                    problems.append(f"case sections differ for {len(ids)} cases, limit {limit}")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            matter = (await client.post("/matters/", json={"title": "Timeline"})).json()
+            for i in range(EVENTS):
+                await client.post(f"/matters/{matter['_id']}/timeline", json={"event_type": "note", "text": f"event {i}"})
+            oid = ObjectId(matter["_id"])
+            motor_matters, memory_matters = MatterRepository(db), MemoryMatterRepository(db)
+            for skip in range(0, EVENTS + 2, 3):
+                for limit in (1, 4, 50):
+                    expected = await motor_matters.timeline(oid, skip, limit)
+                    found = await memory_matters.timeline(oid, skip, limit)
+                    if found != expected:
+                        problems.append(f"timeline differs at skip {skip}, limit {limit}")
+            newest = await memory_matters.timeline(oid, 0, 1)
+            if not newest or newest[0]["text"] != f"event {EVENTS - 1}":
+                problems.append(f"newest timeline event is {newest}")
+
+            # The batch endpoint with and without transactions
+            written = []
+            for transactions in (True, False):
+                settings.memory_transactions = transactions
+                mongo._transactions.clear()
+                case_id = str(case_ids[int(transactions)])
+                response = await client.post(f"/cases/{case_id}/batch", json={"operations": [
+                    {"op": "add_note", "data": {"content": "batched", "created_by": "check"}},
+                    {"op": "update_case", "data": {"status": "Disposed"}},
+                ]})
+                body: Any = response.json()
+                if response.status_code != 200 or body["transaction"] != transactions:
+                    problems.append(f"batch, transactions {transactions}: {response.status_code} {body}")
+                    continue
+                written.append([result["status"] for result in body["results"]])
+            if len(written) == 2 and written[0] != written[1]:
+                problems.append(f"batch results differ with and without transactions: {written}")
+            settings.memory_transactions = True
+            mongo._transactions.clear()
+    return problems
+
+
+def main() -> None:
+    os.environ["DB_ENGINE"] = "memory"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "law_matters_bench")
+
+    problems = asyncio.run(check_repositories())
+    if problems:
+        print(f"{len(problems)} problems:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("repositories: Motor and in-memory implementations agree, batch writes the same without transactions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# benchmarks/load.py
+"""
+Concurrent load benchmark for the API, driven in-process through an ASGI client.
+
+Seeds a database (see benchmarks/seed.py), then runs a weighted mix of
+list_cases, get_case, child record CRUD and list_matters from ``--concurrency``
+virtual clients and reports p50/p95/p99 latency and throughput per route.
+
+Run from backend/:
+
+    python -m benchmarks.load --engine memory --cases 500
+    python -m benchmarks.load --engine mongo --mongo-uri mongodb://localhost:27017
+    python -m benchmarks.load --save-baseline       # write benchmarks/baselines/<engine>.json
+    python -m benchmarks.load --compare             # exit 1 on regression against it
+
+Each invocation runs the mix ``--runs`` times on a freshly seeded database
+and reports, saves and compares the per-route median of the runs. Baselines
+depend on the machine, so they are not committed: save one on the machine
+(and build) you compare on. The gate is meant to catch large regressions,
+not noise: a route fails when it is both ``--tolerance`` (default 50%) and
+``--min-delta-ms`` (default 5 ms) slower than the baseline, or its throughput
+drops by more than the tolerance.
+
+With ``--engine mongo`` the benchmark database (``--db``, default
+law_matters_bench) is dropped before seeding, so never point it at real data.
+No network access is needed beyond the local mongod.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+def _configure(args: argparse.Namespace) -> None:
+    # Settings are read at import time, so the environment must be set first
+    os.environ["DB_ENGINE"] = args.engine
+    os.environ["MONGO_DB"] = args.db
+    os.environ["MONGO_URI"] = args.mongo_uri
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Dict[str, float]]:
+    report = {}
+    for route in sorted(samples):
+        latencies = samples[route]
+        report[route] = {
+            "count": len(latencies),
+            "errors": errors.get(route, 0),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        }
+    return report
+
+
+def median_report(reports: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Per-route median of each metric over several runs; errors are summed"""
+    merged = {}
+    for route in sorted(set().union(*reports)):
+        rows = [report[route] for report in reports if route in report]
+        merged[route] = {metric: round(statistics.median(row[metric] for row in rows), 3)
+                         for metric in ("count", "p50_ms", "p95_ms", "p99_ms", "rps")}
+        merged[route]["count"] = int(merged[route]["count"])
+        merged[route]["errors"] = sum(row["errors"] for row in rows)
+    return merged
+
+
+def print_report(report: Dict[str, Dict[str, float]], elapsed: float) -> None:
+    print(f"{'route':<18}{'count':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for route, row in report.items():
+        print(f"{route:<18}{row['count']:>8}{row['errors']:>6}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['rps']:>10.1f}")
+    total = sum(row["count"] for row in report.values())
+    if elapsed:
+        print(f"total {total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+
+
+# p99 over a few hundred samples is a handful of requests; only gate on it with enough data
+P99_MIN_SAMPLES = 1000
+
+
+def compare(report: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float,
+            min_delta_ms: float = 5.0) -> List[str]:
+    """Regressions against a stored baseline, as readable messages"""
+    problems = []
+    for route, row in report.items():
+        if row["errors"]:
+            problems.append(f"{route}: {row['errors']} failed requests")
+        base = baseline["routes"].get(route)
+        if not base:
+            continue
+        metrics = ["p50_ms", "p95_ms"]
+        if row["count"] >= P99_MIN_SAMPLES:
+            metrics.append("p99_ms")
+        for metric in metrics:
+            limit = max(base[metric] * (1 + tolerance), base[metric] + min_delta_ms)
+            if row[metric] > limit:
+                problems.append(f"{route}: {metric} {row[metric]:.2f} > {limit:.2f} (baseline {base[metric]:.2f})")
+        if row["rps"] < base["rps"] / (1 + tolerance):
+            problems.append(f"{route}: throughput {row['rps']:.1f} req/s < baseline {base['rps']:.1f}")
+    return problems
+
+
+def build_operations(client: Any, case_ids: List[str], rng: random.Random) -> List[Tuple[str, int, Callable[[], Awaitable[Any]]]]:
+    """Weighted request mix. Each operation returns the response it issued last."""
+    new_case_payload = {
+        "case_title": "Benchmark vs State", "court_type": "HC",
+        "court_name_id": "bench", "filing_date": "2024-01-15", "category_id": "bench",
+        "client_id": "bench", "assigned_lawyer_id": "bench", "created_by": "bench",
+    }
+
+    # Case numbers are unique per court (app/core/duplicates.py)
+    case_numbers = itertools.count(1)
+
+    def case_id() -> str:
+        return rng.choice(case_ids)
+
+    async def list_cases():
+        return await client.get("/cases/", params={"skip": rng.randint(0, 200), "limit": 20})
+
+    async def get_case():
+        return await client.get(f"/cases/{case_id()}")
+
+    async def list_matters():
+        return await client.get("/matters/")
+
+    async def list_hearings():
+        return await client.get(f"/cases/{case_id()}/hearings")
+
+    async def list_notes():
+        return await client.get(f"/cases/{case_id()}/notes")
+
+    async def note_crud():
+        cid = case_id()
+        r = await client.post(f"/cases/{cid}/notes", json={"case_id": cid, "content": "Bench note", "created_by": "bench"})
+        if r.status_code != 201:
+            return r
+        nid = r.json()["_id"]
+        r = await client.patch(f"/cases/{cid}/notes/{nid}", json={"content": "Bench note edited"})
+        if r.status_code != 200:
+            return r
+        return await client.delete(f"/cases/{cid}/notes/{nid}")
+
+    async def add_hearing():
+        cid = case_id()
+        return await client.post(f"/cases/{cid}/hearings", json={
+            "case_id": cid, "hearing_date": "2025-01-10", "stage": "Arguments", "courtroom": "Court No. 3"})
+
+    async def task_crud():
+        cid = case_id()
+        r = await client.post(f"/cases/{cid}/tasks", json={"case_id": cid, "title": "Bench task", "due_date": "2025-02-01"})
+        if r.status_code != 201:
+            return r
+        tid = r.json()["_id"]
+        r = await client.patch(f"/cases/{cid}/tasks/{tid}", json={"status": "completed"})
+        if r.status_code != 200:
+            return r
+        return await client.delete(f"/cases/{cid}/tasks/{tid}")
+
+    async def create_case():
+        return await client.post("/cases/", json={**new_case_payload, "case_number": f"BENCH {next(case_numbers)}/2024"})
+
+    return [
+        ("list_cases", 25, list_cases),
+        ("get_case", 25, get_case),
+        ("list_matters", 8, list_matters),
+        ("list_hearings", 8, list_hearings),
+        ("list_notes", 8, list_notes),
+        ("note_crud", 10, note_crud),
+        ("add_hearing", 6, add_hearing),
+        ("task_crud", 6, task_crud),
+        ("create_case", 4, create_case),
+    ]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from app.db.mongo import get_client, get_db
+    from app.main import app
+    from benchmarks.seed import seed
+
+    await get_client().drop_database(args.db)
+
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        seeded = await seed(get_db(), args.cases, args.matters, args.seed)
+        print(f"seeded {seeded['counts']} in {time.perf_counter() - started:.1f}s")
+        case_ids = [str(oid) for oid in seeded["case_ids"]]
+
+        samples: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            rng = random.Random(args.seed)
+            operations = build_operations(client, case_ids, rng)
+            names = [op[0] for op in operations]
+            weights = [op[1] for op in operations]
+            calls = {op[0]: op[2] for op in operations}
+            plan = rng.choices(names, weights=weights, k=args.requests)
+            queue: asyncio.Queue = asyncio.Queue()
+            for name in plan:
+                queue.put_nowait(name)
+
+            # Warm up each route once so first-call costs stay out of the numbers
+            for name in names:
+                await calls[name]()
+
+            async def worker() -> None:
+                while True:
+                    try:
+                        name = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    start = time.perf_counter()
+                    response = await calls[name]()
+                    samples.setdefault(name, []).append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors[name] = errors.get(name, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+        await get_client().drop_database(args.db)
+
+    report = summarize(samples, errors, elapsed)
+    print_report(report, elapsed)
+    return report
+
+
+async def run_all(args: argparse.Namespace) -> Dict[str, Any]:
+    reports = []
+    for i in range(args.runs):
+        if args.runs > 1:
+            print(f"\nrun {i + 1} of {args.runs}")
+        reports.append(await run(args))
+    report = median_report(reports)
+    if args.runs > 1:
+        print(f"\nmedian of {args.runs} runs")
+        print_report(report, 0.0)
+    return {
+        "engine": args.engine,
+        "params": {"cases": args.cases, "matters": args.matters, "requests": args.requests,
+                   "concurrency": args.concurrency, "seed": args.seed, "runs": args.runs},
+        "routes": report,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="law_matters_bench")
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--matters", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, default=3, help="Runs whose per-route median is reported and compared")
+    parser.add_argument("--baseline", type=Path, help="Baseline file (default baselines/<engine>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail if slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown before --compare fails")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="Latency differences below this never count as a regression")
+    args = parser.parse_args()
+    _configure(args)
+
+    result = asyncio.run(run_all(args))
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.engine}.json"
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"baseline written to {baseline_path}")
+
+    if args.compare:
+        if not baseline_path.exists():
+            sys.exit(f"no baseline at {baseline_path}, run with --save-baseline first")
+        baseline = json.loads(baseline_path.read_text())
+        if baseline["params"] != result["params"]:
+            print(f"warning: baseline was recorded with {baseline['params']}")
+        problems = compare(result["routes"], baseline, args.tolerance, args.min_delta_ms)
+        if problems:
+            print("regressions:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/seed.py
+"""
+Seed a database with cases, their related records and matters.
+
+Related record counts are heavy tailed: most cases have a handful of
+hearings and notes, a few long-running ones have hundreds. The shapes match
+what the routers in app/routers write.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+COURT_TYPES = ["SC", "HC", "HC", "District", "District", "District"]
+STAGES = ["Admission", "Notice", "Evidence", "Arguments", "Orders", "Final Hearing"]
+DOCUMENT_CATEGORIES = ["Petition", "Judgment", "Hearing Note", "Evidence", "Other"]
+TASK_STATUSES = ["open", "open", "in_progress", "completed"]
+PRIORITIES = ["low", "medium", "medium", "high"]
+
+
+def _skewed(rng: random.Random, scale: float, cap: int) -> int:
+    """Pareto distributed count: small for most cases, long tail for a few"""
+    return min(int((rng.paretovariate(1.3) - 1) * scale), cap)
+
+
+def _day(base: datetime, days: int) -> datetime:
+    return datetime.combine((base + timedelta(days=days)).date(), datetime.min.time())
+
+
+def make_case(rng: random.Random, i: int, lawyers: List[ObjectId], clients: List[ObjectId],
+              courts: List[str], categories: List[str]) -> Dict[str, Any]:
+    filed = _day(datetime(2015, 1, 1), rng.randint(0, 3600))
+    updated = filed + timedelta(days=rng.randint(0, 400), minutes=rng.randint(0, 1440))
+    return {
+        "_id": ObjectId(),
+        "case_title": f"Petitioner {i} vs State of {rng.choice(['Delhi', 'Maharashtra', 'Karnataka', 'Punjab'])}",
+        "case_number": f"{rng.choice(['CRL.A.', 'W.P.(C)', 'CS', 'MAC'])} {i}/{filed.year}",
+        "court_type": rng.choice(COURT_TYPES),
+        "court_name_id": rng.choice(courts),
+        "judge_name": f"Hon. Justice {rng.choice(['Rao', 'Mehta', 'Iyer', 'Singh', 'Das'])}",
+        "filing_date": filed,
+        "category_id": rng.choice(categories),
+        "subcategory_id": None,
+        "client_id": str(rng.choice(clients)),
+        "assigned_lawyer_id": str(rng.choice(lawyers)),
+        "status": "Disposed" if rng.random() < 0.3 else "Active",
+        "created_by": str(rng.choice(lawyers)),
+        "created_at": filed,
+        "updated_at": updated,
+    }
+
+
+def make_children(rng: random.Random, case: Dict[str, Any], lawyers: List[ObjectId]) -> Dict[str, List[Dict[str, Any]]]:
+    oid = case["_id"]
+    filed = case["filing_date"]
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    children["case_parties"] = [
+        {"case_id": oid, "party_type": "Petitioner" if p % 2 == 0 else "Respondent",
+         "name": f"Party {p}", "phone": None, "address": None, "created_at": filed}
+        for p in range(2 + _skewed(rng, 1, 30))
+    ]
+    hearings = []
+    for h in range(_skewed(rng, 6, 400)):
+        date = _day(filed, 30 * (h + 1))
+        hearings.append({
+            "case_id": oid, "hearing_date": date, "stage": rng.choice(STAGES),
+            "courtroom": f"Court No. {rng.randint(1, 40)}",
+            "order_summary": rng.choice(["Adjourned at request of counsel", "Arguments heard in part",
+                                         "Notice issued", "Reply to be filed"]),
+            "next_hearing_date": _day(date, 30), "purpose_next": "Arguments", "order_file": None,
+            "assigned_lawyer_id": str(rng.choice(lawyers)), "created_at": date,
+        })
+    children["case_hearings"] = hearings
+    children["case_documents"] = [
+        {"case_id": oid, "category": rng.choice(DOCUMENT_CATEGORIES), "document_name": f"Document {d}",
+         "file_path": f"/uploads/{oid}/{d}.pdf", "notes": None, "uploaded_by": str(rng.choice(lawyers)),
+         "uploaded_at": filed + timedelta(days=d)}
+        for d in range(_skewed(rng, 4, 200))
+    ]
+    children["case_notes"] = [
+        {"case_id": oid, "content": "Discussed strategy with client. " * rng.randint(1, 12),
+         "created_by": str(rng.choice(lawyers)), "created_at": filed + timedelta(days=n)}
+        for n in range(_skewed(rng, 5, 1000))
+    ]
+    children["case_tasks"] = [
+        {"case_id": oid, "title": f"Task {t}", "description": None, "assigned_to": str(rng.choice(lawyers)),
+         "due_date": _day(filed, 7 * (t + 1)), "status": rng.choice(TASK_STATUSES),
+         "priority": rng.choice(PRIORITIES), "created_at": filed + timedelta(days=t)}
+        for t in range(_skewed(rng, 3, 100))
+    ]
+    return children
+
+
+def make_matter(rng: random.Random, i: int) -> Dict[str, Any]:
+    created = datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 1500))
+    return {
+        "title": f"Matter {i}", "description": None, "status": rng.choice(["open", "open", "closed"]),
+        "client": None, "assigned_to": None, "tags": [], "timeline": [], "timeline_count": 0,
+        "timeline_version": 2, "is_archived": False, "created_at": created, "updated_at": created,
+    }
+
+
+async def seed(db: AsyncIOMotorDatabase, cases: int, matters: int = 0, seed_value: int = 42,
+               batch: int = 500) -> Dict[str, Any]:
+    """Insert ``cases`` cases with related records and ``matters`` matters. Returns ids and counts."""
+    rng = random.Random(seed_value)
+    lawyers = [ObjectId() for _ in range(max(5, cases // 50))]
+    clients = [ObjectId() for _ in range(max(10, cases // 5))]
+    courts = [str(ObjectId()) for _ in range(25)]
+    categories = [str(ObjectId()) for _ in range(12)]
+
+    case_ids: List[ObjectId] = []
+    counts: Dict[str, int] = {"cases": 0}
+    pending: Dict[str, List[Dict[str, Any]]] = {"cases": []}
+
+    async def flush(force: bool = False) -> None:
+        for name, docs in pending.items():
+            if docs and (force or len(docs) >= batch):
+                await db[name].insert_many(docs)
+                counts[name] = counts.get(name, 0) + len(docs)
+                pending[name] = []
+
+    for i in range(cases):
+        case = make_case(rng, i, lawyers, clients, courts, categories)
+        case_ids.append(case["_id"])
+        pending["cases"].append(case)
+        for name, docs in make_children(rng, case, lawyers).items():
+            pending.setdefault(name, []).extend(docs)
+        await flush()
+
+    pending["matters"] = [make_matter(rng, i) for i in range(matters)]
+    await flush(force=True)
+    return {"case_ids": case_ids, "lawyers": lawyers, "counts": counts}